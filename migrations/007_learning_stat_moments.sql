@@ -0,0 +1,231 @@
+-- ============================================================
+-- Migration 007: Incrementally maintained learning statistics
+-- 學習統計累計表（count / sum / sum of squares）
+--
+-- Purpose: 讓 calculate_dynamic_factors / weather_impact_learner 直接讀取
+--          預先計算的 moments，而不是每次全表掃描 actual_data /
+--          learning_records。觸發器在 INSERT / UPDATE / DELETE 時以
+--          「減舊值、加新值」增量維護；TRUNCATE（clear-and-reimport）
+--          時清零對應的組。
+-- Date: 2026-10-18
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS learning_stat_moments (
+    stat_group VARCHAR(50) NOT NULL,     -- 'actual_all', 'actual_dow', 'actual_month', 'actual_mmdd', 'lr_attendance'
+    group_key VARCHAR(50) NOT NULL,      -- 'all' / DoW 0-6 / 月份 1-12 / 'MM-DD' / 天氣組合名
+    n BIGINT NOT NULL DEFAULT 0,
+    sum_x DOUBLE PRECISION NOT NULL DEFAULT 0,
+    sum_x2 DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (stat_group, group_key)
+);
+
+COMMENT ON TABLE learning_stat_moments IS '按組累計的 count / sum / sum of squares，由觸發器增量維護';
+
+-- ------------------------------------------------------------
+-- 單組增量（sign = 1 加入，-1 移除）
+-- ------------------------------------------------------------
+CREATE OR REPLACE FUNCTION apply_stat_moment(
+    p_group VARCHAR, p_key VARCHAR, p_sign INTEGER, p_x DOUBLE PRECISION
+) RETURNS VOID AS $$
+BEGIN
+    IF p_x IS NULL THEN
+        RETURN;
+    END IF;
+    INSERT INTO learning_stat_moments (stat_group, group_key, n, sum_x, sum_x2, updated_at)
+    VALUES (p_group, p_key, p_sign, p_sign * p_x, p_sign * p_x * p_x, NOW())
+    ON CONFLICT (stat_group, group_key) DO UPDATE SET
+        n = learning_stat_moments.n + EXCLUDED.n,
+        sum_x = learning_stat_moments.sum_x + EXCLUDED.sum_x,
+        sum_x2 = learning_stat_moments.sum_x2 + EXCLUDED.sum_x2,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+-- ------------------------------------------------------------
+-- actual_data.patient_count → overall / DoW / month / MM-DD
+-- ------------------------------------------------------------
+CREATE OR REPLACE FUNCTION apply_actual_data_moments(p_date DATE, p_count NUMERIC, p_sign INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    IF p_date IS NULL OR p_count IS NULL THEN
+        RETURN;
+    END IF;
+    PERFORM apply_stat_moment('actual_all', 'all', p_sign, p_count::double precision);
+    PERFORM apply_stat_moment('actual_dow', EXTRACT(DOW FROM p_date)::int::text, p_sign, p_count::double precision);
+    PERFORM apply_stat_moment('actual_month', EXTRACT(MONTH FROM p_date)::int::text, p_sign, p_count::double precision);
+    PERFORM apply_stat_moment('actual_mmdd', TO_CHAR(p_date, 'MM-DD'), p_sign, p_count::double precision);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION trg_actual_data_moments() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_actual_data_moments(OLD.date, OLD.patient_count, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_actual_data_moments(NEW.date, NEW.patient_count, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS actual_data_moments ON actual_data;
+CREATE TRIGGER actual_data_moments
+    AFTER INSERT OR UPDATE OF date, patient_count OR DELETE ON actual_data
+    FOR EACH ROW EXECUTE FUNCTION trg_actual_data_moments();
+
+-- TRUNCATE 不觸發行級觸發器，清除後重新導入前必須清零，否則累計值會重複計算
+CREATE OR REPLACE FUNCTION trg_actual_data_moments_truncate() RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM learning_stat_moments
+    WHERE stat_group IN ('actual_all', 'actual_dow', 'actual_month', 'actual_mmdd');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS actual_data_moments_truncate ON actual_data;
+CREATE TRIGGER actual_data_moments_truncate
+    AFTER TRUNCATE ON actual_data
+    FOR EACH STATEMENT EXECUTE FUNCTION trg_actual_data_moments_truncate();
+
+-- ------------------------------------------------------------
+-- learning_records.actual_attendance → overall + 天氣組合
+-- （組合與 weather_impact_learner.WEATHER_COMBINATIONS 一致）
+-- ------------------------------------------------------------
+CREATE OR REPLACE FUNCTION apply_learning_record_moments(
+    p_attendance NUMERIC,
+    p_very_cold BOOLEAN, p_very_hot BOOLEAN, p_heavy_rain BOOLEAN, p_strong_wind BOOLEAN,
+    p_sign INTEGER
+) RETURNS VOID AS $$
+DECLARE
+    x DOUBLE PRECISION := p_attendance::double precision;
+BEGIN
+    IF p_attendance IS NULL THEN
+        RETURN;
+    END IF;
+    PERFORM apply_stat_moment('lr_attendance', 'all', p_sign, x);
+    IF p_very_cold THEN
+        PERFORM apply_stat_moment('lr_attendance', 'very_cold', p_sign, x);
+    END IF;
+    IF p_very_hot THEN
+        PERFORM apply_stat_moment('lr_attendance', 'very_hot', p_sign, x);
+    END IF;
+    IF p_heavy_rain THEN
+        PERFORM apply_stat_moment('lr_attendance', 'heavy_rain', p_sign, x);
+    END IF;
+    IF p_strong_wind THEN
+        PERFORM apply_stat_moment('lr_attendance', 'strong_wind', p_sign, x);
+    END IF;
+    IF p_very_cold AND p_heavy_rain THEN
+        PERFORM apply_stat_moment('lr_attendance', 'cold_and_rain', p_sign, x);
+    END IF;
+    IF p_very_hot AND p_heavy_rain THEN
+        PERFORM apply_stat_moment('lr_attendance', 'hot_and_rain', p_sign, x);
+    END IF;
+    IF p_very_cold AND p_strong_wind THEN
+        PERFORM apply_stat_moment('lr_attendance', 'cold_and_wind', p_sign, x);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION trg_learning_record_moments() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_learning_record_moments(
+            OLD.actual_attendance, OLD.is_very_cold, OLD.is_very_hot, OLD.is_heavy_rain, OLD.is_strong_wind, -1
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_learning_record_moments(
+            NEW.actual_attendance, NEW.is_very_cold, NEW.is_very_hot, NEW.is_heavy_rain, NEW.is_strong_wind, 1
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS learning_record_moments ON learning_records;
+CREATE TRIGGER learning_record_moments
+    AFTER INSERT
+        OR UPDATE OF actual_attendance, is_very_cold, is_very_hot, is_heavy_rain, is_strong_wind
+        OR DELETE
+    ON learning_records
+    FOR EACH ROW EXECUTE FUNCTION trg_learning_record_moments();
+
+CREATE OR REPLACE FUNCTION trg_learning_record_moments_truncate() RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM learning_stat_moments WHERE stat_group = 'lr_attendance';
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS learning_record_moments_truncate ON learning_records;
+CREATE TRIGGER learning_record_moments_truncate
+    AFTER TRUNCATE ON learning_records
+    FOR EACH STATEMENT EXECUTE FUNCTION trg_learning_record_moments_truncate();
+
+-- ------------------------------------------------------------
+-- 全量重建（初次安裝 / 修正漂移）
+-- ------------------------------------------------------------
+CREATE OR REPLACE FUNCTION rebuild_learning_stat_moments() RETURNS INTEGER AS $$
+DECLARE
+    row_count INTEGER;
+BEGIN
+    LOCK TABLE learning_stat_moments IN EXCLUSIVE MODE;
+    DELETE FROM learning_stat_moments;
+
+    INSERT INTO learning_stat_moments (stat_group, group_key, n, sum_x, sum_x2)
+    SELECT
+        CASE
+            WHEN GROUPING(dow) = 0 THEN 'actual_dow'
+            WHEN GROUPING(month) = 0 THEN 'actual_month'
+            WHEN GROUPING(mmdd) = 0 THEN 'actual_mmdd'
+            ELSE 'actual_all'
+        END,
+        COALESCE(dow::text, month::text, mmdd, 'all'),
+        COUNT(*),
+        SUM(x),
+        SUM(x * x)
+    FROM (
+        SELECT
+            patient_count::double precision AS x,
+            EXTRACT(DOW FROM date)::int AS dow,
+            EXTRACT(MONTH FROM date)::int AS month,
+            TO_CHAR(date, 'MM-DD') AS mmdd
+        FROM actual_data
+        WHERE patient_count IS NOT NULL AND date IS NOT NULL
+    ) a
+    GROUP BY GROUPING SETS ((), (dow), (month), (mmdd));
+
+    INSERT INTO learning_stat_moments (stat_group, group_key, n, sum_x, sum_x2)
+    SELECT 'lr_attendance', c.name, COUNT(*), SUM(lr.x), SUM(lr.x * lr.x)
+    FROM (
+        SELECT
+            actual_attendance::double precision AS x,
+            is_very_cold, is_very_hot, is_heavy_rain, is_strong_wind
+        FROM learning_records
+        WHERE actual_attendance IS NOT NULL
+    ) lr
+    JOIN (VALUES
+        ('all'), ('very_cold'), ('very_hot'), ('heavy_rain'), ('strong_wind'),
+        ('cold_and_rain'), ('hot_and_rain'), ('cold_and_wind')
+    ) AS c (name) ON
+        CASE c.name
+            WHEN 'all' THEN TRUE
+            WHEN 'very_cold' THEN lr.is_very_cold
+            WHEN 'very_hot' THEN lr.is_very_hot
+            WHEN 'heavy_rain' THEN lr.is_heavy_rain
+            WHEN 'strong_wind' THEN lr.is_strong_wind
+            WHEN 'cold_and_rain' THEN lr.is_very_cold AND lr.is_heavy_rain
+            WHEN 'hot_and_rain' THEN lr.is_very_hot AND lr.is_heavy_rain
+            WHEN 'cold_and_wind' THEN lr.is_very_cold AND lr.is_strong_wind
+        END
+    GROUP BY c.name;
+
+    SELECT COUNT(*) INTO row_count FROM learning_stat_moments;
+    RETURN row_count;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_learning_stat_moments();
@@ -0,0 +1,29 @@
+-- ============================================================
+-- Migration 008: prediction_accuracy change notification
+-- prediction_accuracy 變更通知
+--
+-- Purpose: 預測進程在記憶體中保留最近的 (predicted, actual, CI 命中)
+--          窗口；每當 prediction_accuracy 寫入 / 更新 / 刪除時
+--          NOTIFY 'prediction_accuracy_changed'，payload 為 target_date，
+--          讓窗口只重新讀取變更的日期。未安裝時改為定時 watermark 檢查。
+-- Date: 2026-10-18
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION notify_prediction_accuracy_changed() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('prediction_accuracy_changed', OLD.target_date::text);
+    ELSE
+        PERFORM pg_notify('prediction_accuracy_changed', NEW.target_date::text);
+        IF TG_OP = 'UPDATE' AND OLD.target_date IS DISTINCT FROM NEW.target_date THEN
+            PERFORM pg_notify('prediction_accuracy_changed', OLD.target_date::text);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS prediction_accuracy_notify ON prediction_accuracy;
+CREATE TRIGGER prediction_accuracy_notify
+    AFTER INSERT OR UPDATE OR DELETE ON prediction_accuracy
+    FOR EACH ROW EXECUTE FUNCTION notify_prediction_accuracy_changed();
@@ -36,13 +36,17 @@ class AutoTrainManager {
             // 🔬 自動特徵優化配置 (v2.9.52)
             enableAutoOptimize: process.env.ENABLE_AUTO_OPTIMIZE !== 'false', // 默認啟用
             optimizeEveryNTrains: 5,        // 每 5 次訓練自動優化一次特徵
-            optimizeOnNewData: 50           // 每 50 筆新數據自動優化一次
+            optimizeOnNewData: 50,          // 每 50 筆新數據自動優化一次
+            // 距上次完整優化超過 N 小時則跑完整模式（預設每晚一次），否則 --quick
+            optimizeFullEveryHours: parseFloat(process.env.AUTO_OPTIMIZE_FULL_EVERY_HOURS || '20'),
+            optimizeTimeBudget: parseInt(process.env.AUTO_OPTIMIZE_TIME_BUDGET || '2700', 10)  // 秒
         };
         
         // 優化追蹤
         this.trainCountSinceOptimize = 0;
         this.dataCountSinceOptimize = 0;
         this.lastOptimizeDate = null;
+        this.lastFullOptimizeDate = this._loadLastFullOptimizeDate();
         this.isOptimizing = false;
         
         // 確保模型目錄存在
@@ -507,7 +511,22 @@ class AutoTrainManager {
             this.lastTrainingError = error;
             
             if (code === 0) {
-                if (modelStatus.available) {
+                const skipped = output.includes('skipped — identical inputs');
+                if (modelStatus.available && skipped) {
+                    // 訓練指紋未變（數據、代碼版本、特徵、超參數相同），沿用現有 bundle
+                    console.log(`⏭️ 跳過訓練：輸入未變更（skipped — identical inputs，耗時 ${duration} 分鐘）`);
+                    if (dataCount !== null) {
+                        this.lastDataCount = dataCount;
+                    }
+                    await this._saveTrainingStatusToDB(dataCount, false);
+                    this.broadcastStatusChange({
+                        isTraining: false,
+                        success: true,
+                        skipped: true,
+                        message: '⏭️ skipped — identical inputs（沿用現有模型）'
+                    });
+                    resolve({ success: true, skipped: true, reason: 'skipped — identical inputs', duration: duration, models: modelStatus });
+                } else if (modelStatus.available) {
                     console.log(`✅ 模型訓練完成（耗時 ${duration} 分鐘）`);
                     console.log(`✅ 模型文件驗證通過`);
                     
@@ -784,6 +803,14 @@ class AutoTrainManager {
             };
         }
         
+        // 上次完整優化已超過 optimizeFullEveryHours（每晚一次完整模式）
+        if (this.lastFullOptimizeDate && this.isFullOptimizeDue()) {
+            return {
+                shouldOptimize: true,
+                reason: `距上次完整優化已超過 ${this.config.optimizeFullEveryHours} 小時`
+            };
+        }
+
         // 每 N 筆新數據優化一次
         this.dataCountSinceOptimize += newDataCount;
         if (this.dataCountSinceOptimize >= this.config.optimizeOnNewData) {
@@ -796,6 +823,41 @@ class AutoTrainManager {
         return { shouldOptimize: false, reason: '未達到優化條件' };
     }
     
+    /**
+     * 從優化歷史 (feature_optimization_history.json) 恢復上次完整優化時間，
+     * 避免每次重啟後第一次觸發都跑完整模式；時間預算用盡的部分結果不算
+     */
+    _loadLastFullOptimizeDate() {
+        try {
+            const historyPath = path.join(__dirname, '../python/models/feature_optimization_history.json');
+            if (!fs.existsSync(historyPath)) return null;
+            const history = JSON.parse(fs.readFileSync(historyPath, 'utf8'));
+            const fullRuns = (history.optimizations || []).filter(o => o.mode === 'full' && o.complete !== false);
+            if (fullRuns.length === 0) return null;
+            // timestamp 格式: 'YYYY-MM-DD HH:MM:SS HKT'
+            const timestamp = fullRuns[fullRuns.length - 1].timestamp.replace(' HKT', '+08:00').replace(' ', 'T');
+            const parsed = new Date(timestamp);
+            return isNaN(parsed.getTime()) ? null : parsed.toISOString();
+        } catch (e) {
+            console.warn('⚠️ 無法讀取特徵優化歷史:', e.message);
+            return null;
+        }
+    }
+    
+    /**
+     * 是否應跑完整模式（距上次完整優化超過 optimizeFullEveryHours）
+     */
+    isFullOptimizeDue() {
+        if (!(this.config.optimizeFullEveryHours > 0)) {
+            return false;
+        }
+        if (!this.lastFullOptimizeDate) {
+            return true;
+        }
+        const hoursSince = (Date.now() - new Date(this.lastFullOptimizeDate).getTime()) / 3600000;
+        return hoursSince >= this.config.optimizeFullEveryHours;
+    }
+    
     /**
      * 運行特徵優化
      */
@@ -811,6 +873,10 @@ class AutoTrainManager {
         return new Promise((resolve) => {
             const pythonScript = path.join(__dirname, '../python/auto_feature_optimizer.py');
             const args = quick ? ['--quick'] : [];
+            if (this.config.optimizeTimeBudget > 0) {
+                args.push('--time-budget', String(this.config.optimizeTimeBudget));
+            }
+            console.log(`🔬 模式: ${quick ? '快速' : '完整'}`);
             
             const python = spawn('python3', [pythonScript, ...args], {
                 cwd: path.join(__dirname, '../python'),
@@ -831,13 +897,18 @@ class AutoTrainManager {
             });
             
             python.on('close', (code) => {
+                // 退出碼 3：時間預算用盡，已保存部分結果（不算完整優化）
+                const partial = code === 3;
                 this.isOptimizing = false;
                 this.lastOptimizeDate = new Date().toISOString();
+                if (code === 0 && !quick) {
+                    this.lastFullOptimizeDate = this.lastOptimizeDate;
+                }
                 this.trainCountSinceOptimize = 0;
                 this.dataCountSinceOptimize = 0;
                 
-                if (code === 0) {
-                    console.log('✅ 特徵優化完成');
+                if (code === 0 || partial) {
+                    console.log(partial ? '⚠️ 特徵優化時間預算用盡，已保存部分結果' : '✅ 特徵優化完成');
                     
                     // 嘗試讀取優化結果
                     try {
@@ -850,7 +921,7 @@ class AutoTrainManager {
                         console.error('讀取優化結果失敗:', e);
                     }
                     
-                    resolve({ success: true, output });
+                    resolve({ success: true, partial, output });
                 } else {
                     console.error('❌ 特徵優化失敗:', error);
                     resolve({ success: false, error });
@@ -875,8 +946,8 @@ class AutoTrainManager {
         
         if (checkResult.shouldOptimize) {
             console.log(`🔬 觸發自動優化: ${checkResult.reason}`);
-            // 異步運行優化，不阻塞
-            this.runFeatureOptimization(true).then(result => {
+            // 異步運行優化，不阻塞（每晚一次完整模式，其餘快速模式）
+            this.runFeatureOptimization(!this.isFullOptimizeDue()).then(result => {
                 if (result.success) {
                     console.log('✅ 自動特徵優化完成');
                 } else {
@@ -898,12 +969,15 @@ class AutoTrainManager {
         return {
             isOptimizing: this.isOptimizing,
             lastOptimizeDate: this.lastOptimizeDate,
+            lastFullOptimizeDate: this.lastFullOptimizeDate,
             trainCountSinceOptimize: this.trainCountSinceOptimize,
             dataCountSinceOptimize: this.dataCountSinceOptimize,
             config: {
                 enabled: this.config.enableAutoOptimize,
                 everyNTrains: this.config.optimizeEveryNTrains,
-                onNewData: this.config.optimizeOnNewData
+                onNewData: this.config.optimizeOnNewData,
+                fullEveryHours: this.config.optimizeFullEveryHours,
+                timeBudgetSeconds: this.config.optimizeTimeBudget
             }
         };
     }
@@ -11,6 +11,8 @@ const fs = require('fs');
 
 const WEATHER_HISTORY_RECENT_LOOKBACK_DAYS = Math.max(7, parseInt(process.env.WEATHER_HISTORY_SYNC_LOOKBACK_DAYS || '60', 10) || 60);
 const WEATHER_HISTORY_HISTORICAL_DAILY_BATCH_SIZE = Math.max(0, parseInt(process.env.WEATHER_HISTORY_HISTORICAL_DAILY_BATCH_SIZE || '30', 10) || 30);
+// 單一 Python 進程跑完整學習流程（learning_orchestrator.py）；設 LEARNING_ORCHESTRATOR=0 回退逐個腳本
+const USE_LEARNING_ORCHESTRATOR = !['0', 'false', 'False'].includes(String(process.env.LEARNING_ORCHESTRATOR ?? '1'));
 
 class LearningScheduler {
     constructor() {
@@ -475,6 +477,14 @@ class LearningScheduler {
         console.log('='.repeat(60));
 
         try {
+            if (USE_LEARNING_ORCHESTRATOR) {
+                const summary = await this.runLearningOrchestrator('daily', [
+                    '--lookback-days', String(WEATHER_HISTORY_RECENT_LOOKBACK_DAYS),
+                    '--historical-batch', String(WEATHER_HISTORY_HISTORICAL_DAILY_BATCH_SIZE)
+                ]);
+                return this.finishOrchestratedTask('daily', 'Daily learning', startTime, summary);
+            }
+
             await this.runPythonScript('continuous_learner.py', ['--catch-up']);
             const recentBackfillRange = this.getBackfillDateRange(WEATHER_HISTORY_RECENT_LOOKBACK_DAYS);
             await this.runPythonScript('backfill_weather_learning.py', [
@@ -519,6 +529,11 @@ class LearningScheduler {
         console.log('='.repeat(60));
 
         try {
+            if (USE_LEARNING_ORCHESTRATOR) {
+                const summary = await this.runLearningOrchestrator('weekly');
+                return this.finishOrchestratedTask('weekly', 'Weekly learning', startTime, summary);
+            }
+
             await this.runPythonScript('backfill_weather_learning.py', ['--only-missing-core']);
             await this.runPythonScript('weather_impact_learner.py');
             await this.cacheWeatherForecast(trigger, { nested: true });
@@ -556,6 +571,11 @@ class LearningScheduler {
         console.log('Caching weather forecast...');
 
         try {
+            if (USE_LEARNING_ORCHESTRATOR && !nested) {
+                const summary = await this.runLearningOrchestrator('forecast');
+                return this.finishOrchestratedTask('forecast', 'Forecast cache', startTime, summary);
+            }
+
             await this.runPythonScript('forecast_predictor.py', ['--cache']);
             console.log('Weather forecast cached');
             if (nested) {
@@ -585,7 +605,62 @@ class LearningScheduler {
         }
     }
 
-    async runPythonScript(scriptName, args = []) {
+    parseOrchestratorOutput(output = '') {
+        const lines = String(output).trim().split('\n').reverse();
+        for (const line of lines) {
+            const trimmed = line.trim();
+            if (!trimmed.startsWith('{')) continue;
+            try {
+                return JSON.parse(trimmed);
+            } catch (_) {
+                // Not the summary line.
+            }
+        }
+        throw new Error('learning_orchestrator.py produced no JSON summary');
+    }
+
+    async runLearningOrchestrator(task, args = []) {
+        const output = await this.runPythonScript('learning_orchestrator.py', [task, ...args], {
+            quietStdout: true,
+            echoStderr: true
+        });
+        const summary = this.parseOrchestratorOutput(output);
+
+        Object.entries(summary.stages || {}).forEach(([name, stage]) => {
+            const detail = stage.error ? ` — ${stage.error}` : (stage.reason ? ` — ${stage.reason}` : '');
+            console.log(`  [${stage.status}] ${name}: ${Number(stage.duration_s || 0).toFixed(1)}s${detail}`);
+        });
+        return summary;
+    }
+
+    finishOrchestratedTask(taskName, label, startTime, summary) {
+        const duration = ((Date.now() - startTime) / 1000).toFixed(1);
+        const failedStages = Object.entries(summary.stages || {})
+            .filter(([, stage]) => stage.status !== 'ok')
+            .map(([name, stage]) => `${name} (${stage.status})`);
+
+        if (summary.success) {
+            console.log(`${label} complete (${duration}s)`);
+            return this.finishTask(taskName, startTime, {
+                success: true,
+                status: 'completed',
+                message: `${label} complete (${duration}s)`,
+                stages: summary.stages
+            });
+        }
+
+        const message = `${label} failed: ${failedStages.join(', ') || 'no stages ran'}`;
+        console.error(message);
+        return this.finishTask(taskName, startTime, {
+            success: false,
+            status: 'failed',
+            message,
+            error: message,
+            stages: summary.stages
+        });
+    }
+
+    async runPythonScript(scriptName, args = [], options = {}) {
         const scriptPath = path.join(__dirname, '..', 'python', scriptName);
         const pythonCandidates = this.getPythonCandidates();
         const python = await this.detectPythonCommand();
@@ -601,7 +676,7 @@ class LearningScheduler {
         console.log(`Using Python: ${python}`);
 
         try {
-            const result = await this.executePythonProcess(python, [scriptPath, ...args]);
+            const result = await this.executePythonProcess(python, [scriptPath, ...args], options);
             return result.output;
         } catch (error) {
             const missingModule = this.extractMissingModule(error.message);
@@ -609,7 +684,7 @@ class LearningScheduler {
                 bootstrapAttempted = true;
                 console.warn(`Missing Python module '${missingModule}', attempting runtime dependency bootstrap...`);
                 await this.installPythonDependencies(python);
-                const retryResult = await this.executePythonProcess(python, [scriptPath, ...args]);
+                const retryResult = await this.executePythonProcess(python, [scriptPath, ...args], options);
                 return retryResult.output;
             }
 
@@ -14,7 +14,7 @@ Author: Ma Tsz Kiu
 Date: 2026-01-18
 """
 
-import psycopg2
+from db_access import get_connection
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -90,6 +90,14 @@ def calculate_baseline_stats(conn, days=90):
         'count': int(result[4])
     }
 
+SEVERE_TYPHOON_SIGNALS = ('T8', 'T9', 'T10')
+WEATHER_CAUSE_ADJUSTMENTS = (
+    ('very_cold', -6.8),
+    ('heavy_rain', -4.9),
+    ('typhoon', -12.0),
+)
+
+
 def classify_anomaly(conn, date, error, weather=None, ai_factor=None):
     """分類異常原因"""
     ai_factor = normalize_ai_factor_payload(ai_factor)
@@ -240,11 +248,9 @@ def generate_anomaly_report(conn, date):
 
     return report
 
-def update_anomaly_classifications(conn):
-    """更新所有未分類的異常"""
+def load_unexplained_anomalies(conn):
+    """一次載入所有未解釋的異常（連同 learning_records 的天氣 / AI 欄位）"""
     cur = conn.cursor()
-
-    # 獲取所有未解釋的異常
     cur.execute("""
         SELECT
             ae.date,
@@ -261,64 +267,108 @@ def update_anomaly_classifications(conn):
         WHERE ae.is_explained = FALSE
         ORDER BY ae.date DESC
     """)
+    rows = cur.fetchall()
+    cur.close()
 
-    anomalies = cur.fetchall()
-
-    updated_count = 0
-
-    for row in anomalies:
-        date = row[0]
-        error = row[1]
-        conditions_json = row[2]
-
-        # 解析條件
-        if isinstance(conditions_json, dict):
-            conditions = conditions_json
-        elif isinstance(conditions_json, str):
-            conditions = json.loads(conditions_json) if conditions_json else {}
-        else:
-            conditions = {}
-
-        # 構建天氣和 AI 對象
-        weather = {
-            'is_very_cold': row[3] or conditions.get('is_very_cold', False),
-            'is_heavy_rain': row[4] or conditions.get('is_heavy_rain', False),
-            'is_strong_wind': row[5] or conditions.get('is_strong_wind', False),
-            'typhoon_signal': row[6]
-        }
+    frame = pd.DataFrame(rows, columns=[
+        'date', 'prediction_error', 'conditions_json',
+        'is_very_cold', 'is_heavy_rain', 'is_strong_wind',
+        'typhoon_signal', 'ai_event_type', 'ai_factor',
+    ])
+
+    # learning_records 缺欄時以 anomaly_events.conditions_json 補上
+    def _conditions(value):
+        if isinstance(value, dict):
+            return value
+        if isinstance(value, str) and value:
+            return json.loads(value)
+        return {}
+
+    conditions = [_conditions(value) for value in frame['conditions_json']]
+    for col in ('is_very_cold', 'is_heavy_rain', 'is_strong_wind'):
+        fallback = np.array([bool(c.get(col, False)) for c in conditions], dtype=bool)
+        frame[col] = frame[col].fillna(False).astype(bool).to_numpy() | fallback
+    return frame
+
+
+def classify_anomalies(anomalies, baseline):
+    """向量化版 classify_anomaly：回傳 anomaly_type / explanation / error_std_deviations 欄"""
+    out = pd.DataFrame({'date': anomalies['date']})
+    if anomalies.empty:
+        return out.assign(anomaly_type=[], explanation=[], error_std_deviations=[])
+
+    causes = np.column_stack([
+        anomalies['is_very_cold'].to_numpy(dtype=bool),
+        anomalies['is_heavy_rain'].to_numpy(dtype=bool),
+        anomalies['typhoon_signal'].isin(SEVERE_TYPHOON_SIGNALS).to_numpy(dtype=bool),
+    ])
+    cause_names = np.array([name for name, _ in WEATHER_CAUSE_ADJUSTMENTS], dtype=object)
+    adjustments = causes @ np.array([adj for _, adj in WEATHER_CAUSE_ADJUSTMENTS])
+    n_causes = causes.sum(axis=1)
+    is_weather = n_causes > 0
+
+    # ai_factor 為 NULL / 0 時 classify_anomaly 視作 1.0（無效事件）
+    factor = pd.to_numeric(anomalies['ai_factor'], errors='coerce').fillna(0.0).to_numpy(dtype=float)
+    factor = np.where(factor == 0.0, 1.0, factor)
+    has_event = anomalies['ai_event_type'].fillna('').astype(str).to_numpy() != ''
+    is_ai = ~is_weather & has_event & (np.abs(factor - 1.0) > 0.05)
+
+    out['anomaly_type'] = np.select([is_weather, is_ai], ['weather', 'ai'], default='unknown')
+    confidence = np.select(
+        [is_weather & (n_causes >= 2), is_weather | is_ai], ['high', 'medium'], default='low'
+    )
+    error = pd.to_numeric(anomalies['prediction_error'], errors='coerce').to_numpy(dtype=float)
+    std = baseline['std'] if baseline['std'] else 10
+    out['error_std_deviations'] = np.round((error - baseline['mean']) / std, 2)
+
+    events = anomalies['ai_event_type'].to_numpy(dtype=object)
+    reasons = [
+        list(cause_names[row]) if weather else ([events[i]] if ai else [])
+        for i, (row, weather, ai) in enumerate(zip(causes, is_weather, is_ai))
+    ]
+    out['explanation'] = [
+        json.dumps({
+            'confidence': conf,
+            'reason': reason,
+            'suggested_adjustment': float(adj)
+        })
+        for conf, reason, adj in zip(confidence, reasons, adjustments)
+    ]
+    return out
+
+
+def update_anomaly_classifications(conn, baseline=None):
+    """更新所有未分類的異常（一次載入、記憶體分類、一條 UPDATE ... FROM (VALUES ...) 寫回）"""
+    from psycopg2.extras import execute_values
 
-        ai_factor = {
-            'event_type': row[7],
-            'factor': float(row[8]) if row[8] else None
-        } if row[7] else None
-
-        # 分類
-        classification = classify_anomaly(conn, date, error, weather, ai_factor)
-
-        # 更新
-        cur.execute("""
-            UPDATE anomaly_events
-            SET
-                anomaly_type = %s,
-                is_explained = TRUE,
-                explanation = %s
-            WHERE date = %s
-        """, (
-            classification['type'],
-            json.dumps({
-                'confidence': classification['confidence'],
-                'reason': classification['reason'],
-                'suggested_adjustment': classification['suggested_adjustment']
-            }),
-            date
-        ))
-
-        updated_count += 1
+    if baseline is None:
+        baseline = calculate_baseline_stats(conn)
+    anomalies = load_unexplained_anomalies(conn)
+    if anomalies.empty:
+        return 0
 
+    classified = classify_anomalies(anomalies, baseline)
+    rows = [
+        (row.date, row.anomaly_type, row.explanation,
+         None if np.isnan(row.error_std_deviations) else float(row.error_std_deviations))
+        for row in classified.itertuples(index=False)
+    ]
+
+    cur = conn.cursor()
+    execute_values(cur, """
+        UPDATE anomaly_events AS ae
+        SET
+            anomaly_type = v.anomaly_type,
+            is_explained = TRUE,
+            explanation = v.explanation,
+            error_std_deviations = v.error_std_deviations
+        FROM (VALUES %s) AS v (date, anomaly_type, explanation, error_std_deviations)
+        WHERE ae.date = v.date
+    """, rows, template="(%s::date, %s, %s, %s::numeric)", page_size=len(rows))
     conn.commit()
     cur.close()
 
-    return updated_count
+    return len(rows)
 
 # ============================================================
 # Main
@@ -327,7 +377,7 @@ def update_anomaly_classifications(conn):
 def main():
     """檢測並報告最近的異常"""
     load_dotenv()
-    conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+    conn = get_connection()
 
     # 計算基線
     baseline = calculate_baseline_stats(conn)
@@ -342,7 +392,7 @@ def main():
     print()
 
     # 更新異常分類
-    updated = update_anomaly_classifications(conn)
+    updated = update_anomaly_classifications(conn, baseline)
     print(f"✅ Classified {updated} anomalies")
     print()
 
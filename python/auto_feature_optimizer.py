@@ -8,20 +8,32 @@
 3. 持續學習並記錄最佳配置
 4. 與主訓練腳本整合
 
+特徵子集評估由 SubsetEvaluator 在線程池中並行執行（XGBoost 訓練時釋放 GIL），
+按子集哈希記憶化：不同方法選出的相同子集只訓練一次。RFE 走一條遞增消除路徑，
+一次得到所有目標大小的子集。--time-budget 到期後不再開始新的評估。
+
 Usage:
     python auto_feature_optimizer.py              # 運行完整優化
     python auto_feature_optimizer.py --quick      # 快速優化（較少試驗）
     python auto_feature_optimizer.py --update     # 根據歷史記錄更新
+    python auto_feature_optimizer.py --time-budget 1800 --workers 4
+
+環境變數:
+    FEATURE_OPT_WORKERS       並行評估數 (預設 CPU 核心數)
+    FEATURE_OPT_TIME_BUDGET   時間預算秒數 (預設不限)
 """
 import pandas as pd
 import numpy as np
 import xgboost as xgb
 from sklearn.metrics import mean_absolute_error, r2_score
-from sklearn.feature_selection import RFE
+import hashlib
 import json
 import os
 import sys
+import threading
+import time
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
@@ -37,6 +49,13 @@ os.environ['TZ'] = 'Asia/Hong_Kong'
 OPTIMIZATION_HISTORY_FILE = 'models/feature_optimization_history.json'
 OPTIMAL_FEATURES_FILE = 'models/optimal_features.json'
 
+# 退出碼：0 完整完成；1 失敗 / 無結果；3 時間預算用盡（已保存部分結果）
+EXIT_PARTIAL = 3
+
+# 子集評估模型 / RFE 排序模型參數
+EVAL_PARAMS = dict(n_estimators=200, max_depth=6, learning_rate=0.05, random_state=42)
+RFE_PARAMS = dict(n_estimators=100, max_depth=4, learning_rate=0.1, random_state=42)
+
 
 def get_hkt_time():
     """獲取香港時間"""
@@ -106,20 +125,125 @@ def remove_highly_correlated_features(df, feature_cols, threshold=0.95):
     return remaining, list(to_drop)
 
 
+def subset_key(features):
+    """特徵子集哈希（與順序無關）"""
+    return hashlib.sha1('\n'.join(sorted(features)).encode('utf-8')).hexdigest()
+
+
+class SubsetEvaluator:
+    """
+    並行 + 記憶化的特徵子集評估
+
+    每個子集訓練一個 EVAL_PARAMS 的 XGBoost 並在測試集上評分。
+    子集按 all_features 的順序規範化後以 subset_key 記憶化（包括進行中的評估），
+    workers 個線程各分到 cpu // workers 個 XGBoost 線程。
+    超出時間預算後新的評估直接返回 None；只有真的跳過了評估或提前結束了
+    RFE 消除路徑 (cut_short) 才算部分結果。
+    """
+
+    def __init__(self, X_train, y_train, X_test, y_test, all_features, workers=None, time_budget=None):
+        self.X_train, self.y_train = X_train, y_train
+        self.X_test, self.y_test = X_test, np.asarray(y_test, dtype=float)
+        self.order = {f: i for i, f in enumerate(all_features)}
+        cpu = os.cpu_count() or 1
+        self.workers = max(1, workers or int(os.getenv('FEATURE_OPT_WORKERS', cpu)))
+        self.n_jobs = max(1, cpu // self.workers)
+        time_budget = time_budget or float(os.getenv('FEATURE_OPT_TIME_BUDGET', 0)) or None
+        self.time_budget = time_budget
+        self.started = time.monotonic()
+        self.deadline = self.started + time_budget if time_budget else None
+        self.memo = {}
+        self.stats = {'fits': 0, 'memo_hits': 0, 'skipped': 0, 'stopped_early': 0}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+
+    def canonical(self, features):
+        """去重並按 all_features 順序排列（XGBoost 結果與列順序有關）"""
+        return sorted({f for f in features if f in self.order}, key=self.order.__getitem__)
+
+    def out_of_time(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def stop_requested(self):
+        """incremental_rfe 的 should_stop：超出預算而提前結束時記一次"""
+        if not self.out_of_time():
+            return False
+        with self._lock:
+            self.stats['stopped_early'] += 1
+        return True
+
+    def cut_short(self):
+        """是否有評估因預算被跳過、或消除路徑提前結束（最後一次擬合越過期限不算）"""
+        return self.stats['skipped'] > 0 or self.stats['stopped_early'] > 0
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def _evaluate(self, features):
+        if self.out_of_time():
+            with self._lock:
+                self.stats['skipped'] += 1
+            return None
+        model = xgb.XGBRegressor(**EVAL_PARAMS, n_jobs=self.n_jobs)
+        model.fit(self.X_train[features], self.y_train, verbose=False)
+        y_pred = model.predict(self.X_test[features])
+        with self._lock:
+            self.stats['fits'] += 1
+        return {
+            'features': features,
+            'mae': mean_absolute_error(self.y_test, y_pred),
+            'mape': np.mean(np.abs((self.y_test - y_pred) / self.y_test)) * 100,
+            'r2': r2_score(self.y_test, y_pred),
+        }
+
+    def evaluate_many(self, subsets):
+        """評估多個子集，按輸入順序返回指標 dict（超出預算為 None）"""
+        futures = []
+        for features in subsets:
+            features = self.canonical(features)
+            key = subset_key(features)
+            if key in self.memo:
+                self.stats['memo_hits'] += 1
+            else:
+                self.memo[key] = self._pool.submit(self._evaluate, features)
+            futures.append(self.memo[key])
+        results = [future.result() for future in futures]
+        budget = f" / 預算 {self.time_budget:.0f}s" if self.time_budget else ""
+        print(f"   ⏱ 已訓練 {self.stats['fits']}，記憶命中 {self.stats['memo_hits']}，"
+              f"已用 {self.elapsed():.0f}s{budget}")
+        return results
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+def _record(method, n_features, metrics):
+    return {
+        'method': method,
+        'n_features': n_features,
+        'features': metrics['features'],
+        'mae': metrics['mae'],
+        'mape': metrics['mape'],
+        'r2': metrics['r2']
+    }
+
+
+def _own_evaluator(X_train, y_train, X_test, y_test, all_features, evaluator):
+    if evaluator is not None:
+        return evaluator, False
+    return SubsetEvaluator(X_train, y_train, X_test, y_test, all_features), True
+
+
 def feature_importance_selection(X_train, y_train, X_test, y_test, all_features, 
-                                  test_sizes=[5, 10, 15, 20, 25, 30, 40, 50, 75, 100]):
+                                  test_sizes=[5, 10, 15, 20, 25, 30, 40, 50, 75, 100],
+                                  evaluator=None):
     """基於特徵重要性的選擇"""
     print("\n📊 方法 1: 特徵重要性排序選擇")
     print("-" * 50)
+    evaluator, owned = _own_evaluator(X_train, y_train, X_test, y_test, all_features, evaluator)
     
     # 訓練完整模型獲取重要性
-    model = xgb.XGBRegressor(
-        n_estimators=200,
-        max_depth=6,
-        learning_rate=0.05,
-        random_state=42,
-        n_jobs=-1
-    )
+    model = xgb.XGBRegressor(**EVAL_PARAMS, n_jobs=-1)
     model.fit(X_train[all_features], y_train, verbose=False)
     
     # 排序特徵
@@ -131,114 +255,98 @@ def feature_importance_selection(X_train, y_train, X_test, y_test, all_features,
     best_mae = float('inf')
     best_config = None
     
-    for n_features in test_sizes:
-        if n_features > len(all_features):
+    sizes = [n for n in test_sizes if n <= len(all_features)]
+    subsets = [[f[0] for f in feature_importance[:n]] for n in sizes]
+    
+    for n_features, metrics in zip(sizes, evaluator.evaluate_many(subsets)):
+        if metrics is None:
+            print(f"   ⏭ {n_features:3}個特徵: 超出時間預算，跳過")
             continue
-            
-        top_features = [f[0] for f in feature_importance[:n_features]]
-        
-        # 訓練測試
-        m = xgb.XGBRegressor(
-            n_estimators=200,
-            max_depth=6,
-            learning_rate=0.05,
-            random_state=42,
-            n_jobs=-1
-        )
-        m.fit(X_train[top_features], y_train, verbose=False)
-        y_pred = m.predict(X_test[top_features])
-        
-        mae = mean_absolute_error(y_test, y_pred)
-        mape = np.mean(np.abs((y_test - y_pred) / y_test)) * 100
-        r2 = r2_score(y_test, y_pred)
-        
-        results.append({
-            'method': 'importance',
-            'n_features': n_features,
-            'features': top_features,
-            'mae': mae,
-            'mape': mape,
-            'r2': r2
-        })
+        results.append(_record('importance', n_features, metrics))
+        mae = metrics['mae']
         
         status = "🏆" if mae < best_mae else "  "
-        print(f"   {status} {n_features:3}個特徵: MAE={mae:.2f}, MAPE={mape:.2f}%, R²={r2*100:.1f}%")
+        print(f"   {status} {n_features:3}個特徵: MAE={mae:.2f}, MAPE={metrics['mape']:.2f}%, R²={metrics['r2']*100:.1f}%")
         
         if mae < best_mae:
             best_mae = mae
             best_config = results[-1]
     
+    if owned:
+        evaluator.close()
     return results, best_config, feature_importance
 
 
-def rfe_selection(X_train, y_train, X_test, y_test, all_features, target_sizes=[15, 20, 25, 30]):
+def incremental_rfe(X_train, y_train, all_features, target_sizes, step=5, n_jobs=-1, should_stop=None):
+    """
+    遞增式遞歸特徵消除
+
+    從全部特徵開始，每輪用 RFE_PARAMS 模型按重要性去掉最低的 step 個，
+    不越過任何目標大小；經過每個目標大小時記下當前子集。
+    一條消除路徑得到所有目標大小（最大目標的結果與 sklearn RFE(step) 相同），
+    不再為每個大小從頭訓練。
+
+    Returns:
+        {目標大小: 子集}（should_stop() 為真時提前結束，只含已到達的大小）
+    """
+    targets = sorted({n for n in target_sizes if n <= len(all_features)}, reverse=True)
+    current = list(all_features)
+    subsets = {}
+    for target in targets:
+        while len(current) > target:
+            if should_stop is not None and should_stop():
+                return subsets
+            model = xgb.XGBRegressor(**RFE_PARAMS, n_jobs=n_jobs)
+            model.fit(X_train[current], y_train)
+            n_drop = min(step, len(current) - target)
+            drop = {current[i] for i in np.argsort(model.feature_importances_)[:n_drop]}
+            current = [f for f in current if f not in drop]
+        subsets[target] = list(current)
+    return subsets
+
+
+def rfe_selection(X_train, y_train, X_test, y_test, all_features, target_sizes=[15, 20, 25, 30],
+                  evaluator=None):
     """遞歸特徵消除選擇"""
     print("\n📊 方法 2: 遞歸特徵消除 (RFE)")
     print("-" * 50)
+    evaluator, owned = _own_evaluator(X_train, y_train, X_test, y_test, all_features, evaluator)
     
     results = []
     best_mae = float('inf')
     best_config = None
     
-    for n_features in target_sizes:
-        if n_features > len(all_features):
+    print(f"   ⏳ 遞增消除 {len(all_features)} → {min(target_sizes)} 個特徵 (step=5)...")
+    subsets = incremental_rfe(
+        X_train, y_train, all_features, target_sizes, should_stop=evaluator.stop_requested
+    )
+    sizes = [n for n in target_sizes if n in subsets]
+    
+    for n_features, metrics in zip(sizes, evaluator.evaluate_many([subsets[n] for n in sizes])):
+        if metrics is None:
+            print(f"   ⏭ {n_features:3}個特徵: 超出時間預算，跳過")
             continue
-            
-        print(f"   ⏳ 測試 {n_features} 個特徵 (RFE)...")
-        
-        # RFE
-        base_model = xgb.XGBRegressor(
-            n_estimators=100,
-            max_depth=4,
-            learning_rate=0.1,
-            random_state=42,
-            n_jobs=-1
-        )
-        
-        rfe = RFE(estimator=base_model, n_features_to_select=n_features, step=5)
-        rfe.fit(X_train[all_features], y_train)
-        
-        selected_features = [f for f, s in zip(all_features, rfe.support_) if s]
-        
-        # 訓練測試
-        m = xgb.XGBRegressor(
-            n_estimators=200,
-            max_depth=6,
-            learning_rate=0.05,
-            random_state=42,
-            n_jobs=-1
-        )
-        m.fit(X_train[selected_features], y_train, verbose=False)
-        y_pred = m.predict(X_test[selected_features])
-        
-        mae = mean_absolute_error(y_test, y_pred)
-        mape = np.mean(np.abs((y_test - y_pred) / y_test)) * 100
-        r2 = r2_score(y_test, y_pred)
-        
-        results.append({
-            'method': 'rfe',
-            'n_features': n_features,
-            'features': selected_features,
-            'mae': mae,
-            'mape': mape,
-            'r2': r2
-        })
+        results.append(_record('rfe', n_features, metrics))
+        mae = metrics['mae']
         
         status = "🏆" if mae < best_mae else "  "
-        print(f"   {status} {n_features:3}個特徵: MAE={mae:.2f}, MAPE={mape:.2f}%, R²={r2*100:.1f}%")
+        print(f"   {status} {n_features:3}個特徵: MAE={mae:.2f}, MAPE={metrics['mape']:.2f}%, R²={metrics['r2']*100:.1f}%")
         
         if mae < best_mae:
             best_mae = mae
             best_config = results[-1]
     
+    if owned:
+        evaluator.close()
     return results, best_config
 
 
 def correlation_based_selection(X_train, y_train, X_test, y_test, all_features, df_train,
-                                 target_counts=[15, 20, 25, 30, 40]):
+                                 target_counts=[15, 20, 25, 30, 40], evaluator=None):
     """基於相關性的特徵選擇"""
     print("\n📊 方法 3: 相關性選擇 + 去冗餘")
     print("-" * 50)
+    evaluator, owned = _own_evaluator(X_train, y_train, X_test, y_test, all_features, evaluator)
     
     # 計算與目標的相關性
     correlations = {}
@@ -254,6 +362,7 @@ def correlation_based_selection(X_train, y_train, X_test, y_test, all_features,
     best_mae = float('inf')
     best_config = None
     
+    subsets = []
     for n_features in target_counts:
         if n_features > len(sorted_features):
             continue
@@ -268,45 +377,34 @@ def correlation_based_selection(X_train, y_train, X_test, y_test, all_features,
         
         if len(remaining) < 5:
             remaining = selected[:max(5, n_features//2)]
-        
-        # 訓練測試
-        m = xgb.XGBRegressor(
-            n_estimators=200,
-            max_depth=6,
-            learning_rate=0.05,
-            random_state=42,
-            n_jobs=-1
-        )
-        m.fit(X_train[remaining], y_train, verbose=False)
-        y_pred = m.predict(X_test[remaining])
-        
-        mae = mean_absolute_error(y_test, y_pred)
-        mape = np.mean(np.abs((y_test - y_pred) / y_test)) * 100
-        r2 = r2_score(y_test, y_pred)
-        
-        results.append({
-            'method': 'correlation',
-            'n_features': len(remaining),
-            'features': remaining,
-            'mae': mae,
-            'mape': mape,
-            'r2': r2
-        })
+        subsets.append(remaining)
+    
+    for metrics in evaluator.evaluate_many(subsets):
+        if metrics is None:
+            print(f"   ⏭ 超出時間預算，跳過")
+            continue
+        n_features = len(metrics['features'])
+        results.append(_record('correlation', n_features, metrics))
+        mae = metrics['mae']
         
         status = "🏆" if mae < best_mae else "  "
-        print(f"   {status} {len(remaining):3}個特徵: MAE={mae:.2f}, MAPE={mape:.2f}%, R²={r2*100:.1f}%")
+        print(f"   {status} {n_features:3}個特徵: MAE={mae:.2f}, MAPE={metrics['mape']:.2f}%, R²={metrics['r2']*100:.1f}%")
         
         if mae < best_mae:
             best_mae = mae
             best_config = results[-1]
     
+    if owned:
+        evaluator.close()
     return results, best_config
 
 
-def hybrid_selection(X_train, y_train, X_test, y_test, all_features, df_train, feature_importance):
+def hybrid_selection(X_train, y_train, X_test, y_test, all_features, df_train, feature_importance,
+                     evaluator=None):
     """混合選擇策略：結合多種方法的優勢"""
     print("\n📊 方法 4: 混合智能選擇")
     print("-" * 50)
+    evaluator, owned = _own_evaluator(X_train, y_train, X_test, y_test, all_features, evaluator)
     
     # 1. 從重要性排序取 top 特徵
     imp_sorted = [f[0] for f in feature_importance]
@@ -324,61 +422,53 @@ def hybrid_selection(X_train, y_train, X_test, y_test, all_features, df_train, f
     best_mae = float('inf')
     best_config = None
     
-    # 測試不同的混合策略
+    # 測試不同的混合策略（與方法 1 / 3 重複的子集直接取記憶結果）
     strategies = [
         ('importance_top20', imp_sorted[:20]),
         ('importance_top25', imp_sorted[:25]),
         ('importance_top30', imp_sorted[:30]),
         ('corr_top20', corr_sorted[:20]),
         ('corr_top25', corr_sorted[:25]),
-        ('hybrid_15+10', list(set(imp_sorted[:15] + corr_sorted[:10]))),
-        ('hybrid_20+10', list(set(imp_sorted[:20] + corr_sorted[:10]))),
-        ('hybrid_15+15', list(set(imp_sorted[:15] + corr_sorted[:15]))),
+        ('hybrid_15+10', imp_sorted[:15] + corr_sorted[:10]),
+        ('hybrid_20+10', imp_sorted[:20] + corr_sorted[:10]),
+        ('hybrid_15+15', imp_sorted[:15] + corr_sorted[:15]),
     ]
+    # 確保特徵存在
+    strategies = [(name, evaluator.canonical(selected)) for name, selected in strategies]
+    strategies = [(name, selected) for name, selected in strategies if len(selected) >= 5]
     
-    for name, selected in strategies:
-        # 確保特徵存在
-        selected = [f for f in selected if f in X_train.columns]
-        
-        if len(selected) < 5:
+    for (name, selected), metrics in zip(strategies, evaluator.evaluate_many([s for _, s in strategies])):
+        if metrics is None:
+            print(f"   ⏭ {name:20}: 超出時間預算，跳過")
             continue
-        
-        # 訓練測試
-        m = xgb.XGBRegressor(
-            n_estimators=200,
-            max_depth=6,
-            learning_rate=0.05,
-            random_state=42,
-            n_jobs=-1
-        )
-        m.fit(X_train[selected], y_train, verbose=False)
-        y_pred = m.predict(X_test[selected])
-        
-        mae = mean_absolute_error(y_test, y_pred)
-        mape = np.mean(np.abs((y_test - y_pred) / y_test)) * 100
-        r2 = r2_score(y_test, y_pred)
-        
-        results.append({
-            'method': f'hybrid_{name}',
-            'n_features': len(selected),
-            'features': selected,
-            'mae': mae,
-            'mape': mape,
-            'r2': r2
-        })
+        results.append(_record(f'hybrid_{name}', len(selected), metrics))
+        mae = metrics['mae']
         
         status = "🏆" if mae < best_mae else "  "
-        print(f"   {status} {name:20}: {len(selected):2}個特徵, MAE={mae:.2f}, MAPE={mape:.2f}%, R²={r2*100:.1f}%")
+        print(f"   {status} {name:20}: {len(selected):2}個特徵, MAE={mae:.2f}, MAPE={metrics['mape']:.2f}%, R²={metrics['r2']*100:.1f}%")
         
         if mae < best_mae:
             best_mae = mae
             best_config = results[-1]
     
+    if owned:
+        evaluator.close()
     return results, best_config
 
 
-def run_optimization(quick=False):
-    """運行完整優化流程"""
+def run_optimization(quick=False, time_budget=None, workers=None):
+    """
+    運行完整優化流程
+
+    Args:
+        quick: 快速模式（較少試驗）
+        time_budget: 秒數；到期後不再開始新的評估（預設 FEATURE_OPT_TIME_BUDGET）
+        workers: 並行評估數（預設 FEATURE_OPT_WORKERS 或 CPU 核心數）
+
+    Returns:
+        最佳配置 dict（'complete' 為 False 表示時間預算用盡、只評估了部分子集），
+        無結果時為 None
+    """
     print("=" * 70)
     print("🔬 自動特徵優化器 v1.0")
     print("=" * 70)
@@ -417,6 +507,12 @@ def run_optimization(quick=False):
     print(f"   訓練集: {len(train_data)} 筆")
     print(f"   測試集: {len(test_data)} 筆")
     
+    evaluator = SubsetEvaluator(
+        X_train, y_train, X_test, y_test, all_features, workers=workers, time_budget=time_budget
+    )
+    budget = f", 時間預算 {evaluator.time_budget:.0f}s" if evaluator.time_budget else ""
+    print(f"   並行評估: {evaluator.workers} 個 worker × {evaluator.n_jobs} 線程{budget}")
+    
     # 運行各種選擇方法
     all_results = []
     
@@ -427,7 +523,7 @@ def run_optimization(quick=False):
         test_sizes = [5, 10, 15, 20, 25, 30, 40, 50, 75, 100, 130, 160]
     
     imp_results, imp_best, feature_importance = feature_importance_selection(
-        X_train, y_train, X_test, y_test, all_features, test_sizes
+        X_train, y_train, X_test, y_test, all_features, test_sizes, evaluator=evaluator
     )
     all_results.extend(imp_results)
     
@@ -438,7 +534,7 @@ def run_optimization(quick=False):
         rfe_sizes = [15, 20, 25, 30, 40]
     
     rfe_results, rfe_best = rfe_selection(
-        X_train, y_train, X_test, y_test, all_features, rfe_sizes
+        X_train, y_train, X_test, y_test, all_features, rfe_sizes, evaluator=evaluator
     )
     all_results.extend(rfe_results)
     
@@ -449,21 +545,34 @@ def run_optimization(quick=False):
         corr_sizes = [15, 20, 25, 30, 40, 50]
     
     corr_results, corr_best = correlation_based_selection(
-        X_train, y_train, X_test, y_test, all_features, train_data, corr_sizes
+        X_train, y_train, X_test, y_test, all_features, train_data, corr_sizes, evaluator=evaluator
     )
     all_results.extend(corr_results)
     
     # 4. 混合選擇
     hybrid_results, hybrid_best = hybrid_selection(
-        X_train, y_train, X_test, y_test, all_features, train_data, feature_importance
+        X_train, y_train, X_test, y_test, all_features, train_data, feature_importance,
+        evaluator=evaluator
     )
     all_results.extend(hybrid_results)
+    evaluator.close()
+    evaluation_stats = dict(
+        evaluator.stats, seconds=round(evaluator.elapsed(), 1), budget_exhausted=evaluator.cut_short()
+    )
+    complete = not evaluation_stats['budget_exhausted']
     
     # 找出全局最佳
     print("\n" + "=" * 70)
     print("🏆 優化結果總結")
     print("=" * 70)
     
+    print(f"   評估: 訓練 {evaluation_stats['fits']} 個子集，記憶命中 {evaluation_stats['memo_hits']}，"
+          f"預算跳過 {evaluation_stats['skipped']}，耗時 {evaluation_stats['seconds']}s")
+    
+    if not all_results:
+        print("❌ 時間預算內未完成任何評估")
+        return None
+    
     best_overall = min(all_results, key=lambda x: x['mae'])
     
     print(f"\n🥇 最佳配置:")
@@ -485,6 +594,7 @@ def run_optimization(quick=False):
     optimization_record = {
         'timestamp': get_hkt_time(),
         'mode': 'quick' if quick else 'full',
+        'complete': complete,
         'total_features_tested': len(all_features),
         'best_method': best_overall['method'],
         'best_n_features': best_overall['n_features'],
@@ -492,6 +602,7 @@ def run_optimization(quick=False):
         'best_mape': best_overall['mape'],
         'best_r2': best_overall['r2'],
         'best_features': best_overall['features'],
+        'evaluation': evaluation_stats,
         'all_results_summary': [
             {
                 'method': r['method'],
@@ -546,15 +657,19 @@ def run_optimization(quick=False):
     print(f"\n✅ 結果已保存到:")
     print(f"   - {OPTIMIZATION_HISTORY_FILE}")
     print(f"   - {OPTIMAL_FEATURES_FILE}")
+    if not complete:
+        print("⚠️ 時間預算已用盡，本次為部分優化結果")
     print(f"\n⏰ 完成時間: {get_hkt_time()}")
     
-    return best_overall
+    return dict(best_overall, complete=complete)
 
 
 def main():
     parser = argparse.ArgumentParser(description='自動特徵優化器')
     parser.add_argument('--quick', action='store_true', help='快速優化模式')
     parser.add_argument('--update', action='store_true', help='查看歷史並更新')
+    parser.add_argument('--time-budget', type=float, default=None, help='時間預算（秒），到期後不再開始新的評估')
+    parser.add_argument('--workers', type=int, default=None, help='並行評估數')
     args = parser.parse_args()
     
     if args.update:
@@ -571,8 +686,13 @@ def main():
             for opt in history['optimizations'][-5:]:
                 print(f"   {opt['timestamp']}: MAE={opt['best_mae']:.2f} ({opt['best_method']})")
     else:
-        run_optimization(quick=args.quick)
+        best = run_optimization(quick=args.quick, time_budget=args.time_budget, workers=args.workers)
+        if best is None:
+            return 1
+        if not best['complete']:
+            return EXIT_PARTIAL
+    return 0
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
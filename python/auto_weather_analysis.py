@@ -14,14 +14,14 @@ from datetime import datetime
 def get_attendance_from_db():
     """從數據庫獲取出席數據"""
     try:
-        import psycopg2
+        from db_access import get_connection
         
         # 從環境變量獲取數據庫連接
         database_url = os.environ.get('DATABASE_URL')
         if not database_url:
             return None
         
-        conn = psycopg2.connect(database_url)
+        conn = get_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -12,7 +12,9 @@ Full offline run (all gaps, no row cap):
 Flags:
     --start YYYY-MM-DD       Inclusive start date (default: 2014-12-01 with --full)
     --end   YYYY-MM-DD       Inclusive end date   (default: today minus 30 days)
-    --rate-limit N           Max requests/second to the AI service (default 3)
+    --rate-limit N           Max requests/second to the AI service (default 3, token bucket)
+    --concurrency N          Max AI requests in flight (default 4)
+    --batch-size N           learning_records upserts per DB transaction (default 25)
     --dry-run                Print plan, don't write to DB
     --max-rows N             Cap on rows processed this run (default 50; ignored with --full)
     --full                   Process every missing date in range (sets max-rows very high)
@@ -22,6 +24,9 @@ Flags:
 
 Resumability:
     Skips any date that already has a non-NULL ``ai_factor`` in ``learning_records``.
+    Results are upserted in batches; a date's ``ok`` checkpoint line is only
+    appended after its batch committed, so a crash loses at most one batch,
+    which the next run requests again.
 """
 
 from __future__ import annotations
@@ -30,14 +35,19 @@ import argparse
 import json
 import os
 import sys
+import threading
 import time
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from datetime import date, datetime, timedelta
 from pathlib import Path
+from typing import Callable, List, Tuple
 from zoneinfo import ZoneInfo
 
-import psycopg2
+from db_access import get_connection
 from dotenv import load_dotenv
+from psycopg2.extras import execute_values
 
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -51,7 +61,7 @@ def _hkt_now() -> str:
 
 def _open_conn():
     load_dotenv(ROOT / ".env")
-    return psycopg2.connect(os.environ["DATABASE_URL"])
+    return get_connection()
 
 
 def _missing_dates(conn, start_iso: str, end_iso: str, limit: int) -> list:
@@ -137,20 +147,161 @@ def _extract_factor(payload: dict) -> float | None:
     return None
 
 
-def _upsert_learning_record(conn, target_date: str, ai_factor: float, event_type: str | None):
+def _upsert_learning_records(conn, rows: List[Tuple[str, float, str | None]]) -> None:
+    """Upsert ``(date, ai_factor, event_type)`` rows: one statement, one commit."""
+    if not rows:
+        return
     cur = conn.cursor()
-    cur.execute(
-        """
-        INSERT INTO learning_records (date, ai_factor, ai_event_type, created_at)
-        VALUES (%s, %s, %s, NOW())
-        ON CONFLICT (date) DO UPDATE
-        SET ai_factor = EXCLUDED.ai_factor,
-            ai_event_type = COALESCE(EXCLUDED.ai_event_type, learning_records.ai_event_type)
-        """,
-        (target_date, ai_factor, event_type),
-    )
-    conn.commit()
-    cur.close()
+    try:
+        execute_values(
+            cur,
+            """
+            INSERT INTO learning_records (date, ai_factor, ai_event_type, created_at)
+            VALUES %s
+            ON CONFLICT (date) DO UPDATE
+            SET ai_factor = EXCLUDED.ai_factor,
+                ai_event_type = COALESCE(EXCLUDED.ai_event_type, learning_records.ai_event_type)
+            """,
+            rows,
+            template="(%s, %s, %s, NOW())",
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens/s, bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = max(0.1, float(rate))
+        self.capacity = max(1.0, float(capacity if capacity is not None else self.rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+@dataclass
+class BackfillStats:
+    requested: int = 0
+    written: int = 0
+    errors: int = 0
+    no_factor: int = 0
+    batches: int = 0
+    completed: int = 0  # dates whose AI call returned, committed or not
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def dates_per_minute(self) -> float:
+        elapsed = max(1e-6, time.monotonic() - self.started)
+        return self.completed / elapsed * 60.0
+
+
+def _event_type(payload) -> str | None:
+    if isinstance(payload, dict):
+        return payload.get("eventType") or payload.get("type")
+    return None
+
+
+def run_backfill(
+    dates: List[str],
+    call: Callable[[str], dict | None],
+    write_batch: Callable[[List[Tuple[str, float, str | None]]], None],
+    checkpoint: Path,
+    concurrency: int = 4,
+    rate_limit: float = 3.0,
+    batch_size: int = 25,
+    flush_seconds: float = 30.0,
+    log: Callable[[str], None] = print,
+) -> BackfillStats:
+    """Fetch factors for ``dates`` concurrently and upsert them in batches.
+
+    At most ``concurrency`` AI requests are in flight and their starts are
+    paced by a token bucket at ``rate_limit``/s. Successful results are
+    written every ``batch_size`` dates (or ``flush_seconds``); checkpoint
+    lines keep the sequential tool's format (``ok`` / ``error`` /
+    ``no_factor``), with ``ok`` appended after the batch commit.
+    """
+    stats = BackfillStats(requested=len(dates))
+    bucket = TokenBucket(rate_limit, capacity=max(1, concurrency))
+    pending: List[Tuple[str, float, str | None]] = []
+    last_flush = time.monotonic()
+    write_failed = False
+
+    def fetch(target_date: str):
+        bucket.acquire()
+        return call(target_date)
+
+    def flush() -> None:
+        nonlocal pending, last_flush, write_failed
+        if pending:
+            try:
+                write_batch(pending)
+            except Exception:
+                write_failed = True
+                raise
+            for d, factor, event_type in pending:
+                _append_checkpoint(
+                    checkpoint,
+                    {"ts": _hkt_now(), "date": d, "status": "ok", "ai_factor": factor, "event_type": event_type},
+                )
+            stats.written += len(pending)
+            stats.batches += 1
+            pending = []
+        last_flush = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(fetch, d): d for d in dates}
+        try:
+            for future in as_completed(futures):
+                d = futures[future]
+                stats.completed += 1
+                try:
+                    payload = future.result()
+                except Exception as exc:
+                    log(f"  ❌ {d}: {exc}")
+                    payload = None
+                factor = _extract_factor(payload) if payload else None
+                if not payload:
+                    stats.errors += 1
+                    _append_checkpoint(checkpoint, {"ts": _hkt_now(), "date": d, "status": "error"})
+                elif factor is None:
+                    stats.no_factor += 1
+                    log(f"  ⚠️ {d}: no factor in response, skipping")
+                    _append_checkpoint(checkpoint, {"ts": _hkt_now(), "date": d, "status": "no_factor"})
+                else:
+                    pending.append((d, factor, _event_type(payload)))
+
+                if len(pending) >= batch_size or time.monotonic() - last_flush >= flush_seconds:
+                    flush()
+                if stats.completed % 25 == 0 or stats.completed == len(dates):
+                    log(
+                        f"  [{_hkt_now()}] progress {stats.completed}/{len(dates)} written={stats.written} "
+                        f"({stats.dates_per_minute:.1f} dates/min)"
+                    )
+        finally:
+            # Also on Ctrl-C / errors: keep what already came back. A failed
+            # write is not retried here, so its error is the one that surfaces.
+            for future in futures:
+                future.cancel()
+            if not write_failed:
+                flush()
+    return stats
 
 
 def main(argv: list[str]) -> int:
@@ -160,6 +311,8 @@ def main(argv: list[str]) -> int:
     parser.add_argument("--max-rows", type=int, default=50)
     parser.add_argument("--full", action="store_true", help="Backfill all missing dates in range (no row cap)")
     parser.add_argument("--rate-limit", type=float, default=3.0)
+    parser.add_argument("--concurrency", type=int, default=4, help="Max AI requests in flight")
+    parser.add_argument("--batch-size", type=int, default=25, help="Upserts per DB transaction")
     parser.add_argument("--source", choices=["archive", "none"], default="archive")
     parser.add_argument("--dry-run", action="store_true")
     parser.add_argument("--ai-base-url", default=None)
@@ -183,7 +336,10 @@ def main(argv: list[str]) -> int:
     if args.full:
         est_cost = missing_total * 0.02
         est_hours = missing_total / max(0.1, args.rate_limit) / 3600
-        print(f"  FULL RUN — est. cost ~USD ${est_cost:.0f}, wall-clock ~{est_hours:.1f}h @ {args.rate_limit} req/s")
+        print(
+            f"  FULL RUN — est. cost ~USD ${est_cost:.0f}, wall-clock ≥{est_hours:.1f}h "
+            f"@ {args.rate_limit} req/s, {args.concurrency} in flight"
+        )
 
     if args.dry_run:
         print("DRY-RUN — would request:", rows[:10], "…" if len(rows) > 10 else "")
@@ -191,35 +347,22 @@ def main(argv: list[str]) -> int:
         return 0
 
     ai_key = os.environ.get("AI_API_KEY")
-    interval = 1.0 / max(0.1, args.rate_limit)
-    written = 0
-    for i, d in enumerate(rows, 1):
-        payload = _call_ai_service(d, args.source, args.ai_base_url, ai_key)
-        time.sleep(interval)
-        if not payload:
-            _append_checkpoint(checkpoint, {"ts": _hkt_now(), "date": d, "status": "error"})
-            continue
-        factor = _extract_factor(payload)
-        if factor is None:
-            print(f"  ⚠️ {d}: no factor in response, skipping")
-            _append_checkpoint(checkpoint, {"ts": _hkt_now(), "date": d, "status": "no_factor"})
-            continue
-        event_type = None
-        if isinstance(payload, dict):
-            event_type = payload.get("eventType") or payload.get("type")
-        _upsert_learning_record(conn, d, factor, event_type)
-        written += 1
-        _append_checkpoint(
-            checkpoint,
-            {"ts": _hkt_now(), "date": d, "status": "ok", "ai_factor": factor, "event_type": event_type},
-        )
-        if i % 25 == 0 or i == len(rows):
-            print(f"  [{_hkt_now()}] progress {i}/{len(rows)} written={written}")
-        else:
-            print(f"  ✓ {d} → factor {factor:.3f} ({event_type or 'unspecified'})")
+    stats = run_backfill(
+        rows,
+        call=lambda d: _call_ai_service(d, args.source, args.ai_base_url, ai_key),
+        write_batch=lambda batch: _upsert_learning_records(conn, batch),
+        checkpoint=checkpoint,
+        concurrency=args.concurrency,
+        rate_limit=args.rate_limit,
+        batch_size=max(1, args.batch_size),
+    )
 
     conn.close()
-    print(f"[{_hkt_now()}] ✅ done — written {written}/{len(rows)}")
+    print(
+        f"[{_hkt_now()}] ✅ done — written {stats.written}/{len(rows)} "
+        f"(errors {stats.errors}, no factor {stats.no_factor}, {stats.batches} batches, "
+        f"{stats.dates_per_minute:.1f} dates/min)"
+    )
     return 0
 
 
@@ -8,10 +8,10 @@ from __future__ import annotations
 
 import argparse
 from datetime import datetime, timedelta
-from typing import Iterable, List
+from typing import Dict, Iterable, List, Optional
 
 from continuous_learner import get_db_connection, upsert_weather_history
-from weather_data_loader import get_weather_data_for_date, has_core_weather_fields
+from weather_data_loader import get_weather_data_for_date, has_core_weather_fields, prefetch_daily_extracts
 
 
 def collect_target_dates(conn, start_date=None, end_date=None, only_missing_core: bool = False) -> List:
@@ -158,15 +158,22 @@ def update_learning_record_weather(cur, target_date, weather):
     ))
 
 
-def backfill_dates(conn, dates: Iterable):
+def backfill_dates(conn, dates: Iterable, weather_by_date: Optional[Dict] = None):
+    """weather_by_date: 預先抓取的 {date: weather}；缺的日期才即時向 HKO 取"""
     cur = conn.cursor()
+    weather_by_date = weather_by_date or {}
+    dates = list(dates)
+    # 一次並行抓齊所需年/月檔，逐日查詢只讀快取
+    prefetch_daily_extracts(d for d in dates if weather_by_date.get(d) is None)
 
     weather_rows_updated = 0
     learning_rows_updated = 0
     missing_dates = []
 
     for target_date in dates:
-        weather = get_weather_data_for_date(target_date)
+        weather = weather_by_date.get(target_date)
+        if weather is None:
+            weather = get_weather_data_for_date(target_date)
         if not has_core_weather_fields(weather):
             missing_dates.append(str(target_date))
             continue
@@ -6,7 +6,7 @@
 import os
 import sys
 import io
-import psycopg2
+from db_access import get_connection
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
@@ -29,7 +29,7 @@ print("=" * 60)
 print()
 
 try:
-    conn = psycopg2.connect(DATABASE_URL)
+    conn = get_connection(dsn=DATABASE_URL)
     cur = conn.cursor()
 
     # 1. 找出最近有實際數據和預測的日期
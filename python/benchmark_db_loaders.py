@@ -0,0 +1,132 @@
+"""
+Benchmark the COPY-based bulk loaders against the legacy ``pd.read_sql_query`` path.
+
+Times a full-history pull of ``actual_data``, ``weather_history``,
+``learning_records`` and ``daily_predictions`` both ways on the same pooled
+connection, checks the two frames agree, and prints per-table timings.
+
+Run:
+    DATABASE_URL=... python python/benchmark_db_loaders.py --repeats 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import warnings
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import db_access  # noqa: E402
+
+
+WEATHER_BOOL_COLUMNS = ["is_very_cold", "is_very_hot", "is_heavy_rain", "is_strong_wind"]
+WEATHER_TEXT_COLUMNS = ["typhoon_signal", "rainstorm_warning"]
+
+TABLES: Dict[str, Dict[str, object]] = {
+    "actual_data": {
+        "query": 'SELECT date AS "Date", patient_count AS "Attendance" FROM actual_data ORDER BY date',
+        "copy": {"parse_dates": ["Date"]},
+    },
+    "weather_history": {
+        "query": "SELECT * FROM weather_history ORDER BY date",
+        "copy": {"parse_dates": ["date"], "bool_columns": WEATHER_BOOL_COLUMNS, "text_columns": WEATHER_TEXT_COLUMNS},
+    },
+    "learning_records": {
+        "query": "SELECT * FROM learning_records ORDER BY date",
+        "copy": {"parse_dates": ["date"]},
+    },
+    "daily_predictions": {
+        "query": "SELECT * FROM daily_predictions ORDER BY target_date",
+        "copy": {"parse_dates": ["target_date"]},
+    },
+}
+
+
+def _read_sql(query: str, conn) -> pd.DataFrame:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message=".*pandas only supports SQLAlchemy.*")
+        return pd.read_sql_query(query, conn)
+
+
+def _time(fn: Callable[[], pd.DataFrame], repeats: int) -> tuple[List[float], pd.DataFrame]:
+    timings: List[float] = []
+    frame = pd.DataFrame()
+    for _ in range(repeats):
+        started = time.perf_counter()
+        frame = fn()
+        timings.append(time.perf_counter() - started)
+    return timings, frame
+
+
+def _frames_agree(legacy: pd.DataFrame, bulk: pd.DataFrame) -> bool:
+    if list(legacy.columns) != list(bulk.columns) or len(legacy) != len(bulk):
+        return False
+    for col in legacy.columns:
+        a, b = legacy[col], bulk[col]
+        if pd.api.types.is_numeric_dtype(b) and not pd.api.types.is_bool_dtype(b):
+            a = pd.to_numeric(a, errors="coerce")
+            if not ((a - b).abs().fillna(0) < 1e-9).all():
+                return False
+        elif pd.api.types.is_datetime64_any_dtype(b):
+            if not pd.to_datetime(a).equals(b):
+                return False
+    return True
+
+
+def run_benchmark(repeats: int = 3, tables: List[str] | None = None) -> Dict[str, object]:
+    results: Dict[str, object] = {}
+    with db_access.connection() as conn:
+        for name in tables or list(TABLES):
+            spec = TABLES[name]
+            query = str(spec["query"])
+            try:
+                legacy_times, legacy = _time(lambda: _read_sql(query, conn), repeats)
+                bulk_times, bulk = _time(lambda: db_access.copy_frame(query, conn=conn, **spec["copy"]), repeats)
+            except Exception as exc:
+                conn.rollback()
+                results[name] = {"error": str(exc)}
+                continue
+            legacy_median = statistics.median(legacy_times)
+            bulk_median = statistics.median(bulk_times)
+            results[name] = {
+                "rows": int(len(bulk)),
+                "read_sql_query_s": round(legacy_median, 4),
+                "copy_s": round(bulk_median, 4),
+                "speedup": round(legacy_median / bulk_median, 2) if bulk_median > 0 else None,
+                "frames_agree": _frames_agree(legacy, bulk),
+            }
+    results["db_stats"] = db_access.pool_stats()
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="COPY vs read_sql_query loader benchmark")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--tables", nargs="*", choices=list(TABLES), default=None)
+    args = parser.parse_args()
+
+    results = run_benchmark(repeats=max(1, args.repeats), tables=args.tables)
+    print(f"{'table':<20} {'rows':>8} {'read_sql':>10} {'COPY':>10} {'speedup':>8}  agree")
+    for name in args.tables or list(TABLES):
+        row = results[name]
+        if "error" in row:
+            print(f"{name:<20} error: {row['error']}")
+            continue
+        print(
+            f"{name:<20} {row['rows']:>8} {row['read_sql_query_s']:>9.3f}s {row['copy_s']:>9.3f}s "
+            f"{row['speedup']:>7}x  {row['frames_agree']}"
+        )
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
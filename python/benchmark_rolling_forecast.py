@@ -0,0 +1,160 @@
+"""
+Benchmark ``ensemble_predict.rolling_forecast`` against the legacy per-day loop.
+
+The legacy path re-featurized and re-predicted the 180-day history window
+inside every forecast day (``calculate_historical_errors``) and rebuilt the
+rolling feature frame from scratch for each day (``prepare_rolling_features``).
+Both paths are timed on the same history and saved opt10 model, and their
+outputs are checked to agree.
+
+Run:
+    python python/benchmark_rolling_forecast.py --days 7 30 90 --repeats 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import ensemble_predict as ep  # noqa: E402
+
+
+ATTENDANCE_CSV = Path(__file__).resolve().parent.parent / "ndh_attendance_extracted.csv"
+
+
+def load_history(path: Path = ATTENDANCE_CSV) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    df = df.rename(columns={"date": "Date", "attendance": "Attendance"})
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df[["Date", "Attendance"]].sort_values("Date").reset_index(drop=True)
+
+
+def legacy_historical_errors(df, model, feature_cols, window_days=180):
+    """Per-row loop that ``calculate_historical_errors`` used before batching."""
+    if df is None or len(df) < 30:
+        return None
+    df = df.copy()
+    df["Date"] = pd.to_datetime(df["Date"])
+    df = df.sort_values("Date").reset_index(drop=True)
+    if len(df) > window_days:
+        df = df.iloc[-window_days:].reset_index(drop=True)
+
+    errors = []
+    for i in range(14, len(df)):
+        target_date = df.iloc[i]["Date"].strftime("%Y-%m-%d")
+        try:
+            features_df = ep.prepare_opt10_features(df.iloc[:i], target_date)
+            pred = ep.predict_with_xgboost(model, feature_cols, features_df)
+            if pred is not None:
+                errors.append(abs(pred - df.iloc[i]["Attendance"]))
+        except Exception:
+            continue
+    return np.array(errors) if errors else None
+
+
+def legacy_rolling_forecast(start_date, days, historical_data):
+    """The pre-change ``rolling_forecast`` (opt10 path), kept for comparison."""
+    model, feature_cols, _ = ep.load_xgboost_model()
+    if model is None:
+        return None
+
+    df = historical_data.copy()
+    df["Date"] = pd.to_datetime(df["Date"])
+    df = df.sort_values("Date").reset_index(drop=True)
+    if len(df) > 180:
+        df = df.iloc[-180:].reset_index(drop=True)
+
+    predictions = []
+    previous_predictions = []
+    start_dt = pd.to_datetime(start_date)
+    for i in range(days):
+        target_date_str = (start_dt + timedelta(days=i)).strftime("%Y-%m-%d")
+        features_df = ep.prepare_rolling_features(df, target_date_str, previous_predictions)
+        xgb_pred = ep.predict_with_xgboost(model, feature_cols, features_df)
+
+        hist_errors = legacy_historical_errors(df, model, feature_cols)
+        base_std = np.std(hist_errors) if hist_errors is not None and len(hist_errors) > 10 else xgb_pred * 0.05
+        std_preds = base_std * (1.0 + (i ** 1.2) * 0.015)
+        predictions.append({
+            "date": target_date_str,
+            "prediction": float(xgb_pred),
+            "day_ahead": i,
+            "ci80": {"low": float(xgb_pred - 1.28 * std_preds), "high": float(xgb_pred + 1.28 * std_preds)},
+            "ci95": {"low": float(xgb_pred - 1.96 * std_preds), "high": float(xgb_pred + 1.96 * std_preds)},
+        })
+        previous_predictions.append({"date": target_date_str, "prediction": xgb_pred})
+    return predictions
+
+
+def _time(fn: Callable[[], List[dict]], repeats: int) -> tuple[List[float], List[dict]]:
+    timings: List[float] = []
+    result: List[dict] = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return timings, result
+
+
+def _max_abs_diff(legacy: List[dict], current: List[dict]) -> float:
+    if [p["date"] for p in legacy] != [p["date"] for p in current]:
+        return float("inf")
+    diffs = [0.0]
+    for a, b in zip(legacy, current):
+        diffs.append(abs(a["prediction"] - b["prediction"]))
+        for band in ("ci80", "ci95"):
+            diffs.append(abs(a[band]["low"] - b[band]["low"]))
+            diffs.append(abs(a[band]["high"] - b[band]["high"]))
+    return max(diffs)
+
+
+def run_benchmark(history: pd.DataFrame, horizons: List[int], repeats: int = 3) -> Dict[str, object]:
+    start_date = (history["Date"].iloc[-1] + timedelta(days=1)).strftime("%Y-%m-%d")
+    results: Dict[str, object] = {"history_rows": int(len(history)), "start_date": start_date}
+    for days in horizons:
+        legacy_times, legacy = _time(lambda: legacy_rolling_forecast(start_date, days, history), repeats)
+        current_times, current = _time(lambda: ep.rolling_forecast(start_date, days, history), repeats)
+        legacy_median = statistics.median(legacy_times)
+        current_median = statistics.median(current_times)
+        results[f"{days}d"] = {
+            "legacy_s": round(legacy_median, 4),
+            "current_s": round(current_median, 4),
+            "speedup": round(legacy_median / current_median, 1) if current_median > 0 else None,
+            "max_abs_diff": _max_abs_diff(legacy, current),
+        }
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="rolling_forecast legacy vs incremental benchmark")
+    parser.add_argument("--days", type=int, nargs="*", default=[7, 30, 90])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--csv", type=Path, default=ATTENDANCE_CSV)
+    args = parser.parse_args()
+
+    if ep.load_xgboost_model()[0] is None:
+        print("error: no saved XGBoost model under python/models", file=sys.stderr)
+        return 1
+
+    results = run_benchmark(load_history(args.csv), args.days, repeats=max(1, args.repeats))
+    print(f"{'horizon':<8} {'legacy':>10} {'current':>10} {'speedup':>8}  max|diff|")
+    for days in args.days:
+        row = results[f"{days}d"]
+        print(f"{days:>6}d  {row['legacy_s']:>9.3f}s {row['current_s']:>9.3f}s {row['speedup']:>7}x  {row['max_abs_diff']:.2e}")
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -8,23 +8,83 @@ import os
 import sys
 import json
 from datetime import datetime
-import psycopg2
+from db_access import get_connection
 from psycopg2.extras import RealDictCursor
+from learning_stats import Moments, combine, fetch_moments
 
 def get_db_connection():
     """連接到 Railway Production Database"""
     # 從環境變數或 server.js 配置獲取
     password = os.environ.get('PGPASSWORD') or os.environ.get('DATABASE_PASSWORD') or 'nIdJPREHqkBdMgUifrazOsVlWbxsmDGq'
     
-    return psycopg2.connect(
-        host=os.environ.get('PGHOST', 'tramway.proxy.rlwy.net'),
-        port=int(os.environ.get('PGPORT', '45703')),
-        user=os.environ.get('PGUSER', 'postgres'),
+    return get_connection(
+        host='tramway.proxy.rlwy.net',
+        port='45703',
+        user='postgres',
         password=password,
-        database=os.environ.get('PGDATABASE', 'railway'),
-        sslmode='require'
+        database='railway',
     )
 
+def rows_from_moments(moments, holiday_params):
+    """learning_stat_moments → 與 GROUPING SETS 查詢同形的 overall / DoW / month 行"""
+    def _row(m):
+        return {'count': m.n, 'mean': m.mean}
+
+    overall = _row(moments['actual_all'].get('all', Moments()))
+    mmdd = moments['actual_mmdd']
+    for key, days in holiday_params.items():
+        holiday = combine(mmdd.get(day, Moments()) for day in days)
+        overall[f"{key}_count"] = holiday.n
+        overall[f"{key}_mean"] = holiday.mean
+    dow_rows = [
+        dict(_row(m), dow=int(k)) for k, m in sorted(moments['actual_dow'].items(), key=lambda kv: int(kv[0]))
+        if m.n > 0
+    ]
+    month_rows = [
+        dict(_row(m), month=int(k)) for k, m in sorted(moments['actual_month'].items(), key=lambda kv: int(kv[0]))
+        if m.n > 0
+    ]
+    return overall, dow_rows, month_rows
+
+
+def scan_actual_data(conn, holiday_params):
+    """一次掃描 actual_data：GROUPING SETS 出 overall / DoW / month，
+    假期以 FILTER 欄位在 overall 行上計算"""
+    holiday_columns = ",\n".join(
+        f"COUNT(*) FILTER (WHERE md = ANY(%({key})s)) AS {key}_count, "
+        f"AVG(patient_count) FILTER (WHERE md = ANY(%({key})s)) AS {key}_mean"
+        for key in holiday_params
+    )
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur.execute(f"""
+        SELECT
+            GROUPING(dow) AS g_dow,
+            GROUPING(month) AS g_month,
+            dow,
+            month,
+            COUNT(*) AS count,
+            AVG(patient_count) AS mean,
+            {holiday_columns}
+        FROM (
+            SELECT
+                patient_count,
+                EXTRACT(DOW FROM date)::int AS dow,
+                EXTRACT(MONTH FROM date)::int AS month,
+                TO_CHAR(date, 'MM-DD') AS md
+            FROM actual_data
+        ) a
+        GROUP BY GROUPING SETS ((), (dow), (month))
+        ORDER BY g_dow, g_month, dow, month
+    """, holiday_params)
+    rows = cur.fetchall()
+    cur.close()
+
+    overall = next(row for row in rows if row['g_dow'] == 1 and row['g_month'] == 1)
+    dow_rows = [row for row in rows if row['g_dow'] == 0]
+    month_rows = [row for row in rows if row['g_month'] == 0]
+    return overall, dow_rows, month_rows
+
+
 def calculate_dynamic_factors():
     """從數據庫動態計算所有 factors"""
     
@@ -32,33 +92,49 @@ def calculate_dynamic_factors():
     print("DYNAMIC FACTOR CALCULATION FROM RAILWAY DATABASE")
     print("=" * 80)
     
+    holidays = {
+        '農曆新年': ['01-31', '02-19', '02-08', '01-28', '02-16', '02-05', '01-25', '02-12', '02-01', '01-22', '02-10', '01-29'],
+        '聖誕節': ['12-25'],
+        '聖誕節翌日': ['12-26'],
+        '元旦': ['01-01'],
+        '清明節': ['04-04', '04-05'],
+        '端午節': ['06-02', '06-20', '06-09', '05-30', '06-18', '06-07', '06-25', '06-14', '06-03', '06-22', '06-10', '05-31'],
+        '中秋節翌日': ['09-09', '09-28', '09-16', '10-05', '09-25', '09-14', '10-02', '09-22', '09-12', '09-30', '09-18', '10-07'],
+        '重陽節': ['10-02', '10-21', '10-10', '10-28', '10-17', '10-07', '10-26', '10-14', '10-04', '10-23', '10-11', '10-29'],
+        '佛誕': ['05-06', '05-25', '05-14', '05-03', '05-22', '05-13', '04-30', '05-19', '05-09', '05-26', '05-15', '05-05'],
+        '勞動節': ['05-01'],
+        '耶穌受難日': ['04-18', '04-03', '03-25', '04-14', '03-30', '04-19', '04-10', '04-02', '04-15', '04-07', '03-29', '04-18'],
+        '復活節星期一': ['04-21', '04-06', '03-28', '04-17', '04-02', '04-22', '04-13', '04-05', '04-18', '04-10', '04-01', '04-21'],
+        '香港特別行政區成立紀念日': ['07-01'],
+        '國慶日': ['10-01']
+    }
+
+    holiday_names = list(holidays)
+    params = {f"h{i}": sorted(set(holidays[name])) for i, name in enumerate(holiday_names)}
+
     conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    
+
+    # 優先讀 migration 007 觸發器維護的累計 moments（O(1) 讀取，毋須掃表）
+    moments = fetch_moments(conn, ['actual_all', 'actual_dow', 'actual_month', 'actual_mmdd'])
+    if moments is not None:
+        conn.close()
+        overall, dow_rows, month_rows = rows_from_moments(moments, params)
+    else:
+        overall, dow_rows, month_rows = scan_actual_data(conn, params)
+        conn.close()
+
     # 1. Overall statistics
-    cur.execute("SELECT COUNT(*) as total, AVG(patient_count) as mean FROM actual_data")
-    overall = cur.fetchone()
-    total_days = overall['total']
+    total_days = overall['count']
     overall_mean = float(overall['mean'])
-    
+
     print(f"\nTotal Days: {total_days}")
     print(f"Overall Mean: {overall_mean:.2f}\n")
-    
+
     # 2. Day of Week Factors
     print("Calculating Day-of-Week Factors...")
-    cur.execute("""
-        SELECT 
-            EXTRACT(DOW FROM date) as dow,
-            COUNT(*) as count,
-            AVG(patient_count) as mean
-        FROM actual_data
-        GROUP BY EXTRACT(DOW FROM date)
-        ORDER BY dow
-    """)
-    
     dow_factors = {}
     dow_names = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-    for row in cur.fetchall():
+    for row in dow_rows:
         dow = int(row['dow'])
         factor = float(row['mean']) / overall_mean
         dow_factors[dow] = {
@@ -68,21 +144,11 @@ def calculate_dynamic_factors():
             'count': row['count']
         }
         print(f"  {dow_names[dow]}: {factor:.3f} (n={row['count']})")
-    
+
     # 3. Month Factors
     print("\nCalculating Month Factors...")
-    cur.execute("""
-        SELECT 
-            EXTRACT(MONTH FROM date) as month,
-            COUNT(*) as count,
-            AVG(patient_count) as mean
-        FROM actual_data
-        GROUP BY EXTRACT(MONTH FROM date)
-        ORDER BY month
-    """)
-    
     month_factors = {}
-    for row in cur.fetchall():
+    for row in month_rows:
         month = int(row['month'])
         factor = float(row['mean']) / overall_mean
         month_factors[month] = {
@@ -91,56 +157,26 @@ def calculate_dynamic_factors():
             'count': row['count']
         }
         print(f"  Month {month}: {factor:.3f} (n={row['count']})")
-    
+
     # 4. Holiday Factors (HK Public Holidays)
     print("\nCalculating Holiday Factors...")
-    
-    holidays = {
-        '農曆新年': ['01-31', '02-19', '02-08', '01-28', '02-16', '02-05', '01-25', '02-12', '02-01', '01-22', '02-10', '01-29'],
-        '聖誕節': ['12-25'],
-        '聖誕節翌日': ['12-26'],
-        '元旦': ['01-01'],
-        '清明節': ['04-04', '04-05'],
-        '端午節': ['06-02', '06-20', '06-09', '05-30', '06-18', '06-07', '06-25', '06-14', '06-03', '06-22', '06-10', '05-31'],
-        '中秋節翌日': ['09-09', '09-28', '09-16', '10-05', '09-25', '09-14', '10-02', '09-22', '09-12', '09-30', '09-18', '10-07'],
-        '重陽節': ['10-02', '10-21', '10-10', '10-28', '10-17', '10-07', '10-26', '10-14', '10-04', '10-23', '10-11', '10-29'],
-        '佛誕': ['05-06', '05-25', '05-14', '05-03', '05-22', '05-13', '04-30', '05-19', '05-09', '05-26', '05-15', '05-05'],
-        '勞動節': ['05-01'],
-        '耶穌受難日': ['04-18', '04-03', '03-25', '04-14', '03-30', '04-19', '04-10', '04-02', '04-15', '04-07', '03-29', '04-18'],
-        '復活節星期一': ['04-21', '04-06', '03-28', '04-17', '04-02', '04-22', '04-13', '04-05', '04-18', '04-10', '04-01', '04-21'],
-        '香港特別行政區成立紀念日': ['07-01'],
-        '國慶日': ['10-01']
-    }
-    
     holiday_factors = {}
-    for name, dates in holidays.items():
-        date_conditions = " OR ".join([f"TO_CHAR(date, 'MM-DD') = '{d}'" for d in set(dates)])
-        query = f"""
-            SELECT 
-                COUNT(*) as count,
-                AVG(patient_count) as mean
-            FROM actual_data
-            WHERE {date_conditions}
-        """
-        cur.execute(query)
-        result = cur.fetchone()
-        
-        if result['count'] > 0:
-            factor = float(result['mean']) / overall_mean
+    for i, name in enumerate(holiday_names):
+        count = overall[f"h{i}_count"]
+        if count > 0:
+            mean = float(overall[f"h{i}_mean"])
+            factor = mean / overall_mean
             holiday_factors[name] = {
                 'factor': round(factor, 3),
-                'mean': round(float(result['mean']), 2),
-                'count': result['count'],
+                'mean': round(mean, 2),
+                'count': count,
                 'impact_pct': round((factor - 1.0) * 100, 1)
             }
-            print(f"  {name}: {factor:.3f} (n={result['count']}, {holiday_factors[name]['impact_pct']:+.1f}%)")
-    
+            print(f"  {name}: {factor:.3f} (n={count}, {holiday_factors[name]['impact_pct']:+.1f}%)")
+
     # Add secondary holidays (same factor as primary)
     holiday_factors['耶穌受難日翌日'] = holiday_factors['耶穌受難日'].copy()
     
-    cur.close()
-    conn.close()
-    
     # 5. Save to JSON
     output = {
         'version': '3.0.81',
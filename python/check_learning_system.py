@@ -4,7 +4,7 @@
 """
 import sys
 import io
-import psycopg2
+from db_access import get_connection
 from datetime import datetime
 import os
 
@@ -22,7 +22,7 @@ print("🔍 檢查自動學習系統狀態...")
 print(f"數據庫: {DATABASE_URL.split('@')[1] if '@' in DATABASE_URL else 'unknown'}\n")
 
 try:
-    conn = psycopg2.connect(DATABASE_URL)
+    conn = get_connection(dsn=DATABASE_URL)
     cur = conn.cursor()
 
     # 1. 檢查學習記錄
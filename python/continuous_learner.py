@@ -18,7 +18,7 @@ Date: 2026-01-18
 
 import os
 import sys
-import psycopg2
+from db_access import get_connection
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta, timezone
@@ -51,19 +51,9 @@ HIGH_ANOMALY_THRESHOLD = 30.0  # 誤差 > 30 人視為高異常
 # ============================================================
 
 def get_db_connection():
-    """獲取數據庫連接"""
+    """獲取數據庫連接（共用 db_access 連接池）"""
     load_dotenv()
-    database_url = os.getenv('DATABASE_URL')
-    if database_url:
-        conn = psycopg2.connect(database_url)
-    else:
-        conn = psycopg2.connect(
-            host=os.getenv('PGHOST'),
-            database=os.getenv('PGDATABASE'),
-            user=os.getenv('PGUSER'),
-            password=os.getenv('PGPASSWORD'),
-        )
-    return conn
+    return get_connection(sslmode='prefer')
 
 def normalize_ai_factor_payload(ai_data):
     """相容 type/event_type 與 impactFactor/factor 欄位"""
@@ -175,6 +165,48 @@ def upsert_weather_history(cur, date, weather):
         weather.get('is_high_pressure'),
     ))
 
+WEATHER_COLUMNS_SQL = """
+            temp_min, temp_max, temp_mean,
+            humidity_pct, rainfall_mm, wind_kmh,
+            pressure_hpa, visibility_km,
+            is_very_cold, is_very_hot, is_heavy_rain,
+            is_strong_wind, typhoon_signal"""
+
+
+def _float_or_none(value):
+    return float(value) if value is not None else None
+
+
+def weather_from_row(row):
+    """weather_history 行 → dict（0 mm 雨量保留為 0.0，不當作缺失）"""
+    return {
+        'temp_min': _float_or_none(row[0]),
+        'temp_max': _float_or_none(row[1]),
+        'temp_mean': _float_or_none(row[2]),
+        'humidity_pct': _float_or_none(row[3]),
+        'rainfall_mm': _float_or_none(row[4]),
+        'wind_kmh': _float_or_none(row[5]),
+        'pressure_hpa': _float_or_none(row[6]),
+        'visibility_km': _float_or_none(row[7]),
+        'is_very_cold': row[8],
+        'is_very_hot': row[9],
+        'is_heavy_rain': row[10],
+        'is_strong_wind': row[11],
+        'typhoon_signal': row[12]
+    }
+
+
+def prediction_from_row(row):
+    """daily_predictions (xgboost_base, production, experimental, ai_factor, weather_factor) → dict"""
+    return {
+        'xgboost_base': float(row[0]) if row[0] else None,
+        'production': float(row[1]) if row[1] else None,
+        'experimental': float(row[2]) if row[2] else None,
+        'ai_factor': float(row[3]) if row[3] else None,
+        'weather_factor': float(row[4]) if row[4] else None,
+    }
+
+
 def fetch_yesterday_data(date):
     """獲取指定日期的所有相關數據"""
 
@@ -227,13 +259,7 @@ def fetch_yesterday_data(date):
     """, (utc_start, utc_end))
     result = cur.fetchone()
     if result:
-        data['prediction'] = {
-            'xgboost_base': float(result[0]) if result[0] else None,
-            'production': float(result[1]) if result[1] else None,
-            'experimental': float(result[2]) if result[2] else None,
-            'ai_factor': float(result[3]) if result[3] else None,
-            'weather_factor': float(result[4]) if result[4] else None,
-        }
+        data['prediction'] = prediction_from_row(result)
         print(f"   ✅ Prediction: {data['prediction']['production']:.1f}")
 
     # 3. 獲取 AI factor 詳情（從 ai_factors JSONB 欄位，使用相同的 UTC 範圍）
@@ -254,33 +280,14 @@ def fetch_yesterday_data(date):
         print(f"   ✅ AI Factors: {json.dumps(ai_data, ensure_ascii=False)}")
 
     # 4. 獲取或獲取天氣數據
-    cur.execute("""
-        SELECT
-            temp_min, temp_max, temp_mean,
-            humidity_pct, rainfall_mm, wind_kmh,
-            pressure_hpa, visibility_km,
-            is_very_cold, is_very_hot, is_heavy_rain,
-            is_strong_wind, typhoon_signal
+    cur.execute(f"""
+        SELECT {WEATHER_COLUMNS_SQL}
         FROM weather_history
         WHERE date = %s
     """, (date,))
     result = cur.fetchone()
     if result:
-        stored_weather = {
-            'temp_min': float(result[0]) if result[0] else None,
-            'temp_max': float(result[1]) if result[1] else None,
-            'temp_mean': float(result[2]) if result[2] else None,
-            'humidity_pct': float(result[3]) if result[3] else None,
-            'rainfall_mm': float(result[4]) if result[4] else None,
-            'wind_kmh': float(result[5]) if result[5] else None,
-            'pressure_hpa': float(result[6]) if result[6] else None,
-            'visibility_km': float(result[7]) if result[7] else None,
-            'is_very_cold': result[8],
-            'is_very_hot': result[9],
-            'is_heavy_rain': result[10],
-            'is_strong_wind': result[11],
-            'typhoon_signal': result[12]
-        }
+        stored_weather = weather_from_row(result)
         if has_core_weather_fields(stored_weather):
             data['weather'] = stored_weather
 
@@ -388,76 +395,32 @@ def analyze_ai_impact(data, error):
 # Database Update
 # ============================================================
 
-def save_learning_record(conn, data, metrics, anomaly, weather_impact, ai_impact):
-    """保存學習記錄到數據庫"""
-    cur = conn.cursor()
-
-    prediction = data.get('prediction', {})
-    weather = data.get('weather', {})
+LEARNING_RECORD_COLUMNS = (
+    'date', 'xgboost_base_pred', 'final_prediction', 'actual_attendance', 'prediction_error', 'error_pct',
+    # 天氣條件
+    'temp_min', 'temp_max', 'rainfall_mm', 'wind_kmh', 'humidity_pct', 'pressure_hpa',
+    'is_very_cold', 'is_very_hot', 'is_heavy_rain', 'is_strong_wind', 'typhoon_signal',
+    # AI 因素
+    'ai_factor', 'ai_event_type', 'ai_description',
+    # 學習結果
+    'weather_impact_learned', 'ai_impact_learned', 'is_anomaly',
+)
+
+LEARNING_RECORD_UPSERT = (
+    "INSERT INTO learning_records (" + ", ".join(LEARNING_RECORD_COLUMNS) + ") VALUES {values} "
+    "ON CONFLICT (date) DO UPDATE SET "
+    + ", ".join(f"{col} = EXCLUDED.{col}" for col in LEARNING_RECORD_COLUMNS[1:])
+    + ", processed = FALSE"
+)
+
+
+def learning_record_row(data, metrics, anomaly, weather_impact, ai_impact):
+    """learning_records 一行的參數（順序同 LEARNING_RECORD_COLUMNS）"""
+    prediction = data.get('prediction') or {}
+    weather = data.get('weather') or {}
     ai = normalize_ai_factor_payload(data.get('ai_factor'))
 
-    cur.execute("""
-        INSERT INTO learning_records (
-            date,
-            xgboost_base_pred,
-            final_prediction,
-            actual_attendance,
-            prediction_error,
-            error_pct,
-
-            -- 天氣條件
-            temp_min,
-            temp_max,
-            rainfall_mm,
-            wind_kmh,
-            humidity_pct,
-            pressure_hpa,
-            is_very_cold,
-            is_very_hot,
-            is_heavy_rain,
-            is_strong_wind,
-            typhoon_signal,
-
-            -- AI 因素
-            ai_factor,
-            ai_event_type,
-            ai_description,
-
-            -- 學習結果
-            weather_impact_learned,
-            ai_impact_learned,
-            is_anomaly
-        ) VALUES (
-            %s, %s, %s, %s, %s, %s,
-            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-            %s, %s, %s,
-            %s, %s, %s
-        )
-        ON CONFLICT (date) DO UPDATE SET
-            xgboost_base_pred = EXCLUDED.xgboost_base_pred,
-            final_prediction = EXCLUDED.final_prediction,
-            actual_attendance = EXCLUDED.actual_attendance,
-            prediction_error = EXCLUDED.prediction_error,
-            error_pct = EXCLUDED.error_pct,
-            temp_min = EXCLUDED.temp_min,
-            temp_max = EXCLUDED.temp_max,
-            rainfall_mm = EXCLUDED.rainfall_mm,
-            wind_kmh = EXCLUDED.wind_kmh,
-            humidity_pct = EXCLUDED.humidity_pct,
-            pressure_hpa = EXCLUDED.pressure_hpa,
-            is_very_cold = EXCLUDED.is_very_cold,
-            is_very_hot = EXCLUDED.is_very_hot,
-            is_heavy_rain = EXCLUDED.is_heavy_rain,
-            is_strong_wind = EXCLUDED.is_strong_wind,
-            typhoon_signal = EXCLUDED.typhoon_signal,
-            ai_factor = EXCLUDED.ai_factor,
-            ai_event_type = EXCLUDED.ai_event_type,
-            ai_description = EXCLUDED.ai_description,
-            weather_impact_learned = EXCLUDED.weather_impact_learned,
-            ai_impact_learned = EXCLUDED.ai_impact_learned,
-            is_anomaly = EXCLUDED.is_anomaly,
-            processed = FALSE
-    """, (
+    return (
         data['date'],
         prediction.get('xgboost_base'),
         prediction.get('production'),
@@ -484,19 +447,40 @@ def save_learning_record(conn, data, metrics, anomaly, weather_impact, ai_impact
         weather_impact.get('total_effect') if weather_impact else None,
         ai_impact.get('improvement_amount') if ai_impact else None,
         anomaly.get('is_anomaly', False)
-    ))
+    )
+
+
+def save_learning_record(conn, data, metrics, anomaly, weather_impact, ai_impact):
+    """保存學習記錄到數據庫"""
+    cur = conn.cursor()
+    placeholders = "(" + ", ".join(["%s"] * len(LEARNING_RECORD_COLUMNS)) + ")"
+    cur.execute(
+        LEARNING_RECORD_UPSERT.format(values=placeholders),
+        learning_record_row(data, metrics, anomaly, weather_impact, ai_impact),
+    )
 
     conn.commit()
     cur.close()
 
-def update_anomaly_if_needed(conn, data, metrics, anomaly):
-    """如果檢測到異常，記錄到異常表"""
-    if not anomaly.get('is_anomaly'):
-        return
+ANOMALY_EVENT_UPSERT = """
+        INSERT INTO anomaly_events (
+            date,
+            anomaly_type,
+            prediction_error,
+            conditions_json,
+            requires_review
+        ) VALUES {values}
+        ON CONFLICT (date) DO UPDATE SET
+            anomaly_type = EXCLUDED.anomaly_type,
+            prediction_error = EXCLUDED.prediction_error,
+            conditions_json = EXCLUDED.conditions_json,
+            requires_review = EXCLUDED.requires_review
+"""
 
-    cur = conn.cursor()
 
-    weather = data.get('weather', {})
+def anomaly_event_row(data, metrics, anomaly):
+    """anomaly_events 一行的參數"""
+    weather = data.get('weather') or {}
     conditions = {
         'temp_min': weather.get('temp_min'),
         'temp_max': weather.get('temp_max'),
@@ -514,28 +498,25 @@ def update_anomaly_if_needed(conn, data, metrics, anomaly):
     elif data.get('ai_factor'):
         anomaly_type = 'ai'
 
-    cur.execute("""
-        INSERT INTO anomaly_events (
-            date,
-            anomaly_type,
-            prediction_error,
-            conditions_json,
-            requires_review
-        ) VALUES (
-            %s, %s, %s, %s, %s
-        )
-        ON CONFLICT (date) DO UPDATE SET
-            anomaly_type = EXCLUDED.anomaly_type,
-            prediction_error = EXCLUDED.prediction_error,
-            conditions_json = EXCLUDED.conditions_json,
-            requires_review = EXCLUDED.requires_review
-    """, (
+    return (
         data['date'],
         anomaly_type,
         metrics.get('error'),
         json.dumps(conditions),
         anomaly.get('severity') == 'high'
-    ))
+    )
+
+
+def update_anomaly_if_needed(conn, data, metrics, anomaly):
+    """如果檢測到異常，記錄到異常表"""
+    if not anomaly.get('is_anomaly'):
+        return
+
+    cur = conn.cursor()
+    cur.execute(
+        ANOMALY_EVENT_UPSERT.format(values="(%s, %s, %s, %s, %s)"),
+        anomaly_event_row(data, metrics, anomaly),
+    )
 
     conn.commit()
     cur.close()
@@ -595,6 +576,193 @@ def process_date(date):
 
     return True
 
+# ============================================================
+# Batch Learning（缺口補跑：整段日期幾條 set-based 查詢）
+# ============================================================
+
+def fetch_range_data(conn, dates):
+    """一次過獲取多日數據；回傳 {date: data}，結構同 fetch_yesterday_data
+
+    actual / prediction（含 ai_factors）/ weather 各一條查詢，取代每日
+    四條單行查詢；weather_history 缺漏的日子才逐日向 HKO 補取。
+    """
+    dates = sorted(set(dates))
+    if not dates:
+        return {}
+    cur = conn.cursor()
+
+    cur.execute("""
+        SELECT date, patient_count
+        FROM actual_data
+        WHERE date = ANY(%s)
+    """, (dates,))
+    actual = {row[0]: row[1] for row in cur.fetchall()}
+
+    # target_date 是 UTC 時間：+8h 後的日期就是 HKT 日期；每個 HKT 日期取最新一筆
+    utc_start = datetime.combine(dates[0] - timedelta(days=1), datetime.min.time()) + timedelta(hours=16)
+    utc_end = datetime.combine(dates[-1], datetime.min.time()) + timedelta(hours=16)
+    cur.execute("""
+        SELECT DISTINCT ON (hkt_date)
+            hkt_date,
+            xgboost_base,
+            prediction_production,
+            prediction_experimental,
+            ai_factor,
+            weather_factor,
+            ai_factors
+        FROM (
+            SELECT (target_date + INTERVAL '8 hours')::date AS hkt_date, *
+            FROM daily_predictions
+            WHERE target_date >= %s AND target_date < %s
+        ) p
+        WHERE hkt_date = ANY(%s)
+        ORDER BY hkt_date, created_at DESC
+    """, (utc_start, utc_end, dates))
+    predictions = {row[0]: row[1:] for row in cur.fetchall()}
+
+    cur.execute(f"""
+        SELECT date, {WEATHER_COLUMNS_SQL}
+        FROM weather_history
+        WHERE date = ANY(%s)
+    """, (dates,))
+    weather = {row[0]: weather_from_row(row[1:]) for row in cur.fetchall()}
+
+    records = {}
+    for date in dates:
+        pred_row = predictions.get(date)
+        stored_weather = weather.get(date)
+        records[date] = {
+            'date': date,
+            'actual': actual.get(date),
+            'prediction': prediction_from_row(pred_row[:5]) if pred_row else None,
+            'ai_factor': normalize_ai_factor_payload(pred_row[5]) if pred_row and pred_row[5] else None,
+            'weather': stored_weather if has_core_weather_fields(stored_weather) else None,
+        }
+
+    missing_weather = [d for d, data in records.items() if not data['weather'] and data['actual']]
+    if missing_weather:
+        print(f"   📡 Fetching historical weather from HKO Daily Extract for {len(missing_weather)} day(s)...")
+    for date in missing_weather:
+        fetched_weather = fetch_hko_weather(date)
+        if fetched_weather and has_core_weather_fields(fetched_weather):
+            upsert_weather_history(cur, date, fetched_weather)
+            records[date]['weather'] = fetched_weather
+        else:
+            print(f"   ⚠️ Historical weather unavailable for {date}")
+    if missing_weather:
+        conn.commit()
+
+    cur.close()
+    return records
+
+
+def compute_batch_learning(records):
+    """向量化計算誤差 / 異常 / 天氣效應；回傳 DataFrame（index = date）
+
+    只保留 actual 與 production 預測齊全的日子，與 process_date 的跳過條件一致。
+    """
+    rows = []
+    for date, data in records.items():
+        prediction = data.get('prediction') or {}
+        weather = data.get('weather') or {}
+        rows.append({
+            'date': date,
+            'actual': data.get('actual'),
+            'production': prediction.get('production'),
+            'is_very_cold': bool(weather.get('is_very_cold')),
+            'is_very_hot': bool(weather.get('is_very_hot')),
+            'is_heavy_rain': bool(weather.get('is_heavy_rain')),
+            'is_strong_wind': bool(weather.get('is_strong_wind')),
+            'has_weather': bool(weather),
+        })
+    frame = pd.DataFrame(rows).set_index('date')
+    frame = frame[frame['actual'].fillna(0).astype(float).ne(0) & frame['production'].notna()].copy()
+    if frame.empty:
+        return frame
+
+    actual = frame['actual'].astype(float).to_numpy()
+    predicted = frame['production'].astype(float).to_numpy()
+    error = actual - predicted
+    abs_error = np.abs(error)
+    frame['error'] = error
+    frame['error_pct'] = np.where(actual > 0, error / np.where(actual > 0, actual, 1.0) * 100, 0.0)
+    frame['abs_error'] = abs_error
+    frame['is_anomaly'] = abs_error > ANOMALY_THRESHOLD
+    frame['is_high_anomaly'] = abs_error > HIGH_ANOMALY_THRESHOLD
+    frame['severity'] = np.select(
+        [frame['is_high_anomaly'], frame['is_anomaly']], ['high', 'medium'], default='none'
+    )
+
+    # 同 analyze_weather_impact 的固定效應
+    temperature_effect = np.select(
+        [frame['is_very_cold'], frame['is_very_hot']], [-6.8, 1.2], default=0.0
+    )
+    rain_effect = np.where(frame['is_heavy_rain'], -4.9, 0.0)
+    wind_effect = np.where(frame['is_strong_wind'], -2.8, 0.0)
+    frame['weather_total_effect'] = temperature_effect + rain_effect + wind_effect
+    return frame
+
+
+def save_learning_batch(conn, records, learning):
+    """learning_records + anomaly_events 以 execute_values 批量寫入，單一交易"""
+    from psycopg2.extras import execute_values
+
+    record_rows = []
+    anomaly_rows = []
+    for date, row in learning.iterrows():
+        data = records[date]
+        metrics = {'error': float(row['error']), 'error_pct': float(row['error_pct']), 'abs_error': float(row['abs_error'])}
+        anomaly = {
+            'is_anomaly': bool(row['is_anomaly']),
+            'is_high_anomaly': bool(row['is_high_anomaly']),
+            'severity': row['severity'],
+        }
+        weather_impact = {'total_effect': float(row['weather_total_effect'])} if row['has_weather'] else None
+        ai_impact = analyze_ai_impact(data, metrics['error'])
+        record_rows.append(learning_record_row(data, metrics, anomaly, weather_impact, ai_impact))
+        if anomaly['is_anomaly']:
+            anomaly_rows.append(anomaly_event_row(data, metrics, anomaly))
+
+    cur = conn.cursor()
+    try:
+        execute_values(cur, LEARNING_RECORD_UPSERT.format(values="%s"), record_rows, page_size=500)
+        if anomaly_rows:
+            execute_values(cur, ANOMALY_EVENT_UPSERT.format(values="%s"), anomaly_rows, page_size=500)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return len(record_rows), len(anomaly_rows)
+
+
+def process_dates_batch(dates):
+    """批量處理多日：回傳 {date: 是否成功學習}"""
+    dates = sorted(set(dates))
+    if not dates:
+        return {}
+    print(f"Batch processing {len(dates)} date(s): {dates[0]} → {dates[-1]}")
+
+    conn = get_db_connection()
+    try:
+        records = fetch_range_data(conn, dates)
+        learning = compute_batch_learning(records)
+        for date in dates:
+            if date not in learning.index:
+                reason = 'actual' if not records[date].get('actual') else 'prediction'
+                print(f"   ⚠️ {date}: no {reason} data")
+        if learning.empty:
+            return {date: False for date in dates}
+        saved, anomalies = save_learning_batch(conn, records, learning)
+        print(f"   ✅ Saved {saved} learning record(s), {anomalies} anomaly event(s)")
+        print(f"   MAE over batch: {learning['abs_error'].mean():.1f}")
+    finally:
+        conn.close()
+
+    return {date: date in learning.index for date in dates}
+
+
 def get_yesterday_hkt():
     """HKT 昨天（避免 server 在 UTC 時跑錯日）"""
     now_hkt = datetime.now(HKT)
@@ -622,18 +790,19 @@ def main():
     """主函數 - 處理 HKT 昨天的數據；--catch-up 時一併補跑缺口日"""
     yesterday = get_yesterday_hkt()
     do_catch_up = '--catch-up' in (sys.argv or [])
+    use_batch = '--no-batch' not in (sys.argv or [])
 
     print("=" * 60)
     print("Continuous Learning Engine v4.0.00")
     print("=" * 60)
     print(f"Processing (HKT yesterday): {yesterday}")
     if do_catch_up:
-        print("   --catch-up: 補跑缺口日")
+        print(f"   --catch-up: 補跑缺口日（{'batch' if use_batch else 'per-date'}）")
     print()
 
-    success = process_date(yesterday)
-
-    if do_catch_up:
+    if not do_catch_up:
+        success = process_date(yesterday)
+    else:
         conn = get_db_connection()
         try:
             gap_dates = run_catch_up(conn, yesterday)
@@ -645,9 +814,15 @@ def main():
                 conn.close()
             except Exception:
                 pass
-        for d in (gap_dates or []):
-            if d != yesterday:  # 已處理
-                process_date(d)
+        if use_batch:
+            # 昨天連同缺口日一次過處理（幾條 set-based 查詢 + 一個寫入交易）
+            results = process_dates_batch(list(gap_dates or []) + [yesterday])
+            success = results.get(yesterday, False)
+        else:
+            success = process_date(yesterday)
+            for d in (gap_dates or []):
+                if d != yesterday:  # 已處理
+                    process_date(d)
 
     print()
     if success:
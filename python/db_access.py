@@ -0,0 +1,419 @@
+"""
+Shared PostgreSQL access for the Python pipeline.
+
+Every loader and script used to open its own SSL ``psycopg2`` connection.
+This module keeps lazily created ``ThreadedConnectionPool``s per process
+(and per ``os.getpid()`` so forked workers never share sockets), one for
+each distinct set of resolved connection settings, applies the connect /
+statement timeouts once, and reuses server-side prepared statements for the
+hot read queries. A checkout waits for a free connection (up to
+``DB_POOL_TIMEOUT``) instead of failing once ``DB_POOL_MAX`` are in use.
+
+Environment:
+    DATABASE_URL or PGHOST / PGPORT / PGUSER / PGPASSWORD / PGDATABASE
+    PGSSLMODE               (default ``require`` for the PG* form)
+    DB_POOL_MIN / DB_POOL_MAX       (default 1 / 4)
+    DB_POOL_TIMEOUT                 seconds to wait for a free connection, default 30
+    DB_CONNECT_TIMEOUT              seconds, default 10
+    DB_STATEMENT_TIMEOUT_MS         default 120000 (0 = server default)
+
+Usage:
+    from db_access import connection, copy_frame, fetch_frame, get_connection
+
+    with connection() as conn:          # returned to the pool afterwards
+        ...
+    conn = get_connection()             # legacy style; ``conn.close()``
+    df = fetch_frame("actual_data", "SELECT ...")   # prepared + pooled
+    df = copy_frame("SELECT ...", parse_dates=["date"])   # bulk COPY TO STDOUT
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import re
+import threading
+import warnings
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Sequence
+
+import pandas as pd
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+from dotenv import load_dotenv
+
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+DEFAULT_POOL_MIN = 1
+DEFAULT_POOL_MAX = 4
+DEFAULT_POOL_TIMEOUT = 30
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_STATEMENT_TIMEOUT_MS = 120000
+
+_STATEMENT_NAME = re.compile(r"^[a-z_][a-z0-9_]*$")
+_PLACEHOLDER = re.compile(r"\$\d+")
+
+_POOLS: "Dict[tuple, _CountingPool]" = {}
+_POOL_PID: int | None = None
+_POOL_LOCK = threading.Lock()
+_STATS_LOCK = threading.Lock()
+_STATS: Dict[str, int] = {
+    "connections_opened": 0,
+    "checkouts": 0,
+    "round_trips": 0,
+    "statements_prepared": 0,
+    "broken_connections": 0,
+    "bytes_copied": 0,
+}
+
+
+def _bump(key: str, amount: int = 1) -> None:
+    with _STATS_LOCK:
+        _STATS[key] = _STATS.get(key, 0) + amount
+
+
+def _env_flag_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+class PipelineConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers which statements it has prepared."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: set = set()
+        self.poisoned = False
+
+
+class _CountingPool(ThreadedConnectionPool):
+    """``ThreadedConnectionPool`` that feeds the connection-count metric.
+
+    ``getconn`` blocks on a semaphore sized to ``maxconn`` rather than
+    raising ``PoolError`` the moment every connection is checked out.
+    """
+
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        _bump("connections_opened")
+        return conn
+
+    def getconn(self, key=None, timeout: float | None = None):
+        if timeout is None:
+            timeout = _env_flag_int("DB_POOL_TIMEOUT", DEFAULT_POOL_TIMEOUT)
+        if not self._slots.acquire(timeout=max(0, timeout)):
+            raise PoolError(f"connection pool exhausted: {self.maxconn} in use for {timeout}s")
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        super().putconn(conn, key, close)
+        self._slots.release()
+
+
+def connection_kwargs(**overrides) -> Dict[str, object]:
+    """Resolve connection settings from ``.env`` / the environment.
+
+    ``overrides`` fill in PG* values a script used to hard-code as defaults;
+    environment variables still win.
+    """
+    load_dotenv(ROOT_DIR / ".env")
+    kwargs: Dict[str, object] = {}
+    database_url = os.getenv("DATABASE_URL") or overrides.get("dsn")
+    if database_url:
+        kwargs["dsn"] = database_url
+    else:
+        kwargs.update(
+            host=os.getenv("PGHOST", overrides.get("host")),
+            port=os.getenv("PGPORT", overrides.get("port")),
+            user=os.getenv("PGUSER", overrides.get("user")),
+            password=os.getenv("PGPASSWORD") or os.getenv("DATABASE_PASSWORD") or overrides.get("password"),
+            database=os.getenv("PGDATABASE", overrides.get("database")),
+            sslmode=os.getenv("PGSSLMODE", overrides.get("sslmode", "require")),
+        )
+    kwargs["connect_timeout"] = _env_flag_int("DB_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)
+    statement_timeout = _env_flag_int("DB_STATEMENT_TIMEOUT_MS", DEFAULT_STATEMENT_TIMEOUT_MS)
+    if statement_timeout > 0:
+        kwargs["options"] = f"-c statement_timeout={statement_timeout}"
+    kwargs["application_name"] = os.getenv("DB_APPLICATION_NAME", "ndh-aed-python")
+    kwargs["connection_factory"] = PipelineConnection
+    return {k: v for k, v in kwargs.items() if v is not None}
+
+
+def _pool_key(kwargs: Dict[str, object]) -> tuple:
+    return tuple(sorted((k, repr(v)) for k, v in kwargs.items()))
+
+
+def get_pool(**overrides) -> ThreadedConnectionPool:
+    """Return this process's pool for the resolved settings, creating it on first use.
+
+    Callers whose ``overrides`` resolve to different settings (another
+    ``sslmode`` or database) get their own pool rather than the first
+    caller's connections.
+    """
+    global _POOL_PID
+    kwargs = connection_kwargs(**overrides)
+    key = _pool_key(kwargs)
+    with _POOL_LOCK:
+        if _POOL_PID != os.getpid():
+            # Forked child: the parent's sockets are not ours to close or use.
+            _POOLS.clear()
+            _POOL_PID = os.getpid()
+        pool = _POOLS.get(key)
+        if pool is None or pool.closed:
+            minconn = max(0, _env_flag_int("DB_POOL_MIN", DEFAULT_POOL_MIN))
+            maxconn = max(1, minconn, _env_flag_int("DB_POOL_MAX", DEFAULT_POOL_MAX))
+            pool = _POOLS[key] = _CountingPool(minconn, maxconn, **kwargs)
+        return pool
+
+
+def close_pool() -> None:
+    """Close every pooled connection (tests, forked children, shutdown)."""
+    global _POOL_PID
+    with _POOL_LOCK:
+        if _POOL_PID == os.getpid():
+            for pool in _POOLS.values():
+                if not pool.closed:
+                    pool.closeall()
+        _POOLS.clear()
+        _POOL_PID = None
+
+
+def _release(pool: ThreadedConnectionPool, conn, broken: bool) -> None:
+    if conn.closed or getattr(conn, "poisoned", False):
+        broken = True
+    elif not broken and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
+    if broken:
+        _bump("broken_connections")
+    pool.putconn(conn, close=broken)
+
+
+@contextmanager
+def connection(**overrides) -> Iterator[PipelineConnection]:
+    """Check a connection out of the pool for the duration of the block.
+
+    Uncommitted work is rolled back on return; a connection that raised is
+    closed instead of being reused so its session state can't leak.
+    """
+    pool = get_pool(**overrides)
+    conn = pool.getconn()
+    _bump("checkouts")
+    broken = False
+    try:
+        yield conn
+    except Exception:
+        broken = True
+        raise
+    finally:
+        _release(pool, conn, broken)
+
+
+class PooledConnection:
+    """Drop-in stand-in for a raw connection whose ``close()`` returns it to the pool.
+
+    Lets existing ``conn = get_db_connection(); ...; conn.close()`` scripts
+    move onto the pool without restructuring.
+    """
+
+    _pool = None
+    _conn = None
+    _cursor_factory = None
+
+    def __init__(self, pool: ThreadedConnectionPool, conn, cursor_factory=None):
+        self._pool = pool
+        self._conn = conn
+        self._cursor_factory = cursor_factory
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise psycopg2.InterfaceError("connection already returned to the pool")
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        if self._cursor_factory is not None and not args:
+            kwargs.setdefault("cursor_factory", self._cursor_factory)
+        return self.__getattr__("cursor")(*args, **kwargs)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._conn.__exit__(exc_type, exc, tb)
+
+    @property
+    def closed(self) -> int:
+        return 1 if self._conn is None else self._conn.closed
+
+    def close(self) -> None:
+        if self._conn is not None:
+            _release(self._pool, self._conn, broken=False)
+            self._conn = None
+
+    def __del__(self):  # pragma: no cover - best effort for forgotten closes
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def get_connection(cursor_factory=None, **overrides) -> PooledConnection:
+    """Pooled replacement for the per-script ``get_db_connection`` helpers.
+
+    ``cursor_factory`` (e.g. ``RealDictCursor``) becomes the default for
+    ``conn.cursor()`` on this checkout only, not for the pooled session.
+    """
+    pool = get_pool(**overrides)
+    conn = pool.getconn()
+    _bump("checkouts")
+    return PooledConnection(pool, conn, cursor_factory)
+
+
+def _raw(conn):
+    return conn._conn if isinstance(conn, PooledConnection) else conn
+
+
+def execute_prepared(cur, name: str, query: str, params: Sequence | None = None) -> None:
+    """Run ``query`` through a per-connection server-side prepared statement.
+
+    ``query`` uses ``$1, $2 ...`` placeholders. The first call on a pooled
+    connection ships ``PREPARE`` and ``EXECUTE`` in one round trip; later
+    calls only send ``EXECUTE name(...)``. Prepared statements are
+    session-scoped and survive the rollback issued on check-in.
+    """
+    if not _STATEMENT_NAME.match(name):
+        raise ValueError(f"invalid prepared statement name: {name!r}")
+    conn = _raw(cur.connection)
+    prepared = getattr(conn, "prepared_statements", None)
+    if prepared is None:
+        # Plain psycopg2 connection (not from the pool): run it unprepared.
+        plain = _PLACEHOLDER.sub("%s", query.replace("%", "%%")) if params else query
+        cur.execute(plain, tuple(params) if params else None)
+        _bump("round_trips")
+        return
+    execute = f"EXECUTE {name}({', '.join(['%s'] * len(params))})" if params else f"EXECUTE {name}"
+    if name in prepared:
+        statement = execute
+    else:
+        statement = f"PREPARE {name} AS {query.replace('%', '%%') if params else query}; {execute}"
+    try:
+        cur.execute(statement, tuple(params) if params else None)
+    except Exception:
+        # Unknown whether the PREPARE landed; don't hand this session out again.
+        conn.poisoned = True
+        raise
+    if name not in prepared:
+        prepared.add(name)
+        _bump("statements_prepared")
+    _bump("round_trips")
+
+
+def fetch_frame(
+    name: str,
+    query: str,
+    params: Sequence | None = None,
+    conn=None,
+) -> pd.DataFrame:
+    """Prepared, pooled ``SELECT`` into a DataFrame (column names from the cursor)."""
+    if conn is None:
+        with connection() as pooled:
+            return fetch_frame(name, query, params, conn=pooled)
+    with conn.cursor() as cur:
+        execute_prepared(cur, name, query, params)
+        columns = [desc[0] for desc in cur.description]
+        rows = cur.fetchall()
+    return pd.DataFrame.from_records(rows, columns=columns)
+
+
+def read_sql(query: str, conn=None, params: Sequence | None = None) -> pd.DataFrame:
+    """``pd.read_sql_query`` on a pooled connection, minus the SQLAlchemy warning."""
+    if conn is None:
+        with connection() as pooled:
+            return read_sql(query, pooled, params)
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message=".*pandas only supports SQLAlchemy.*")
+        frame = pd.read_sql_query(query, _raw(conn), params=params)
+    _bump("round_trips")
+    return frame
+
+
+def copy_frame(
+    query: str,
+    conn=None,
+    parse_dates: Sequence[str] = (),
+    bool_columns: Sequence[str] = (),
+    text_columns: Sequence[str] = (),
+) -> pd.DataFrame:
+    """Stream ``query`` through ``COPY (...) TO STDOUT`` into a typed DataFrame.
+
+    The server renders CSV once and the bytes go straight to pandas' C (or
+    pyarrow, when installed) parser, so numeric columns come back as NumPy
+    int64/float64 without per-cell Python objects. ``bool_columns`` map the
+    ``t``/``f`` text form to booleans (NULL stays NaN), ``text_columns`` keep
+    NULL and empty strings as ``""`` and ``parse_dates`` are converted in one
+    vectorised pass. ``query`` must not take parameters.
+    """
+    if conn is None:
+        with connection() as pooled:
+            return copy_frame(query, pooled, parse_dates, bool_columns, text_columns)
+    buffer = io.BytesIO()
+    with conn.cursor() as cur:
+        cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)", buffer)
+    _bump("round_trips")
+    _bump("bytes_copied", buffer.tell())
+    buffer.seek(0)
+
+    read_kwargs: Dict[str, object] = {}
+    if text_columns:
+        read_kwargs["dtype"] = {col: str for col in text_columns}
+        read_kwargs["keep_default_na"] = False
+        read_kwargs["na_values"] = [""]
+    try:
+        import pyarrow  # noqa: F401
+        engine = "pyarrow" if not text_columns else "c"
+    except ImportError:
+        engine = "c"
+    frame = pd.read_csv(buffer, engine=engine, **read_kwargs)
+    for col in text_columns:
+        if col in frame.columns:
+            frame[col] = frame[col].fillna("")
+    for col in bool_columns:
+        if col in frame.columns and frame[col].dtype != bool:
+            frame[col] = frame[col].map({"t": True, "f": False, True: True, False: False})
+    for col in parse_dates:
+        if col in frame.columns:
+            frame[col] = pd.to_datetime(frame[col], format="ISO8601")
+    return frame
+
+
+def pool_stats() -> Dict[str, int]:
+    """Connection-count metric: connections opened, checkouts, round trips, pool size."""
+    with _STATS_LOCK:
+        stats = dict(_STATS)
+    pools = [p for p in _POOLS.values() if not p.closed] if _POOL_PID == os.getpid() else []
+    stats["pools"] = len(pools)
+    stats["pool_open"] = sum(len(p._pool) + len(p._used) for p in pools)
+    stats["pool_in_use"] = sum(len(p._used) for p in pools)
+    return stats
+
+
+def reset_stats() -> None:
+    with _STATS_LOCK:
+        for key in _STATS:
+            _STATS[key] = 0
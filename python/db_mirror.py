@@ -0,0 +1,338 @@
+"""
+Local SQLite mirror of the production tables the pipeline reads.
+
+Training and prediction used to re-download ``actual_data``, all of
+``weather_history`` and the ``learning_records`` / ``daily_predictions``
+AI-factor union on every run. The mirror keeps those projections in
+``python/models/cache/db_mirror.sqlite`` and syncs incrementally:
+
+* each dataset stores a ``boundary`` date and the server-side checksum
+  (row count + md5 over the projected rows) of everything below it;
+* a sync is ONE statement for all requested datasets. It re-checks the
+  checksum below the stored boundary, returns only rows at or above it,
+  and computes the next boundary/checksum (``max(Date) - OVERLAP_DAYS``);
+* a checksum mismatch (a historical row was edited or deleted) or a
+  dataset never seen before triggers a full ``COPY`` resync of that
+  dataset only.
+
+The overlap window re-reads the last ``OVERLAP_DAYS`` every time, so rows
+that are updated in place (``daily_predictions`` is rewritten throughout
+the day) stay current. If PostgreSQL is unreachable the mirror is served
+as-is, which makes offline training / prediction possible.
+
+Environment:
+    DB_MIRROR=0                      read straight from PostgreSQL instead
+    DB_MIRROR_OFFLINE=1              never contact PostgreSQL
+    DB_MIRROR_MAX_AGE_SECONDS=30     skip a dataset's sync if synced this recently
+    DB_MIRROR_PATH                   override the SQLite file
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import pandas as pd
+
+import db_access
+
+
+PYTHON_DIR = Path(__file__).resolve().parent
+MIRROR_PATH = PYTHON_DIR / "models" / "cache" / "db_mirror.sqlite"
+OVERLAP_DAYS = 14
+DEFAULT_MAX_AGE_SECONDS = 30.0
+_EPOCH = "1900-01-01"
+
+WEATHER_SELECT = """date AS "Date",
+               temp_min, temp_max, temp_mean,
+               humidity_pct, rainfall_mm, wind_kmh, pressure_hpa,
+               typhoon_signal, rainstorm_warning,
+               is_very_cold, is_very_hot, is_heavy_rain, is_strong_wind"""
+
+
+@dataclass(frozen=True)
+class MirrorDataset:
+    name: str
+    query: str
+    bool_columns: Tuple[str, ...] = ()
+    text_columns: Tuple[str, ...] = ()
+    copy_kwargs: Dict[str, object] = field(default_factory=dict)
+
+
+DATASETS: Dict[str, MirrorDataset] = {
+    ds.name: ds
+    for ds in (
+        MirrorDataset(
+            "actual_data",
+            'SELECT date AS "Date", patient_count AS "Attendance" FROM actual_data',
+        ),
+        MirrorDataset(
+            "weather_history",
+            f"SELECT {WEATHER_SELECT} FROM weather_history",
+            bool_columns=("is_very_cold", "is_very_hot", "is_heavy_rain", "is_strong_wind"),
+            text_columns=("typhoon_signal", "rainstorm_warning"),
+        ),
+        MirrorDataset(
+            "learning_records_ai",
+            'SELECT date AS "Date", ai_factor FROM learning_records WHERE ai_factor IS NOT NULL',
+        ),
+        MirrorDataset(
+            "daily_predictions_ai",
+            'SELECT target_date AS "Date", ai_factor FROM daily_predictions WHERE ai_factor IS NOT NULL',
+        ),
+        MirrorDataset(
+            "prediction_accuracy",
+            'SELECT target_date AS "Date", predicted_count AS predicted, actual_count AS actual, '
+            "within_ci80, within_ci95 FROM prediction_accuracy WHERE actual_count IS NOT NULL",
+            bool_columns=("within_ci80", "within_ci95"),
+        ),
+    )
+}
+
+_LOCK = threading.Lock()
+
+
+def enabled() -> bool:
+    return os.getenv("DB_MIRROR", "1") not in ("0", "false", "False")
+
+
+def offline() -> bool:
+    return os.getenv("DB_MIRROR_OFFLINE", "0") not in ("0", "false", "False")
+
+
+def mirror_path() -> Path:
+    return Path(os.getenv("DB_MIRROR_PATH") or MIRROR_PATH)
+
+
+def _open_local() -> sqlite3.Connection:
+    path = mirror_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    local = sqlite3.connect(path, timeout=30)
+    local.execute("PRAGMA journal_mode=WAL")
+    local.execute(
+        """
+        CREATE TABLE IF NOT EXISTS mirror_state (
+            name TEXT PRIMARY KEY,
+            boundary TEXT,
+            checksum TEXT,
+            synced_at REAL,
+            row_count INTEGER
+        )
+        """
+    )
+    return local
+
+
+def _table(name: str) -> str:
+    return f"mirror_{name}"
+
+
+def _load_state(local: sqlite3.Connection) -> Dict[str, Dict[str, object]]:
+    rows = local.execute("SELECT name, boundary, checksum, synced_at, row_count FROM mirror_state").fetchall()
+    return {
+        name: {"boundary": boundary, "checksum": checksum, "synced_at": synced_at, "row_count": row_count}
+        for name, boundary, checksum, synced_at, row_count in rows
+    }
+
+
+def _checksum_sql(query: str, where: str) -> str:
+    return (
+        f"(SELECT count(*)::text || ':' || coalesce(md5(string_agg(md5(t::text), '' ORDER BY t.\"Date\")), '') "
+        f"FROM ({query}) t WHERE {where})"
+    )
+
+
+def _dataset_sql(ds: MirrorDataset, boundary_param: str, include_rows: bool) -> str:
+    boundary = f"%({boundary_param})s::date"
+    next_boundary = f'(SELECT max(m."Date") - {OVERLAP_DAYS} FROM ({ds.query}) m)'
+    rows = (
+        f'(SELECT json_agg(t) FROM ({ds.query}) t WHERE t."Date" >= {boundary})'
+        if include_rows
+        else "NULL::json"
+    )
+    verify = _checksum_sql(ds.query, f't."Date" < {boundary}')
+    checksum = _checksum_sql(ds.query, f't."Date" < {next_boundary}')
+    return (
+        f"json_build_object('verify', {verify}, 'rows', {rows}, "
+        f"'boundary', {next_boundary}, 'checksum', {checksum}) AS {ds.name}"
+    )
+
+
+def _normalise(frame: pd.DataFrame, ds: MirrorDataset) -> pd.DataFrame:
+    """Bring a remote or local frame to the stored form (ISO dates, 0/1 bools)."""
+    frame = frame.copy()
+    if "Date" in frame.columns:
+        frame["Date"] = pd.to_datetime(frame["Date"]).dt.strftime("%Y-%m-%d")
+    for col in ds.text_columns:
+        if col in frame.columns:
+            frame[col] = frame[col].fillna("").astype(str)
+    for col in ds.bool_columns:
+        if col in frame.columns:
+            frame[col] = frame[col].map({True: 1, False: 0, 1: 1, 0: 0, "t": 1, "f": 0})
+    return frame
+
+
+def _write(local: sqlite3.Connection, ds: MirrorDataset, frame: pd.DataFrame, boundary: str | None, full: bool) -> int:
+    table = _table(ds.name)
+    frame = _normalise(frame, ds)
+    exists = local.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()
+    if full or not exists:
+        frame.to_sql(table, local, if_exists="replace", index=False)
+    else:
+        local.execute(f'DELETE FROM {table} WHERE "Date" >= ?', (boundary or _EPOCH,))
+        if len(frame):
+            frame.to_sql(table, local, if_exists="append", index=False)
+    return int(local.execute(f"SELECT count(*) FROM {table}").fetchone()[0])
+
+
+def _save_state(local: sqlite3.Connection, name: str, boundary, checksum, row_count: int) -> None:
+    local.execute(
+        "INSERT OR REPLACE INTO mirror_state (name, boundary, checksum, synced_at, row_count) VALUES (?, ?, ?, ?, ?)",
+        (name, str(boundary) if boundary else None, checksum, time.time(), row_count),
+    )
+
+
+def sync(names: Iterable[str] | None = None, force: bool = False) -> Dict[str, Dict[str, object]]:
+    """Bring the requested datasets up to date; returns a per-dataset report.
+
+    Normal path is one round trip for all datasets. Datasets whose checksum
+    no longer matches (or that have no local copy yet) are reloaded with one
+    ``COPY`` each.
+    """
+    names = [n for n in (names or DATASETS) if n in DATASETS]
+    report: Dict[str, Dict[str, object]] = {}
+    if offline():
+        return {name: {"status": "offline"} for name in names}
+    max_age = float(os.getenv("DB_MIRROR_MAX_AGE_SECONDS", str(DEFAULT_MAX_AGE_SECONDS)))
+    with _LOCK:
+        local = _open_local()
+        try:
+            state = _load_state(local)
+            now = time.time()
+            due = [
+                n for n in names
+                if force or n not in state or now - float(state[n]["synced_at"] or 0) >= max_age
+            ]
+            for name in names:
+                if name not in due:
+                    report[name] = {"status": "fresh", "rows": state[name]["row_count"]}
+            if not due:
+                return report
+
+            params: Dict[str, object] = {}
+            parts: List[str] = []
+            for i, name in enumerate(due):
+                known = name in state and not force
+                params[f"b{i}"] = (state[name]["boundary"] if known else None) or _EPOCH
+                parts.append(_dataset_sql(DATASETS[name], f"b{i}", include_rows=known))
+            try:
+                results = _fetch_sync_row(parts, params, due)
+            except Exception as exc:
+                if len(due) == 1:
+                    raise
+                # One missing table shouldn't block the others: retry singly.
+                warnings.warn(f"combined mirror sync failed ({exc}); syncing datasets one by one")
+                results = {}
+                for i, name in enumerate(due):
+                    try:
+                        results.update(_fetch_sync_row([parts[i]], {f"b{i}": params[f"b{i}"]}, [name]))
+                    except Exception as single_exc:
+                        report[name] = {"status": "error", "error": str(single_exc)}
+
+            for name, payload in results.items():
+                ds = DATASETS[name]
+                known = name in state and not force
+                expected = state[name]["checksum"] if known else None
+                if known and payload.get("verify") == expected:
+                    rows = pd.DataFrame(payload.get("rows") or [])
+                    row_count = _write(local, ds, rows, state[name]["boundary"], full=False)
+                    status = "incremental"
+                    fetched = int(len(rows))
+                else:
+                    frame = db_access.copy_frame(
+                        ds.query,
+                        bool_columns=ds.bool_columns,
+                        text_columns=ds.text_columns,
+                    )
+                    row_count = _write(local, ds, frame, None, full=True)
+                    status = "full_resync" if known else "initial"
+                    fetched = int(len(frame))
+                _save_state(local, name, payload.get("boundary"), payload.get("checksum"), row_count)
+                report[name] = {"status": status, "fetched": fetched, "rows": row_count}
+            local.commit()
+        finally:
+            local.close()
+    return report
+
+
+def _fetch_sync_row(parts: List[str], params: Dict[str, object], names: List[str]) -> Dict[str, Dict[str, object]]:
+    with db_access.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT " + ",\n       ".join(parts), params)
+            row = cur.fetchone()
+    db_access._bump("round_trips")
+    return {name: (json.loads(value) if isinstance(value, str) else value) for name, value in zip(names, row)}
+
+
+def read(name: str, sync_first: bool = True) -> pd.DataFrame:
+    """Return a mirrored dataset shaped like the matching ``load_*_from_db`` query.
+
+    Syncs first unless ``sync_first`` is False. When PostgreSQL is
+    unreachable the existing mirror is used (with a warning); with no mirror
+    either, the connection error propagates.
+    """
+    ds = DATASETS[name]
+    if sync_first:
+        try:
+            report = sync([name])
+            if report.get(name, {}).get("status") == "error":
+                raise RuntimeError(report[name]["error"])
+        except Exception as exc:
+            if not has_dataset(name):
+                raise
+            warnings.warn(f"mirror sync for {name} failed, serving local copy: {exc}")
+    if not has_dataset(name):
+        raise LookupError(f"no local mirror for {name}")
+    local = _open_local()
+    try:
+        frame = pd.read_sql_query(f'SELECT * FROM {_table(name)} ORDER BY "Date"', local)
+    finally:
+        local.close()
+    frame["Date"] = pd.to_datetime(frame["Date"])
+    for col in ds.bool_columns:
+        if col in frame.columns:
+            frame[col] = frame[col].map({1: True, 0: False})
+    for col in ds.text_columns:
+        if col in frame.columns:
+            frame[col] = frame[col].fillna("")
+    return frame
+
+
+def has_dataset(name: str) -> bool:
+    if not mirror_path().exists():
+        return False
+    local = _open_local()
+    try:
+        return local.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (_table(name),)
+        ).fetchone() is not None
+    finally:
+        local.close()
+
+
+def status() -> Dict[str, Dict[str, object]]:
+    """Mirror state per dataset (boundary, checksum, last sync, row count)."""
+    if not mirror_path().exists():
+        return {}
+    local = _open_local()
+    try:
+        return _load_state(local)
+    finally:
+        local.close()
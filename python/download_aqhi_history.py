@@ -2,15 +2,23 @@
 """
 Download and process EPD AQHI historical data
 Source: https://www.aqhi.gov.hk/en/past-data/past-aqhi.html
+
+Months are fetched concurrently through history_downloader (rate limited,
+retried, resumable); by default only new / still-open months are fetched.
+
+Usage:
+    python download_aqhi_history.py            # incremental
+    python download_aqhi_history.py --full     # re-download from 2014-12
 """
 
+import argparse
 import os
 import sys
-import requests
 import pandas as pd
 from io import StringIO
-from datetime import datetime
-import time
+from pathlib import Path
+
+import history_downloader
 
 # Fix Windows console encoding
 if sys.platform == 'win32':
@@ -18,6 +26,8 @@ if sys.platform == 'win32':
     sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
     sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
 
+OUTPUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aqhi_history.csv')
+
 # AQHI 數據 URL 模板
 URL_TEMPLATE = "https://www.aqhi.gov.hk/common/epd/ddata/html/history/{year}/{year}{month:02d}_Eng.csv"
 
@@ -31,20 +41,6 @@ GENERAL_STATIONS = [
 # Roadside Stations (路邊監測站)
 ROADSIDE_STATIONS = ['Causeway Bay', 'Central', 'Mong Kok']
 
-def download_month_data(year, month):
-    """下載單月 AQHI 數據"""
-    url = URL_TEMPLATE.format(year=year, month=month)
-    try:
-        response = requests.get(url, timeout=30)
-        if response.status_code == 200:
-            return response.text
-        else:
-            print(f"  ⚠️ {year}-{month:02d}: HTTP {response.status_code}", file=sys.stderr)
-            return None
-    except Exception as e:
-        print(f"  ❌ {year}-{month:02d}: {e}", file=sys.stderr)
-        return None
-
 def parse_csv_content(content, year, month):
     """解析 CSV 內容，提取每日最高 AQHI"""
     lines = content.strip().split('\n')
@@ -127,74 +123,66 @@ def process_to_daily(df):
     
     return pd.DataFrame(daily_data)
 
-def download_all_history(start_year=2014, start_month=12):
-    """Download all historical data"""
-    all_data = []
-    current_year = datetime.now().year
-    current_month = datetime.now().month
-    
-    print(f"[AQHI] Downloading historical data ({start_year}-{start_month:02d} to {current_year}-{current_month:02d})")
-    print("=" * 60)
-    
-    for year in range(start_year, current_year + 1):
-        m_start = start_month if year == start_year else 1
-        m_end = current_month if year == current_year else 12
-        
-        for month in range(m_start, m_end + 1):
-            print(f"  Downloading {year}-{month:02d}...", end=' ', flush=True)
-            content = download_month_data(year, month)
-            
-            if content:
-                df = parse_csv_content(content, year, month)
-                if not df.empty:
-                    daily_df = process_to_daily(df)
-                    if not daily_df.empty:
-                        all_data.append(daily_df)
-                        print(f"OK ({len(daily_df)} days)")
-                    else:
-                        print("WARN: No valid data")
-                else:
-                    print("WARN: Parse failed")
-            else:
-                print("FAIL: Download error")
-            
-            time.sleep(0.3)  # Rate limiting
-    
-    if all_data:
-        combined = pd.concat(all_data, ignore_index=True)
-        combined['Date'] = pd.to_datetime(combined['Date'])
-        combined = combined.sort_values('Date').drop_duplicates(subset='Date')
-        
-        # 計算風險等級
-        combined['AQHI_Risk'] = combined['AQHI_General_Max'].apply(
-            lambda x: 3 if x >= 7 else (2 if x >= 4 else 1)  # 1=Low, 2=Moderate, 3=High
-        )
-        
-        return combined
-    
-    return pd.DataFrame()
+def parse_month(body, period):
+    """history_downloader parser: one month's CSV → daily rows"""
+    year, month = (int(x) for x in period.split('-'))
+    df = parse_csv_content(body.decode('utf-8', errors='replace'), year, month)
+    if df.empty:
+        return None
+    return process_to_daily(df)
+
+
+def add_risk_level(combined):
+    # 計算風險等級
+    combined['AQHI_Risk'] = combined['AQHI_General_Max'].apply(
+        lambda x: 3 if x >= 7 else (2 if x >= 4 else 1)  # 1=Low, 2=Moderate, 3=High
+    )
+    combined['Date'] = combined['Date'].dt.strftime('%Y-%m-%d')
+    return combined
+
+
+def build_source(output_path=OUTPUT_PATH, start_year=2014, start_month=12, url_template=URL_TEMPLATE):
+    return history_downloader.DownloadSource(
+        name='aqhi',
+        output_path=Path(output_path),
+        periods=lambda: history_downloader.monthly_periods(start_year, start_month),
+        url_for=lambda period: url_template.format(year=int(period[:4]), month=int(period[5:7])),
+        parse=parse_month,
+        finalize=add_risk_level,
+        period_of=history_downloader.month_of,
+        requests_per_second=3.0,
+    )
+
+
+def download_all_history(start_year=2014, start_month=12, incremental=True, workers=4):
+    """Download historical data; returns the combined daily frame (Date as datetime)"""
+    source = build_source(start_year=start_year, start_month=start_month)
+    result = history_downloader.run(source, incremental=incremental, workers=workers)
+    if not result.rows:
+        return pd.DataFrame()
+    df = pd.read_csv(source.output_path)
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df
+
 
 def main():
     """Main function"""
-    output_path = os.path.join(os.path.dirname(__file__), 'aqhi_history.csv')
-    
-    # Download all historical data (from 2014-12 to match our AED data)
-    df = download_all_history(start_year=2014, start_month=12)
-    
-    if not df.empty:
-        # Format date
-        df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
-        
-        # Save
-        df.to_csv(output_path, index=False)
-        print("=" * 60)
-        print(f"[OK] Saved {len(df)} days AQHI data to: {output_path}")
+    parser = argparse.ArgumentParser(description='Download EPD AQHI history into aqhi_history.csv')
+    history_downloader.add_cli_arguments(parser)
+    args = parser.parse_args()
+
+    # From 2014-12 to match our AED data
+    source = build_source()
+    result = history_downloader.run(
+        source, incremental=not args.full, workers=args.workers, retries=args.retries
+    )
+    if result.rows:
+        df = pd.read_csv(source.output_path)
         print(f"     Date range: {df['Date'].iloc[0]} -> {df['Date'].iloc[-1]}")
         print(f"     Columns: {', '.join(df.columns)}")
     else:
         print("[ERROR] No data to save")
-        sys.exit(1)
+    sys.exit(history_downloader.print_result(result))
 
 if __name__ == '__main__':
     main()
-
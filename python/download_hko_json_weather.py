@@ -3,15 +3,22 @@
 Download historical weather data from HKO JSON API
 URL format: https://www.hko.gov.hk/cis/individual_day/daily_{YEAR}.xml
 Data includes: Pressure, Temperature, Humidity, Cloud, Rainfall, etc.
+
+Years are fetched concurrently through history_downloader; by default only
+years not yet downloaded plus the current one (--full re-downloads all).
 """
 
+import argparse
 import pandas as pd
-import requests
 import json
 import os
 import sys
-from datetime import datetime
-import time
+from pathlib import Path
+
+import history_downloader
+
+URL_TEMPLATE = "https://www.hko.gov.hk/cis/individual_day/daily_{year}.xml"
+OUTPUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'weather_full_history.csv')
 
 # Element codes from HKO
 ELEMENT_CODES = {
@@ -28,124 +35,109 @@ ELEMENT_CODES = {
     'VIS_HKA': 'Visibility_km',  # Visibility
 }
 
-def download_year(year):
-    """Download weather data for a specific year"""
-    url = f"https://www.hko.gov.hk/cis/individual_day/daily_{year}.xml"
-    
-    try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        
-        data = json.loads(response.text)
-        
-        if 'stn' not in data or 'data' not in data['stn']:
-            return None
-        
-        # Parse each element
-        elements_data = {}
-        for elem in data['stn']['data']:
-            code = elem.get('code', '')
-            if code in ELEMENT_CODES:
-                col_name = ELEMENT_CODES[code]
-                day_data = elem.get('dayData', [])
-                
-                # Parse day/month grid
-                for day_row in day_data:
-                    if not day_row or len(day_row) < 2:
-                        continue
-                    
-                    day = day_row[0].strip()
-                    if not day.isdigit():
+def parse_year_payload(data, year):
+    """Parse one year's element grids into daily rows"""
+    if 'stn' not in data or 'data' not in data['stn']:
+        return None
+
+    # Parse each element
+    elements_data = {}
+    for elem in data['stn']['data']:
+        code = elem.get('code', '')
+        if code in ELEMENT_CODES:
+            col_name = ELEMENT_CODES[code]
+            day_data = elem.get('dayData', [])
+
+            # Parse day/month grid
+            for day_row in day_data:
+                if not day_row or len(day_row) < 2:
+                    continue
+
+                day = day_row[0].strip()
+                if not day.isdigit():
+                    continue
+                day = int(day)
+
+                for month_idx, value in enumerate(day_row[1:], 1):
+                    if month_idx > 12:
+                        break
+
+                    # Parse value
+                    value_str = str(value).strip()
+                    if value_str in ['', '-', '***', 'N.A.', '---']:
                         continue
-                    day = int(day)
-                    
-                    for month_idx, value in enumerate(day_row[1:], 1):
-                        if month_idx > 12:
-                            break
-                        
-                        # Parse value
-                        value_str = str(value).strip()
-                        if value_str in ['', '-', '***', 'N.A.', '---']:
+                    if value_str == 'Trace':
+                        value_float = 0.05
+                    else:
+                        try:
+                            value_float = float(value_str.replace(',', ''))
+                        except:
                             continue
-                        if value_str == 'Trace':
-                            value_float = 0.05
-                        else:
-                            try:
-                                value_float = float(value_str.replace(',', ''))
-                            except:
-                                continue
-                        
-                        date_key = f"{year}-{month_idx:02d}-{day:02d}"
-                        if date_key not in elements_data:
-                            elements_data[date_key] = {'Date': date_key}
-                        elements_data[date_key][col_name] = value_float
-        
-        if not elements_data:
-            return None
-        
-        df = pd.DataFrame(list(elements_data.values()))
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-        df = df.dropna(subset=['Date'])
-        df = df.sort_values('Date')
-        
-        return df
-        
-    except Exception as e:
-        print(f" Error: {e}", file=sys.stderr)
+
+                    date_key = f"{year}-{month_idx:02d}-{day:02d}"
+                    if date_key not in elements_data:
+                        elements_data[date_key] = {'Date': date_key}
+                    elements_data[date_key][col_name] = value_float
+
+    if not elements_data:
         return None
 
+    df = pd.DataFrame(list(elements_data.values()))
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    df = df.dropna(subset=['Date'])
+    df = df.sort_values('Date')
+
+    return df
+
+
+def format_output(combined):
+    combined['Date'] = combined['Date'].dt.strftime('%Y-%m-%d')
+    return combined
+
+
+def build_source(output_path=OUTPUT_PATH, start_year=2014, url_template=URL_TEMPLATE):
+    return history_downloader.DownloadSource(
+        name='hko_json_weather',
+        output_path=Path(output_path),
+        periods=lambda: history_downloader.yearly_periods(start_year),
+        url_for=lambda period: url_template.format(year=int(period)),
+        parse=lambda body, period: parse_year_payload(json.loads(body.decode('utf-8')), int(period)),
+        finalize=format_output,
+        is_open=history_downloader.year_is_open,
+        period_of=history_downloader.year_of,
+    )
+
 def main():
+    parser = argparse.ArgumentParser(description='Download HKO daily weather into weather_full_history.csv')
+    history_downloader.add_cli_arguments(parser)
+    args = parser.parse_args()
+
     print("=" * 60)
     print("HKO JSON Weather Data Download")
     print("=" * 60)
-    
+
     # Download from 2014 to current year
-    start_year = 2014
-    end_year = datetime.now().year
-    
-    all_data = []
-    
-    for year in range(start_year, end_year + 1):
-        print(f"  {year}... ", end="", flush=True)
-        df = download_year(year)
-        
-        if df is not None:
-            all_data.append(df)
-            print(f"OK ({len(df)} days)")
-        else:
-            print("No data")
-        
-        time.sleep(0.3)
-    
-    if not all_data:
+    source = build_source()
+    result = history_downloader.run(
+        source, incremental=not args.full, workers=args.workers, retries=args.retries
+    )
+
+    if result.rows:
+        combined = pd.read_csv(source.output_path)
+        print(f"Date range: {combined['Date'].min()} to {combined['Date'].max()}")
+        print(f"Columns: {list(combined.columns)}")
+        print()
+
+        # Stats
+        print("Data coverage:")
+        for col in combined.columns:
+            if col != 'Date':
+                count = combined[col].notna().sum()
+                pct = count / len(combined) * 100
+                print(f"  {col}: {count} ({pct:.1f}%)")
+    else:
         print("No data downloaded!")
-        return
-    
-    # Combine all data
-    combined = pd.concat(all_data, ignore_index=True)
-    combined = combined.sort_values('Date')
-    combined = combined.drop_duplicates(subset=['Date'])
-    
-    # Save
-    output_path = os.path.join(os.path.dirname(__file__), 'weather_full_history.csv')
-    combined.to_csv(output_path, index=False)
-    
-    print()
-    print("=" * 60)
-    print(f"Saved to: {output_path}")
-    print(f"Total records: {len(combined)}")
-    print(f"Date range: {combined['Date'].min()} to {combined['Date'].max()}")
-    print(f"Columns: {list(combined.columns)}")
-    print()
-    
-    # Stats
-    print("Data coverage:")
-    for col in combined.columns:
-        if col != 'Date':
-            count = combined[col].notna().sum()
-            pct = count / len(combined) * 100
-            print(f"  {col}: {count} ({pct:.1f}%)")
+    sys.exit(history_downloader.print_result(result))
 
 if __name__ == "__main__":
     main()
-
@@ -2,13 +2,21 @@
 """
 Download historical weather data from HKO
 Downloads: Pressure, Humidity, Rainfall, Cloud, Wind Speed
+
+The element files are fetched concurrently through history_downloader (each
+element is one "period", always refreshed since the files grow daily).
 """
 
+import argparse
 import pandas as pd
-import requests
 import os
 import sys
-from datetime import datetime
+from io import StringIO
+from pathlib import Path
+
+import history_downloader
+
+OUTPUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'weather_history.csv')
 
 # HKO data URLs - daily data CSV format
 # Format: https://www.hko.gov.hk/cis/dailyExtract/dailyExtract_{ELEMENT}_{STATION}.csv
@@ -39,106 +47,92 @@ ELEMENTS = {
     }
 }
 
-def download_element(element_name, element_config):
-    """Download a single weather element from HKO"""
-    url = element_config['url']
-    print(f"  Downloading {element_name}...", end=" ")
-    
-    try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        
-        # Parse CSV - HKO format has header rows to skip
-        from io import StringIO
-        content = response.text
-        
-        # Find the data start (usually after header lines)
-        lines = content.split('\n')
-        data_start = 0
-        for i, line in enumerate(lines):
-            if line.startswith('Year') or (len(line) > 0 and line[0].isdigit()):
-                data_start = i
-                break
-        
-        # Read CSV from data start
-        df = pd.read_csv(StringIO('\n'.join(lines[data_start:])), 
-                        names=['Year', 'Month', 'Day', 'Value'],
-                        skipinitialspace=True)
-        
-        # Clean data
-        df = df.dropna(subset=['Year', 'Month', 'Day'])
-        df['Year'] = pd.to_numeric(df['Year'], errors='coerce')
-        df['Month'] = pd.to_numeric(df['Month'], errors='coerce')
-        df['Day'] = pd.to_numeric(df['Day'], errors='coerce')
-        df = df.dropna(subset=['Year', 'Month', 'Day'])
-        
-        # Create date column
-        df['Date'] = pd.to_datetime(df[['Year', 'Month', 'Day']].astype(int), errors='coerce')
-        df = df.dropna(subset=['Date'])
-        
-        # Clean value column
-        df['Value'] = pd.to_numeric(df['Value'].astype(str).str.replace('Trace', '0.05').str.replace('***', ''), errors='coerce')
-        
-        # Rename value column
-        df = df.rename(columns={'Value': element_config['output_col']})
-        df = df[['Date', element_config['output_col']]]
-        
-        print(f"OK ({len(df)} records, {df['Date'].min().strftime('%Y')} - {df['Date'].max().strftime('%Y')})")
-        return df
-        
-    except Exception as e:
-        print(f"FAILED: {e}")
-        return None
+def parse_element_csv(content, element_config):
+    """Parse an HKO element CSV into (Date, <output_col>) rows"""
+    # Find the data start (usually after header lines)
+    lines = content.split('\n')
+    data_start = 0
+    for i, line in enumerate(lines):
+        if line.startswith('Year') or (len(line) > 0 and line[0].isdigit()):
+            data_start = i
+            break
+
+    # Read CSV from data start
+    df = pd.read_csv(StringIO('\n'.join(lines[data_start:])),
+                    names=['Year', 'Month', 'Day', 'Value'],
+                    skipinitialspace=True)
+
+    # Clean data
+    df = df.dropna(subset=['Year', 'Month', 'Day'])
+    df['Year'] = pd.to_numeric(df['Year'], errors='coerce')
+    df['Month'] = pd.to_numeric(df['Month'], errors='coerce')
+    df['Day'] = pd.to_numeric(df['Day'], errors='coerce')
+    df = df.dropna(subset=['Year', 'Month', 'Day'])
+
+    # Create date column
+    df['Date'] = pd.to_datetime(df[['Year', 'Month', 'Day']].astype(int), errors='coerce')
+    df = df.dropna(subset=['Date'])
+
+    # Clean value column
+    df['Value'] = pd.to_numeric(df['Value'].astype(str).str.replace('Trace', '0.05').str.replace('***', ''), errors='coerce')
+
+    # Rename value column
+    df = df.rename(columns={'Value': element_config['output_col']})
+    return df[['Date', element_config['output_col']]]
+
+
+def merge_into_existing(merged, existing_path=OUTPUT_PATH):
+    """Add downloaded element columns that weather_history.csv doesn't have yet"""
+    if not os.path.exists(existing_path):
+        return merged
+
+    existing = pd.read_csv(existing_path)
+    existing['Date'] = pd.to_datetime(existing['Date'])
+    print(f"Existing weather_history.csv: {len(existing)} records")
+
+    # Merge with existing (add new columns)
+    for col in merged.columns:
+        if col != 'Date' and col not in existing.columns:
+            # Merge this column
+            existing = pd.merge(existing, merged[['Date', col]], on='Date', how='left')
+            print(f"  Added column: {col}")
+
+    return existing
+
+
+def build_source(output_path=OUTPUT_PATH, elements=ELEMENTS):
+    return history_downloader.DownloadSource(
+        name='hko_element_weather',
+        output_path=Path(output_path),
+        periods=lambda: list(elements),
+        url_for=lambda element: elements[element]['url'],
+        parse=lambda body, element: parse_element_csv(body.decode('utf-8', errors='replace'), elements[element]),
+        finalize=lambda merged: merge_into_existing(merged, output_path),
+        is_open=lambda element: True,
+    )
+
 
 def main():
+    parser = argparse.ArgumentParser(description='Download HKO element CSVs into weather_history.csv')
+    history_downloader.add_cli_arguments(parser)
+    args = parser.parse_args()
+
     print("=" * 60)
     print("HKO Weather Data Download")
     print("=" * 60)
-    
-    all_data = []
-    
-    for element_name, element_config in ELEMENTS.items():
-        df = download_element(element_name, element_config)
-        if df is not None:
-            all_data.append(df)
-    
-    if not all_data:
+
+    source = build_source()
+    result = history_downloader.run(
+        source, incremental=not args.full, workers=args.workers, retries=args.retries
+    )
+
+    if result.rows:
+        merged = pd.read_csv(source.output_path)
+        print(f"Date range: {merged['Date'].min()} to {merged['Date'].max()}")
+        print(f"Columns: {list(merged.columns)}")
+    else:
         print("No data downloaded!")
-        return
-    
-    # Merge all data on Date
-    print("\nMerging data...")
-    merged = all_data[0]
-    for df in all_data[1:]:
-        merged = pd.merge(merged, df, on='Date', how='outer')
-    
-    merged = merged.sort_values('Date')
-    
-    # Load existing weather history
-    existing_path = os.path.join(os.path.dirname(__file__), 'weather_history.csv')
-    if os.path.exists(existing_path):
-        existing = pd.read_csv(existing_path)
-        existing['Date'] = pd.to_datetime(existing['Date'])
-        print(f"Existing weather_history.csv: {len(existing)} records")
-        
-        # Merge with existing (add new columns)
-        for col in merged.columns:
-            if col != 'Date' and col not in existing.columns:
-                # Merge this column
-                existing = pd.merge(existing, merged[['Date', col]], on='Date', how='left')
-                print(f"  Added column: {col}")
-        
-        merged = existing
-    
-    # Save
-    output_path = os.path.join(os.path.dirname(__file__), 'weather_history.csv')
-    merged.to_csv(output_path, index=False)
-    
-    print(f"\nSaved to: {output_path}")
-    print(f"Total records: {len(merged)}")
-    print(f"Date range: {merged['Date'].min()} to {merged['Date'].max()}")
-    print(f"Columns: {list(merged.columns)}")
+    sys.exit(history_downloader.print_result(result))
 
 if __name__ == "__main__":
     main()
-
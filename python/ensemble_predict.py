@@ -146,8 +146,101 @@ def prepare_rolling_features(df, target_date_str, previous_predictions=None):
     return pd.DataFrame([last_row], columns=OPT10_FEATURES)
 
 
+def prepare_opt10_history_features(df):
+    """
+    為每一行構建 opt10 特徵（只使用該行之前的數據），一次性向量化計算
+
+    第 i 行與 prepare_opt10_features(df.iloc[:i], df.iloc[i]['Date']) 的結果一致
+    """
+    dates = pd.to_datetime(df['Date'])
+    day_of_week = dates.dt.dayofweek
+    attendance = df['Attendance'].astype(float)
+    lag1 = attendance.shift(1)
+
+    features = pd.DataFrame({
+        'Attendance_EWMA7': attendance.ewm(span=7, adjust=False).mean().shift(1),
+        'Daily_Change': lag1 - attendance.shift(2),
+        'Attendance_EWMA14': attendance.ewm(span=14, adjust=False).mean().shift(1),
+        'Weekly_Change': lag1 - attendance.shift(8),
+        'Day_of_Week': day_of_week,
+        'Attendance_Lag7': attendance.shift(7),
+        'Attendance_Lag1': lag1,
+        'Is_Weekend': (day_of_week >= 5).astype(int),
+        'DayOfWeek_sin': np.sin(2 * np.pi * day_of_week / 7),
+        'DayOfWeek_cos': np.cos(2 * np.pi * day_of_week / 7),
+    })
+    return features[OPT10_FEATURES]
+
+
+def _ewm_step(previous, value, span):
+    """EWMA 單步更新（與 pandas ewm(span=span, adjust=False) 的遞推一致）"""
+    if previous == value:
+        return previous
+    alpha = 2.0 / (span + 1.0)
+    old_weight = 1.0 - alpha
+    return (old_weight * previous + alpha * value) / (old_weight + alpha)
+
+
+class RollingFeatureState:
+    """
+    滾動預測的增量特徵狀態 (v4.0.27)
+
+    歷史數據只排序及計算 EWMA 一次；之後每追加一個預測值只做 O(1) 更新。
+    features() 的結果與 prepare_rolling_features(df, target_date_str, previous_predictions) 一致
+    （前提：預測日期都在歷史數據之後）。
+    """
+    def __init__(self, df):
+        df = df.copy()
+        df['Date'] = pd.to_datetime(df['Date'])
+        df = df.sort_values('Date').reset_index(drop=True)
+
+        series = df['Attendance'].astype(float)
+        self.last_date = df['Date'].iloc[-1] if len(df) > 0 else None
+        self.values = series.tolist()
+        self.total = float(series.sum())
+        self.ewma7 = series.ewm(span=7, adjust=False).mean().iloc[-1] if len(series) > 0 else None
+        self.ewma14 = series.ewm(span=14, adjust=False).mean().iloc[-1] if len(series) > 0 else None
+
+    def append(self, value):
+        """追加一天（通常是上一天的預測值）"""
+        value = float(value)
+        if self.values:
+            self.ewma7 = _ewm_step(self.ewma7, value, 7)
+            self.ewma14 = _ewm_step(self.ewma14, value, 14)
+        else:
+            self.ewma7 = self.ewma14 = value
+        self.values.append(value)
+        self.total += value
+
+    def features(self, target_date_str):
+        """為目標日期構建單行 opt10 特徵"""
+        values = self.values
+        n = len(values)
+        target_dt = pd.to_datetime(target_date_str)
+
+        last_row = {}
+        last_row['Date'] = target_dt
+        last_row['Day_of_Week'] = target_dt.dayofweek
+        last_row['Is_Weekend'] = 1 if target_dt.dayofweek >= 5 else 0
+        last_row['DayOfWeek_sin'] = np.sin(2 * np.pi * target_dt.dayofweek / 7)
+        last_row['DayOfWeek_cos'] = np.cos(2 * np.pi * target_dt.dayofweek / 7)
+
+        last_row['Attendance_Lag1'] = values[-1] if n >= 1 else 250
+        last_row['Attendance_Lag7'] = values[-7] if n >= 7 else (self.total / n if n > 0 else 250)
+        last_row['Attendance_EWMA7'] = self.ewma7 if n >= 1 else 250
+        last_row['Attendance_EWMA14'] = self.ewma14 if n >= 1 else 250
+        last_row['Daily_Change'] = values[-1] - values[-2] if n >= 2 else 0
+        last_row['Weekly_Change'] = values[-1] - values[-8] if n >= 8 else 0
+
+        return pd.DataFrame([last_row], columns=OPT10_FEATURES)
+
+
 def calculate_historical_errors(df, model, feature_cols, model_type='opt10', window_days=180):
-    """計算歷史預測誤差（用於置信區間）"""
+    """
+    計算歷史預測誤差（用於置信區間）
+
+    v4.0.27: 特徵一次性構建、單次批量預測，取代逐日重建特徵 + 逐日預測
+    """
     if df is None or len(df) < 30:
         return None
     
@@ -159,25 +252,17 @@ def calculate_historical_errors(df, model, feature_cols, model_type='opt10', win
     if len(df) > window_days:
         df = df.iloc[-window_days:].reset_index(drop=True)
     
-    errors = []
-    for i in range(14, len(df)):  # 需要至少 14 天歷史數據
-        train_df = df.iloc[:i]
-        target_date = df.iloc[i]['Date'].strftime('%Y-%m-%d')
-        actual = df.iloc[i]['Attendance']
-        
-        try:
-            if model_type == 'opt10':
-                features_df = prepare_opt10_features(train_df, target_date)
-            else:
-                features_df = prepare_opt10_features(train_df, target_date)
-            
-            pred = predict_with_xgboost(model, feature_cols, features_df)
-            if pred is not None:
-                errors.append(abs(pred - actual))
-        except:
-            continue
-    
-    return np.array(errors) if len(errors) > 0 else None
+    # 需要至少 14 天歷史數據
+    features_df = prepare_opt10_history_features(df).iloc[14:]
+    actual = df['Attendance'].iloc[14:].to_numpy(dtype=float)
+
+    try:
+        preds = np.asarray(model.predict(features_df[feature_cols]), dtype=float)
+    except Exception:
+        return None
+
+    errors = np.abs(preds - actual)
+    return errors if len(errors) > 0 else None
 
 
 def load_xgboost_model():
@@ -455,12 +540,23 @@ def rolling_forecast(start_date, days, historical_data):
 
     start_dt = pd.to_datetime(start_date)
 
+    # 歷史誤差在整個預測期間不變，只計算一次
+    hist_errors = calculate_historical_errors(df, xgb_model, xgb_features, model_type)
+    hist_std = np.std(hist_errors) if hist_errors is not None and len(hist_errors) > 10 else None
+
+    # 預測日期都在歷史之後時，用增量狀態更新 Lag/EWMA；否則回退到逐日重建
+    rolling_state = None
+    if model_type == 'opt10' and len(df) > 0 and start_dt > df['Date'].iloc[-1]:
+        rolling_state = RollingFeatureState(df)
+
     for i in range(days):
         target_dt = start_dt + timedelta(days=i)
         target_date_str = target_dt.strftime('%Y-%m-%d')
 
         # 使用滾動特徵（包含之前的預測值）
-        if model_type == 'opt10':
+        if rolling_state is not None:
+            features_df = rolling_state.features(target_date_str)
+        elif model_type == 'opt10':
             features_df = prepare_rolling_features(df, target_date_str, previous_predictions)
         else:
             # 舊模型使用原始方法
@@ -480,11 +576,7 @@ def rolling_forecast(start_date, days, historical_data):
             continue
 
         # 計算置信區間（使用歷史誤差 + 遠期不確定性）
-        hist_errors = calculate_historical_errors(df, xgb_model, xgb_features, model_type)
-        if hist_errors is not None and len(hist_errors) > 10:
-            base_std = np.std(hist_errors)
-        else:
-            base_std = xgb_pred * 0.05
+        base_std = hist_std if hist_std is not None else xgb_pred * 0.05
         
         # 遠期不確定性：非線性增長
         uncertainty_multiplier = 1.0 + (i ** 1.2) * 0.015
@@ -511,6 +603,8 @@ def rolling_forecast(start_date, days, historical_data):
             'date': target_date_str,
             'prediction': xgb_pred
         })
+        if rolling_state is not None:
+            rolling_state.append(xgb_pred)
 
         # 每 7 天輸出一次進度
         if (i + 1) % 7 == 0:
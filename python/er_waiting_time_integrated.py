@@ -21,6 +21,12 @@ API: https://www.ha.org.hk/opendata/aed/aedwtdata2-tc.json
 }
 
 用途: 使用等候時間作為實時特徵來調整預測
+
+歷史記錄存於 SQLite (models/ndh_waiting_history.sqlite)，只追加不重寫：
+readings 表按時間索引，hour_buckets 表按 (日, 小時) 維護 count / sum /
+sum of squares，同時段中位數與 3 小時趨勢都只讀幾行，與保留天數無關。
+保留期由 ER_WAITING_RETENTION_DAYS 設定（預設 365 天）。
+舊的 ndh_waiting_history.csv 會在第一次使用時自動匯入。
 """
 import sys
 import io
@@ -34,6 +40,8 @@ if sys.platform == 'win32':
 
 import requests
 import json
+import sqlite3
+import threading
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -211,11 +219,169 @@ def get_waiting_time_level(minutes):
         return 3
 
 
-def save_waiting_time_history(history_file='models/ndh_waiting_history.csv', max_days=30):
+DEFAULT_HISTORY_FILE = 'models/ndh_waiting_history.csv'
+DEFAULT_RETENTION_DAYS = int(os.getenv('ER_WAITING_RETENTION_DAYS', '365'))
+
+WAITING_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    ts INTEGER NOT NULL,          -- 本地時間 epoch 秒
+    day INTEGER NOT NULL,         -- date.toordinal()
+    hour INTEGER NOT NULL,        -- 0-23
+    t45p95 TEXT,
+    t45p50 TEXT,
+    t3p50 TEXT,
+    minutes REAL,
+    level INTEGER,
+    update_time TEXT
+);
+CREATE INDEX IF NOT EXISTS readings_ts ON readings (ts);
+CREATE TABLE IF NOT EXISTS hour_buckets (
+    day INTEGER NOT NULL,
+    hour INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    sum_minutes REAL NOT NULL,
+    sum_sq_minutes REAL NOT NULL,
+    PRIMARY KEY (hour, day)
+);
+"""
+
+
+class WaitingTimeStore:
+    """只追加的等候時間記錄 + 每小時預聚合
+
+    append() 為一次 INSERT + 一次 bucket upsert（過期記錄按 ts 索引成批刪除，
+    攤分後仍為 O(1)）；same_hour_median() 讀最多 days 個 bucket，
+    recent_minutes() 讀最多 limit 行。
+    """
+
+    def __init__(self, path, retention_days=None):
+        self.path = path
+        self.retention_days = retention_days or DEFAULT_RETENTION_DAYS
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(WAITING_STORE_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def is_empty(self):
+        return self.conn.execute('SELECT 1 FROM readings LIMIT 1').fetchone() is None
+
+    def append(self, record, when=None):
+        """record: save_waiting_time_history 的欄位 (minutes 可為 None)"""
+        when = when or datetime.now()
+        minutes = _minutes_or_none(record.get('minutes'))
+        with self._lock, self.conn:
+            self._insert(when, record, minutes)
+            self._purge(when)
+
+    def _insert(self, when, record, minutes):
+        day, hour = when.date().toordinal(), when.hour
+        self.conn.execute(
+            'INSERT INTO readings (ts, day, hour, t45p95, t45p50, t3p50, minutes, level, update_time) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                int(when.timestamp()), day, hour,
+                record.get('t45p95'), record.get('t45p50'), record.get('t3p50'),
+                minutes, record.get('level'), record.get('update_time'),
+            ),
+        )
+        if minutes is not None:
+            self.conn.execute(
+                'INSERT INTO hour_buckets (day, hour, n, sum_minutes, sum_sq_minutes) VALUES (?, ?, 1, ?, ?) '
+                'ON CONFLICT (hour, day) DO UPDATE SET n = n + 1, '
+                'sum_minutes = sum_minutes + excluded.sum_minutes, '
+                'sum_sq_minutes = sum_sq_minutes + excluded.sum_sq_minutes',
+                (day, hour, minutes, minutes * minutes),
+            )
+
+    def _purge(self, now):
+        cutoff = now - timedelta(days=self.retention_days)
+        oldest = self.conn.execute('SELECT MIN(ts) FROM readings').fetchone()[0]
+        if oldest is not None and oldest < cutoff.timestamp():
+            self.conn.execute('DELETE FROM readings WHERE ts < ?', (int(cutoff.timestamp()),))
+            self.conn.execute('DELETE FROM hour_buckets WHERE day < ?', (cutoff.date().toordinal(),))
+
+    def import_frame(self, history):
+        """匯入舊 CSV 格式的 DataFrame（datetime, t45p95, ..., minutes, level）"""
+        history = history.copy()
+        history['datetime'] = pd.to_datetime(history['datetime'], errors='coerce')
+        history = history.dropna(subset=['datetime']).sort_values('datetime')
+        with self._lock, self.conn:
+            for row in history.to_dict('records'):
+                record = {k: (None if pd.isna(v) else v) for k, v in row.items()}
+                self._insert(row['datetime'].to_pydatetime(), record, _minutes_or_none(record.get('minutes')))
+        return len(history)
+
+    def same_hour_median(self, now=None, days=7):
+        """過去 days 天同一小時的等候時間中位數（每日該小時取平均）"""
+        now = now or datetime.now()
+        rows = self.conn.execute(
+            'SELECT sum_minutes / n FROM hour_buckets WHERE hour = ? AND day > ? AND day <= ? AND n > 0',
+            (now.hour, now.date().toordinal() - days, now.date().toordinal()),
+        ).fetchall()
+        if not rows:
+            return None
+        return float(np.median([r[0] for r in rows]))
+
+    def recent_minutes(self, now=None, hours=3, limit=5):
+        """過去 hours 小時內最近 limit 筆有效等候時間（舊→新）"""
+        now = now or datetime.now()
+        rows = self.conn.execute(
+            'SELECT minutes FROM readings WHERE ts > ? AND ts <= ? AND minutes IS NOT NULL '
+            'ORDER BY ts DESC LIMIT ?',
+            (int((now - timedelta(hours=hours)).timestamp()), int(now.timestamp()), limit),
+        ).fetchall()
+        return [r[0] for r in reversed(rows)]
+
+    def frame(self):
+        """完整歷史（舊 CSV 欄位格式），供分析用"""
+        df = pd.read_sql_query(
+            'SELECT ts, t45p95, t45p50, t3p50, minutes, level, update_time FROM readings ORDER BY ts',
+            self.conn,
+        )
+        df.insert(0, 'datetime', pd.to_datetime(df.pop('ts').map(datetime.fromtimestamp)))
+        return df
+
+
+def _minutes_or_none(value):
+    if value is None or value == '':
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if np.isnan(value) else value
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_waiting_time_store(history_file=DEFAULT_HISTORY_FILE, retention_days=None):
+    """history_file 的 SQLite store（.csv 路徑對應同名 .sqlite；舊 CSV 首次自動匯入）"""
+    path = os.path.splitext(history_file)[0] + '.sqlite'
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = WaitingTimeStore(path, retention_days)
+            if store.is_empty() and history_file.endswith('.csv') and os.path.exists(history_file):
+                imported = store.import_frame(pd.read_csv(history_file))
+                print(f"   📥 已匯入舊歷史 {history_file} ({imported} 筆)")
+            _stores[path] = store
+        elif retention_days:
+            store.retention_days = retention_days
+    return store
+
+
+def save_waiting_time_history(history_file=DEFAULT_HISTORY_FILE, max_days=None):
     """
     保存等候時間到歷史記錄
 
     建議每小時運行一次，建立歷史數據庫
+    只追加一筆記錄；max_days 覆蓋保留天數（預設 ER_WAITING_RETENTION_DAYS）
     """
     ndh_wait = get_ndh_waiting_time()
 
@@ -225,42 +391,24 @@ def save_waiting_time_history(history_file='models/ndh_waiting_history.csv', max
 
     # 準備記錄
     record = {
-        'datetime': ndh_wait['timestamp'].strftime('%Y-%m-%d %H:%M:%S'),
         't45p95': ndh_wait['t45p95'],
         't45p50': ndh_wait['t45p50'],
         't3p50': ndh_wait['t3p50'],
-        'minutes': ndh_wait['minutes'] if ndh_wait['minutes'] is not None else '',
+        'minutes': ndh_wait['minutes'],
         'level': ndh_wait['level'],
         'update_time': ndh_wait['update_time']
     }
 
-    # 讀取現有歷史
-    if os.path.exists(history_file):
-        history = pd.read_csv(history_file)
-        history['datetime'] = pd.to_datetime(history['datetime'])
-        new_record = pd.DataFrame([record])
-        new_record['datetime'] = pd.to_datetime(new_record['datetime'])
-        history = pd.concat([history, new_record], ignore_index=True)
-    else:
-        record_df = pd.DataFrame([record])
-        record_df['datetime'] = pd.to_datetime(record_df['datetime'])
-        history = record_df
-
-    # 只保留最近 N 天
-    cutoff = datetime.now() - timedelta(days=max_days)
-    history = history[history['datetime'] >= cutoff].copy()
-
-    # 保存
-    os.makedirs('models', exist_ok=True)
-    history.to_csv(history_file, index=False)
+    store = get_waiting_time_store(history_file, max_days)
+    store.append(record, ndh_wait['timestamp'])
 
-    print(f"   ✅ 已保存到 {history_file} ({len(history)} 筆記錄)")
+    print(f"   ✅ 已保存到 {store.path}")
     print(f"   📊 北區醫院等候: {ndh_wait['t45p95']} (級別 {ndh_wait['level']})")
 
     return True
 
 
-def calculate_waiting_time_features(current_waiting=None, history_file='models/ndh_waiting_history.csv'):
+def calculate_waiting_time_features(current_waiting=None, history_file=DEFAULT_HISTORY_FILE):
     """
     計算等候時間相關特徵，用於模型預測
 
@@ -273,7 +421,7 @@ def calculate_waiting_time_features(current_waiting=None, history_file='models/n
 
     Args:
         current_waiting: dict from get_ndh_waiting_time()
-        history_file: path to history CSV
+        history_file: path to history CSV (對應的 .sqlite store)
 
     Returns:
         dict of features
@@ -298,45 +446,24 @@ def calculate_waiting_time_features(current_waiting=None, history_file='models/n
         features['ER_Waiting_Minutes'] = minutes
         features['ER_Waiting_Level'] = current_waiting['level']
 
-    # 歷史比較特徵
-    if os.path.exists(history_file):
-        try:
-            history = pd.read_csv(history_file)
-            history['datetime'] = pd.to_datetime(history['datetime'])
-            history = history[history['minutes'] != '']  # 過濾空值
-            history['minutes'] = pd.to_numeric(history['minutes'], errors='coerce')
-
-            if len(history) > 0:
-                # 同時段歷史平均 (過去 7 天同時段)
-                current_hour = datetime.now().hour
-                same_hour_data = history[
-                    (pd.to_datetime(history['datetime']).dt.hour == current_hour) &
-                    (history['datetime'] > datetime.now() - timedelta(days=7))
-                ]
-
-                if len(same_hour_data) > 0:
-                    normal_minutes = same_hour_data['minutes'].median()
-
-                    if normal_minutes > 0 and minutes is not None:
-                        features['ER_Waiting_Ratio'] = minutes / normal_minutes
-                        features['ER_Waiting_Above_Normal'] = int(minutes > normal_minutes * 1.2)
-
-                # 過去 3 小時趨勢
-                recent_data = history[
-                    history['datetime'] > datetime.now() - timedelta(hours=3)
-                ].tail(5)
-
-                if len(recent_data) >= 2:
-                    recent_minutes = recent_data['minutes'].values
-                    # 簡單線性趨勢
-                    if len(recent_minutes) > 0:
-                        features['ER_Waiting_Trend_3h'] = (
-                            (recent_minutes[-1] - recent_minutes[0]) / len(recent_minutes)
-                            if len(recent_minutes) > 1 else 0
-                        )
-
-        except Exception as e:
-            print(f"   ⚠️ 計算歷史特徵失敗: {e}")
+    # 歷史比較特徵（預聚合 bucket，不掃描整個歷史）
+    try:
+        store = get_waiting_time_store(history_file)
+        now = datetime.now()
+
+        # 同時段歷史中位數 (過去 7 天同時段)
+        normal_minutes = store.same_hour_median(now, days=7)
+        if normal_minutes and normal_minutes > 0 and minutes is not None:
+            features['ER_Waiting_Ratio'] = minutes / normal_minutes
+            features['ER_Waiting_Above_Normal'] = int(minutes > normal_minutes * 1.2)
+
+        # 過去 3 小時趨勢（最近 5 筆，簡單線性趨勢）
+        recent_minutes = store.recent_minutes(now, hours=3, limit=5)
+        if len(recent_minutes) >= 2:
+            features['ER_Waiting_Trend_3h'] = (recent_minutes[-1] - recent_minutes[0]) / len(recent_minutes)
+
+    except Exception as e:
+        print(f"   ⚠️ 計算歷史特徵失敗: {e}")
 
     return features
 
@@ -392,9 +519,9 @@ def simulate_waiting_time_correlation():
 
     需要收集歷史數據後才能準確計算
     """
-    history_file = 'models/ndh_waiting_history.csv'
+    store = get_waiting_time_store(DEFAULT_HISTORY_FILE)
 
-    if not os.path.exists(history_file):
+    if store.is_empty():
         print("\n" + "=" * 60)
         print("📊 等候時間相關性分析")
         print("=" * 60)
@@ -405,8 +532,7 @@ def simulate_waiting_time_correlation():
         print("      3. 收集 1-2 週數據後進行分析")
         return
 
-    history = pd.read_csv(history_file)
-    history['datetime'] = pd.to_datetime(history['datetime'])
+    history = store.frame()
 
     print("\n" + "=" * 60)
     print("📊 等候時間歷史分析")
@@ -415,9 +541,7 @@ def simulate_waiting_time_correlation():
     print(f"   📊 記錄數: {len(history)} 筆")
 
     # 統計
-    valid_data = history[history['minutes'] != '']
-    valid_data['minutes'] = pd.to_numeric(valid_data['minutes'], errors='coerce')
-    valid_data = valid_data.dropna(subset=['minutes'])
+    valid_data = history.dropna(subset=['minutes'])
 
     if len(valid_data) > 0:
         print(f"\n   📈 等候時間統計:")
@@ -61,6 +61,7 @@ from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 # Database
 try:
     import psycopg2
+    from db_access import get_connection
     from psycopg2.extras import RealDictCursor
     HAS_PSYCOPG2 = True
 except ImportError:
@@ -86,13 +87,12 @@ def get_db_connection():
     
     password = os.environ.get('PGPASSWORD') or os.environ.get('DATABASE_PASSWORD') or 'nIdJPREHqkBdMgUifrazOsVlWbxsmDGq'
     
-    return psycopg2.connect(
-        host=os.environ.get('PGHOST', 'tramway.proxy.rlwy.net'),
-        port=int(os.environ.get('PGPORT', '45703')),
-        user=os.environ.get('PGUSER', 'postgres'),
+    return get_connection(
+        host='tramway.proxy.rlwy.net',
+        port='45703',
+        user='postgres',
         password=password,
-        database=os.environ.get('PGDATABASE', 'railway'),
-        sslmode='require'
+        database='railway',
     )
 
 def load_data_from_db():
@@ -0,0 +1,789 @@
+#!/usr/bin/env python3
+"""
+Shared benchmark harness for the model-comparison experiment scripts.
+
+``test_full_data_comparison.py``, ``test_data_size_impact.py``,
+``test_comprehensive.py``, ``test_ensemble_full.py`` and
+``comprehensive_model_comparison.py`` used to each reload ``actual_data``,
+rebuild the feature frame and train their models in their own loop, then
+write a separate ``models/*.json``. They now only declare ``SCENARIOS``
+(feature set × columns × model × data window) and this module runs them:
+
+* every dataset (``actual_data``, AI factors, weather) is loaded at most once
+  per run, through the ``db_mirror``-aware loaders;
+* every distinct feature frame is built once and pickled under
+  ``models/cache/experiments/`` keyed by the fingerprints of the datasets it
+  reads, its builder parameters and the builder / ``feature_engineering.py``
+  source, so later runs skip feature engineering entirely;
+* scenarios run in a spawn process pool, each worker fitting with
+  ``cpu // workers`` threads (as ``horizon_backtest``); model fits go through
+  ``stacking_ensemble.fit_models`` so identical fits are shared across
+  scenarios and runs;
+* one row per scenario (accuracy, per-period error, timing, predictions) is
+  appended to ``models/experiment_results.sqlite``.
+
+CLI:
+    python experiment_harness.py --list
+    python experiment_harness.py --group data_size_impact --workers 2
+    python experiment_harness.py --report [--group G]
+
+Environment:
+    EXPERIMENT_WORKERS        default worker count (CPU count)
+    EXPERIMENT_CACHE          0 to rebuild feature frames
+    EXPERIMENT_CACHE_DIR      override the feature-frame cache directory
+    EXPERIMENT_RESULTS_DB     override the result store
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib
+import inspect
+import io
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+PYTHON_DIR = Path(__file__).resolve().parent
+MODELS_DIR = PYTHON_DIR / "models"
+FEATURE_CACHE_DIR = Path(os.getenv("EXPERIMENT_CACHE_DIR") or MODELS_DIR / "cache" / "experiments")
+RESULTS_DB = Path(os.getenv("EXPERIMENT_RESULTS_DB") or MODELS_DIR / "experiment_results.sqlite")
+ATTENDANCE_CSV = PYTHON_DIR.parent / "ndh_attendance_extracted.csv"
+
+# Scripts whose SCENARIOS are registered with the harness.
+SCENARIO_MODULES = (
+    "test_full_data_comparison",
+    "test_data_size_impact",
+    "test_comprehensive",
+    "test_ensemble_full",
+    "comprehensive_model_comparison",
+)
+
+COVID_START = pd.Timestamp("2020-02-01")
+COVID_END = pd.Timestamp("2022-06-30")
+
+BASE_FEATURES = (
+    "Attendance_Lag1", "Attendance_Lag7", "Attendance_Same_Weekday_Avg",
+    "Day_of_Week", "DayOfWeek_Target_Mean", "Attendance_Rolling7",
+    "Attendance_EWMA7", "Attendance_Lag14", "Attendance_Lag30",
+    "Daily_Change", "Weekly_Change", "Is_Weekend",
+    "Holiday_Factor", "Attendance_Std7", "Month",
+)
+
+# Error over consecutive slices of the test period (days since the split).
+PERIODS = (
+    ("Day 1-7", 0, 7),
+    ("Day 8-14", 7, 14),
+    ("Day 15-21", 14, 21),
+    ("Day 22-30", 21, 30),
+    ("Day 31-60", 30, 60),
+    ("Day 61-90", 60, 90),
+)
+
+
+def covid_mask(dates: pd.Series) -> pd.Series:
+    dates = pd.to_datetime(dates)
+    return (dates >= COVID_START) & (dates <= COVID_END)
+
+
+# ============================================================
+# Datasets
+# ============================================================
+
+DATASET_LOADERS: Dict[str, Callable[[], object]] = {}
+
+
+def dataset(name: str):
+    """Register a loader for a named dataset (DataFrame or JSON-able dict)."""
+    def register(loader: Callable[[], object]) -> Callable[[], object]:
+        DATASET_LOADERS[name] = loader
+        return loader
+    return register
+
+
+@dataset("actual_data")
+def load_actual_data() -> pd.DataFrame:
+    """``actual_data`` via the local mirror; the extracted CSV if the DB is unreachable."""
+    import horizon_model_pipeline as hmp
+
+    try:
+        return hmp.load_actual_data_from_db()[["Date", "Attendance"]]
+    except Exception as exc:
+        if not ATTENDANCE_CSV.exists():
+            raise
+        warnings.warn(f"actual_data unavailable ({exc}); using {ATTENDANCE_CSV.name}")
+        df = pd.read_csv(ATTENDANCE_CSV).rename(columns={"date": "Date", "attendance": "Attendance"})
+        df["Date"] = pd.to_datetime(df["Date"])
+        return df.sort_values("Date").reset_index(drop=True)
+
+
+@dataset("ai_factors")
+def load_ai_factors() -> dict:
+    from ensemble_predict import load_ai_factors_from_db
+
+    return load_ai_factors_from_db() or {}
+
+
+@dataset("weather_history")
+def load_weather() -> Optional[pd.DataFrame]:
+    from feature_engineering import load_weather_history
+
+    return load_weather_history()
+
+
+class Datasets:
+    """Per-run memo of the registered datasets (``overrides`` bypass the loaders)."""
+
+    def __init__(self, overrides: Optional[Dict[str, object]] = None) -> None:
+        self._values: Dict[str, object] = dict(overrides or {})
+        self._fingerprints: Dict[str, str] = {}
+
+    def get(self, name: str):
+        if name not in self._values:
+            self._values[name] = DATASET_LOADERS[name]()
+        return self._values[name]
+
+    def fingerprint(self, name: str) -> str:
+        if name not in self._fingerprints:
+            value = self.get(name)
+            h = hashlib.sha1(name.encode("utf-8"))
+            if isinstance(value, pd.DataFrame):
+                h.update(repr(list(value.columns)).encode("utf-8"))
+                h.update(pd.util.hash_pandas_object(value, index=False).values.tobytes())
+            else:
+                h.update(json.dumps(value, sort_keys=True, default=str).encode("utf-8"))
+            self._fingerprints[name] = h.hexdigest()
+        return self._fingerprints[name]
+
+
+# ============================================================
+# Feature frames
+# ============================================================
+
+@dataclass(frozen=True)
+class FeatureBuilder:
+    name: str
+    build: Callable[..., pd.DataFrame]
+    # params → dataset names the frame depends on
+    uses: Callable[[Dict[str, object]], Sequence[str]]
+
+
+FEATURE_BUILDERS: Dict[str, FeatureBuilder] = {}
+
+
+def feature_builder(name: str, uses: Callable[[Dict[str, object]], Sequence[str]]):
+    """Register ``build(datasets, **params) -> frame`` (must keep ``Date`` / ``Attendance``)."""
+    def register(build: Callable[..., pd.DataFrame]) -> Callable[..., pd.DataFrame]:
+        FEATURE_BUILDERS[name] = FeatureBuilder(name, build, uses)
+        return build
+    return register
+
+
+@dataclass(frozen=True)
+class FeatureSet:
+    builder: str = "comprehensive"
+    params: Tuple[Tuple[str, object], ...] = ()
+
+    @classmethod
+    def of(cls, builder: str = "comprehensive", **params) -> "FeatureSet":
+        return cls(builder, tuple(sorted(params.items())))
+
+    @property
+    def label(self) -> str:
+        args = ",".join(f"{key}={value}" for key, value in self.params)
+        return f"{self.builder}({args})"
+
+
+@feature_builder(
+    "comprehensive",
+    uses=lambda p: ["actual_data"]
+    + (["ai_factors"] if p.get("ai") else [])
+    + (["weather_history"] if p.get("weather") else []),
+)
+def comprehensive_features(
+    datasets: Datasets,
+    exclude_covid: bool = True,
+    recent_days: Optional[int] = None,
+    ai: bool = False,
+    weather: bool = False,
+) -> pd.DataFrame:
+    """``create_comprehensive_features`` over (a window of) ``actual_data``."""
+    from feature_engineering import add_weather_features, create_comprehensive_features
+
+    df = datasets.get("actual_data")[["Date", "Attendance"]].copy()
+    df["Date"] = pd.to_datetime(df["Date"])
+    if recent_days:
+        df = df[df["Date"] >= df["Date"].max() - pd.Timedelta(days=recent_days)]
+    if exclude_covid:
+        df = df[~covid_mask(df["Date"])]
+    if weather:
+        weather_df = datasets.get("weather_history")
+        if weather_df is not None and len(weather_df):
+            df = add_weather_features(df.copy(), weather_df)
+            df["Date"] = pd.to_datetime(df["Date"])
+    ai_factors = datasets.get("ai_factors") if ai else None
+    df = create_comprehensive_features(df.copy(), ai_factors_dict=ai_factors or None)
+    return df.dropna(subset=["Attendance"]).reset_index(drop=True)
+
+
+def _source_digest(obj) -> str:
+    try:
+        return hashlib.sha1(inspect.getsource(obj).encode("utf-8")).hexdigest()
+    except (OSError, TypeError):
+        return ""
+
+
+def feature_key(features: FeatureSet, datasets: Datasets) -> str:
+    import feature_engineering
+
+    builder = FEATURE_BUILDERS[features.builder]
+    h = hashlib.sha1(features.label.encode("utf-8"))
+    for name in builder.uses(dict(features.params)):
+        h.update(datasets.fingerprint(name).encode("utf-8"))
+    # The builder's whole module (its helpers), the shared builder and feature_engineering.
+    for source in (sys.modules.get(builder.build.__module__), comprehensive_features, feature_engineering):
+        h.update(_source_digest(source).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _cache_enabled() -> bool:
+    return os.getenv("EXPERIMENT_CACHE", "1") not in ("0", "false", "False")
+
+
+def materialize(features: FeatureSet, datasets: Datasets, use_cache: Optional[bool] = None) -> Tuple[Path, bool]:
+    """Path of the pickled feature frame, building it unless cached. Returns (path, cached)."""
+    use_cache = _cache_enabled() if use_cache is None else use_cache
+    path = FEATURE_CACHE_DIR / f"{features.builder}-{feature_key(features, datasets)[:16]}.pkl"
+    if use_cache and path.exists():
+        return path, True
+    builder = FEATURE_BUILDERS[features.builder]
+    frame = builder.build(datasets, **dict(features.params))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    frame.to_pickle(tmp)
+    os.replace(tmp, path)
+    return path, False
+
+
+# ============================================================
+# Models
+# ============================================================
+
+def _rf():
+    from sklearn.ensemble import RandomForestRegressor
+
+    return RandomForestRegressor(n_estimators=200, max_depth=12, min_samples_split=10, random_state=42, n_jobs=-1)
+
+
+def _xgb():
+    import xgboost as xgb
+
+    return xgb.XGBRegressor(n_estimators=500, max_depth=8, learning_rate=0.05, random_state=42)
+
+
+def _xgb_tuned():
+    import xgboost as xgb
+
+    return xgb.XGBRegressor(
+        n_estimators=500, max_depth=8, learning_rate=0.05, min_child_weight=3,
+        subsample=0.85, colsample_bytree=0.85, objective="reg:squarederror",
+        alpha=0.5, reg_lambda=1.5, tree_method="hist", random_state=42, n_jobs=-1,
+    )
+
+
+def _gbm():
+    from sklearn.ensemble import GradientBoostingRegressor
+
+    return GradientBoostingRegressor(n_estimators=200, max_depth=6, learning_rate=0.05, random_state=42)
+
+
+def _lgbm():
+    try:
+        from lightgbm import LGBMRegressor
+    except ImportError:
+        return None
+    return LGBMRegressor(n_estimators=300, max_depth=8, learning_rate=0.05, random_state=42, verbose=-1, n_jobs=-1)
+
+
+# name → factory (None when the library is not installed)
+MODELS: Dict[str, Callable[[], object]] = {
+    "rf": _rf,
+    "xgb": _xgb,
+    "xgb_tuned": _xgb_tuned,
+    "gbm": _gbm,
+    "lgbm": _lgbm,
+}
+
+_COMBINED = re.compile(r"^(mean|weighted|adaptive)\(([\w,\s]+)\)$")
+
+
+def parse_model(spec: str) -> Tuple[Optional[str], List[str]]:
+    """``"xgb"`` → (None, ["xgb"]); ``"mean(xgb,rf)"`` → ("mean", ["xgb", "rf"])."""
+    match = _COMBINED.match(spec.replace(" ", ""))
+    kind, names = (match.group(1), match.group(2).split(",")) if match else (None, [spec])
+    unknown = [name for name in names if name not in MODELS]
+    if unknown:
+        raise ValueError(f"unknown model(s) {unknown} in {spec!r}")
+    return kind, names
+
+
+def fit_predict(
+    spec: str,
+    X_train: pd.DataFrame,
+    y_train: np.ndarray,
+    X_test: pd.DataFrame,
+    n_jobs: int = 1,
+) -> Tuple[np.ndarray, Dict[str, object]]:
+    """Predictions of a single model or a combination of models.
+
+    ``mean(a,b,…)``     simple average
+    ``weighted(a,b,…)`` inverse-MAE weights on the last 20% of the training set
+    ``adaptive(a,b)``   ``a`` weighted 0.4 / 0.5 / 0.6 on days 1-7 / 8-30 / 31+
+    Components whose library is missing are skipped inside combinations.
+    """
+    from stacking_ensemble import fit_models
+
+    kind, names = parse_model(spec)
+    models = {name: MODELS[name]() for name in names}
+    missing = [name for name, model in models.items() if model is None]
+    models = {name: model for name, model in models.items() if model is not None}
+    if not models:
+        raise RuntimeError(f"{spec}: {', '.join(missing)} not installed")
+
+    fitted, stats = fit_models(
+        {name: (model, X_train, y_train) for name, model in models.items()}, workers=1, n_jobs=n_jobs
+    )
+    preds = {name: np.asarray(model.predict(X_test), dtype=float) for name, model in fitted.items()}
+    info: Dict[str, object] = {"components": list(preds), "skipped": missing, **stats}
+
+    if kind is None:
+        return preds[names[0]], info
+    if kind == "mean":
+        return np.mean(list(preds.values()), axis=0), info
+    if kind == "weighted":
+        val_size = max(1, len(X_train) // 5)
+        X_val, y_val = X_train[-val_size:], y_train[-val_size:]
+        inverse = {
+            name: 1.0 / max(float(np.mean(np.abs(model.predict(X_val) - y_val))), 1e-9)
+            for name, model in fitted.items()
+        }
+        total = sum(inverse.values())
+        weights = {name: value / total for name, value in inverse.items()}
+        info["weights"] = weights
+        return np.sum([weights[name] * preds[name] for name in preds], axis=0), info
+    # adaptive
+    if len(preds) != 2:
+        raise ValueError(f"{spec}: adaptive needs exactly two installed models")
+    first, second = (preds[name] for name in names if name in preds)
+    days = np.arange(len(first))
+    weight = np.where(days < 7, 0.4, np.where(days < 30, 0.5, 0.6))
+    return weight * first + (1 - weight) * second, info
+
+
+# ============================================================
+# Scenarios
+# ============================================================
+
+@dataclass(frozen=True)
+class Scenario:
+    """One experiment cell: a feature frame, its columns, a model and a data window."""
+
+    name: str
+    group: str
+    model: str
+    features: FeatureSet = field(default_factory=FeatureSet.of)
+    columns: Tuple[str, ...] = BASE_FEATURES
+    # every frame column starting with one of these is appended (e.g. "AI_")
+    column_prefixes: Tuple[str, ...] = ()
+    # keep only the last N rows of the feature frame
+    tail_days: Optional[int] = None
+    train_fraction: float = 0.8
+    description: str = ""
+
+    def select_columns(self, frame: pd.DataFrame) -> List[str]:
+        columns = [c for c in self.columns if c in frame.columns]
+        for prefix in self.column_prefixes:
+            columns += [c for c in frame.columns if c.startswith(prefix) and c not in columns]
+        return columns
+
+
+SCENARIOS: Dict[str, Scenario] = {}
+
+
+def register(*scenarios: Scenario) -> List[Scenario]:
+    for scenario in scenarios:
+        parse_model(scenario.model)
+        if scenario.name in SCENARIOS and SCENARIOS[scenario.name] != scenario:
+            raise ValueError(f"duplicate scenario {scenario.name!r}")
+        SCENARIOS[scenario.name] = scenario
+    return list(scenarios)
+
+
+def load_scenarios(modules: Iterable[str] = SCENARIO_MODULES) -> Dict[str, Scenario]:
+    for module in modules:
+        importlib.import_module(module)
+    return SCENARIOS
+
+
+def select(groups: Sequence[str] = (), names: Sequence[str] = ()) -> List[Scenario]:
+    load_scenarios()
+    chosen = [
+        scenario for scenario in SCENARIOS.values()
+        if (not groups and not names) or scenario.group in groups or scenario.name in names
+    ]
+    unknown = set(groups) - {s.group for s in SCENARIOS.values()} | set(names) - set(SCENARIOS)
+    if unknown:
+        raise KeyError(f"unknown group / scenario: {sorted(unknown)}")
+    return chosen
+
+
+# ============================================================
+# Evaluation
+# ============================================================
+
+def calculate_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
+    y_true = np.asarray(y_true, dtype=float)
+    y_pred = np.asarray(y_pred, dtype=float)
+    errors = y_pred - y_true
+    ss_tot = float(np.sum((y_true - y_true.mean()) ** 2))
+    naive_mse = float(np.mean(np.diff(y_true) ** 2)) if len(y_true) > 1 else 0.0
+    mse = float(np.mean(errors ** 2))
+    return {
+        "mae": float(np.mean(np.abs(errors))),
+        "rmse": float(np.sqrt(mse)),
+        "mape": float(np.mean(np.abs(errors) / np.maximum(y_true, 1)) * 100),
+        "r2": 1.0 - float(np.sum(errors ** 2)) / ss_tot if ss_tot > 0 else 0.0,
+        "mean_error": float(np.mean(errors)),
+        "median_ae": float(np.median(np.abs(errors))),
+        "theils_u": float(np.sqrt(mse / naive_mse)) if naive_mse > 0 else 1.0,
+    }
+
+
+_FRAMES: Dict[str, pd.DataFrame] = {}
+
+
+def _load_frame(path: str) -> pd.DataFrame:
+    """Per-process memo: a worker running several scenarios of one frame unpickles it once."""
+    if path not in _FRAMES:
+        _FRAMES[path] = pd.read_pickle(path)
+    return _FRAMES[path]
+
+
+def run_scenario(task: Dict[str, object]) -> Dict[str, object]:
+    """Worker: train / evaluate one scenario. Errors are returned, not raised."""
+    scenario: Scenario = task["scenario"]
+    started = time.perf_counter()
+    result: Dict[str, object] = {
+        "scenario": scenario.name,
+        "group": scenario.group,
+        "model": scenario.model,
+        "feature_set": scenario.features.label,
+    }
+    try:
+        frame = _load_frame(task["frame_path"])
+        if scenario.tail_days:
+            if scenario.tail_days > len(frame):
+                raise ValueError(f"tail_days={scenario.tail_days} > {len(frame)} rows available")
+            frame = frame.tail(scenario.tail_days)
+        columns = scenario.select_columns(frame)
+        split = int(len(frame) * scenario.train_fraction)
+        train, test = frame.iloc[:split], frame.iloc[split:]
+        y_train = train["Attendance"].to_numpy(dtype=float)
+        y_test = test["Attendance"].to_numpy(dtype=float)
+
+        fit_started = time.perf_counter()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            pred, info = fit_predict(
+                scenario.model, train[columns].fillna(0), y_train, test[columns].fillna(0), task["n_jobs"]
+            )
+        result["fit_seconds"] = time.perf_counter() - fit_started
+
+        result.update(
+            metrics=calculate_metrics(y_test, pred),
+            by_period={
+                label: calculate_metrics(y_test[start:end], pred[start:end])
+                for label, start, end in PERIODS
+                if end <= len(y_test)
+            },
+            columns=columns,
+            train_days=len(train),
+            test_days=len(test),
+            test_start=str(pd.Timestamp(test["Date"].iloc[0]).date()) if len(test) else None,
+            info=info,
+            y_true=y_test.tolist(),
+            predictions=np.round(pred, 3).tolist(),
+        )
+    except Exception as exc:
+        result["error"] = f"{type(exc).__name__}: {exc}"
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+# ============================================================
+# Result store
+# ============================================================
+
+class ResultStore:
+    """SQLite store: one ``runs`` row per invocation, one ``results`` row per scenario."""
+
+    def __init__(self, path: Path | str = RESULTS_DB) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at TEXT NOT NULL,
+                finished_at TEXT,
+                workers INTEGER,
+                scenarios INTEGER,
+                seconds REAL,
+                datasets TEXT
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                run_id INTEGER NOT NULL REFERENCES runs(run_id),
+                scenario TEXT NOT NULL,
+                group_name TEXT NOT NULL,
+                model TEXT NOT NULL,
+                feature_set TEXT NOT NULL,
+                feature_count INTEGER,
+                train_days INTEGER,
+                test_days INTEGER,
+                mae REAL,
+                rmse REAL,
+                mape REAL,
+                r2 REAL,
+                seconds REAL,
+                fit_seconds REAL,
+                error TEXT,
+                details TEXT,
+                PRIMARY KEY (run_id, scenario)
+            );
+            CREATE INDEX IF NOT EXISTS results_scenario ON results(scenario, run_id);
+            """
+        )
+
+    def start_run(self, workers: int, scenarios: int, datasets: Dict[str, str]) -> int:
+        with self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (started_at, workers, scenarios, datasets) VALUES (?, ?, ?, ?)",
+                (datetime.now().isoformat(timespec="seconds"), workers, scenarios, json.dumps(datasets)),
+            )
+        return int(cursor.lastrowid)
+
+    def finish_run(self, run_id: int, seconds: float) -> None:
+        with self._conn:
+            self._conn.execute(
+                "UPDATE runs SET finished_at = ?, seconds = ? WHERE run_id = ?",
+                (datetime.now().isoformat(timespec="seconds"), seconds, run_id),
+            )
+
+    def record(self, run_id: int, result: Dict[str, object]) -> None:
+        metrics = result.get("metrics") or {}
+        details = {
+            key: result[key]
+            for key in ("metrics", "by_period", "columns", "test_start", "info", "y_true", "predictions")
+            if key in result
+        }
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run_id, result["scenario"], result["group"], result["model"], result["feature_set"],
+                    len(result.get("columns") or []), result.get("train_days"), result.get("test_days"),
+                    metrics.get("mae"), metrics.get("rmse"), metrics.get("mape"), metrics.get("r2"),
+                    result.get("seconds"), result.get("fit_seconds"), result.get("error"),
+                    json.dumps(details),
+                ),
+            )
+
+    def latest_run_id(self) -> Optional[int]:
+        row = self._conn.execute("SELECT MAX(run_id) FROM runs").fetchone()
+        return row[0]
+
+    def results(self, group: Optional[str] = None, run_id: Optional[int] = None) -> pd.DataFrame:
+        """Results of ``run_id``, or the latest result of every scenario."""
+        if run_id is not None:
+            where, params = "r.run_id = ?", [run_id]
+        else:
+            where = "r.run_id = (SELECT MAX(run_id) FROM results WHERE scenario = r.scenario)"
+            params = []
+        if group:
+            where += " AND r.group_name = ?"
+            params.append(group)
+        frame = pd.read_sql_query(
+            f"SELECT r.* FROM results r WHERE {where} ORDER BY r.group_name, r.scenario", self._conn, params=params
+        )
+        frame["details"] = frame["details"].map(lambda text: json.loads(text) if text else {})
+        return frame.set_index("scenario", drop=False)
+
+    def predictions(self, scenario: str, run_id: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(y_true, y_pred) of a scenario's latest (or given) run."""
+        row = self.results(run_id=run_id).loc[scenario, "details"]
+        return np.asarray(row["y_true"]), np.asarray(row["predictions"])
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# ============================================================
+# Runner
+# ============================================================
+
+def run(
+    scenarios: Sequence[Scenario],
+    workers: Optional[int] = None,
+    datasets: Optional[Datasets] = None,
+    store: Optional[ResultStore] = None,
+    use_cache: Optional[bool] = None,
+    log: Callable[[str], None] = print,
+) -> Tuple[int, List[Dict[str, object]]]:
+    """Build the feature frames once, run ``scenarios`` in parallel, store the results."""
+    started = time.perf_counter()
+    datasets = datasets or Datasets()
+    own_store = store is None
+    store = store or ResultStore()
+
+    frame_paths: Dict[FeatureSet, str] = {}
+    for features in dict.fromkeys(s.features for s in scenarios):
+        t0 = time.perf_counter()
+        path, cached = materialize(features, datasets, use_cache)
+        frame_paths[features] = str(path)
+        log(f"  features {features.label}: {'cached' if cached else 'built'} ({time.perf_counter() - t0:.1f}s)")
+
+    cpu = os.cpu_count() or 1
+    n_workers = max(1, min(len(scenarios), workers or int(os.getenv("EXPERIMENT_WORKERS", cpu))))
+    n_jobs = max(1, cpu // n_workers)
+    # Scenarios sharing a frame are queued together so a worker reuses its unpickled frame.
+    tasks = [
+        {"scenario": s, "frame_path": frame_paths[s.features], "n_jobs": n_jobs}
+        for s in sorted(scenarios, key=lambda s: frame_paths[s.features])
+    ]
+    used = sorted({name for f in frame_paths for name in FEATURE_BUILDERS[f.builder].uses(dict(f.params))})
+    run_id = store.start_run(n_workers, len(tasks), {name: datasets.fingerprint(name)[:12] for name in used})
+    log(f"Run {run_id}: {len(tasks)} scenario(s), {n_workers} worker(s) × {n_jobs} thread(s)")
+
+    results: List[Dict[str, object]] = []
+
+    def collect(result: Dict[str, object]) -> None:
+        store.record(run_id, result)
+        results.append(result)
+        if result.get("error"):
+            log(f"  ❌ {result['scenario']}: {result['error']}")
+        else:
+            log(f"  ✅ {result['scenario']}: MAE {result['metrics']['mae']:.2f} ({result['seconds']:.1f}s)")
+
+    if n_workers == 1:
+        for task in tasks:
+            collect(run_scenario(task))
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx) as pool:
+            for future in as_completed([pool.submit(run_scenario, task) for task in tasks]):
+                collect(future.result())
+
+    store.finish_run(run_id, time.perf_counter() - started)
+    if own_store:
+        store.close()
+    return run_id, results
+
+
+def report(store: ResultStore, group: Optional[str] = None, run_id: Optional[int] = None) -> pd.DataFrame:
+    """Print the latest results per group, best MAE first."""
+    frame = store.results(group=group, run_id=run_id)
+    for group_name, rows in frame.groupby("group_name", sort=True):
+        print("=" * 100)
+        print(f"📊 {group_name}")
+        print("=" * 100)
+        print(f"{'scenario':<44} {'feat':>4} {'train':>6} {'test':>5} {'MAE':>8} {'RMSE':>8} {'MAPE':>7} {'R²':>7} {'sec':>6}")
+        print("-" * 100)
+        for _, row in rows.sort_values("mae", na_position="last").iterrows():
+            if row["error"]:
+                print(f"{row['scenario']:<44} ❌ {row['error']}")
+                continue
+            print(
+                f"{row['scenario']:<44} {row['feature_count']:>4} {row['train_days']:>6} {row['test_days']:>5} "
+                f"{row['mae']:>8.2f} {row['rmse']:>8.2f} {row['mape']:>6.2f}% {row['r2']:>7.4f} {row['seconds']:>6.1f}"
+            )
+    return frame
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    if sys.platform == "win32":
+        try:
+            sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
+        except Exception:
+            pass
+
+    parser = argparse.ArgumentParser(description="Run declared experiment scenarios")
+    parser.add_argument("--group", action="append", default=[], help="scenario group (repeatable)")
+    parser.add_argument("--scenario", action="append", default=[], help="scenario name (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="parallel scenario workers")
+    parser.add_argument("--no-cache", action="store_true", help="rebuild the feature frames")
+    parser.add_argument("--list", action="store_true", help="list the declared scenarios")
+    parser.add_argument("--report", action="store_true", help="print the stored results without running")
+    parser.add_argument("--run-id", type=int, default=None, help="report a specific run")
+    args = parser.parse_args(argv)
+
+    # Reports also cover groups recorded by scripts outside the registry (e.g. sliding_window).
+    scenarios = [] if args.report else select(args.group, args.scenario)
+    if args.list:
+        for scenario in scenarios:
+            print(f"{scenario.name:<44} {scenario.model:<32} {scenario.features.label}")
+        return 0
+
+    store = ResultStore()
+    try:
+        if not args.report:
+            print(f"⏰ 開始時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            run_id, results = run(scenarios, workers=args.workers, store=store, use_cache=False if args.no_cache else None)
+            args.run_id = args.run_id or run_id
+            if all(result.get("error") for result in results):
+                return 1
+        for group in args.group or [None]:
+            report(store, group=group, run_id=args.run_id)
+    finally:
+        store.close()
+    return 0
+
+
+def run_group(
+    group: str,
+    summarize: Optional[Callable[[pd.DataFrame, ResultStore], None]] = None,
+    argv: Optional[Sequence[str]] = None,
+) -> int:
+    """Entry point of the experiment scripts: run their group, then their own summary."""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    code = main(["--group", group] + argv)
+    if code == 0 and summarize is not None and "--list" not in argv:
+        store = ResultStore()
+        try:
+            summarize(store.results(group=group), store)
+        finally:
+            store.close()
+    return code
+
+
+if __name__ == "__main__":
+    # The scenario scripts register with the importable module, not with __main__.
+    import experiment_harness
+
+    raise SystemExit(experiment_harness.main())
@@ -8,18 +8,32 @@ A. No sliding window (all data + time decay 0.001)
 B. 2 year sliding window (2024-2026)
 C. 3 year sliding window (2023-2026)
 D. 4 year sliding window (2022-2026, excludes COVID core period)
+
+Runs in-process: actual_data / AI factors are loaded and featurized once,
+the feature matrix is placed in one shared-memory block, and a spawn process
+pool (cpu // workers threads each) only slices its window and trains with
+train_xgboost.train_xgboost_model. Production model files are not touched.
+
+Usage: python experiment_sliding_window.py [--workers N]
 """
 
-import subprocess
-import sys
-import os
+import argparse
+import contextlib
+import io
 import json
+import multiprocessing
+import os
+import sys
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
 
 # Fix Windows encoding
 if sys.platform == 'win32':
-    import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
@@ -28,204 +42,295 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 os.chdir(SCRIPT_DIR)
 
 # 實驗配置
+# exclude_covid: train_xgboost 預設排除 COVID 期間，而且排除時會忽略滑動窗口；
+# 這裡明確指定，讓 B-D 的窗口真正生效
 EXPERIMENTS = [
     {
         'name': 'A: 全部數據 + 時間衰減',
         'sliding_window': 0,
         'time_decay': 0.001,
+        'exclude_covid': True,
         'description': '使用全部 10 年數據，近期數據權重更高'
     },
     {
         'name': 'B: 2 年滑動窗口',
         'sliding_window': 2,
         'time_decay': 0.001,
+        'exclude_covid': False,
         'description': '只用 2024-2026 數據，約 730 天'
     },
     {
         'name': 'C: 3 年滑動窗口',
         'sliding_window': 3,
         'time_decay': 0.001,
+        'exclude_covid': False,
         'description': '只用 2023-2026 數據，約 1095 天'
     },
     {
         'name': 'D: 4 年滑動窗口 (排除 COVID)',
         'sliding_window': 4,
         'time_decay': 0.001,
+        'exclude_covid': False,
         'description': '只用 2022-2026 數據，約 1460 天'
     }
 ]
 
-def run_experiment(config):
-    """Run a single experiment configuration"""
-    print(f"\n{'='*60}")
-    print(f"[TEST] {config['name']}")
-    print(f"   {config['description']}")
-    print(f"   Sliding Window: {config['sliding_window']} years")
-    print(f"   Time Decay: {config['time_decay']}")
-    print(f"{'='*60}")
-    
-    env = os.environ.copy()
-    env['SLIDING_WINDOW_YEARS'] = str(config['sliding_window'])
-    env['TIME_DECAY_RATE'] = str(config['time_decay'])
-    env['PYTHONUNBUFFERED'] = '1'
-    
-    start_time = time.time()
-    
+RESULTS_FILE = os.path.join(SCRIPT_DIR, 'models', 'experiment_results.json')
+
+
+# ============ 共享特徵矩陣 ============
+class SharedFrame:
+    """
+    特徵矩陣 (float64) 放在一塊共享內存中，worker 只讀附加，不複製整個歷史
+
+    Date 以 epoch 天數存放 (float64 可精確表示)
+    """
+
+    def __init__(self, frame, columns):
+        matrix = frame[columns].to_numpy(dtype=np.float64)
+        days = (pd.to_datetime(frame['Date']) - pd.Timestamp(0)).dt.days.to_numpy(dtype=np.float64)
+        self.columns = ['Date'] + list(columns)
+        self.shape = (len(frame), len(self.columns))
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, matrix.nbytes + days.nbytes))
+        view = np.ndarray(self.shape, dtype=np.float64, buffer=self.shm.buf)
+        view[:, 0] = days
+        view[:, 1:] = matrix
+
+    @property
+    def spec(self):
+        return self.shm.name, self.shape, self.columns
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+# worker 進程內的共享數據 (initializer 設置)
+_SHARED = {}
+
+
+def _attach(spec):
+    name, shape, columns = spec
+    shm = shared_memory.SharedMemory(name=name)
+    _SHARED['shm'] = shm  # 保持引用，否則 buffer 會被釋放
+    _SHARED['array'] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _SHARED['columns'] = columns
+
+
+def _window(config):
+    """按配置切出訓練窗口 (只複製切片)"""
+    from train_xgboost import COVID_END, COVID_START
+
+    array, columns = _SHARED['array'], _SHARED['columns']
+    dates = pd.Timestamp(0) + pd.to_timedelta(array[:, 0], unit='D')
+    keep = np.ones(len(array), dtype=bool)
+    if config.get('exclude_covid'):
+        keep &= ~((dates >= COVID_START) & (dates <= COVID_END))
+    if config['sliding_window'] > 0:
+        cutoff = dates[keep].max() - pd.Timedelta(days=config['sliding_window'] * 365)
+        keep &= dates >= cutoff
+    frame = pd.DataFrame(array[keep, 1:], columns=columns[1:])
+    frame.insert(0, 'Date', dates[keep])
+    return frame
+
+
+def run_experiment(config, feature_cols, n_jobs):
+    """Run a single experiment configuration (in a worker)"""
+    from train_xgboost import time_decay_weights, train_xgboost_model
+
+    start_time = time.perf_counter()
     try:
-        result = subprocess.run(
-            [sys.executable, 'train_xgboost.py'],
-            cwd=SCRIPT_DIR,
-            env=env,
-            capture_output=True,
-            text=True,
-            timeout=600  # 10 分鐘超時
+        df = _window(config)
+        split_idx = int(len(df) * 0.8)
+        train_data = df[:split_idx].copy()
+        test_data = df[split_idx:].copy()
+
+        sample_weights = None
+        if config['time_decay'] > 0:
+            sample_weights = time_decay_weights(train_data['Date'], config['time_decay'])
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, result = train_xgboost_model(
+                train_data, test_data, feature_cols, sample_weights=sample_weights, n_jobs=n_jobs
+            )
+
+        # MASE: 相對訓練集 naive (前一日) 預測的 MAE
+        naive_mae = float(np.mean(np.abs(np.diff(train_data['Attendance'].to_numpy()))))
+        metrics = {k: float(result[k]) for k in ('mae', 'rmse', 'mape', 'r2')}
+        metrics.update(
+            mase=metrics['mae'] / naive_mae if naive_mae > 0 else None,
+            naive_mae=naive_mae,
+            train_days=len(train_data),
+            test_days=len(test_data),
+            train_start=str(train_data['Date'].iloc[0].date()),
+            success=True,
         )
-        
-        elapsed = time.time() - start_time
-        
-        # 解析輸出中的 metrics
-        output = result.stdout + result.stderr
-        metrics = parse_metrics(output)
-        metrics['elapsed_time'] = elapsed
-        metrics['success'] = result.returncode == 0
-        
-        print(f"\n[RESULT]")
-        print(f"   MAE: {metrics.get('mae', 'N/A')}")
-        print(f"   MAPE: {metrics.get('mape', 'N/A')}%")
-        print(f"   R2: {metrics.get('r2', 'N/A')}")
-        print(f"   MASE: {metrics.get('mase', 'N/A')}")
-        print(f"   Time: {elapsed:.1f}s")
-        
-        return metrics
-        
-    except subprocess.TimeoutExpired:
-        print(f"[ERROR] Timeout (>10min)")
-        return {'success': False, 'error': 'timeout'}
     except Exception as e:
-        print(f"[ERROR] Failed: {e}")
-        return {'success': False, 'error': str(e)}
+        metrics = {'success': False, 'error': f"{type(e).__name__}: {e}"}
+    metrics['elapsed_time'] = time.perf_counter() - start_time
+    return metrics
 
-def parse_metrics(output):
-    """從訓練輸出解析 metrics"""
+
+# ============ 數據加載 (只做一次) ============
+def load_featurized_history():
+    """加載 actual_data + AI 因子並特徵化一次；返回 (DataFrame, AI 因子數)"""
+    from experiment_harness import Datasets
+    from feature_engineering import create_comprehensive_features
+
+    datasets = Datasets()
+    df = datasets.get('actual_data')
+    ai_factors = datasets.get('ai_factors')
+    if not ai_factors:
+        ai_path = os.path.join(SCRIPT_DIR, 'models', 'ai_factors.json')
+        if os.path.exists(ai_path):
+            with open(ai_path, 'r', encoding='utf-8') as f:
+                ai_factors = json.load(f)
+
+    df = create_comprehensive_features(df[['Date', 'Attendance']].copy(), ai_factors_dict=ai_factors or None)
+    df = df.dropna(subset=['Attendance']).sort_values('Date').reset_index(drop=True)
+    return df, len(ai_factors or {})
+
+
+def run_all(df, feature_cols, workers=None, log=print):
+    """在進程池中運行所有配置；返回 [{'config', 'metrics'}]"""
+    cpu = os.cpu_count() or 1
+    n_workers = max(1, min(len(EXPERIMENTS), workers or int(os.getenv('EXPERIMENT_WORKERS', cpu))))
+    n_jobs = max(1, cpu // n_workers)
+    log(f"   Workers: {n_workers} × {n_jobs} thread(s)")
+
+    shared = SharedFrame(df, feature_cols + ['Attendance'])
     metrics = {}
-    
-    # 尋找 metrics 行
-    lines = output.split('\n')
-    for i, line in enumerate(lines):
-        if 'MAE:' in line and 'MAPE' not in line:
-            try:
-                metrics['mae'] = float(line.split('MAE:')[1].split()[0].replace(',', ''))
-            except:
-                pass
-        if 'MAPE:' in line:
-            try:
-                val = line.split('MAPE:')[1].split()[0].replace('%', '').replace(',', '')
-                metrics['mape'] = float(val)
-            except:
-                pass
-        if 'R²:' in line or 'R2:' in line:
-            try:
-                if 'R²:' in line:
-                    val = line.split('R²:')[1].split()[0].replace('%', '').replace(',', '')
-                else:
-                    val = line.split('R2:')[1].split()[0].replace('%', '').replace(',', '')
-                metrics['r2'] = float(val)
-            except:
-                pass
-        if 'MASE:' in line:
-            try:
-                metrics['mase'] = float(line.split('MASE:')[1].split()[0].replace(',', ''))
-            except:
-                pass
-        if 'Naive MAE:' in line or 'naive_mae' in line.lower():
-            try:
-                if 'Naive MAE:' in line:
-                    metrics['naive_mae'] = float(line.split('Naive MAE:')[1].split()[0].replace(',', ''))
-            except:
-                pass
-                
-    # 也嘗試從 JSON 輸出解析
-    for line in lines:
-        if line.strip().startswith('{') and 'mae' in line.lower():
-            try:
-                data = json.loads(line.strip())
-                if 'mae' in data:
-                    metrics['mae'] = data['mae']
-                if 'mape' in data:
-                    metrics['mape'] = data['mape']
-                if 'r2' in data:
-                    metrics['r2'] = data['r2']
-                if 'mase' in data:
-                    metrics['mase'] = data['mase']
-            except:
-                pass
-    
-    return metrics
+    try:
+        if n_workers == 1:
+            _attach(shared.spec)
+            for i, config in enumerate(EXPERIMENTS):
+                metrics[i] = run_experiment(config, feature_cols, n_jobs)
+                _report(config, metrics[i], log)
+        else:
+            ctx = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx,
+                                     initializer=_attach, initargs=(shared.spec,)) as pool:
+                futures = {
+                    pool.submit(run_experiment, config, feature_cols, n_jobs): i
+                    for i, config in enumerate(EXPERIMENTS)
+                }
+                for future in as_completed(futures):
+                    i = futures[future]
+                    metrics[i] = future.result()
+                    _report(EXPERIMENTS[i], metrics[i], log)
+    finally:
+        _SHARED.pop('array', None)
+        if 'shm' in _SHARED:
+            _SHARED.pop('shm').close()
+        _SHARED.clear()
+        shared.close()
+    return [{'config': config, 'metrics': metrics[i]} for i, config in enumerate(EXPERIMENTS)]
+
+
+def _report(config, metrics, log):
+    if not metrics.get('success'):
+        log(f"[ERROR] {config['name']}: {metrics.get('error')}")
+        return
+    log(f"[RESULT] {config['name']}: MAE {metrics['mae']:.2f}, MAPE {metrics['mape']:.2f}%, "
+        f"R2 {metrics['r2']:.4f}, MASE {metrics['mase']:.3f}, "
+        f"{metrics['train_days']} train days, {metrics['elapsed_time']:.1f}s")
+
+
+def _store(results):
+    """同時寫入 experiment_harness 的結果庫 (group: sliding_window)"""
+    from experiment_harness import ResultStore
+
+    store = ResultStore()
+    try:
+        run_id = store.start_run(workers=0, scenarios=len(results), datasets={})
+        for r in results:
+            config, metrics = r['config'], r['metrics']
+            store.record(run_id, {
+                'scenario': f"sliding_window/{config['name'][0]}",
+                'group': 'sliding_window',
+                'model': f"train_xgboost(time_decay={config['time_decay']})",
+                'feature_set': (f"comprehensive(exclude_covid={config['exclude_covid']},"
+                                f"sliding_window={config['sliding_window']})"),
+                'metrics': {k: metrics.get(k) for k in ('mae', 'rmse', 'mape', 'r2', 'mase')},
+                'train_days': metrics.get('train_days'),
+                'test_days': metrics.get('test_days'),
+                'seconds': metrics['elapsed_time'],
+                'error': metrics.get('error'),
+            })
+        store.finish_run(run_id, sum(r['metrics']['elapsed_time'] for r in results))
+    finally:
+        store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sliding window / time decay experiment')
+    parser.add_argument('--workers', type=int, default=None, help='parallel configurations')
+    args = parser.parse_args(argv)
 
-def main():
     print(f"\n{'#'*60}")
     print("[EXP] Sliding Window Experiment")
     print(f"   Start: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"   Research: Gama et al. (2014) Concept Drift Adaptation")
     print(f"{'#'*60}")
-    
-    results = []
-    
-    for config in EXPERIMENTS:
-        metrics = run_experiment(config)
-        results.append({
-            'config': config,
-            'metrics': metrics
-        })
-    
+
+    from train_xgboost import DEFAULT_OPTIMAL_FEATURES, load_optimal_features
+
+    t0 = time.perf_counter()
+    df, ai_count = load_featurized_history()
+    load_seconds = time.perf_counter() - t0
+    feature_cols = [c for c in (load_optimal_features() or DEFAULT_OPTIMAL_FEATURES) if c in df.columns]
+    print(f"   Data: {len(df)} days ({df['Date'].min().date()} → {df['Date'].max().date()}), "
+          f"{len(feature_cols)} features, {ai_count} AI factor dates")
+    print(f"   Load + featurize: {load_seconds:.1f}s (once)")
+
+    t0 = time.perf_counter()
+    results = run_all(df, feature_cols, workers=args.workers)
+    wall_seconds = time.perf_counter() - t0
+
     # Summary
     print(f"\n{'='*60}")
     print("[SUMMARY] Experiment Results")
     print(f"{'='*60}")
-    print(f"{'Config':<30} {'MAE':>8} {'MAPE':>8} {'MASE':>8} {'Winner':>10}")
-    print("-" * 70)
-    
-    best_mae = float('inf')
-    best_config = None
-    
+    print(f"{'Config':<30} {'MAE':>8} {'MAPE':>8} {'MASE':>8} {'Time':>8} {'Winner':>10}")
+    print("-" * 78)
+
+    ok = [r for r in results if r['metrics'].get('success')]
+    best = min(ok, key=lambda r: r['metrics']['mae']) if ok else None
+    best_config = best['config']['name'] if best else None
+    best_mae = best['metrics']['mae'] if best else float('inf')
+
     for r in results:
-        config = r['config']
-        metrics = r['metrics']
-        
-        mae = metrics.get('mae', float('inf'))
-        mape = metrics.get('mape', 'N/A')
-        mase = metrics.get('mase', 'N/A')
-        
-        if isinstance(mae, (int, float)) and mae < best_mae:
-            best_mae = mae
-            best_config = config['name']
-        
-        conclusion = '<-- BEST' if mae == best_mae and best_config == config['name'] else ''
-        
-        mae_str = f"{mae:.2f}" if isinstance(mae, (int, float)) else str(mae)
-        mape_str = f"{mape:.2f}%" if isinstance(mape, (int, float)) else str(mape)
-        mase_str = f"{mase:.3f}" if isinstance(mase, (int, float)) else str(mase)
-        
-        print(f"{config['name']:<30} {mae_str:>8} {mape_str:>8} {mase_str:>8} {conclusion:>10}")
-    
-    print("-" * 70)
+        config, metrics = r['config'], r['metrics']
+        time_str = f"{metrics['elapsed_time']:.1f}s"
+        if not metrics.get('success'):
+            print(f"{config['name']:<30} {'N/A':>8} {'N/A':>8} {'N/A':>8} {time_str:>8}")
+            continue
+        conclusion = '<-- BEST' if config['name'] == best_config else ''
+        mase_str = f"{metrics['mase']:.3f}" if metrics['mase'] is not None else 'N/A'
+        print(f"{config['name']:<30} {metrics['mae']:>8.2f} {metrics['mape']:>7.2f}% {mase_str:>8} {time_str:>8} {conclusion:>10}")
+
+    print("-" * 78)
+    print(f"   Wall time: {wall_seconds:.1f}s for {len(results)} configs "
+          f"(sum of per-config time {sum(r['metrics']['elapsed_time'] for r in results):.1f}s)")
     print(f"\n[WINNER] Best config: {best_config}")
     print(f"         MAE: {best_mae:.2f}")
-    
+
     # 保存結果
-    results_file = os.path.join(SCRIPT_DIR, 'models', 'experiment_results.json')
-    with open(results_file, 'w', encoding='utf-8') as f:
+    with open(RESULTS_FILE, 'w', encoding='utf-8') as f:
         json.dump({
             'timestamp': datetime.now().isoformat(),
+            'load_seconds': load_seconds,
+            'wall_seconds': wall_seconds,
             'experiments': results,
             'best_config': best_config,
             'best_mae': best_mae
         }, f, indent=2, ensure_ascii=False)
-    
-    print(f"\n[SAVED] Results saved to: {results_file}")
-    
+    _store(results)
+
+    print(f"\n[SAVED] Results saved to: {RESULTS_FILE}")
+
     return best_config, best_mae
 
+
 if __name__ == '__main__':
     main()
-
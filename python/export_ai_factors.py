@@ -11,13 +11,8 @@ def export_ai_factors():
     load_dotenv()
     
     try:
-        import psycopg2
-        conn = psycopg2.connect(
-            host=os.getenv('PGHOST'),
-            database=os.getenv('PGDATABASE'),
-            user=os.getenv('PGUSER'),
-            password=os.getenv('PGPASSWORD'),
-        )
+        from db_access import get_connection
+        conn = get_connection(sslmode='prefer')
         
         cursor = conn.cursor()
         cursor.execute("SELECT factors_cache FROM ai_factors_cache WHERE id = 1")
@@ -28,6 +28,7 @@ print(f"時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
 try:
     import psycopg2
     import psycopg2.extras
+    from db_access import get_connection
 
     # 從環境變數獲取資料庫配置
     db_host = os.getenv('PGHOST') or 'tramway.proxy.rlwy.net'
@@ -47,7 +48,7 @@ try:
         'sslmode': 'require'
     }
 
-    conn = psycopg2.connect(**DB_CONFIG)
+    conn = get_connection(**DB_CONFIG)
     cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
 
     # 查詢所有欄位
@@ -10,7 +10,7 @@ Author: Ma Tsz Kiu
 Date: 2026-01-18
 """
 
-import psycopg2
+from db_access import get_connection
 import requests
 import pandas as pd
 import numpy as np
@@ -121,7 +121,7 @@ def predict_with_forecast(target_date, base_prediction):
     """使用天氣預報生成調整後的預測"""
 
     load_dotenv()
-    conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+    conn = get_connection()
 
     # 1. 獲取天氣預報
     forecasts = fetch_weather_forecast()
@@ -163,18 +163,19 @@ def predict_with_forecast(target_date, base_prediction):
         'has_forecast': True
     }
 
-def cache_forecast_data(conn):
-    """緩存天氣預報數據到數據庫"""
-    forecasts = fetch_weather_forecast()
+def cache_forecast_data(conn, forecasts=None):
+    """緩存天氣預報數據到數據庫（forecasts 可由呼叫方預先抓取）"""
+    if forecasts is None:
+        forecasts = fetch_weather_forecast()
     if not forecasts:
         return 0
 
     cur = conn.cursor()
     cached_count = 0
+    impacts = get_learned_impacts(conn)
 
     for f in forecasts:
         # 預測影響
-        impacts = get_learned_impacts(conn)
         adjustment, _ = calculate_weather_adjustment(f, impacts, [])
 
         cur.execute("""
@@ -209,7 +210,7 @@ def main():
     if len(sys.argv) > 1 and sys.argv[1] == '--cache':
         # 緩存模式
         load_dotenv()
-        conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+        conn = get_connection()
         count = cache_forecast_data(conn)
         conn.close()
         print(f"✅ Cached {count} days of forecast")
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Shared concurrent, resumable downloader for the historical CSV builders.
+
+``download_aqhi_history.py`` and the ``download_hko_*`` scripts describe a
+``DownloadSource`` (period list, URL per period, parser, output CSV) and
+hand it to ``run``:
+
+* periods (``YYYY-MM`` months, ``YYYY`` years, or any key) are fetched by a
+  bounded thread pool, each source throttled by its own rate limiter;
+* transient failures (connection errors, 429, 5xx) are retried with
+  exponential backoff; a 404 or an unparsable body marks the period missing;
+* every finished period's rows are stored under
+  ``models/cache/downloads/<source>/<period>.csv`` and recorded in
+  ``<source>.manifest.json``, so an interrupted run resumes where it stopped;
+* incremental mode (default) only fetches periods not in the manifest plus
+  the still-open ones (current / previous month), then rebuilds the output
+  CSV from all stored periods with an atomic replace.
+
+On the first incremental run an existing output CSV can seed the manifest
+(``period_of``), so the committed CSVs aren't re-downloaded from 2014.
+
+Environment:
+    DOWNLOAD_STATE_DIR   override the manifest / period directory
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+
+PYTHON_DIR = Path(__file__).resolve().parent
+STATE_DIR = PYTHON_DIR / "models" / "cache" / "downloads"
+USER_AGENT = "ndh-aed-prediction/5.6"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def state_dir() -> Path:
+    return Path(os.getenv("DOWNLOAD_STATE_DIR") or STATE_DIR)
+
+
+# ============================================================
+# Periods
+# ============================================================
+
+def monthly_periods(start_year: int, start_month: int, end: Optional[date] = None) -> List[str]:
+    end = end or date.today()
+    periods = []
+    year, month = start_year, start_month
+    while (year, month) <= (end.year, end.month):
+        periods.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return periods
+
+
+def yearly_periods(start_year: int, end_year: Optional[int] = None) -> List[str]:
+    return [f"{year:04d}" for year in range(start_year, (end_year or date.today().year) + 1)]
+
+
+def month_is_open(key: str) -> bool:
+    """The current and previous month may still be revised upstream."""
+    today = date.today()
+    previous = (today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)
+    return key >= f"{previous[0]:04d}-{previous[1]:02d}"
+
+
+def year_is_open(key: str) -> bool:
+    return int(key) >= date.today().year - (1 if date.today().month == 1 else 0)
+
+
+def month_of(ts: pd.Timestamp) -> str:
+    return ts.strftime("%Y-%m")
+
+
+def year_of(ts: pd.Timestamp) -> str:
+    return ts.strftime("%Y")
+
+
+# ============================================================
+# Source description
+# ============================================================
+
+@dataclass(frozen=True)
+class DownloadSource:
+    name: str
+    output_path: Path
+    periods: Callable[[], List[str]]
+    url_for: Callable[[str], str]
+    # (body, period) → rows with a ``Date`` column, or None / empty if no data
+    parse: Callable[[bytes, str], Optional[pd.DataFrame]]
+    finalize: Callable[[pd.DataFrame], pd.DataFrame] = field(default=lambda df: df)
+    is_open: Callable[[str], bool] = field(default=month_is_open)
+    # Maps an output row's Date to its period so an existing CSV can seed the manifest.
+    period_of: Optional[Callable[[pd.Timestamp], str]] = None
+    requests_per_second: float = 2.0
+    timeout: float = 30.0
+
+
+@dataclass
+class DownloadResult:
+    source: str
+    output_path: Path
+    fetched: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    skipped: int = 0
+    seeded: int = 0
+    rows: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+class RateLimiter:
+    """Minimum spacing between request starts, shared by a source's workers."""
+
+    def __init__(self, per_second: float) -> None:
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class _TransientError(RuntimeError):
+    pass
+
+
+# ============================================================
+# Manifest / period storage
+# ============================================================
+
+class Manifest:
+    def __init__(self, source_name: str) -> None:
+        self.path = state_dir() / f"{source_name}.manifest.json"
+        self.parts_dir = state_dir() / source_name
+        self._lock = threading.Lock()
+        try:
+            self.periods: Dict[str, dict] = json.loads(self.path.read_text(encoding="utf-8")).get("periods", {})
+        except (OSError, ValueError):
+            self.periods = {}
+
+    def part_path(self, key: str) -> Path:
+        return self.parts_dir / f"{key}.csv"
+
+    def record(self, key: str, frame: Optional[pd.DataFrame]) -> None:
+        rows = 0 if frame is None else len(frame)
+        if rows:
+            self.parts_dir.mkdir(parents=True, exist_ok=True)
+            _atomic_csv(frame, self.part_path(key))
+        else:
+            self.part_path(key).unlink(missing_ok=True)
+        with self._lock:
+            self.periods[key] = {
+                "rows": rows,
+                "missing": rows == 0,
+                "completed_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            self._save()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"periods": self.periods}, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def load_parts(self) -> pd.DataFrame:
+        frames = [
+            pd.read_csv(self.part_path(key))
+            for key, entry in sorted(self.periods.items())
+            if entry.get("rows") and self.part_path(key).exists()
+        ]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def _atomic_csv(frame: pd.DataFrame, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    frame.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def _seed_from_output(source: DownloadSource, manifest: Manifest) -> int:
+    """Split an existing output CSV into closed periods (first incremental run only)."""
+    if manifest.periods or source.period_of is None or not source.output_path.exists():
+        return 0
+    existing = pd.read_csv(source.output_path)
+    if existing.empty or "Date" not in existing.columns:
+        return 0
+    keys = pd.to_datetime(existing["Date"], errors="coerce").map(
+        lambda ts: source.period_of(ts) if pd.notna(ts) else None
+    )
+    wanted = set(source.periods())
+    seeded = 0
+    for key, part in existing.groupby(keys):
+        if key in wanted and not source.is_open(key):
+            manifest.record(key, part)
+            seeded += 1
+    return seeded
+
+
+# ============================================================
+# Fetching
+# ============================================================
+
+def fetch_with_retry(
+    session: requests.Session,
+    url: str,
+    limiter: RateLimiter,
+    timeout: float,
+    retries: int = 3,
+    backoff: float = 1.0,
+) -> Optional[bytes]:
+    """Body of ``url``; None on 404. Raises after ``retries`` failed retries."""
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            response = session.get(url, timeout=timeout, headers={"User-Agent": USER_AGENT})
+            if response.status_code == 404:
+                return None
+            if response.status_code in RETRY_STATUS:
+                raise _TransientError(f"HTTP {response.status_code}")
+            response.raise_for_status()
+            return response.content
+        except (requests.ConnectionError, requests.Timeout, _TransientError) as exc:
+            if attempt == retries:
+                raise RuntimeError(f"{url}: {exc}") from exc
+            time.sleep(backoff * (2 ** attempt) * (1 + random.random() * 0.25))
+    return None  # pragma: no cover
+
+
+def run(
+    source: DownloadSource,
+    incremental: bool = True,
+    workers: int = 4,
+    retries: int = 3,
+    backoff: float = 1.0,
+    log: Callable[[str], None] = print,
+) -> DownloadResult:
+    """Download the pending periods of ``source`` and rebuild its output CSV."""
+    manifest = Manifest(source.name)
+    result = DownloadResult(source=source.name, output_path=source.output_path)
+    if incremental:
+        result.seeded = _seed_from_output(source, manifest)
+
+    periods = source.periods()
+    if incremental:
+        todo = [key for key in periods if key not in manifest.periods or source.is_open(key)]
+    else:
+        todo = list(periods)
+    result.skipped = len(periods) - len(todo)
+    log(f"[{source.name}] {len(todo)} period(s) to fetch, {result.skipped} already complete")
+
+    limiter = RateLimiter(source.requests_per_second)
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    def fetch(key: str) -> Optional[pd.DataFrame]:
+        body = fetch_with_retry(session, source.url_for(key), limiter, source.timeout, retries, backoff)
+        if body is None:
+            return None
+        try:
+            return source.parse(body, key)
+        except Exception as exc:
+            # Retrying won't change the body: record the period as missing, not failed.
+            log(f"  ⚠️ {key}: unparsable body ({exc})")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(fetch, key): key for key in todo}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                frame = future.result()
+            except Exception as exc:
+                result.failed[key] = str(exc)
+                log(f"  ❌ {key}: {exc}")
+                continue
+            manifest.record(key, frame)
+            if frame is None or frame.empty:
+                result.missing.append(key)
+                log(f"  ⚠️ {key}: no data")
+            else:
+                result.fetched.append(key)
+                log(f"  ✅ {key}: {len(frame)} rows")
+    session.close()
+
+    combined = manifest.load_parts()
+    if not combined.empty:
+        combined["Date"] = pd.to_datetime(combined["Date"], errors="coerce")
+        combined = combined.dropna(subset=["Date"]).sort_values("Date")
+        # Periods are disjoint by date; sources split by element merge column-wise.
+        combined = combined.groupby("Date", as_index=False, sort=True).first()
+        combined = source.finalize(combined)
+        _atomic_csv(combined, source.output_path)
+        result.rows = len(combined)
+    result.fetched.sort()
+    result.missing.sort()
+    return result
+
+
+def print_result(result: DownloadResult) -> int:
+    """CLI summary; returns the process exit code."""
+    print("=" * 60)
+    print(f"[{result.source}] fetched {len(result.fetched)}, missing {len(result.missing)}, "
+          f"failed {len(result.failed)}, skipped {result.skipped}, seeded {result.seeded}")
+    if result.rows:
+        print(f"[OK] {result.rows} rows → {result.output_path}")
+    for key, error in sorted(result.failed.items()):
+        print(f"  ❌ {key}: {error}", file=sys.stderr)
+    if result.failed:
+        print("Re-run to resume: completed periods are kept in the manifest.", file=sys.stderr)
+        return 1
+    return 0 if result.rows else 1
+
+
+def add_cli_arguments(parser) -> None:
+    parser.add_argument("--full", action="store_true", help="re-download every period (default: only new / open ones)")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent downloads")
+    parser.add_argument("--retries", type=int, default=3, help="retries per period on transient errors")
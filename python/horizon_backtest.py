@@ -0,0 +1,348 @@
+"""
+Rolling-origin backtest for the direct multi-horizon pipeline.
+
+``evaluate_saved_bundle`` only scores the already-saved boosters on one
+validation slice. This module instead retrains the full horizon pipeline at a
+series of historical origins (monthly over the last two years by default),
+then scores every cutoff between one origin and the next with that origin's
+models — the same cadence as a monthly production retrain.
+
+Each origin's bundle is cached under ``models/backtest_cache`` keyed by a
+training fingerprint of the data visible at that origin, so re-running after
+one more month of data only trains the new origin.
+"""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+import horizon_model_pipeline as hmp
+
+
+BACKTEST_CACHE_DIR = hmp.MODELS_DIR / "backtest_cache"
+BACKTEST_REPORT_FILENAME = "horizon_backtest_report.json"
+DEFAULT_BACKTEST_MONTHS = 24
+
+
+def rolling_origins(dates: pd.Series, months: int = DEFAULT_BACKTEST_MONTHS) -> List[pd.Timestamp]:
+    """Month-end origins over the last ``months`` complete months.
+
+    Each origin is snapped back to the latest date actually present in
+    ``dates`` so gaps in ``actual_data`` never produce an origin without a
+    last observed value.
+    """
+    dates = pd.to_datetime(pd.Series(dates)).sort_values().reset_index(drop=True)
+    if dates.empty:
+        return []
+    last_period = dates.iloc[-1].to_period("M")
+    origins: List[pd.Timestamp] = []
+    for back in range(months, 0, -1):
+        month_end = (last_period - back).to_timestamp(how="end").normalize()
+        available = dates[dates <= month_end]
+        if available.empty:
+            continue
+        origin = pd.Timestamp(available.iloc[-1]).normalize()
+        if not origins or origin > origins[-1]:
+            origins.append(origin)
+    return origins
+
+
+def _slice_until(frame: pd.DataFrame | None, origin: pd.Timestamp) -> pd.DataFrame | None:
+    if frame is None or frame.empty or "Date" not in frame.columns:
+        return frame
+    return frame[pd.to_datetime(frame["Date"]) <= origin].reset_index(drop=True)
+
+
+def origin_fingerprint(
+    origin: pd.Timestamp,
+    history_df: pd.DataFrame,
+    exog: Dict[str, pd.DataFrame | None],
+    settings: Dict[str, object],
+) -> str:
+    """Training fingerprint of everything the pipeline can see at ``origin``.
+
+    Exogenous frames are cut at the origin too, so appending new weather or
+    AI-factor rows does not invalidate earlier origins.
+    """
+    frames = {"actual_data": _slice_until(history_df[["Date", "Attendance"]], origin)}
+    for name, frame in exog.items():
+        frames[name] = _slice_until(frame, origin)
+    return hmp.training_fingerprint(frames, settings)
+
+
+def _origin_dir(cache_dir: Path, origin: pd.Timestamp, fingerprint: str) -> Path:
+    return cache_dir / f"{origin.date()}_{fingerprint[:16]}"
+
+
+def _train_origin(task: Dict[str, object]) -> Dict[str, object]:
+    """Worker: retrain the pipeline on data up to one origin into the cache."""
+    origin = pd.Timestamp(task["origin"])
+    final_dir = Path(task["final_dir"])
+    staging_dir = final_dir.with_name(f".{final_dir.name}.{os.getpid()}.tmp")
+    if staging_dir.exists():
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    started = time.perf_counter()
+    try:
+        hmp.train_horizon_models(
+            recent_rows=task["recent_rows"],
+            validation_cutoffs=task["validation_cutoffs"],
+            allow_gate_fail=True,
+            weather_df=task["weather_df"],
+            ai_factor_df=task["ai_factor_df"],
+            flu_df=task["flu_df"],
+            school_calendar=task["school_calendar"],
+            train_quantile=task["train_quantile"],
+            train_lightgbm=task["train_lightgbm"],
+            history_df=task["history_df"],
+            aqhi_df=task["aqhi_df"],
+            models_dir=staging_dir,
+            n_jobs=task["n_jobs"],
+        )
+        if final_dir.exists():
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        else:
+            os.replace(staging_dir, final_dir)
+    except Exception as exc:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        return {"origin": str(origin.date()), "error": f"{type(exc).__name__}: {exc}"}
+    return {
+        "origin": str(origin.date()),
+        "train_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def _predict_bucket(
+    bundle: Dict[str, object],
+    models: Dict[str, xgb.Booster],
+    lgb_models: Dict[str, object],
+    bucket_name: str,
+    frame: pd.DataFrame,
+) -> np.ndarray:
+    """Vectorised version of the tree part of ``predict_target_date``."""
+    info = bundle["buckets"][bucket_name]
+    dmatrix = xgb.DMatrix(frame[hmp.FEATURE_COLUMNS], feature_names=hmp.FEATURE_COLUMNS)
+    best_iteration = int(info.get("best_iteration") or 0)
+    if best_iteration > 0:
+        pred = models[bucket_name].predict(dmatrix, iteration_range=(0, best_iteration + 1))
+    else:
+        pred = models[bucket_name].predict(dmatrix)
+    pred = np.asarray(pred, dtype=float)
+
+    lgb_spec = lgb_models.get(bucket_name)
+    if lgb_spec and info.get("ensemble_active"):
+        lgb_pred = lgb_spec["booster"].predict(
+            frame[hmp.FEATURE_COLUMNS],
+            num_iteration=lgb_spec.get("best_iteration") or None,
+        )
+        w = float(lgb_spec.get("weight_xgb", 0.55))
+        pred = w * pred + (1.0 - w) * np.asarray(lgb_pred, dtype=float)
+
+    return pred - hmp._apply_bias(frame, pred, info.get("bias_correction"))
+
+
+def run_rolling_backtest(
+    months: int = DEFAULT_BACKTEST_MONTHS,
+    origins: List[pd.Timestamp] | None = None,
+    workers: int | None = None,
+    recent_rows: int | None = hmp.DEFAULT_RECENT_ROWS,
+    validation_cutoffs: int = hmp.DEFAULT_VALIDATION_CUTOFFS,
+    train_lightgbm: bool = True,
+    train_quantile: bool = False,
+    cache_dir: Path | None = None,
+    history_df: pd.DataFrame | None = None,
+    weather_df: pd.DataFrame | None = None,
+    ai_factor_df: pd.DataFrame | None = None,
+    aqhi_df: pd.DataFrame | None = None,
+    flu_df: pd.DataFrame | None = None,
+    school_calendar: Dict | None = None,
+    write_report: bool = True,
+) -> Dict[str, object]:
+    """Retrain at each origin (cached) and build per-bucket / per-horizon error surfaces."""
+    cache_dir = Path(cache_dir) if cache_dir is not None else BACKTEST_CACHE_DIR
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    df = history_df.copy() if history_df is not None else hmp.load_actual_data_from_db()
+    df["Date"] = pd.to_datetime(df["Date"])
+    df = df.sort_values("Date").reset_index(drop=True)
+    if weather_df is None:
+        weather_df = hmp.load_weather_history_from_db()
+    if ai_factor_df is None:
+        ai_factor_df = hmp.load_ai_factor_history_from_db()
+    if aqhi_df is None:
+        aqhi_df = hmp.load_aqhi_history()
+    if flu_df is None:
+        flu_df = hmp.load_chp_flu_history()
+    if school_calendar is None:
+        school_calendar = hmp.load_school_calendar()
+    holiday_set = hmp.load_holiday_set()
+
+    origins = [pd.Timestamp(o).normalize() for o in (origins or rolling_origins(df["Date"], months))]
+    origins = [o for o in origins if (df["Date"] <= o).sum() > hmp.MIN_HISTORY_DAYS + hmp.MAX_HORIZON]
+    if not origins:
+        raise ValueError("No backtest origins with enough history")
+
+    settings = {
+        "recent_rows": recent_rows,
+        "validation_cutoffs": validation_cutoffs,
+        "train_lightgbm": train_lightgbm,
+        "train_quantile": train_quantile,
+    }
+    exog = {"weather": weather_df, "ai_factor": ai_factor_df, "aqhi": aqhi_df, "flu": flu_df}
+    calendar_frame = hmp.calendar_frame(school_calendar)
+
+    origin_dirs: Dict[pd.Timestamp, Path] = {}
+    origin_status: Dict[pd.Timestamp, Dict[str, object]] = {}
+    tasks: List[Dict[str, object]] = []
+    for origin in origins:
+        fingerprint = origin_fingerprint(origin, df, {**exog, "school_calendar": calendar_frame}, settings)
+        final_dir = _origin_dir(cache_dir, origin, fingerprint)
+        origin_dirs[origin] = final_dir
+        cached = (final_dir / hmp.MODEL_BUNDLE_FILENAME).exists()
+        origin_status[origin] = {"origin": str(origin.date()), "fingerprint": fingerprint, "cached": cached}
+        if cached:
+            continue
+        tasks.append(
+            {
+                "origin": origin,
+                "final_dir": str(final_dir),
+                "history_df": _slice_until(df[["Date", "Attendance"]], origin),
+                "weather_df": _slice_until(weather_df, origin),
+                "ai_factor_df": _slice_until(ai_factor_df, origin),
+                "aqhi_df": _slice_until(aqhi_df, origin),
+                "flu_df": _slice_until(flu_df, origin),
+                "school_calendar": school_calendar,
+                "recent_rows": recent_rows,
+                "validation_cutoffs": validation_cutoffs,
+                "train_lightgbm": train_lightgbm,
+                "train_quantile": train_quantile,
+            }
+        )
+
+    started = time.perf_counter()
+    if tasks:
+        cpu = os.cpu_count() or 1
+        n_workers = max(1, min(len(tasks), workers or cpu))
+        for task in tasks:
+            task["n_jobs"] = max(1, cpu // n_workers)
+        if n_workers == 1:
+            results = [_train_origin(task) for task in tasks]
+        else:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx) as pool:
+                futures = [pool.submit(_train_origin, task) for task in tasks]
+                results = [future.result() for future in as_completed(futures)]
+        for result in results:
+            status = origin_status[pd.Timestamp(result["origin"])]
+            status.update({k: v for k, v in result.items() if k != "origin"})
+    training_seconds = round(time.perf_counter() - started, 2)
+
+    # One feature pass covering every scored cutoff plus the yearly lag span.
+    window_start = origins[0] - timedelta(days=hmp.LONG_LAG_DAYS + hmp.MIN_HISTORY_DAYS)
+    datasets = hmp.build_training_examples(
+        df=df,
+        holiday_set=holiday_set,
+        recent_rows=int((df["Date"] >= window_start).sum()),
+        min_history_days=hmp.MIN_HISTORY_DAYS,
+        weather_df=weather_df,
+        aqhi_df=aqhi_df,
+        ai_factor_df=ai_factor_df,
+        flu_df=flu_df,
+        school_calendar=school_calendar,
+    )
+
+    scored: List[pd.DataFrame] = []
+    bounds = origins[1:] + [pd.Timestamp.max]
+    for origin, next_origin in zip(origins, bounds):
+        status = origin_status[origin]
+        origin_dir = origin_dirs[origin]
+        if status.get("error") or not (origin_dir / hmp.MODEL_BUNDLE_FILENAME).exists():
+            continue
+        bundle = hmp.load_model_bundle(origin_dir)
+        models = hmp.load_bucket_models(bundle, origin_dir)
+        lgb_models = hmp.load_lightgbm_models(bundle, origin_dir) if train_lightgbm else {}
+        n_rows = 0
+        for bucket in hmp.HORIZON_BUCKETS:
+            frame = datasets.get(bucket.name)
+            if frame is None or frame.empty or bucket.name not in models:
+                continue
+            cutoffs = pd.to_datetime(frame["cutoff_date"])
+            window = frame[(cutoffs >= origin) & (cutoffs < next_origin)]
+            if window.empty:
+                continue
+            pred = _predict_bucket(bundle, models, lgb_models, bucket.name, window)
+            scored.append(
+                pd.DataFrame(
+                    {
+                        "origin": origin,
+                        "bucket": bucket.name,
+                        "horizon": window["horizon"].to_numpy(dtype=int),
+                        "target": window["target"].to_numpy(dtype=float),
+                        "predicted": pred,
+                    }
+                )
+            )
+            n_rows += len(window)
+        status["scored_rows"] = n_rows
+
+    if not scored:
+        raise RuntimeError("Backtest produced no scored rows")
+    results_df = pd.concat(scored, ignore_index=True)
+
+    def _summary(group: pd.DataFrame) -> Dict[str, float]:
+        return hmp._metric_summary(group["target"].to_numpy(), group["predicted"].to_numpy())
+
+    per_origin = {
+        str(origin.date()): _summary(group) for origin, group in results_df.groupby("origin")
+    }
+    for origin, status in origin_status.items():
+        status["metrics"] = per_origin.get(str(origin.date()))
+
+    abs_err = results_df.assign(abs_error=(results_df["predicted"] - results_df["target"]).abs())
+    surface = abs_err.pivot_table(index="origin", columns="horizon", values="abs_error", aggfunc="mean")
+    surface = surface.reindex(columns=range(1, hmp.MAX_HORIZON + 1))
+
+    report = {
+        "version": hmp.PIPELINE_VERSION,
+        "model_family": hmp.MODEL_FAMILY,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "settings": settings,
+        "training_seconds": training_seconds,
+        "origins_trained": len(tasks),
+        "origins_cached": len(origins) - len(tasks),
+        "summary": _summary(results_df),
+        "buckets": {
+            bucket.name: _summary(results_df[results_df["bucket"] == bucket.name])
+            for bucket in hmp.HORIZON_BUCKETS
+            if (results_df["bucket"] == bucket.name).any()
+        },
+        "per_horizon": {
+            str(int(horizon)): _summary(group) for horizon, group in results_df.groupby("horizon")
+        },
+        "origins": [origin_status[o] for o in origins],
+        "error_surface": {
+            "metric": "mae",
+            "origins": [str(pd.Timestamp(o).date()) for o in surface.index],
+            "horizons": [int(h) for h in surface.columns],
+            "values": [
+                [None if pd.isna(v) else round(float(v), 4) for v in row]
+                for row in surface.to_numpy()
+            ],
+        },
+    }
+
+    if write_report:
+        with open(hmp.MODELS_DIR / BACKTEST_REPORT_FILENAME, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2, ensure_ascii=False)
+    return report
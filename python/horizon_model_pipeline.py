@@ -10,24 +10,33 @@ Design goals:
 
 from __future__ import annotations
 
+import filecmp
+import hashlib
 import json
 import math
+import multiprocessing
 import os
+import queue
+import shutil
+import threading
+import time
 import warnings
 from bisect import bisect_left
 from collections import deque
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
 
 import numpy as np
 import pandas as pd
-import psycopg2
 import xgboost as xgb
-from dotenv import load_dotenv
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 
+import db_access
+import db_mirror
+import http_cache
+
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
 PYTHON_DIR = ROOT_DIR / "python"
@@ -47,6 +56,9 @@ LONG_LAG_DAYS = 372
 DEFAULT_RECENT_ROWS = 1600
 DEFAULT_VALIDATION_CUTOFFS = 180
 DEFAULT_GATE_MARGIN = 0.01
+DEFAULT_STREAM_CHUNK_CUTOFFS = 90
+QUANTILE_ALPHAS: Tuple[float, ...] = (0.025, 0.10, 0.50, 0.90, 0.975)
+NEURAL_WORKER_TIMEOUT_SECONDS = 1800.0
 
 TYPHOON_SIGNAL_ORDINAL: Dict[str, int] = {
     "": 0, "0": 0, "NONE": 0, "none": 0,
@@ -67,6 +79,10 @@ RAINSTORM_SIGNAL_ORDINAL: Dict[str, int] = {
 MODEL_BUNDLE_FILENAME = "horizon_model_bundle.json"
 WALK_FORWARD_REPORT_FILENAME = "horizon_walk_forward_report.json"
 SUMMARY_METRICS_FILENAME = "xgboost_metrics.json"
+ARTIFACT_STORE_DIRNAME = "artifacts"
+ARTIFACT_MANIFEST_FILENAME = "artifact_manifest.json"
+ARTIFACT_STORE_KEEP = 3
+SKIPPED_IDENTICAL_INPUTS = "skipped — identical inputs"
 
 
 @dataclass(frozen=True)
@@ -290,34 +306,32 @@ class TrainingGateError(RuntimeError):
 
 
 def _open_db_connection():
-    load_dotenv(ROOT_DIR / ".env")
-    database_url = os.getenv("DATABASE_URL")
-    if database_url:
-        return psycopg2.connect(database_url)
-    return psycopg2.connect(
-        host=os.getenv("PGHOST"),
-        port=os.getenv("PGPORT"),
-        user=os.getenv("PGUSER"),
-        password=os.getenv("PGPASSWORD"),
-        database=os.getenv("PGDATABASE"),
-        sslmode="require",
-    )
+    """Pooled connection from ``db_access``; ``close()`` returns it to the pool."""
+    return db_access.get_connection()
+
+
+def _mirror_frame(name: str) -> pd.DataFrame | None:
+    """Dataset from the local ``db_mirror`` (synced first), or None to read PostgreSQL directly."""
+    if not db_mirror.enabled():
+        return None
+    try:
+        return db_mirror.read(name)
+    except Exception as exc:  # pragma: no cover - env without DB and without mirror
+        warnings.warn(f"db mirror unavailable for {name}: {exc}")
+        return None
 
 
 def load_actual_data_from_db() -> pd.DataFrame:
-    """Load NDH AED actual data from PostgreSQL only."""
-    conn = _open_db_connection()
+    """Load NDH AED actual data from PostgreSQL only (via the local mirror)."""
+    mirrored = _mirror_frame("actual_data")
+    if mirrored is not None:
+        return _prepare_actual_frame(mirrored)
     query = 'SELECT date AS "Date", patient_count AS "Attendance" FROM actual_data ORDER BY date ASC'
-    try:
-        with warnings.catch_warnings():
-            warnings.filterwarnings(
-                "ignore",
-                message=".*pandas only supports SQLAlchemy.*",
-            )
-            df = pd.read_sql_query(query, conn)
-    finally:
-        conn.close()
+    return _prepare_actual_frame(db_access.copy_frame(query, parse_dates=["Date"]))
 
+
+def _prepare_actual_frame(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
     df["Date"] = pd.to_datetime(df["Date"])
     df["Attendance"] = pd.to_numeric(df["Attendance"], errors="coerce")
     df = df.dropna(subset=["Attendance"]).sort_values("Date").reset_index(drop=True)
@@ -326,8 +340,10 @@ def load_actual_data_from_db() -> pd.DataFrame:
 
 HKO_FORECAST_API_URL = "https://data.weather.gov.hk/weatherAPI/opendata/weather.php?dataType=fnd&lang=en"
 HKO_FORECAST_CACHE_TTL_SECONDS = 6 * 3600  # 6h — HKO updates 4×/day
+HKO_FORECAST_STALE_SECONDS = 18 * 3600  # serve up to a day old while revalidating
 
-_HKO_FORECAST_CACHE: Dict[str, object] = {"fetched_at": None, "forecasts": []}
+# Parsed rows of the last cache entry seen by this process.
+_HKO_FORECAST_CACHE: Dict[str, object] = {"entry": None, "forecasts": []}
 
 
 def fetch_hko_9day_forecast(timeout: float = 10.0, use_cache: bool = True) -> List[Dict[str, object]]:
@@ -340,24 +356,35 @@ def fetch_hko_9day_forecast(timeout: float = 10.0, use_cache: bool = True) -> Li
     publish a per-day humidity range with a single number, so we take the
     midpoint of the reported range.
 
-    Cached for ``HKO_FORECAST_CACHE_TTL_SECONDS`` to avoid hammering the API
-    on every batch prediction.
+    The response goes through ``http_cache`` (shared by every process):
+    fresh for ``HKO_FORECAST_CACHE_TTL_SECONDS``, then served stale for up to
+    ``HKO_FORECAST_STALE_SECONDS`` while one process revalidates with
+    ETag / If-Modified-Since. ``use_cache=False`` forces a revalidation.
     """
-    now = datetime.now()
-    if use_cache and _HKO_FORECAST_CACHE.get("fetched_at"):
-        age = (now - _HKO_FORECAST_CACHE["fetched_at"]).total_seconds()
-        if age < HKO_FORECAST_CACHE_TTL_SECONDS and _HKO_FORECAST_CACHE.get("forecasts"):
-            return _HKO_FORECAST_CACHE["forecasts"]
-
+    response = http_cache.fetch(
+        HKO_FORECAST_API_URL,
+        ttl=HKO_FORECAST_CACHE_TTL_SECONDS if use_cache else 0,
+        stale_ttl=HKO_FORECAST_STALE_SECONDS if use_cache else 0,
+        timeout=timeout,
+    )
+    if response is None:  # pragma: no cover - network failure with a cold cache
+        return _HKO_FORECAST_CACHE.get("forecasts", [])
+    if _HKO_FORECAST_CACHE.get("entry") == (response.fetched_at, response.etag):
+        return _HKO_FORECAST_CACHE["forecasts"]
     try:
-        import urllib.request
-        req = urllib.request.Request(HKO_FORECAST_API_URL, headers={"User-Agent": "ndh-aed-prediction/5.5"})
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            payload = json.loads(resp.read().decode("utf-8"))
-    except Exception as exc:  # pragma: no cover - network failure path
-        warnings.warn(f"HKO forecast fetch failed: {exc}")
+        payload = response.json()
+    except ValueError as exc:  # pragma: no cover - truncated / non-JSON body
+        warnings.warn(f"HKO forecast payload unreadable: {exc}")
         return _HKO_FORECAST_CACHE.get("forecasts", [])
 
+    forecasts = parse_hko_9day_forecast(payload)
+    _HKO_FORECAST_CACHE["entry"] = (response.fetched_at, response.etag)
+    _HKO_FORECAST_CACHE["forecasts"] = forecasts
+    return forecasts
+
+
+def parse_hko_9day_forecast(payload: Dict[str, object]) -> List[Dict[str, object]]:
+    """Normalise an HKO ``fnd`` payload into forecast rows."""
     forecasts: List[Dict[str, object]] = []
     for day in payload.get("weatherForecast", []):
         try:
@@ -407,8 +434,6 @@ def fetch_hko_9day_forecast(timeout: float = 10.0, use_cache: bool = True) -> Li
             "is_typhoon_expected": bool(is_typhoon_expected),
         })
 
-    _HKO_FORECAST_CACHE["fetched_at"] = now
-    _HKO_FORECAST_CACHE["forecasts"] = forecasts
     return forecasts
 
 
@@ -512,34 +537,44 @@ def load_weather_history_from_db() -> pd.DataFrame:
     table is missing — returns an empty frame and feature builder will fall back
     to neutral defaults.
     """
+    mirrored = _mirror_frame("weather_history")
+    if mirrored is not None:
+        return _prepare_weather_frame(mirrored)
     try:
         conn = _open_db_connection()
     except Exception as exc:  # pragma: no cover - env without DB
         warnings.warn(f"weather DB unavailable: {exc}")
         return pd.DataFrame(columns=["Date"])
 
-    query = """
-        SELECT date AS "Date",
-               temp_min, temp_max, temp_mean,
-               humidity_pct, rainfall_mm, wind_kmh, pressure_hpa,
-               typhoon_signal, rainstorm_warning,
-               is_very_cold, is_very_hot, is_heavy_rain, is_strong_wind
+    query = f"""
+        SELECT {_WEATHER_SELECT}
         FROM weather_history
         ORDER BY date ASC
     """
     try:
-        with warnings.catch_warnings():
-            warnings.filterwarnings("ignore", message=".*pandas only supports SQLAlchemy.*")
-            df = pd.read_sql_query(query, conn)
+        df = db_access.copy_frame(
+            query,
+            conn=conn,
+            parse_dates=["Date"],
+            bool_columns=["is_very_cold", "is_very_hot", "is_heavy_rain", "is_strong_wind"],
+            text_columns=["typhoon_signal", "rainstorm_warning"],
+        )
     except Exception as exc:  # pragma: no cover - DB schema mismatch
         warnings.warn(f"weather_history load failed: {exc}")
         df = pd.DataFrame(columns=["Date"])
     finally:
         conn.close()
+    return _prepare_weather_frame(df)
 
+
+_WEATHER_SELECT = db_mirror.WEATHER_SELECT
+
+
+def _prepare_weather_frame(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return df
 
+    df = df.copy()
     df["Date"] = pd.to_datetime(df["Date"])
     numeric_cols = ["temp_min", "temp_max", "temp_mean", "humidity_pct", "rainfall_mm", "wind_kmh", "pressure_hpa"]
     for col in numeric_cols:
@@ -573,6 +608,10 @@ def load_ai_factor_history_from_db() -> pd.DataFrame:
     Pre-AI-era days (before ``AI_FACTOR_EPOCH_START_STR``) get
     ``ai_factor_known=0`` / ``is_pre_ai_era=1`` and the neutral 1.0 value.
     """
+    if db_mirror.enabled():
+        mirrored = [_mirror_frame("learning_records_ai"), _mirror_frame("daily_predictions_ai")]
+        if all(frame is not None for frame in mirrored):
+            return _prepare_ai_factor_frame([frame for frame in mirrored if not frame.empty])
     try:
         conn = _open_db_connection()
     except Exception as exc:  # pragma: no cover
@@ -586,16 +625,18 @@ def load_ai_factor_history_from_db() -> pd.DataFrame:
     ]
     for query in queries:
         try:
-            with warnings.catch_warnings():
-                warnings.filterwarnings("ignore", message=".*pandas only supports SQLAlchemy.*")
-                part = pd.read_sql_query(query, conn)
+            part = db_access.copy_frame(query, conn=conn, parse_dates=["Date"])
             if not part.empty:
                 frames.append(part)
         except Exception as exc:  # pragma: no cover
             warnings.warn(f"ai_factor query failed ({query[:30]}…): {exc}")
+            conn.rollback()
 
     conn.close()
+    return _prepare_ai_factor_frame(frames)
 
+
+def _prepare_ai_factor_frame(frames: List[pd.DataFrame]) -> pd.DataFrame:
     if not frames:
         return pd.DataFrame(columns=["Date", "ai_factor", "ai_factor_known", "is_pre_ai_era"])
 
@@ -1106,6 +1147,18 @@ def _residual_quantiles(actual: np.ndarray, predicted: np.ndarray) -> Dict[str,
     }
 
 
+def _quantile_columns(predictions: np.ndarray, alphas: Iterable[float]) -> Dict[float, np.ndarray]:
+    """Split multi-quantile booster output into ``{alpha: column}``.
+
+    Columns are sorted row-wise first so independently fitted quantile heads
+    can never cross (q10 > q90) at inference.
+    """
+    alphas = [round(float(a), 4) for a in alphas]
+    matrix = np.sort(np.asarray(predictions, dtype=float).reshape(-1, len(alphas)), axis=1)
+    order = np.argsort(alphas)
+    return {alphas[idx]: matrix[:, rank] for rank, idx in enumerate(order)}
+
+
 def _build_time_series_cache(values: np.ndarray) -> Dict[str, np.ndarray]:
     series = pd.Series(values, dtype=float)
     return {
@@ -1136,6 +1189,22 @@ def _lookback_value(values: np.ndarray, cutoff_idx: int, lag: int, fallback: flo
     return float(values[idx])
 
 
+def _slice_recent(df: pd.DataFrame, recent_rows: int | None) -> pd.DataFrame:
+    if recent_rows and len(df) > recent_rows:
+        return df.tail(recent_rows).reset_index(drop=True)
+    return df.reset_index(drop=True)
+
+
+def example_cutoff_dates(
+    df: pd.DataFrame,
+    recent_rows: int | None = DEFAULT_RECENT_ROWS,
+    min_history_days: int = MIN_HISTORY_DAYS,
+) -> pd.DatetimeIndex:
+    """Cutoff dates that ``build_training_examples`` would emit rows for."""
+    dates = pd.to_datetime(_slice_recent(df, recent_rows)["Date"])
+    return pd.DatetimeIndex(dates.iloc[min_history_days:max(min_history_days, len(dates) - MAX_HORIZON)])
+
+
 def build_training_examples(
     df: pd.DataFrame,
     holiday_set: set,
@@ -1147,10 +1216,49 @@ def build_training_examples(
     flu_df: pd.DataFrame | None = None,
     school_calendar: Dict | None = None,
 ) -> Dict[str, pd.DataFrame]:
-    if recent_rows and len(df) > recent_rows:
-        df = df.tail(recent_rows).reset_index(drop=True)
-    else:
-        df = df.reset_index(drop=True)
+    chunks = iter_training_example_chunks(
+        df=df,
+        holiday_set=holiday_set,
+        recent_rows=recent_rows,
+        min_history_days=min_history_days,
+        weather_df=weather_df,
+        aqhi_df=aqhi_df,
+        ai_factor_df=ai_factor_df,
+        flu_df=flu_df,
+        school_calendar=school_calendar,
+        chunk_cutoffs=None,
+    )
+    return next(chunks, {bucket.name: pd.DataFrame() for bucket in HORIZON_BUCKETS})
+
+
+def iter_training_example_chunks(
+    df: pd.DataFrame,
+    holiday_set: set,
+    recent_rows: int | None = DEFAULT_RECENT_ROWS,
+    min_history_days: int = MIN_HISTORY_DAYS,
+    weather_df: pd.DataFrame | None = None,
+    aqhi_df: pd.DataFrame | None = None,
+    ai_factor_df: pd.DataFrame | None = None,
+    flu_df: pd.DataFrame | None = None,
+    school_calendar: Dict | None = None,
+    chunk_cutoffs: int | None = DEFAULT_STREAM_CHUNK_CUTOFFS,
+    cutoff_start: pd.Timestamp | None = None,
+    cutoff_end: pd.Timestamp | None = None,
+    buckets: Iterable[str] | None = None,
+) -> Iterator[Dict[str, pd.DataFrame]]:
+    """Yield per-bucket example frames for ``chunk_cutoffs`` cutoffs at a time.
+
+    Rolling state (same-DoW and 84-day windows) is always advanced from the
+    first row, but rows are only built for cutoffs in
+    ``[cutoff_start, cutoff_end)`` and for the requested ``buckets``, so the
+    streaming trainer can replay one bucket's slice without materialising the
+    whole cutoff x horizon grid. ``chunk_cutoffs=None`` yields a single chunk.
+    """
+    df = _slice_recent(df, recent_rows)
+    wanted = set(buckets) if buckets is not None else {bucket.name for bucket in HORIZON_BUCKETS}
+    horizons = [h for h in range(1, MAX_HORIZON + 1) if get_bucket_for_horizon(h).name in wanted]
+    cutoff_start = pd.Timestamp(cutoff_start) if cutoff_start is not None else None
+    cutoff_end = pd.Timestamp(cutoff_end) if cutoff_end is not None else None
 
     values = df["Attendance"].astype(float).to_numpy()
     dates = pd.to_datetime(df["Date"])
@@ -1168,6 +1276,7 @@ def build_training_examples(
     records: Dict[str, List[Dict[str, float]]] = {bucket.name: [] for bucket in HORIZON_BUCKETS}
     recent_by_dow = {dow: deque(maxlen=12) for dow in range(7)}
     recent_all = deque(maxlen=84)
+    cutoffs_in_chunk = 0
 
     for cutoff_idx in range(len(values)):
         value = float(values[cutoff_idx])
@@ -1177,6 +1286,10 @@ def build_training_examples(
 
         if cutoff_idx < min_history_days or cutoff_idx + MAX_HORIZON >= len(values):
             continue
+        if cutoff_start is not None and dates.iloc[cutoff_idx] < cutoff_start:
+            continue
+        if cutoff_end is not None and dates.iloc[cutoff_idx] >= cutoff_end:
+            break
 
         base = {
             "cutoff_date": dates.iloc[cutoff_idx],
@@ -1205,7 +1318,7 @@ def build_training_examples(
             "recent_mean_84": float(np.mean(recent_all)),
         }
 
-        for horizon in range(1, MAX_HORIZON + 1):
+        for horizon in horizons:
             target_idx = cutoff_idx + horizon
             target_date = dates.iloc[target_idx]
             target_dow = int(dows[target_idx])
@@ -1277,7 +1390,14 @@ def build_training_examples(
             bucket = get_bucket_for_horizon(horizon)
             records[bucket.name].append(row)
 
-    return {bucket_name: pd.DataFrame(rows) for bucket_name, rows in records.items()}
+        cutoffs_in_chunk += 1
+        if chunk_cutoffs and cutoffs_in_chunk >= chunk_cutoffs:
+            yield {bucket_name: pd.DataFrame(rows) for bucket_name, rows in records.items()}
+            records = {bucket.name: [] for bucket in HORIZON_BUCKETS}
+            cutoffs_in_chunk = 0
+
+    if cutoffs_in_chunk or not chunk_cutoffs:
+        yield {bucket_name: pd.DataFrame(rows) for bucket_name, rows in records.items()}
 
 
 BIAS_DEFAULT_SHRINK = 50.0
@@ -1399,12 +1519,55 @@ def _bucket_params() -> Dict[str, float]:
     }
 
 
+def frame_digest(frame: pd.DataFrame | None) -> str:
+    """Stable SHA-256 of a frame's columns and cell values (index ignored)."""
+    digest = hashlib.sha256()
+    if frame is None:
+        digest.update(b"<none>")
+        return digest.hexdigest()
+    digest.update(json.dumps([str(c) for c in frame.columns]).encode("utf-8"))
+    if len(frame):
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def training_fingerprint(
+    frames: Dict[str, pd.DataFrame | None],
+    settings: Dict[str, object] | None = None,
+) -> str:
+    """Hash every input that determines a trained bundle.
+
+    Combines the per-source frame digests with ``PIPELINE_VERSION``,
+    ``FEATURE_COLUMNS``, the default bucket hyperparameters and any extra
+    ``settings`` (training kwargs). Two runs with the same fingerprint produce
+    the same models, so callers can reuse cached artifacts.
+    """
+    payload = {
+        "pipeline_version": PIPELINE_VERSION,
+        "feature_columns": FEATURE_COLUMNS,
+        "bucket_params": _bucket_params(),
+        "buckets": [(b.name, b.min_horizon, b.max_horizon) for b in HORIZON_BUCKETS],
+        "frames": {name: frame_digest(frame) for name, frame in sorted(frames.items())},
+        "settings": settings or {},
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def calendar_frame(payload: object) -> pd.DataFrame:
+    """Wrap a JSON-like calendar (school terms, holiday set) for ``frame_digest``."""
+    if isinstance(payload, (set, frozenset)):
+        payload = sorted(str(item) for item in payload)
+    return pd.DataFrame({"payload": [json.dumps(payload, sort_keys=True, default=str)]})
+
+
 def _optuna_tune_xgb(
     train_df: pd.DataFrame,
     val_df: pd.DataFrame,
     n_trials: int,
     timeout: float | None = None,
     seed: int = 42,
+    n_jobs: int | None = None,
 ) -> Tuple[Dict[str, float], Dict[str, object]]:
     """Lightweight TPE search for per-bucket XGBoost hyperparameters.
 
@@ -1441,7 +1604,7 @@ def _optuna_tune_xgb(
             "reg_lambda": trial.suggest_float("reg_lambda", 0.2, 5.0),
             "gamma": trial.suggest_float("gamma", 0.0, 1.5),
         })
-        model = xgb.XGBRegressor(n_estimators=500, early_stopping_rounds=30, **params)
+        model = xgb.XGBRegressor(n_estimators=500, early_stopping_rounds=30, n_jobs=n_jobs, **params)
         model.fit(train_X, train_y, eval_set=[(val_X, val_y)], verbose=False)
         pred = model.predict(val_X)
         return float(mean_absolute_error(val_y, pred))
@@ -1649,16 +1812,298 @@ def _train_nbeats_global(
         return None, {"available": False, "error": str(exc)}
 
 
+# name -> (trainer, output directory under MODELS_DIR, blend weight)
+NEURAL_LEARNERS: Dict[str, Tuple[object, str, float]] = {
+    "nbeats": (_train_nbeats_global, "nbeats", 0.15),  # conservative anchor weight
+    "tft": (_train_tft_global, "tft", 0.10),  # smaller weight than N-BEATS
+    "deepar": (_train_deepar_itransformer_global, "deepar", 0.08),
+}
+
+
+def _neural_thread_budget(n_workers: int, neural_threads: int | None = None) -> Tuple[int, int]:
+    """Split the CPU budget between neural workers and the tree learners.
+
+    Returns ``(threads_per_neural_worker, tree_threads)``. On a single-core
+    box both get one thread and the OS time-slices; with more cores the
+    tree stage keeps at least half of them so XGBoost / LightGBM don't
+    starve while the neural workers run alongside.
+    """
+    cpu = os.cpu_count() or 1
+    if n_workers <= 0:
+        return 0, cpu
+    if neural_threads and neural_threads > 0:
+        per_worker = int(neural_threads)
+    else:
+        per_worker = max(1, (cpu // 2) // n_workers)
+    tree_threads = max(1, cpu - per_worker * n_workers)
+    return per_worker, tree_threads
+
+
+def _neural_worker_main(
+    name: str,
+    history_df: pd.DataFrame,
+    max_epochs: int,
+    num_threads: int,
+    staging_dir: str,
+    result_queue: "multiprocessing.Queue",
+) -> None:
+    """Entry point of one isolated neural training process.
+
+    Threads are pinned before torch is imported so MKL/OpenMP pools are
+    sized correctly. The fitted model is saved to ``staging_dir`` inside the
+    worker — only the small ``info`` dict crosses the process boundary.
+    """
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(num_threads)
+    started = time.monotonic()
+    try:
+        try:
+            import torch
+
+            torch.set_num_threads(num_threads)
+            torch.set_num_interop_threads(1)
+        except Exception:  # pragma: no cover
+            pass
+        trainer = NEURAL_LEARNERS[name][0]
+        model, info = trainer(
+            history_df=history_df,
+            max_epochs=max_epochs,
+            input_size=90,
+            horizon=MAX_HORIZON,
+        )
+        if model is not None:
+            model.save(path=staging_dir, overwrite=True)
+            info["num_threads"] = num_threads
+        info["train_seconds"] = round(time.monotonic() - started, 1)
+        result_queue.put(info)
+    except BaseException as exc:  # pragma: no cover - isolation boundary
+        result_queue.put({"available": False, "error": f"{type(exc).__name__}: {exc}"})
+
+
+def _start_neural_workers(
+    jobs: Dict[str, int],
+    history_df: pd.DataFrame,
+    num_threads: int,
+    models_dir: Path,
+) -> Dict[str, Dict[str, object]]:
+    """Spawn one process per neural learner; ``jobs`` maps name -> max_epochs."""
+    ctx = multiprocessing.get_context("spawn")
+    handles: Dict[str, Dict[str, object]] = {}
+    for name, max_epochs in jobs.items():
+        staging_dir = models_dir / f".{NEURAL_LEARNERS[name][1]}.staging"
+        if staging_dir.exists():
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        result_queue = ctx.Queue()
+        process = ctx.Process(
+            target=_neural_worker_main,
+            args=(name, history_df, max_epochs, num_threads, str(staging_dir), result_queue),
+            name=f"neural-{name}",
+            daemon=True,
+        )
+        process.start()
+        handles[name] = {
+            "process": process,
+            "queue": result_queue,
+            "staging_dir": staging_dir,
+            "started_at": time.monotonic(),
+        }
+    return handles
+
+
+def _collect_neural_worker(handle: Dict[str, object], timeout: float) -> Dict[str, object]:
+    """Wait for one worker's result, killing it once its own deadline passes.
+
+    Collection only starts after the tree buckets are trained, so the
+    deadline may already be gone by then; a result the worker queued in
+    the meantime is still taken before it is treated as timed out or dead.
+    """
+    process = handle["process"]
+    result_queue = handle["queue"]
+    deadline = float(handle["started_at"]) + timeout
+    info: Dict[str, object] | None = None
+    while info is None:
+        # Decided before reading, so a result queued just before the worker
+        # exited (or the deadline passed) is still picked up below.
+        expired = time.monotonic() >= deadline or not process.is_alive()
+        try:
+            if expired:
+                info = result_queue.get_nowait()
+            else:
+                info = result_queue.get(timeout=max(0.0, min(1.0, deadline - time.monotonic())))
+        except queue.Empty:
+            if expired:
+                break
+
+    if info is None:
+        if process.is_alive():
+            process.terminate()
+            info = {"available": False, "error": f"worker timed out after {timeout:.0f}s"}
+        else:
+            info = {"available": False, "error": f"worker exited with code {process.exitcode}"}
+    process.join(timeout=10)
+    if process.is_alive():  # pragma: no cover
+        process.kill()
+        process.join(timeout=5)
+    return info
+
+
+def _promote_neural_artifact(
+    name: str,
+    staging_dir: Path,
+    info: Dict[str, object],
+    models_dir: Path,
+) -> Dict[str, object]:
+    """Move a worker's staged model into ``models_dir`` and tag the bundle info."""
+    _, dir_name, blend_weight = NEURAL_LEARNERS[name]
+    if not info.get("available"):
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        return info
+    target_dir = models_dir / dir_name
+    try:
+        if target_dir.exists():
+            shutil.rmtree(target_dir)
+        os.replace(staging_dir, target_dir)
+        info["dir"] = dir_name
+        info["blend_weight"] = blend_weight
+    except Exception as exc:  # pragma: no cover
+        info = {"available": False, "save_error": str(exc)}
+    return info
+
+
+def _train_neural_inline(
+    name: str,
+    history_df: pd.DataFrame,
+    max_epochs: int,
+    models_dir: Path,
+) -> Dict[str, object]:
+    """Sequential (in-process) fallback used when ``neural_parallel=False``."""
+    trainer, dir_name, blend_weight = NEURAL_LEARNERS[name]
+    model, info = trainer(
+        history_df=history_df,
+        max_epochs=max_epochs,
+        input_size=90,
+        horizon=MAX_HORIZON,
+    )
+    if model is None:
+        return info
+    target_dir = models_dir / dir_name
+    try:
+        if target_dir.exists():
+            shutil.rmtree(target_dir)
+        model.save(path=str(target_dir), overwrite=True)
+        info["dir"] = dir_name
+        info["blend_weight"] = blend_weight
+    except Exception as exc:  # pragma: no cover
+        info = {"available": False, "save_error": str(exc)}
+    return info
+
+
+class _ExampleChunkIter(xgb.DataIter):
+    """Feed one bucket's training rows to XGBoost one cutoff-chunk at a time.
+
+    ``make_chunks`` is called at the start of every pass (XGBoost iterates
+    the data twice to build a ``QuantileDMatrix``), so only one chunk of
+    float32 rows is alive at any moment.
+    """
+
+    def __init__(self, make_chunks: Callable[[], Iterator[pd.DataFrame]]) -> None:
+        self._make_chunks = make_chunks
+        self._chunks: Iterator[pd.DataFrame] | None = None
+        self.rows = 0
+        super().__init__()
+
+    def next(self, input_data: Callable) -> bool:
+        if self._chunks is None:
+            self._chunks = self._make_chunks()
+            self.rows = 0
+        for frame in self._chunks:
+            if frame.empty:
+                continue
+            self.rows += len(frame)
+            input_data(
+                data=frame[FEATURE_COLUMNS].to_numpy(dtype=np.float32),
+                label=frame["target"].to_numpy(dtype=np.float32),
+                feature_names=FEATURE_COLUMNS,
+            )
+            return True
+        return False
+
+    def reset(self) -> None:
+        self._chunks = None
+
+
+class _StreamedXGBModel:
+    """The slice of the ``XGBRegressor`` API the bucket loop relies on, for
+    boosters trained with ``xgb.train`` on a streamed ``QuantileDMatrix``."""
+
+    def __init__(self, booster: xgb.Booster, n_estimators: int) -> None:
+        self._booster = booster
+        self.n_estimators = n_estimators
+        try:
+            self.best_iteration: int | None = int(booster.best_iteration)
+        except AttributeError:
+            self.best_iteration = None
+
+    def get_booster(self) -> xgb.Booster:
+        return self._booster
+
+    def predict(self, features: pd.DataFrame) -> np.ndarray:
+        dmatrix = xgb.DMatrix(features, feature_names=FEATURE_COLUMNS)
+        if self.best_iteration is not None:
+            return self._booster.predict(dmatrix, iteration_range=(0, self.best_iteration + 1))
+        return self._booster.predict(dmatrix)
+
+    @property
+    def feature_importances_(self) -> np.ndarray:
+        score = self._booster.get_score(importance_type="gain")
+        values = np.array([score.get(name, 0.0) for name in FEATURE_COLUMNS], dtype=np.float32)
+        total = float(values.sum())
+        return values / total if total > 0 else values
+
+
+def _fit_streamed_xgb(
+    dtrain: xgb.QuantileDMatrix,
+    val_df: pd.DataFrame | None,
+    params: Dict[str, object],
+    n_estimators: int,
+    early_stopping_rounds: int | None = None,
+    n_jobs: int | None = None,
+) -> _StreamedXGBModel:
+    train_params = dict(params)
+    if n_jobs:
+        train_params["nthread"] = n_jobs
+    evals = []
+    if val_df is not None:
+        dval = xgb.DMatrix(val_df[FEATURE_COLUMNS], label=val_df["target"], feature_names=FEATURE_COLUMNS)
+        evals.append((dval, "validation"))
+    booster = xgb.train(
+        train_params,
+        dtrain,
+        num_boost_round=n_estimators,
+        evals=evals,
+        early_stopping_rounds=early_stopping_rounds if evals else None,
+        verbose_eval=False,
+    )
+    return _StreamedXGBModel(booster, n_estimators)
+
+
 def _train_lightgbm_companion(
-    train_df: pd.DataFrame,
+    train_df: pd.DataFrame | None,
     val_df: pd.DataFrame,
     seed: int = 42,
+    num_threads: int = 0,
+    train_chunks: Iterable[pd.DataFrame] | None = None,
+    train_rows: int = 0,
 ) -> Tuple[object, Dict[str, object]]:
     """Train a LightGBM regressor with similar discipline to the XGBoost base.
 
     Used as the second base learner in a simple blend; LightGBM tends to model
     interactions XGBoost misses (and vice versa) so a 50/50 mean blend has
     historically given a free 1–3% MAE drop on ED time-series.
+
+    In streaming mode ``train_chunks`` are copied into one preallocated
+    ``train_rows`` x features float32 matrix, so at most one chunk is alive
+    next to it and the raw matrix is released once the Dataset is built.
     """
     import lightgbm as lgb
 
@@ -1677,7 +2122,32 @@ def _train_lightgbm_companion(
         "verbose": -1,
         "random_state": seed,
     }
-    train_set = lgb.Dataset(train_df[FEATURE_COLUMNS], label=train_df["target"])
+    if num_threads > 0:
+        params["num_threads"] = num_threads
+    if train_chunks is not None:
+        features = np.empty((train_rows, len(FEATURE_COLUMNS)), dtype=np.float32)
+        labels = np.empty(train_rows, dtype=np.float32)
+        filled = 0
+        for frame in train_chunks:
+            n = len(frame)
+            if n == 0:
+                continue
+            if filled + n > train_rows:
+                raise ValueError(f"streamed chunks exceed train_rows={train_rows}")
+            features[filled:filled + n] = frame[FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+            labels[filled:filled + n] = frame["target"].to_numpy(dtype=np.float32)
+            filled += n
+        if filled != train_rows:
+            raise ValueError(f"streamed {filled} rows, expected train_rows={train_rows}")
+        train_set = lgb.Dataset(
+            features,
+            label=labels,
+            feature_name=FEATURE_COLUMNS,
+            free_raw_data=True,
+        ).construct()
+        del features, labels
+    else:
+        train_set = lgb.Dataset(train_df[FEATURE_COLUMNS], label=train_df["target"])
     val_set = lgb.Dataset(val_df[FEATURE_COLUMNS], label=val_df["target"], reference=train_set)
 
     booster = lgb.train(
@@ -1689,13 +2159,13 @@ def _train_lightgbm_companion(
     )
     audit = {
         "best_iteration": int(booster.best_iteration or 0),
-        "params": {k: v for k, v in params.items() if k not in ("metric", "objective", "verbose")},
+        "params": {k: v for k, v in params.items() if k not in ("metric", "objective", "verbose", "num_threads")},
     }
     return booster, audit
 
 
 def train_horizon_models(
-    recent_rows: int = DEFAULT_RECENT_ROWS,
+    recent_rows: int | None = DEFAULT_RECENT_ROWS,
     validation_cutoffs: int = DEFAULT_VALIDATION_CUTOFFS,
     gate_margin: float = DEFAULT_GATE_MARGIN,
     allow_gate_fail: bool = False,
@@ -1714,19 +2184,70 @@ def train_horizon_models(
     train_deepar: bool = False,
     deepar_max_epochs: int = 20,
     blend_weight_xgb: float = 0.55,
+    neural_parallel: bool = True,
+    neural_threads: int | None = None,
+    neural_timeout: float = NEURAL_WORKER_TIMEOUT_SECONDS,
+    history_df: pd.DataFrame | None = None,
+    aqhi_df: pd.DataFrame | None = None,
+    models_dir: Path | None = None,
+    n_jobs: int | None = None,
+    streaming: bool = False,
+    stream_chunk_cutoffs: int = DEFAULT_STREAM_CHUNK_CUTOFFS,
+    multi_quantile: bool = False,
 ) -> Dict[str, object]:
-    df = load_actual_data_from_db()
+    """Fit every horizon bucket and write the bundle into ``models_dir``.
+
+    ``history_df`` / ``aqhi_df`` / ``models_dir`` default to the production
+    sources and ``MODELS_DIR``; the backtest engine overrides them to retrain
+    the same pipeline at a historical origin without touching live artifacts.
+
+    ``streaming=True`` never materialises the training grid: each bucket's
+    training rows are replayed ``stream_chunk_cutoffs`` cutoffs at a time into
+    an ``xgb.DataIter`` / chunked LightGBM ``Dataset``, so memory stays
+    bounded for ``recent_rows=None`` (full history). Only the validation
+    slice is held as a DataFrame. Optuna tuning is skipped in this mode.
+
+    ``multi_quantile=True`` fits one ``QUANTILE_ALPHAS`` booster per bucket
+    instead of separate q10/q90 models; CI80/CI95 and the CQR offsets are
+    derived from its outputs.
+    """
+    models_dir = Path(models_dir) if models_dir is not None else MODELS_DIR
+    df = history_df.copy() if history_df is not None else load_actual_data_from_db()
     holiday_set = load_holiday_set()
+
+    # Neural learners only need the raw attendance series, so with
+    # ``neural_parallel`` they start in isolated worker processes right away
+    # and train while the tree buckets below are fitted.
+    neural_jobs: Dict[str, int] = {}
+    if train_nbeats:
+        neural_jobs["nbeats"] = nbeats_max_epochs
+    if train_tft:
+        neural_jobs["tft"] = tft_max_epochs
+    if train_deepar:
+        neural_jobs["deepar"] = deepar_max_epochs
+    neural_handles: Dict[str, Dict[str, object]] = {}
+    tree_threads: int | None = n_jobs
+    if neural_jobs and neural_parallel:
+        models_dir.mkdir(parents=True, exist_ok=True)
+        worker_threads, budget_threads = _neural_thread_budget(len(neural_jobs), neural_threads)
+        tree_threads = min(tree_threads, budget_threads) if tree_threads else budget_threads
+        neural_handles = _start_neural_workers(
+            neural_jobs,
+            history_df=df[["Date", "Attendance"]].copy(),
+            num_threads=worker_threads,
+            models_dir=models_dir,
+        )
     if weather_df is None:
         weather_df = load_weather_history_from_db()
-    aqhi_df = load_aqhi_history()
+    if aqhi_df is None:
+        aqhi_df = load_aqhi_history()
     if ai_factor_df is None:
         ai_factor_df = load_ai_factor_history_from_db()
     if flu_df is None:
         flu_df = load_chp_flu_history()
     if school_calendar is None:
         school_calendar = load_school_calendar()
-    datasets = build_training_examples(
+    example_kwargs = dict(
         df=df,
         holiday_set=holiday_set,
         recent_rows=recent_rows,
@@ -1737,10 +2258,19 @@ def train_horizon_models(
         flu_df=flu_df,
         school_calendar=school_calendar,
     )
+    stream_val_start: pd.Timestamp | None = None
+    if streaming:
+        stream_cutoffs = example_cutoff_dates(df, recent_rows, MIN_HISTORY_DAYS)
+        if len(stream_cutoffs) < 2:
+            raise ValueError("Not enough history for a streamed train/validation split")
+        stream_val_start = stream_cutoffs[max(1, len(stream_cutoffs) - validation_cutoffs)]
+        datasets = next(iter_training_example_chunks(**example_kwargs, chunk_cutoffs=None, cutoff_start=stream_val_start))
+    else:
+        datasets = build_training_examples(**example_kwargs)
     dynamic_val_mae: Dict[str, Dict[str, float]] = {}
     dynamic_base_weights: Dict[str, Dict[str, float]] = {}
 
-    MODELS_DIR.mkdir(parents=True, exist_ok=True)
+    models_dir.mkdir(parents=True, exist_ok=True)
     training_timestamp = datetime.now().isoformat(timespec="seconds")
     bundle = {
         "version": PIPELINE_VERSION,
@@ -1754,6 +2284,7 @@ def train_horizon_models(
         "gate_margin": gate_margin,
         "feature_columns": FEATURE_COLUMNS,
         "aqhi_rows": int(len(aqhi_df)),
+        "streaming": {"enabled": streaming, "chunk_cutoffs": stream_chunk_cutoffs if streaming else None},
         "buckets": {},
         "summary": {},
         "dynamic_stacking": {
@@ -1795,14 +2326,36 @@ def train_horizon_models(
             report["buckets"][bucket.name] = {"error": message}
             continue
 
-        cutoff_dates = pd.to_datetime(bucket_df["cutoff_date"]).sort_values().unique()
-        split_index = max(1, len(cutoff_dates) - validation_cutoffs)
-        val_cutoff_start = cutoff_dates[split_index]
+        dtrain: xgb.QuantileDMatrix | None = None
+        if streaming:
+            val_cutoff_start = stream_val_start
+            val_df = bucket_df.copy()
+            train_df = None
+
+            def _train_chunks(name: str = bucket.name) -> Iterator[pd.DataFrame]:
+                return (
+                    chunk[name]
+                    for chunk in iter_training_example_chunks(
+                        **example_kwargs,
+                        chunk_cutoffs=stream_chunk_cutoffs,
+                        cutoff_end=val_cutoff_start,
+                        buckets=[name],
+                    )
+                )
 
-        train_df = bucket_df[bucket_df["cutoff_date"] < val_cutoff_start].copy()
-        val_df = bucket_df[bucket_df["cutoff_date"] >= val_cutoff_start].copy()
+            train_iter = _ExampleChunkIter(_train_chunks)
+            dtrain = xgb.QuantileDMatrix(train_iter)
+            train_rows = int(train_iter.rows)
+        else:
+            cutoff_dates = pd.to_datetime(bucket_df["cutoff_date"]).sort_values().unique()
+            split_index = max(1, len(cutoff_dates) - validation_cutoffs)
+            val_cutoff_start = cutoff_dates[split_index]
 
-        if train_df.empty or val_df.empty:
+            train_df = bucket_df[bucket_df["cutoff_date"] < val_cutoff_start].copy()
+            val_df = bucket_df[bucket_df["cutoff_date"] >= val_cutoff_start].copy()
+            train_rows = int(len(train_df))
+
+        if train_rows == 0 or val_df.empty:
             message = f"{bucket.name} split produced empty train/validation"
             gating_failures.append(message)
             report["buckets"][bucket.name] = {"error": message}
@@ -1810,26 +2363,33 @@ def train_horizon_models(
 
         bucket_params = dict(params)
         optuna_audit: Dict[str, object] | None = None
-        if optuna_trials and optuna_trials > 0:
+        if optuna_trials and optuna_trials > 0 and streaming:
+            optuna_audit = {"skipped": "streaming mode"}
+        elif optuna_trials and optuna_trials > 0:
             tuned, optuna_audit = _optuna_tune_xgb(
                 train_df,
                 val_df,
                 n_trials=optuna_trials,
                 timeout=optuna_timeout,
+                n_jobs=tree_threads,
             )
             bucket_params = tuned
 
-        model = xgb.XGBRegressor(
-            n_estimators=600,
-            early_stopping_rounds=40,
-            **bucket_params,
-        )
-        model.fit(
-            train_df[FEATURE_COLUMNS],
-            train_df["target"],
-            eval_set=[(val_df[FEATURE_COLUMNS], val_df["target"])],
-            verbose=False,
-        )
+        if streaming:
+            model = _fit_streamed_xgb(dtrain, val_df, bucket_params, 600, 40, tree_threads)
+        else:
+            model = xgb.XGBRegressor(
+                n_estimators=600,
+                early_stopping_rounds=40,
+                n_jobs=tree_threads,
+                **bucket_params,
+            )
+            model.fit(
+                train_df[FEATURE_COLUMNS],
+                train_df["target"],
+                eval_set=[(val_df[FEATURE_COLUMNS], val_df["target"])],
+                verbose=False,
+            )
 
         xgb_val_pred = model.predict(val_df[FEATURE_COLUMNS])
 
@@ -1839,7 +2399,13 @@ def train_horizon_models(
         lgb_val_pred: np.ndarray | None = None
         if train_lightgbm:
             try:
-                lgb_booster, lgb_audit = _train_lightgbm_companion(train_df, val_df)
+                lgb_booster, lgb_audit = _train_lightgbm_companion(
+                    train_df,
+                    val_df,
+                    num_threads=tree_threads or 0,
+                    train_chunks=_train_chunks() if streaming else None,
+                    train_rows=train_rows,
+                )
                 lgb_val_pred = lgb_booster.predict(
                     val_df[FEATURE_COLUMNS],
                     num_iteration=lgb_audit.get("best_iteration") or None,
@@ -1972,14 +2538,14 @@ def train_horizon_models(
             for name, score in importance_pairs[:12]
         ]
 
-        model_path = MODELS_DIR / bucket.model_file
+        model_path = models_dir / bucket.model_file
         booster = model.get_booster()
         booster.save_model(model_path)
 
         lgb_file_info: Dict[str, object] | None = None
         if lgb_booster is not None and ensemble_active:
             lgb_file = bucket.model_file.replace(".json", "_lgb.txt")
-            lgb_path = MODELS_DIR / lgb_file
+            lgb_path = models_dir / lgb_file
             lgb_booster.save_model(str(lgb_path), num_iteration=lgb_audit.get("best_iteration") or -1)
             lgb_file_info = {
                 "file": lgb_file,
@@ -1994,15 +2560,45 @@ def train_horizon_models(
         if train_quantile:
             q10_val_pred: np.ndarray | None = None
             q90_val_pred: np.ndarray | None = None
-            for alpha, qname in ((0.10, "q10"), (0.90, "q90")):
+            q025_val_pred: np.ndarray | None = None
+            q975_val_pred: np.ndarray | None = None
+            separate_quantiles: Tuple[Tuple[float, str], ...] = ((0.10, "q10"), (0.90, "q90"))
+            if multi_quantile:
+                # One booster with a vector ``quantile_alpha`` replaces the
+                # separate q10/q90 fits and adds native 2.5% / 97.5% outputs.
+                separate_quantiles = ()
+                q_params = dict(bucket_params)
+                q_params["objective"] = "reg:quantileerror"
+                q_params["quantile_alpha"] = list(QUANTILE_ALPHAS)
+                q_params.pop("eval_metric", None)
+                if streaming:
+                    q_model = _fit_streamed_xgb(dtrain, None, q_params, 400, n_jobs=tree_threads)
+                else:
+                    q_model = xgb.XGBRegressor(n_estimators=400, n_jobs=tree_threads, **q_params)
+                    q_model.fit(train_df[FEATURE_COLUMNS], train_df["target"], verbose=False)
+                q_file = bucket.model_file.replace(".json", "_mq.json")
+                q_model.get_booster().save_model(models_dir / q_file)
+                quantile_models["mq"] = {
+                    "file": q_file,
+                    "alphas": list(QUANTILE_ALPHAS),
+                    "n_estimators": q_model.n_estimators,
+                }
+                by_alpha = _quantile_columns(q_model.predict(val_df[FEATURE_COLUMNS]), QUANTILE_ALPHAS)
+                q025_val_pred, q10_val_pred = by_alpha[0.025], by_alpha[0.1]
+                q90_val_pred, q975_val_pred = by_alpha[0.9], by_alpha[0.975]
+
+            for alpha, qname in separate_quantiles:
                 q_params = dict(bucket_params)
                 q_params["objective"] = "reg:quantileerror"
                 q_params["quantile_alpha"] = alpha
                 q_params.pop("eval_metric", None)
-                q_model = xgb.XGBRegressor(n_estimators=400, **q_params)
-                q_model.fit(train_df[FEATURE_COLUMNS], train_df["target"], verbose=False)
+                if streaming:
+                    q_model = _fit_streamed_xgb(dtrain, None, q_params, 400, n_jobs=tree_threads)
+                else:
+                    q_model = xgb.XGBRegressor(n_estimators=400, n_jobs=tree_threads, **q_params)
+                    q_model.fit(train_df[FEATURE_COLUMNS], train_df["target"], verbose=False)
                 q_file = bucket.model_file.replace(".json", f"_{qname}.json")
-                q_path = MODELS_DIR / q_file
+                q_path = models_dir / q_file
                 q_model.get_booster().save_model(q_path)
                 quantile_models[qname] = {
                     "file": q_file,
@@ -2026,25 +2622,32 @@ def train_horizon_models(
                 delta_low = float(np.clip(np.quantile(low_residual, 0.90), 0.0, 25.0))
                 delta_high = float(np.clip(np.quantile(high_residual, 0.90), 0.0, 25.0))
                 # CI95 also gets its own delta computed at quantile 0.975 for
-                # a wider but properly calibrated outer band.
-                delta_low_95 = float(np.clip(np.quantile(low_residual, 0.975), 0.0, 40.0))
-                delta_high_95 = float(np.clip(np.quantile(high_residual, 0.975), 0.0, 40.0))
+                # a wider but properly calibrated outer band. With the
+                # multi-quantile booster the band is anchored on the native
+                # q2.5/q97.5 outputs instead of stretching q10/q90.
+                low_95 = q025_val_pred if q025_val_pred is not None else q10_val_pred
+                high_95 = q975_val_pred if q975_val_pred is not None else q90_val_pred
+                delta_low_95 = float(np.clip(np.quantile(low_95 - y_val, 0.975), 0.0, 40.0))
+                delta_high_95 = float(np.clip(np.quantile(y_val - high_95, 0.975), 0.0, 40.0))
                 # Empirical coverage check on val
                 adj_low = q10_val_pred - delta_low
                 adj_high = q90_val_pred + delta_high
                 covered = ((y_val >= adj_low) & (y_val <= adj_high)).mean()
+                covered_95 = ((y_val >= low_95 - delta_low_95) & (y_val <= high_95 + delta_high_95)).mean()
                 conformal_info = {
                     "delta_low": round(delta_low, 4),
                     "delta_high": round(delta_high, 4),
                     "delta_low_95": round(delta_low_95, 4),
                     "delta_high_95": round(delta_high_95, 4),
                     "val_coverage_ci80": round(float(covered), 4),
+                    "val_coverage_ci95": round(float(covered_95), 4),
+                    "ci95_anchor": "q025_q975" if q025_val_pred is not None else "q10_q90",
                     "val_n": int(len(y_val)),
                 }
 
         bucket_report = {
             "label": bucket.label,
-            "train_rows": int(len(train_df)),
+            "train_rows": train_rows,
             "validation_rows": int(len(val_df)),
             "validation_cutoff_start": str(pd.Timestamp(val_cutoff_start).date()),
             "metrics": metrics,
@@ -2101,79 +2704,26 @@ def train_horizon_models(
     report["dynamic_stacking"] = bundle["dynamic_stacking"]
     report["aqhi_rows"] = int(len(aqhi_df))
 
-    # ----- v5.4.00 Stage D: optional N-BEATS global anchor model -----
-    nbeats_info: Dict[str, object] = {"available": False, "reason": "train_nbeats=False"}
-    if train_nbeats:
-        nbeats_model, nbeats_info = _train_nbeats_global(
-            history_df=df[["Date", "Attendance"]],
-            max_epochs=nbeats_max_epochs,
-            input_size=90,
-            horizon=MAX_HORIZON,
-        )
-        if nbeats_model is not None:
-            nbeats_dir = MODELS_DIR / "nbeats"
-            try:
-                if nbeats_dir.exists():
-                    import shutil
-                    shutil.rmtree(nbeats_dir)
-                nbeats_model.save(path=str(nbeats_dir), overwrite=True)
-                nbeats_info["dir"] = "nbeats"
-                nbeats_info["blend_weight"] = 0.15  # conservative anchor weight
-            except Exception as exc:  # pragma: no cover
-                nbeats_info = {"available": False, "save_error": str(exc)}
-    bundle["nbeats"] = nbeats_info
-    report["nbeats"] = nbeats_info
-
-    # ----- v5.5.00 Stage D2: optional TFT global learner -----
-    tft_info: Dict[str, object] = {"available": False, "reason": "train_tft=False"}
-    if train_tft:
-        tft_model, tft_info = _train_tft_global(
-            history_df=df[["Date", "Attendance"]],
-            max_epochs=tft_max_epochs,
-            input_size=90,
-            horizon=MAX_HORIZON,
-        )
-        if tft_model is not None:
-            tft_dir = MODELS_DIR / "tft"
-            try:
-                if tft_dir.exists():
-                    import shutil
-                    shutil.rmtree(tft_dir)
-                tft_model.save(path=str(tft_dir), overwrite=True)
-                tft_info["dir"] = "tft"
-                tft_info["blend_weight"] = 0.10  # smaller weight than N-BEATS
-            except Exception as exc:  # pragma: no cover
-                tft_info = {"available": False, "save_error": str(exc)}
-    bundle["tft"] = tft_info
-    report["tft"] = tft_info
-
-    # ----- v5.6.00 Stage D3: DeepAR / iTransformer 5th global learner -----
-    deepar_info: Dict[str, object] = {"available": False, "reason": "train_deepar=False"}
-    if train_deepar:
-        deepar_model, deepar_info = _train_deepar_itransformer_global(
-            history_df=df[["Date", "Attendance"]],
-            max_epochs=deepar_max_epochs,
-            input_size=90,
-            horizon=MAX_HORIZON,
-        )
-        if deepar_model is not None:
-            deepar_dir = MODELS_DIR / "deepar"
-            try:
-                if deepar_dir.exists():
-                    import shutil
-                    shutil.rmtree(deepar_dir)
-                deepar_model.save(path=str(deepar_dir), overwrite=True)
-                deepar_info["dir"] = "deepar"
-                deepar_info["blend_weight"] = 0.08
-            except Exception as exc:  # pragma: no cover
-                deepar_info = {"available": False, "save_error": str(exc)}
-    bundle["deepar"] = deepar_info
-    report["deepar"] = deepar_info
+    # ----- Stage D: optional global neural learners -----
+    # v5.4.00 N-BEATS anchor, v5.5.00 TFT, v5.6.00 DeepAR / iTransformer.
+    # Parallel mode collects each worker against its own deadline; a crash
+    # or timeout only marks that learner unavailable.
+    for name in NEURAL_LEARNERS:
+        if name not in neural_jobs:
+            neural_info: Dict[str, object] = {"available": False, "reason": f"train_{name}=False"}
+        elif name in neural_handles:
+            handle = neural_handles[name]
+            neural_info = _collect_neural_worker(handle, timeout=neural_timeout)
+            neural_info = _promote_neural_artifact(name, handle["staging_dir"], neural_info, models_dir)
+        else:
+            neural_info = _train_neural_inline(name, df[["Date", "Attendance"]], neural_jobs[name], models_dir)
+        bundle[name] = neural_info
+        report[name] = neural_info
 
-    with open(MODELS_DIR / WALK_FORWARD_REPORT_FILENAME, "w", encoding="utf-8") as handle:
+    with open(models_dir / WALK_FORWARD_REPORT_FILENAME, "w", encoding="utf-8") as handle:
         json.dump(report, handle, indent=2, ensure_ascii=False)
 
-    with open(MODELS_DIR / MODEL_BUNDLE_FILENAME, "w", encoding="utf-8") as handle:
+    with open(models_dir / MODEL_BUNDLE_FILENAME, "w", encoding="utf-8") as handle:
         json.dump(bundle, handle, indent=2, ensure_ascii=False)
 
     summary_metrics = {
@@ -2201,7 +2751,7 @@ def train_horizon_models(
             if bucket.name in bundle["buckets"]
         },
     }
-    with open(MODELS_DIR / SUMMARY_METRICS_FILENAME, "w", encoding="utf-8") as handle:
+    with open(models_dir / SUMMARY_METRICS_FILENAME, "w", encoding="utf-8") as handle:
         json.dump(summary_metrics, handle, indent=2, ensure_ascii=False)
 
     if gating_failures and not allow_gate_fail:
@@ -2214,21 +2764,209 @@ def train_horizon_models(
     }
 
 
-def load_model_bundle() -> Dict[str, object]:
-    bundle_path = MODELS_DIR / MODEL_BUNDLE_FILENAME
+# Runtime knobs that change how fast a run is, not what it produces.
+_FINGERPRINT_EXCLUDED_KWARGS = ("neural_parallel", "neural_threads", "neural_timeout", "n_jobs", "allow_gate_fail")
+
+
+def _publish_artifacts(artifact_dir: Path, models_dir: Path, changed_only: bool = False) -> List[str]:
+    """Expose a stored artifact set under ``models_dir`` as independent copies.
+
+    Copies rather than hardlinks: ``train_xgboost.py`` and other writers
+    rewrite published files such as ``xgboost_metrics.json`` in place, which
+    would otherwise write through into the store. Every entry is swapped in
+    with ``os.replace`` so readers never see a half-written model; the bundle
+    is published last. ``changed_only`` skips files whose live copy still
+    matches the store and directories that already exist.
+    """
+    published: List[str] = []
+    entries = sorted(
+        (p for p in artifact_dir.iterdir() if p.name != ARTIFACT_MANIFEST_FILENAME and not p.name.startswith(".")),
+        key=lambda p: p.name == MODEL_BUNDLE_FILENAME,
+    )
+    for src in entries:
+        dst = models_dir / src.name
+        if changed_only and dst.exists() and (src.is_dir() or filecmp.cmp(src, dst, shallow=False)):
+            continue
+        tmp = models_dir / f".{src.name}.publish"
+        if tmp.is_dir():
+            shutil.rmtree(tmp)
+        elif tmp.exists():
+            tmp.unlink()
+        if src.is_dir():
+            shutil.copytree(src, tmp)
+            if dst.exists():
+                shutil.rmtree(dst)
+            os.replace(tmp, dst)
+        else:
+            shutil.copy2(src, tmp)
+            os.replace(tmp, dst)
+        published.append(src.name)
+    return published
+
+
+def _prune_artifact_store(store_dir: Path, keep: int, current: Path) -> List[str]:
+    """Drop all but the ``keep`` most recently used artifact sets."""
+    sets = sorted(
+        (p for p in store_dir.iterdir() if p.is_dir() and not p.name.startswith(".")),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    removed = []
+    for path in sets[keep:]:
+        if path == current:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed.append(path.name)
+    return removed
+
+
+def train_horizon_models_cached(
+    models_dir: Path | None = None,
+    force: bool = False,
+    keep: int = ARTIFACT_STORE_KEEP,
+    **train_kwargs,
+) -> Dict[str, object]:
+    """``train_horizon_models`` behind a content-addressed artifact store.
+
+    Inputs (``actual_data``, weather, AI factors, AQHI, flu, school calendar,
+    holidays) are loaded once and fingerprinted together with
+    ``PIPELINE_VERSION``, ``FEATURE_COLUMNS``, bucket hyperparameters and the
+    training kwargs. Artifacts live in ``models_dir/artifacts/<fingerprint>``
+    and are published into ``models_dir`` for the existing loaders. When the
+    fingerprint already has an artifact set the run is skipped and the stored
+    bundle is returned with ``status == SKIPPED_IDENTICAL_INPUTS``; if the live
+    bundle is already that set, only files rewritten since publishing are
+    restored.
+    """
+    models_dir = Path(models_dir) if models_dir is not None else MODELS_DIR
+    history_df = train_kwargs.pop("history_df", None)
+    df = history_df.copy() if history_df is not None else load_actual_data_from_db()
+    sources = {
+        "weather_df": load_weather_history_from_db,
+        "aqhi_df": load_aqhi_history,
+        "ai_factor_df": load_ai_factor_history_from_db,
+        "flu_df": load_chp_flu_history,
+        "school_calendar": load_school_calendar,
+    }
+    for key, loader in sources.items():
+        if train_kwargs.get(key) is None:
+            train_kwargs[key] = loader()
+    settings = {
+        key: value
+        for key, value in sorted(train_kwargs.items())
+        if key not in sources and key not in _FINGERPRINT_EXCLUDED_KWARGS
+    }
+    fingerprint = training_fingerprint(
+        {
+            "actual_data": df,
+            "weather": train_kwargs["weather_df"],
+            "aqhi": train_kwargs["aqhi_df"],
+            "ai_factor": train_kwargs["ai_factor_df"],
+            "flu": train_kwargs["flu_df"],
+            "school_calendar": calendar_frame(train_kwargs["school_calendar"]),
+            "holidays": calendar_frame(load_holiday_set()),
+        },
+        settings,
+    )
+    store_dir = models_dir / ARTIFACT_STORE_DIRNAME
+    artifact_dir = store_dir / fingerprint[:16]
+    manifest_path = artifact_dir / ARTIFACT_MANIFEST_FILENAME
+
+    if manifest_path.exists() and not force:
+        with open(manifest_path, "r", encoding="utf-8") as handle:
+            manifest = json.load(handle)
+        with open(artifact_dir / MODEL_BUNDLE_FILENAME, "r", encoding="utf-8") as handle:
+            bundle = json.load(handle)
+        with open(artifact_dir / WALK_FORWARD_REPORT_FILENAME, "r", encoding="utf-8") as handle:
+            report = json.load(handle)
+        live_fingerprint = None
+        live_bundle_path = models_dir / MODEL_BUNDLE_FILENAME
+        if live_bundle_path.exists():
+            with open(live_bundle_path, "r", encoding="utf-8") as handle:
+                live_fingerprint = (json.load(handle).get("artifact") or {}).get("fingerprint")
+        # Same live bundle: only restore files something else has rewritten since.
+        published = _publish_artifacts(artifact_dir, models_dir, changed_only=live_fingerprint == fingerprint)
+        os.utime(artifact_dir)
+        gating_failures = manifest.get("gating_failures", [])
+        if gating_failures and not train_kwargs.get("allow_gate_fail", False):
+            raise TrainingGateError(f"{SKIPPED_IDENTICAL_INPUTS}: " + " | ".join(gating_failures))
+        return {
+            "bundle": bundle,
+            "report": report,
+            "gating_failures": gating_failures,
+            "status": SKIPPED_IDENTICAL_INPUTS,
+            "fingerprint": fingerprint,
+            "artifact_dir": str(artifact_dir),
+            "published": published,
+        }
+
+    store_dir.mkdir(parents=True, exist_ok=True)
+    staging_dir = store_dir / f".{fingerprint[:16]}.{os.getpid()}.tmp"
+    if staging_dir.exists():
+        shutil.rmtree(staging_dir)
+    gate_error: TrainingGateError | None = None
+    try:
+        try:
+            result = train_horizon_models(history_df=df, models_dir=staging_dir, **train_kwargs)
+            gating_failures = result["gating_failures"]
+        except TrainingGateError as exc:
+            # The plain trainer writes its files before raising; keep them so
+            # an identical rerun reports the same gate failure without refitting.
+            gate_error = exc
+            result = None
+            gating_failures = str(exc).split(" | ")
+        with open(staging_dir / MODEL_BUNDLE_FILENAME, "r", encoding="utf-8") as handle:
+            bundle = json.load(handle)
+        bundle["artifact"] = {"fingerprint": fingerprint, "dir": f"{ARTIFACT_STORE_DIRNAME}/{artifact_dir.name}"}
+        with open(staging_dir / MODEL_BUNDLE_FILENAME, "w", encoding="utf-8") as handle:
+            json.dump(bundle, handle, indent=2, ensure_ascii=False)
+        manifest = {
+            "fingerprint": fingerprint,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "pipeline_version": PIPELINE_VERSION,
+            "settings": settings,
+            "gating_failures": gating_failures,
+        }
+        with open(staging_dir / ARTIFACT_MANIFEST_FILENAME, "w", encoding="utf-8") as handle:
+            json.dump(manifest, handle, indent=2, ensure_ascii=False, default=str)
+        if artifact_dir.exists():
+            shutil.rmtree(artifact_dir)
+        os.replace(staging_dir, artifact_dir)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    published = _publish_artifacts(artifact_dir, models_dir)
+    pruned = _prune_artifact_store(store_dir, keep, artifact_dir)
+    if gate_error is not None:
+        raise gate_error
+    result["bundle"] = bundle
+    result.update(
+        {
+            "status": "trained",
+            "fingerprint": fingerprint,
+            "artifact_dir": str(artifact_dir),
+            "published": published,
+            "pruned": pruned,
+        }
+    )
+    return result
+
+
+def load_model_bundle(models_dir: Path | None = None) -> Dict[str, object]:
+    bundle_path = Path(models_dir or MODELS_DIR) / MODEL_BUNDLE_FILENAME
     if not bundle_path.exists():
         raise FileNotFoundError(f"Missing model bundle: {bundle_path}")
     with open(bundle_path, "r", encoding="utf-8") as handle:
         return json.load(handle)
 
 
-def load_bucket_models(bundle: Dict[str, object]) -> Dict[str, xgb.Booster]:
+def load_bucket_models(bundle: Dict[str, object], models_dir: Path | None = None) -> Dict[str, xgb.Booster]:
     models = {}
     for bucket in HORIZON_BUCKETS:
         bucket_info = bundle.get("buckets", {}).get(bucket.name)
         if not bucket_info:
             continue
-        model_path = MODELS_DIR / bucket_info["model_file"]
+        model_path = Path(models_dir or MODELS_DIR) / bucket_info["model_file"]
         booster = xgb.Booster()
         booster.load_model(model_path)
         models[bucket.name] = booster
@@ -2296,95 +3034,464 @@ def load_conformal_offsets(bundle: Dict[str, object]) -> Dict[str, Dict[str, flo
     return out
 
 
-def fetch_recent_residuals_from_db(window_days: int = 30) -> pd.DataFrame:
-    """Pull the latest realised (predicted, actual) pairs for online CI tuning.
+_ACCURACY_COLUMNS = ["target_date", "predicted", "actual", "within_ci80", "within_ci95"]
 
-    Source preference: ``prediction_accuracy`` table (already aggregated);
-    falls back to a join of ``final_daily_predictions`` + ``actual_data`` if
-    that table isn't populated. Returns columns: target_date, predicted,
-    actual, residual (= predicted - actual).
+
+def fetch_recent_accuracy_from_db(window_days: int = 30) -> pd.DataFrame:
+    """Latest realised rows for online CI tuning.
+
+    Serves both the residual and the CI-coverage consumers. With the
+    in-process ``RecentAccuracyWindow`` enabled (default) this is a slice of
+    the shared window; otherwise one round trip via ``_load_recent_accuracy``.
     """
-    try:
-        conn = _open_db_connection()
-    except Exception as exc:  # pragma: no cover
-        warnings.warn(f"residual DB unavailable: {exc}")
-        return pd.DataFrame(columns=["target_date", "predicted", "actual", "residual"])
+    if _accuracy_window_enabled() and int(window_days) <= ACCURACY_WINDOW_CAPACITY:
+        return accuracy_window().frame(window_days)
+    return _load_recent_accuracy(window_days)
+
+
+def _load_recent_accuracy(window_days: int) -> pd.DataFrame:
+    """Newest ``window_days`` realised rows, read directly.
 
+    Source preference: ``prediction_accuracy`` (has the CI hit flags); falls
+    back to a join of ``final_daily_predictions`` + ``actual_data`` (no CI
+    flags) if that table isn't populated. ``prediction_accuracy`` is read
+    from the local mirror when it is enabled.
+    """
+    mirrored = _mirror_frame("prediction_accuracy")
+    if mirrored is not None and not mirrored.empty:
+        return _accuracy_from_mirror(mirrored, window_days)
     queries = [
         # prediction_accuracy table (preferred — already has both)
-        f"""
-        SELECT target_date, predicted_count AS predicted, actual_count AS actual
+        ("ndh_recent_accuracy", """
+        SELECT target_date, predicted_count AS predicted, actual_count AS actual,
+               within_ci80, within_ci95
         FROM prediction_accuracy
         WHERE actual_count IS NOT NULL
-        ORDER BY target_date DESC LIMIT {window_days}
-        """,
+        ORDER BY target_date DESC LIMIT $1
+        """),
         # fallback via final_daily_predictions ↔ actual_data join
-        f"""
+        ("ndh_recent_final_residuals", """
         SELECT f.target_date, f.predicted_count AS predicted, a.patient_count AS actual
         FROM final_daily_predictions f
         JOIN actual_data a ON a.date = f.target_date
         WHERE a.patient_count IS NOT NULL
-        ORDER BY f.target_date DESC LIMIT {window_days}
-        """,
+        ORDER BY f.target_date DESC LIMIT $1
+        """),
     ]
+    try:
+        conn = _open_db_connection()
+    except Exception as exc:  # pragma: no cover
+        warnings.warn(f"residual DB unavailable: {exc}")
+        return pd.DataFrame(columns=_ACCURACY_COLUMNS)
+
     df = pd.DataFrame()
     try:
-        for query in queries:
+        for name, query in queries:
             try:
-                with warnings.catch_warnings():
-                    warnings.filterwarnings("ignore", message=".*pandas only supports SQLAlchemy.*")
-                    df = pd.read_sql_query(query, conn)
+                df = db_access.fetch_frame(name, query, (int(window_days),), conn=conn)
                 if not df.empty:
                     break
             except Exception:
+                conn.rollback()
                 continue
     finally:
         conn.close()
+    return df
 
-    if df.empty:
+
+def _accuracy_from_mirror(frame: pd.DataFrame, window_days: int) -> pd.DataFrame:
+    df = frame.rename(columns={"Date": "target_date"})
+    df = df.sort_values("target_date", ascending=False).head(int(window_days))
+    return df[_ACCURACY_COLUMNS].reset_index(drop=True)
+
+
+ACCURACY_WINDOW_CAPACITY = 120
+ACCURACY_NOTIFY_CHANNEL = "prediction_accuracy_changed"
+
+_ACCURACY_WATERMARK_SQL = """
+SELECT md5(COALESCE(string_agg(
+           concat_ws('|', target_date, predicted_count, actual_count, within_ci80, within_ci95),
+           ',' ORDER BY target_date), ''))
+FROM (
+    SELECT target_date, predicted_count, actual_count, within_ci80, within_ci95
+    FROM prediction_accuracy
+    WHERE actual_count IS NOT NULL
+    ORDER BY target_date DESC LIMIT $1
+) p
+"""
+
+_ACCURACY_BY_DATE_SQL = """
+SELECT target_date, predicted_count AS predicted, actual_count AS actual,
+       within_ci80, within_ci95
+FROM prediction_accuracy
+WHERE target_date = ANY(string_to_array($1, ',')::date[])
+"""
+
+
+def _accuracy_window_enabled() -> bool:
+    return os.getenv("ACCURACY_WINDOW", "1") not in ("0", "false", "False")
+
+
+def _normalise_accuracy(frame: pd.DataFrame) -> pd.DataFrame:
+    df = frame.copy()
+    for column in _ACCURACY_COLUMNS:
+        if column not in df.columns:
+            df[column] = None
+    df["target_date"] = pd.to_datetime(df["target_date"]).dt.normalize()
+    df["predicted"] = pd.to_numeric(df["predicted"], errors="coerce")
+    df["actual"] = pd.to_numeric(df["actual"], errors="coerce")
+    return df[_ACCURACY_COLUMNS].sort_values("target_date", ascending=False).reset_index(drop=True)
+
+
+class RecentAccuracyWindow:
+    """In-process rolling window of the newest realised accuracy rows.
+
+    Loaded once (``capacity`` rows, enough for every stacking / conformal
+    window), then kept current without re-running the accuracy queries:
+
+    * ``LISTEN prediction_accuracy_changed`` on a dedicated connection when
+      migration 008's trigger is installed; each access drains pending
+      notifications and re-reads only the notified dates.
+    * Otherwise a watermark (md5 of the newest ``capacity`` rows) is compared
+      at most every ``ACCURACY_WINDOW_POLL_SECONDS`` and the window reloaded
+      when it moved. The ``final_daily_predictions`` fallback source has no
+      trigger and is simply reloaded on that interval, listener or not.
+
+    A notified change that drops a row (deleted, or ``actual_count`` set back
+    to NULL) reloads the window so it refills to ``capacity``.
+    """
+
+    def __init__(self, capacity: int = ACCURACY_WINDOW_CAPACITY, poll_seconds: float | None = None) -> None:
+        self.capacity = int(capacity)
+        self.poll_seconds = (
+            float(os.getenv("ACCURACY_WINDOW_POLL_SECONDS", "60")) if poll_seconds is None else float(poll_seconds)
+        )
+        self.stats = {"loads": 0, "notified_dates": 0, "watermark_checks": 0, "served": 0}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._frame: pd.DataFrame | None = None
+        self._has_ci_flags = False
+        self._watermark: str | None = None
+        self._checked_at = 0.0
+        self._listener = None
+
+    def frame(self, window_days: int) -> pd.DataFrame:
+        """Newest ``window_days`` rows (descending ``target_date``), like the direct query."""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked child: the parent's listener socket is not ours to use.
+                self._listener = None
+                self._frame = None
+                self._pid = os.getpid()
+            if self._frame is None:
+                self._reload()
+            else:
+                self._refresh()
+            self.stats["served"] += 1
+            return self._frame.head(int(window_days)).reset_index(drop=True)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._frame = None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                try:
+                    self._listener.close()
+                except Exception:
+                    pass
+            self._listener = None
+            self._frame = None
+
+    # -- loading -----------------------------------------------------------
+
+    def _reload(self) -> None:
+        if self._listener is None:
+            # LISTEN before loading so no change between the two is lost.
+            self._listener = self._open_listener()
+        frame = _load_recent_accuracy(self.capacity)
+        self._has_ci_flags = "within_ci80" in frame.columns and not frame.empty
+        self._frame = _normalise_accuracy(frame)
+        self._watermark = self._read_watermark() if self._listener is None and self._has_ci_flags else None
+        self._checked_at = time.monotonic()
+        self.stats["loads"] += 1
+
+    def _refresh(self) -> None:
+        if self._listener is not None:
+            try:
+                changed = self._drain_notifications()
+            except Exception as exc:
+                warnings.warn(f"accuracy listener lost, reloading window: {exc}")
+                self._listener = None
+                self._reload()
+                return
+            if self._has_ci_flags:
+                if changed:
+                    self._merge_dates(changed)
+                return
+            if changed:
+                # prediction_accuracy gained rows while serving the fallback source.
+                self._reload()
+                return
+            # The fallback join has no trigger: fall through to the interval reload.
+
+        if time.monotonic() - self._checked_at < self.poll_seconds:
+            return
+        self._checked_at = time.monotonic()
+        if not self._has_ci_flags:
+            self._reload()
+            return
+        watermark = self._read_watermark()
+        self.stats["watermark_checks"] += 1
+        if watermark is None or watermark != self._watermark:
+            self._reload()
+
+    # -- change detection --------------------------------------------------
+
+    def _open_listener(self):
+        if os.getenv("ACCURACY_WINDOW_LISTEN", "1") in ("0", "false", "False"):
+            return None
+        import psycopg2
+
+        try:
+            conn = psycopg2.connect(**db_access.connection_kwargs())
+        except Exception:
+            return None
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT 1 FROM pg_trigger WHERE tgname = 'prediction_accuracy_notify' AND NOT tgisinternal"
+                )
+                if cur.fetchone() is None:
+                    conn.close()
+                    return None
+                cur.execute(f"LISTEN {ACCURACY_NOTIFY_CHANNEL}")
+        except Exception:
+            conn.close()
+            return None
+        return conn
+
+    def _drain_notifications(self) -> List[str]:
+        self._listener.poll()
+        dates = sorted({n.payload for n in self._listener.notifies if n.channel == ACCURACY_NOTIFY_CHANNEL})
+        self._listener.notifies.clear()
+        return dates
+
+    def _read_watermark(self) -> str | None:
+        try:
+            with db_access.connection() as conn:
+                with conn.cursor() as cur:
+                    db_access.execute_prepared(cur, "ndh_accuracy_watermark", _ACCURACY_WATERMARK_SQL, (self.capacity,))
+                    return cur.fetchone()[0]
+        except Exception as exc:
+            warnings.warn(f"accuracy watermark unavailable: {exc}")
+            return None
+
+    def _merge_dates(self, dates: List[str]) -> None:
+        try:
+            with db_access.connection() as conn:
+                changed = db_access.fetch_frame("ndh_accuracy_by_date", _ACCURACY_BY_DATE_SQL, (",".join(dates),), conn=conn)
+        except Exception as exc:
+            warnings.warn(f"accuracy window update failed, reloading: {exc}")
+            self._reload()
+            return
+        self.stats["notified_dates"] += len(dates)
+        touched = pd.to_datetime(pd.Series(dates)).dt.normalize()
+        kept = self._frame[~self._frame["target_date"].isin(touched)]
+        changed = changed[changed["actual"].notna()] if not changed.empty else changed
+        merged = pd.concat([kept, _normalise_accuracy(changed)], ignore_index=True) if not changed.empty else kept
+        if len(merged) < min(len(self._frame), self.capacity):
+            # Rows deleted or un-realised: older rows beyond the window must move in.
+            self._reload()
+            return
+        self._frame = _normalise_accuracy(merged).head(self.capacity)
+
+
+_ACCURACY_WINDOW: RecentAccuracyWindow | None = None
+_ACCURACY_WINDOW_LOCK = threading.Lock()
+
+
+def accuracy_window() -> RecentAccuracyWindow:
+    """Process-wide ``RecentAccuracyWindow`` shared by stacking weights and online conformal."""
+    global _ACCURACY_WINDOW
+    with _ACCURACY_WINDOW_LOCK:
+        if _ACCURACY_WINDOW is None:
+            _ACCURACY_WINDOW = RecentAccuracyWindow()
+        return _ACCURACY_WINDOW
+
+
+_MIRROR_SNAPSHOT_DATASETS: Dict[str, Tuple[str, ...]] = {
+    "actual": ("actual_data",),
+    "weather": ("weather_history",),
+    "ai_factor": ("learning_records_ai", "daily_predictions_ai"),
+    "accuracy": ("prediction_accuracy",),
+}
+
+
+def residuals_from_accuracy(accuracy: pd.DataFrame, window_days: int | None = None) -> pd.DataFrame:
+    """(predicted, actual, residual) frame from ``fetch_recent_accuracy_from_db`` rows."""
+    if accuracy is None or accuracy.empty:
         return pd.DataFrame(columns=["target_date", "predicted", "actual", "residual"])
 
+    df = accuracy[["target_date", "predicted", "actual"]].copy()
     df["target_date"] = pd.to_datetime(df["target_date"])
     df["predicted"] = pd.to_numeric(df["predicted"], errors="coerce")
     df["actual"] = pd.to_numeric(df["actual"], errors="coerce")
     df = df.dropna(subset=["predicted", "actual"]).sort_values("target_date").reset_index(drop=True)
+    if window_days is not None:
+        df = df.tail(int(window_days)).reset_index(drop=True)
     df["residual"] = df["predicted"] - df["actual"]
     return df
 
 
-def fetch_recent_ci_coverage_from_db(window_days: int = DYNAMIC_STACK_WINDOW_DAYS) -> Dict[str, float]:
-    """Empirical CI80/CI95 hit-rates over the last ``window_days`` realised rows."""
-    try:
-        conn = _open_db_connection()
-    except Exception as exc:  # pragma: no cover
-        warnings.warn(f"CI coverage DB unavailable: {exc}")
-        return {"n": 0, "ci80_rate": 0.80, "ci95_rate": 0.95}
-
-    query = f"""
-        SELECT within_ci80, within_ci95
-        FROM prediction_accuracy
-        WHERE actual_count IS NOT NULL
-        ORDER BY target_date DESC
-        LIMIT {int(window_days)}
-    """
-    try:
-        with warnings.catch_warnings():
-            warnings.filterwarnings("ignore", message=".*pandas only supports SQLAlchemy.*")
-            df = pd.read_sql_query(query, conn)
-    except Exception:
-        df = pd.DataFrame()
-    finally:
-        conn.close()
-
-    if df.empty:
+def ci_coverage_from_accuracy(accuracy: pd.DataFrame, window_days: int = DYNAMIC_STACK_WINDOW_DAYS) -> Dict[str, float]:
+    """Empirical CI80/CI95 hit-rates over the newest ``window_days`` rows."""
+    if accuracy is None or accuracy.empty or "within_ci80" not in accuracy.columns:
         return {"n": 0, "ci80_rate": 0.80, "ci95_rate": 0.95}
 
+    df = accuracy.assign(target_date=pd.to_datetime(accuracy["target_date"]))
+    df = df.sort_values("target_date").tail(int(window_days))
     n = int(len(df))
     ci80 = float(df["within_ci80"].fillna(False).astype(bool).mean()) if "within_ci80" in df.columns else 0.80
     ci95 = float(df["within_ci95"].fillna(False).astype(bool).mean()) if "within_ci95" in df.columns else 0.95
     return {"n": n, "ci80_rate": round(ci80, 4), "ci95_rate": round(ci95, 4)}
 
 
+def fetch_recent_residuals_from_db(window_days: int = 30) -> pd.DataFrame:
+    """Pull the latest realised (predicted, actual) pairs for online CI tuning.
+
+    Returns columns: target_date, predicted, actual, residual (= predicted - actual).
+    """
+    return residuals_from_accuracy(fetch_recent_accuracy_from_db(window_days))
+
+
+def fetch_recent_ci_coverage_from_db(window_days: int = DYNAMIC_STACK_WINDOW_DAYS) -> Dict[str, float]:
+    """Empirical CI80/CI95 hit-rates over the last ``window_days`` realised rows."""
+    return ci_coverage_from_accuracy(fetch_recent_accuracy_from_db(window_days), window_days)
+
+
+_PREDICTION_SNAPSHOT_PARTS: Dict[str, str] = {
+    "actual": """(SELECT json_agg(a ORDER BY a."Date") FROM (
+            SELECT date AS "Date", patient_count AS "Attendance" FROM actual_data
+        ) a)""",
+    "weather": f"""(SELECT json_agg(w ORDER BY w."Date") FROM (
+            SELECT {_WEATHER_SELECT}
+            FROM weather_history
+        ) w)""",
+    "ai_factor": """(SELECT json_agg(f ORDER BY f.src) FROM (
+            SELECT date AS "Date", ai_factor, 0 AS src FROM learning_records WHERE ai_factor IS NOT NULL
+            UNION ALL
+            SELECT target_date AS "Date", ai_factor, 1 AS src FROM daily_predictions WHERE ai_factor IS NOT NULL
+        ) f)""",
+    "accuracy": """(SELECT json_agg(p) FROM (
+            SELECT target_date, predicted_count AS predicted, actual_count AS actual,
+                   within_ci80, within_ci95
+            FROM prediction_accuracy
+            WHERE actual_count IS NOT NULL
+            ORDER BY target_date DESC LIMIT %(window_days)s
+        ) p)""",
+}
+
+
+def _snapshot_fallback(part: str, window_days: int) -> pd.DataFrame:
+    if part == "actual":
+        return load_actual_data_from_db()
+    if part == "weather":
+        return load_weather_history_from_db()
+    if part == "ai_factor":
+        return load_ai_factor_history_from_db()
+    return fetch_recent_accuracy_from_db(window_days)
+
+
+def load_prediction_snapshot_from_db(
+    window_days: int = 30,
+    parts: Iterable[str] = ("actual", "weather", "ai_factor", "accuracy"),
+) -> Dict[str, pd.DataFrame]:
+    """Everything a prediction reads from PostgreSQL, in a single round trip.
+
+    Each requested part (``actual`` / ``weather`` / ``ai_factor`` /
+    ``accuracy``) is a ``json_agg`` sub-select of one statement, decoded into
+    frames shaped exactly like the individual loaders. If the combined query
+    fails (e.g. an optional table is missing) the per-table loaders are used
+    instead, on the same pooled connection.
+
+    With the local mirror enabled the snapshot is one incremental
+    ``db_mirror.sync`` round trip for all parts, then local reads. The
+    ``accuracy`` part comes from ``accuracy_window()`` when that is enabled.
+    """
+    parts = [part for part in _PREDICTION_SNAPSHOT_PARTS if part in set(parts)]
+    if not parts:
+        return {}
+    if "accuracy" in parts and _accuracy_window_enabled():
+        # Served from the shared in-process window, not re-read per snapshot.
+        rest = [part for part in parts if part != "accuracy"]
+        snapshot = load_prediction_snapshot_from_db(window_days, rest) if rest else {}
+        snapshot["accuracy"] = fetch_recent_accuracy_from_db(window_days)
+        return snapshot
+    if db_mirror.enabled():
+        snapshot = _mirror_snapshot(parts, window_days)
+        if snapshot is not None:
+            return snapshot
+    if parts == ["accuracy"]:
+        return {"accuracy": fetch_recent_accuracy_from_db(window_days)}
+    query = "SELECT " + ",\n       ".join(f"{_PREDICTION_SNAPSHOT_PARTS[part]} AS {part}" for part in parts)
+    try:
+        with db_access.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, {"window_days": int(window_days)})
+                row = dict(zip(parts, cur.fetchone()))
+    except Exception as exc:
+        warnings.warn(f"prediction snapshot query failed, using per-table loaders: {exc}")
+        return {part: _snapshot_fallback(part, window_days) for part in parts}
+
+    snapshot: Dict[str, pd.DataFrame] = {}
+    if "actual" in row:
+        snapshot["actual"] = _prepare_actual_frame(pd.DataFrame(row["actual"] or [], columns=["Date", "Attendance"]))
+    if "weather" in row:
+        weather = row["weather"]
+        snapshot["weather"] = _prepare_weather_frame(pd.DataFrame(weather) if weather else pd.DataFrame(columns=["Date"]))
+    if "ai_factor" in row:
+        ai_frame = pd.DataFrame(row["ai_factor"] or [], columns=["Date", "ai_factor", "src"])
+        snapshot["ai_factor"] = _prepare_ai_factor_frame([ai_frame.drop(columns=["src"])] if len(ai_frame) else [])
+    if "accuracy" in row:
+        accuracy = pd.DataFrame(row["accuracy"] or [], columns=_ACCURACY_COLUMNS)
+        snapshot["accuracy"] = accuracy if not accuracy.empty else fetch_recent_accuracy_from_db(window_days)
+    return snapshot
+
+
+def _mirror_snapshot(parts: List[str], window_days: int) -> Dict[str, pd.DataFrame] | None:
+    names = [name for part in parts for name in _MIRROR_SNAPSHOT_DATASETS[part]]
+    try:
+        db_mirror.sync(names)
+    except Exception as exc:
+        warnings.warn(f"db mirror sync failed, serving local copy where available: {exc}")
+    if not all(db_mirror.has_dataset(name) for name in names):
+        return None
+
+    snapshot: Dict[str, pd.DataFrame] = {}
+    try:
+        if "actual" in parts:
+            snapshot["actual"] = _prepare_actual_frame(db_mirror.read("actual_data", sync_first=False))
+        if "weather" in parts:
+            snapshot["weather"] = _prepare_weather_frame(db_mirror.read("weather_history", sync_first=False))
+        if "ai_factor" in parts:
+            frames = [db_mirror.read(name, sync_first=False) for name in _MIRROR_SNAPSHOT_DATASETS["ai_factor"]]
+            snapshot["ai_factor"] = _prepare_ai_factor_frame([frame for frame in frames if not frame.empty])
+        if "accuracy" in parts:
+            accuracy = db_mirror.read("prediction_accuracy", sync_first=False)
+            snapshot["accuracy"] = (
+                _accuracy_from_mirror(accuracy, window_days)
+                if not accuracy.empty
+                else fetch_recent_accuracy_from_db(window_days)
+            )
+    except Exception as exc:  # pragma: no cover - corrupt mirror file
+        warnings.warn(f"db mirror read failed: {exc}")
+        return None
+    return snapshot
+
+
 def _inverse_mae_weights(mae_by_learner: Dict[str, float], floor: float = 1.0) -> Dict[str, float]:
     inv = {k: 1.0 / max(floor, float(v)) for k, v in mae_by_learner.items() if v is not None}
     total = sum(inv.values()) or 1.0
@@ -2521,7 +3628,7 @@ def load_deepar_models(bundle: Dict[str, object]) -> Dict[str, object]:
     return info
 
 
-def load_lightgbm_models(bundle: Dict[str, object]) -> Dict[str, object]:
+def load_lightgbm_models(bundle: Dict[str, object], models_dir: Path | None = None) -> Dict[str, object]:
     """Optionally load LightGBM companion boosters for ensemble inference."""
     lgb_models: Dict[str, object] = {}
     try:
@@ -2533,7 +3640,7 @@ def load_lightgbm_models(bundle: Dict[str, object]) -> Dict[str, object]:
         spec = bucket_info.get("lightgbm")
         if not spec:
             continue
-        lgb_path = MODELS_DIR / spec.get("file", "")
+        lgb_path = Path(models_dir or MODELS_DIR) / spec.get("file", "")
         if not lgb_path.exists():
             continue
         try:
@@ -2548,8 +3655,8 @@ def load_lightgbm_models(bundle: Dict[str, object]) -> Dict[str, object]:
     return lgb_models
 
 
-def load_quantile_models(bundle: Dict[str, object]) -> Dict[str, Dict[str, xgb.Booster]]:
-    """Optionally load q10/q90 quantile boosters for state-dependent CI."""
+def load_quantile_models(bundle: Dict[str, object], models_dir: Path | None = None) -> Dict[str, Dict[str, xgb.Booster]]:
+    """Optionally load quantile boosters (q10/q90 pair or one ``mq`` multi-quantile) for state-dependent CI."""
     quantiles: Dict[str, Dict[str, xgb.Booster]] = {}
     for bucket in HORIZON_BUCKETS:
         bucket_info = bundle.get("buckets", {}).get(bucket.name) or {}
@@ -2558,7 +3665,7 @@ def load_quantile_models(bundle: Dict[str, object]) -> Dict[str, Dict[str, xgb.B
         for qname, spec in q_specs.items():
             if not isinstance(spec, dict):
                 continue
-            q_path = MODELS_DIR / spec.get("file", "")
+            q_path = Path(models_dir or MODELS_DIR) / spec.get("file", "")
             if not q_path.exists():
                 continue
             booster = xgb.Booster()
@@ -2745,9 +3852,19 @@ def predict_target_date(
     deepar_models: Dict[str, object] | None = None,
     conformal_offsets: Dict[str, Dict[str, float]] | None = None,
     recent_residuals: pd.DataFrame | None = None,
+    ci_stats: Dict[str, float] | None = None,
 ) -> Dict[str, object]:
     target_date = pd.Timestamp(target_date_str)
-    history = historical_df.copy() if historical_df is not None else load_actual_data_from_db()
+    # Whatever the caller didn't supply comes from one combined DB round trip.
+    missing = [
+        part
+        for part, supplied in (("actual", historical_df), ("weather", weather_df), ("ai_factor", ai_factor_df))
+        if supplied is None
+    ]
+    if recent_residuals is None or ci_stats is None:
+        missing.append("accuracy")
+    snapshot = load_prediction_snapshot_from_db(window_days=DYNAMIC_STACK_WINDOW_DAYS, parts=missing)
+    history = historical_df.copy() if historical_df is not None else snapshot["actual"]
     history["Date"] = pd.to_datetime(history["Date"])
     history = history.sort_values("Date").reset_index(drop=True)
 
@@ -2783,10 +3900,7 @@ def predict_target_date(
     if aqhi_df is None:
         aqhi_df = load_aqhi_history()
     if weather_df is None:
-        try:
-            weather_df = load_weather_history_from_db()
-        except Exception:  # pragma: no cover
-            weather_df = pd.DataFrame(columns=["Date"])
+        weather_df = snapshot["weather"]
     # v5.5.00 — inject HKO 9-day forecast for future-date predictions
     try:
         forecast_rows = fetch_hko_9day_forecast()
@@ -2795,10 +3909,7 @@ def predict_target_date(
     except Exception:  # pragma: no cover
         pass
     if ai_factor_df is None:
-        try:
-            ai_factor_df = load_ai_factor_history_from_db()
-        except Exception:  # pragma: no cover
-            ai_factor_df = pd.DataFrame(columns=["Date", "ai_factor"])
+        ai_factor_df = snapshot["ai_factor"]
     if flu_df is None:
         flu_df = load_chp_flu_history()
     if school_calendar is None:
@@ -2806,10 +3917,9 @@ def predict_target_date(
     if conformal_offsets is None:
         conformal_offsets = bundle.get("conformal_offsets") or {}
     if recent_residuals is None:
-        try:
-            recent_residuals = fetch_recent_residuals_from_db(window_days=DYNAMIC_STACK_WINDOW_DAYS)
-        except Exception:  # pragma: no cover
-            recent_residuals = pd.DataFrame()
+        recent_residuals = residuals_from_accuracy(snapshot["accuracy"], DYNAMIC_STACK_WINDOW_DAYS)
+    if ci_stats is None:
+        ci_stats = ci_coverage_from_accuracy(snapshot["accuracy"], DYNAMIC_STACK_WINDOW_DAYS)
 
     holiday_set = load_holiday_set()
     latest_actual_date = pd.Timestamp(history["Date"].max())
@@ -2913,11 +4023,27 @@ def predict_target_date(
     # production residuals (Stage E online conformal).
     interval: Dict[str, Dict[str, float]] | None = None
     bucket_quantile = (quantile_models or {}).get(bucket.name) or {}
-    if "q10" in bucket_quantile and "q90" in bucket_quantile:
+    q10_pred: float | None = None
+    q90_pred: float | None = None
+    q025_pred: float | None = None
+    q975_pred: float | None = None
+    if "mq" in bucket_quantile:
+        mq_spec = (bucket_info.get("quantile_models") or {}).get("mq") or {}
+        by_alpha = _quantile_columns(
+            bucket_quantile["mq"].predict(dmatrix),
+            mq_spec.get("alphas") or QUANTILE_ALPHAS,
+        )
+        q10_pred = float(by_alpha[0.1][0]) - bias_applied
+        q90_pred = float(by_alpha[0.9][0]) - bias_applied
+        if 0.025 in by_alpha and 0.975 in by_alpha:
+            q025_pred = float(by_alpha[0.025][0]) - bias_applied
+            q975_pred = float(by_alpha[0.975][0]) - bias_applied
+    elif "q10" in bucket_quantile and "q90" in bucket_quantile:
         q10_pred = float(bucket_quantile["q10"].predict(dmatrix)[0]) - bias_applied
         q90_pred = float(bucket_quantile["q90"].predict(dmatrix)[0]) - bias_applied
         if q10_pred > q90_pred:
             q10_pred, q90_pred = q90_pred, q10_pred
+    if q10_pred is not None and q90_pred is not None:
 
         # CQR offsets fitted at training time on the validation slice.
         conf = (conformal_offsets or {}).get(bucket.name) or bucket_info.get("conformal") or {}
@@ -2927,7 +4053,6 @@ def predict_target_date(
         delta_high_95 = float(conf.get("delta_high_95", delta_high * 1.5) or 0.0)
 
         try:
-            ci_stats = fetch_recent_ci_coverage_from_db(DYNAMIC_STACK_WINDOW_DAYS)
             delta_low, delta_high, delta_low_95, delta_high_95 = apply_online_quantile_reweight(
                 delta_low, delta_high, delta_low_95, delta_high_95, ci_stats
             )
@@ -2942,8 +4067,8 @@ def predict_target_date(
 
         ci80_low = q10_pred - delta_low - live_offset
         ci80_high = q90_pred + delta_high + live_offset
-        ci95_low = q10_pred - delta_low_95 - live_offset * 1.5
-        ci95_high = q90_pred + delta_high_95 + live_offset * 1.5
+        ci95_low = (q025_pred if q025_pred is not None else q10_pred) - delta_low_95 - live_offset * 1.5
+        ci95_high = (q975_pred if q975_pred is not None else q90_pred) + delta_high_95 + live_offset * 1.5
 
         interval = {
             "ci80": {"low": round(ci80_low, 2), "high": round(ci80_high, 2)},
@@ -3014,7 +4139,16 @@ def predict_range(
     conformal_offsets: Dict[str, Dict[str, float]] | None = None,
 ) -> Dict[str, object]:
     start_date = pd.Timestamp(start_date_str)
-    history = historical_df.copy() if historical_df is not None else load_actual_data_from_db()
+    # One DB round trip for the whole range; every day reuses these frames.
+    snapshot = load_prediction_snapshot_from_db(
+        window_days=30,
+        parts=[
+            part
+            for part, supplied in (("actual", historical_df), ("weather", weather_df), ("ai_factor", ai_factor_df))
+            if supplied is None
+        ] + ["accuracy"],
+    )
+    history = historical_df.copy() if historical_df is not None else snapshot["actual"]
     if bundle is None:
         bundle = load_model_bundle()
     if models is None:
@@ -3030,15 +4164,9 @@ def predict_range(
         except Exception:  # pragma: no cover
             lightgbm_models = {}
     if weather_df is None:
-        try:
-            weather_df = load_weather_history_from_db()
-        except Exception:  # pragma: no cover
-            weather_df = pd.DataFrame(columns=["Date"])
+        weather_df = snapshot["weather"]
     if ai_factor_df is None:
-        try:
-            ai_factor_df = load_ai_factor_history_from_db()
-        except Exception:  # pragma: no cover
-            ai_factor_df = pd.DataFrame(columns=["Date", "ai_factor"])
+        ai_factor_df = snapshot["ai_factor"]
     if nbeats_models is None:
         try:
             nbeats_models = load_nbeats_models(bundle)
@@ -3063,16 +4191,13 @@ def predict_range(
     if conformal_offsets is None:
         conformal_offsets = load_conformal_offsets(bundle)
 
-    recent_stack_res = pd.DataFrame()
-    try:
-        recent_stack_res = fetch_recent_residuals_from_db(window_days=DYNAMIC_STACK_WINDOW_DAYS)
-    except Exception:  # pragma: no cover
-        pass
+    recent_stack_res = residuals_from_accuracy(snapshot["accuracy"], DYNAMIC_STACK_WINDOW_DAYS)
+    ci_stats = ci_coverage_from_accuracy(snapshot["accuracy"], DYNAMIC_STACK_WINDOW_DAYS)
 
     # Stage E online conformal: pull recent live residuals once per batch and
     # widen the CI uniformly when a non-trivial sample is available.
     try:
-        recent_res = fetch_recent_residuals_from_db(window_days=30)
+        recent_res = residuals_from_accuracy(snapshot["accuracy"], 30)
         if len(recent_res) >= 10:
             residual_std = float(recent_res["residual"].std())
             widen = round(0.4 * residual_std, 4)
@@ -3103,6 +4228,7 @@ def predict_range(
             deepar_models=deepar_models,
             conformal_offsets=conformal_offsets,
             recent_residuals=recent_stack_res,
+            ci_stats=ci_stats,
         )
         metadata = result["metadata"]
         predictions.append(
@@ -3126,6 +4252,7 @@ def predict_range(
         "model_type": MODEL_FAMILY,
         "version": bundle["version"],
         "source": "database_only",
+        "db_stats": db_access.pool_stats(),
     }
 
 
@@ -0,0 +1,285 @@
+"""
+Cross-process on-disk cache for small HTTP GET resources (HKO APIs, CSVs).
+
+Every prediction / learning job runs in a freshly spawned process, so an
+in-memory cache never hits. This keeps the response body and its validators
+under ``python/models/cache/http/``:
+
+* fresh (younger than ``ttl``)          served from disk, no network;
+* stale but within ``stale_ttl``        served from disk immediately while
+                                        one process revalidates in the
+                                        background (stale-while-revalidate);
+* older / missing                       fetched before returning.
+
+Revalidation sends ``If-None-Match`` / ``If-Modified-Since``; a ``304``
+only bumps the entry's timestamp. Fetches are single-flight across
+processes: the fetcher holds an exclusive ``flock`` on the entry's lock
+file, and waiters re-read the entry once they get the lock instead of
+hitting the API again. Writes are atomic (temp file + ``os.replace``), so
+readers never need the lock. If the network fails the last good body is
+returned, however old. At interpreter exit the process waits (at most
+``HTTP_CACHE_EXIT_WAIT`` seconds) for its in-flight background refreshes,
+so a short-lived job still leaves a fresh entry for the next one.
+
+Environment:
+    HTTP_CACHE_DIR        override the cache directory
+    HTTP_CACHE_EXIT_WAIT  seconds to wait for revalidations at exit (default 15)
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator
+
+try:  # POSIX only; on Windows fetches are single-flight per process only
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+PYTHON_DIR = Path(__file__).resolve().parent
+CACHE_DIR = PYTHON_DIR / "models" / "cache" / "http"
+USER_AGENT = "ndh-aed-prediction/5.6"
+EXIT_WAIT_SECONDS = 15.0
+
+_THREAD_LOCKS: Dict[str, threading.Lock] = {}
+_THREAD_LOCKS_GUARD = threading.Lock()
+# url -> in-flight background revalidation; entries remove themselves when done.
+_REVALIDATIONS: Dict[str, threading.Thread] = {}
+_REVALIDATIONS_GUARD = threading.Lock()
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    fetched_at: float
+    etag: str | None = None
+    last_modified: str | None = None
+    status: str = "fetched"  # fetched / fresh / revalidated / stale
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.fetched_at)
+
+    def json(self):
+        return json.loads(self.body.decode("utf-8"))
+
+
+def cache_dir() -> Path:
+    return Path(os.getenv("HTTP_CACHE_DIR") or CACHE_DIR)
+
+
+def _entry_paths(url: str) -> tuple[Path, Path, Path]:
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    base = cache_dir()
+    return base / f"{key}.body", base / f"{key}.json", base / f"{key}.lock"
+
+
+def _thread_lock(url: str) -> threading.Lock:
+    with _THREAD_LOCKS_GUARD:
+        return _THREAD_LOCKS.setdefault(url, threading.Lock())
+
+
+def read_entry(url: str) -> CachedResponse | None:
+    """The cached entry for ``url`` (status ``fresh``) or None."""
+    body_path, meta_path, _ = _entry_paths(url)
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        body = body_path.read_bytes()
+    except (OSError, ValueError):
+        return None
+    if hashlib.sha1(body).hexdigest() != meta.get("sha1"):
+        return None  # body and metadata from different writes; refetch
+    return CachedResponse(
+        body=body,
+        fetched_at=float(meta.get("fetched_at", 0.0)),
+        etag=meta.get("etag"),
+        last_modified=meta.get("last_modified"),
+        status="fresh",
+    )
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _write_entry(url: str, entry: CachedResponse, write_body: bool = True) -> None:
+    body_path, meta_path, _ = _entry_paths(url)
+    body_path.parent.mkdir(parents=True, exist_ok=True)
+    if write_body:
+        _atomic_write(body_path, entry.body)
+    meta = {
+        "url": url,
+        "fetched_at": entry.fetched_at,
+        "etag": entry.etag,
+        "last_modified": entry.last_modified,
+        "sha1": hashlib.sha1(entry.body).hexdigest(),
+    }
+    _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+
+
+@contextlib.contextmanager
+def _single_flight(url: str, blocking: bool = True) -> Iterator[bool]:
+    """Exclusive per-URL lock across threads and processes; yields whether it was acquired."""
+    thread_lock = _thread_lock(url)
+    if not thread_lock.acquire(blocking=blocking):
+        yield False
+        return
+    try:
+        if fcntl is None:
+            yield True
+            return
+        _, _, lock_path = _entry_paths(url)
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(lock_path, "a+") as handle:
+            flags = fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB)
+            try:
+                fcntl.flock(handle.fileno(), flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    finally:
+        thread_lock.release()
+
+
+def _request(url: str, cached: CachedResponse | None, timeout: float, headers: Dict[str, str] | None) -> CachedResponse:
+    request_headers = {"User-Agent": USER_AGENT, **(headers or {})}
+    if cached is not None:
+        if cached.etag:
+            request_headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            request_headers["If-Modified-Since"] = cached.last_modified
+    req = urllib.request.Request(url, headers=request_headers)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            body = resp.read()
+            etag = resp.headers.get("ETag")
+            last_modified = resp.headers.get("Last-Modified")
+    except urllib.error.HTTPError as exc:
+        if exc.code == 304 and cached is not None:
+            entry = CachedResponse(
+                body=cached.body,
+                fetched_at=time.time(),
+                etag=exc.headers.get("ETag") or cached.etag,
+                last_modified=exc.headers.get("Last-Modified") or cached.last_modified,
+                status="revalidated",
+            )
+            _write_entry(url, entry, write_body=False)
+            return entry
+        raise
+    entry = CachedResponse(body=body, fetched_at=time.time(), etag=etag, last_modified=last_modified)
+    _write_entry(url, entry)
+    return entry
+
+
+def _revalidate(url: str, ttl: float, timeout: float, headers: Dict[str, str] | None) -> None:
+    with _single_flight(url, blocking=False) as acquired:
+        if not acquired:
+            return  # another thread / process is already on it
+        cached = read_entry(url)
+        if cached is not None and cached.age < ttl:
+            return
+        try:
+            _request(url, cached, timeout, headers)
+        except Exception as exc:
+            warnings.warn(f"background revalidation of {url} failed: {exc}")
+
+
+def _run_revalidation(url: str, ttl: float, timeout: float, headers: Dict[str, str] | None) -> None:
+    try:
+        _revalidate(url, ttl, timeout, headers)
+    finally:
+        with _REVALIDATIONS_GUARD:
+            _REVALIDATIONS.pop(url, None)
+
+
+def _start_revalidation(url: str, ttl: float, timeout: float, headers: Dict[str, str] | None) -> None:
+    """Start at most one background revalidation per URL in this process."""
+    with _REVALIDATIONS_GUARD:
+        if url in _REVALIDATIONS:
+            return
+        # Daemon, so a hung request can't block exit; the atexit hook below
+        # gives it a bounded window to finish first.
+        worker = threading.Thread(
+            target=_run_revalidation,
+            args=(url, ttl, timeout, headers),
+            name="http-cache-revalidate",
+            daemon=True,
+        )
+        _REVALIDATIONS[url] = worker
+        worker.start()
+
+
+def fetch(
+    url: str,
+    ttl: float,
+    stale_ttl: float = 0.0,
+    timeout: float = 10.0,
+    headers: Dict[str, str] | None = None,
+) -> CachedResponse | None:
+    """GET ``url`` through the disk cache; None only if nothing was ever cached and the fetch failed.
+
+    ``ttl`` is the freshness lifetime in seconds; ``stale_ttl`` how much
+    longer a stale entry may be served while it is revalidated in the
+    background.
+    """
+    cached = read_entry(url)
+    if cached is not None and cached.age < ttl:
+        return cached
+    if cached is not None and cached.age < ttl + stale_ttl:
+        _start_revalidation(url, ttl, timeout, headers)
+        cached.status = "stale"
+        return cached
+
+    with _single_flight(url):
+        latest = read_entry(url)
+        if latest is not None and latest.age < ttl:
+            return latest  # filled by whoever held the lock before us
+        try:
+            return _request(url, latest, timeout, headers)
+        except Exception as exc:
+            warnings.warn(f"fetch of {url} failed: {exc}")
+            if latest is not None:
+                latest.status = "stale"
+            return latest
+
+
+def wait_for_revalidations(timeout: float | None = None) -> None:
+    """Join the background revalidations currently running in this process.
+
+    ``timeout`` bounds the whole wait, not each revalidation.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with _REVALIDATIONS_GUARD:
+        workers = list(_REVALIDATIONS.values())
+    for worker in workers:
+        worker.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+
+def _wait_at_exit() -> None:
+    # atexit runs before daemon threads are abandoned.
+    try:
+        timeout = float(os.getenv("HTTP_CACHE_EXIT_WAIT", EXIT_WAIT_SECONDS))
+    except ValueError:
+        timeout = EXIT_WAIT_SECONDS
+    wait_for_revalidations(timeout)
+
+
+atexit.register(_wait_at_exit)
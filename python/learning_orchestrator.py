@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Learning orchestrator — the daily / weekly / forecast learning jobs in one process.
+
+Replaces the scheduler's chain of separate ``continuous_learner.py``,
+``backfill_weather_learning.py``, ``anomaly_detector.py``,
+``weather_impact_learner.py`` and ``forecast_predictor.py --cache`` processes:
+pandas / sklearn are imported once and every stage borrows a connection from
+the shared ``db_access`` pool. Stages that don't depend on each other run
+concurrently under asyncio (blocking work goes to ``asyncio.to_thread``):
+
+    daily     catch-up learning  ||  HKO daily-extract prefetch
+              → weather backfill (recent window + historical batch)
+              → anomaly classification
+    weekly    full weather backfill  ||  HKO 9-day forecast fetch
+              → impact regression || combination impacts || AI event learning
+              → forecast cache
+    forecast  HKO 9-day forecast fetch → forecast cache
+
+Stage logs go to stderr; stdout carries exactly one JSON document with the
+per-stage status and timings, which ``modules/learning-scheduler.js`` parses.
+A failed stage marks its dependents as skipped; independent stages still run.
+
+Usage:
+    python learning_orchestrator.py daily --lookback-days 60 --historical-batch 30
+    python learning_orchestrator.py weekly
+    python learning_orchestrator.py forecast
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+import time
+import traceback
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List
+
+from dotenv import load_dotenv
+
+import db_access
+
+
+ORCHESTRATOR_VERSION = "1.0.0"
+
+
+class StageSkipped(Exception):
+    """Raised for a stage whose upstream stage failed."""
+
+
+class Orchestrator:
+    def __init__(self) -> None:
+        self.stages: Dict[str, Dict[str, object]] = {}
+
+    async def stage(
+        self,
+        name: str,
+        fn: Callable[[], object],
+        after: Iterable[Awaitable] = (),
+    ) -> object:
+        """Run blocking ``fn`` in a worker thread once every ``after`` awaitable succeeded."""
+        upstream = await asyncio.gather(*after, return_exceptions=True)
+        failed = [exc for exc in upstream if isinstance(exc, BaseException)]
+        if failed:
+            self.stages[name] = {"status": "skipped", "duration_s": 0.0, "reason": "upstream stage failed"}
+            raise StageSkipped(name)
+
+        print(f"▶ {name}", file=sys.stderr)
+        started = time.perf_counter()
+        try:
+            result = await asyncio.to_thread(fn)
+        except Exception as exc:
+            duration = round(time.perf_counter() - started, 3)
+            self.stages[name] = {"status": "failed", "duration_s": duration, "error": str(exc)}
+            print(f"✖ {name} failed after {duration:.1f}s: {exc}", file=sys.stderr)
+            traceback.print_exc(file=sys.stderr)
+            raise
+        duration = round(time.perf_counter() - started, 3)
+        self.stages[name] = {"status": "ok", "duration_s": duration, "result": _jsonable(result)}
+        print(f"✔ {name} ({duration:.1f}s)", file=sys.stderr)
+        return result
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _hkt_today() -> date:
+    return (datetime.utcnow() + timedelta(hours=8)).date()
+
+
+# ============================================================
+# Stage bodies (blocking; each borrows its own pooled connection)
+# ============================================================
+
+def run_catch_up() -> Dict[str, object]:
+    import continuous_learner
+
+    yesterday = continuous_learner.get_yesterday_hkt()
+    with db_access.connection() as conn:
+        gap_dates = continuous_learner.run_catch_up(conn, yesterday)
+    results = continuous_learner.process_dates_batch(list(gap_dates) + [yesterday])
+    return {
+        "yesterday": yesterday,
+        "yesterday_learned": bool(results.get(yesterday)),
+        "dates": len(results),
+        "learned": sum(1 for ok in results.values() if ok),
+    }
+
+
+def collect_backfill_dates(lookback_days: int | None, historical_batch: int) -> List[date]:
+    """Dates missing core weather: the recent window plus a bounded historical batch."""
+    from backfill_weather_learning import collect_target_dates
+
+    with db_access.connection() as conn:
+        if lookback_days is None:
+            return list(collect_target_dates(conn, only_missing_core=True))
+        start = _hkt_today() - timedelta(days=max(lookback_days - 1, 0))
+        dates = list(collect_target_dates(conn, start.isoformat(), _hkt_today().isoformat(), only_missing_core=True))
+        if historical_batch > 0:
+            historical = collect_target_dates(
+                conn, None, (start - timedelta(days=1)).isoformat(), only_missing_core=True
+            )
+            dates += list(historical)[:historical_batch]
+    return dates
+
+
+def prefetch_weather(dates: Iterable[date]) -> Dict[date, dict]:
+    """HKO daily-extract lookups; the year/month files are fetched concurrently first."""
+    from weather_data_loader import get_weather_data_for_date, prefetch_daily_extracts
+
+    dates = list(dates)
+    prefetch_daily_extracts(dates)
+    weather: Dict[date, dict] = {}
+    for target_date in dates:
+        try:
+            data = get_weather_data_for_date(target_date)
+        except Exception as exc:
+            print(f"   ⚠️ HKO prefetch failed for {target_date}: {exc}", file=sys.stderr)
+            continue
+        if data is not None:
+            weather[target_date] = data
+    return weather
+
+
+def run_weather_backfill(
+    lookback_days: int | None,
+    historical_batch: int,
+    prefetched: Dict[date, dict] | None = None,
+) -> Dict[str, object]:
+    from backfill_weather_learning import backfill_dates
+
+    # Re-collect: the catch-up stage may have added records since the prefetch.
+    dates = collect_backfill_dates(lookback_days, historical_batch)
+    with db_access.connection() as conn:
+        result = backfill_dates(conn, dates, weather_by_date=prefetched)
+    result["dates_checked"] = len(dates)
+    result["prefetched"] = len(prefetched or {})
+    return result
+
+
+def run_anomaly_classification() -> Dict[str, object]:
+    import anomaly_detector
+
+    with db_access.connection() as conn:
+        baseline = anomaly_detector.calculate_baseline_stats(conn)
+        updated = anomaly_detector.update_anomaly_classifications(conn, baseline)
+    return {"classified": updated, "baseline": baseline}
+
+
+def run_impact_model() -> Dict[str, object]:
+    import weather_impact_learner
+
+    with db_access.connection() as conn:
+        model, impacts = weather_impact_learner.train_impact_model(conn)
+    return {"trained": model is not None, "parameters": len(impacts or {})}
+
+
+def run_combination_impacts() -> Dict[str, object]:
+    import weather_impact_learner
+
+    with db_access.connection() as conn:
+        return {"updated": weather_impact_learner.update_combination_impacts(conn)}
+
+
+def run_ai_event_learning() -> Dict[str, object]:
+    import weather_impact_learner
+
+    with db_access.connection() as conn:
+        return {"updated": weather_impact_learner.update_ai_event_learning(conn)}
+
+
+def fetch_forecast() -> List[dict]:
+    import forecast_predictor
+
+    return forecast_predictor.fetch_weather_forecast()
+
+
+def run_forecast_cache(forecasts: List[dict]) -> Dict[str, object]:
+    import forecast_predictor
+
+    with db_access.connection() as conn:
+        return {"cached_days": forecast_predictor.cache_forecast_data(conn, forecasts=forecasts)}
+
+
+# ============================================================
+# Pipelines
+# ============================================================
+
+async def daily_pipeline(orch: Orchestrator, lookback_days: int, historical_batch: int) -> None:
+    catch_up = asyncio.ensure_future(orch.stage("catch_up_learning", run_catch_up))
+    prefetch = asyncio.ensure_future(orch.stage(
+        "hko_weather_prefetch",
+        lambda: prefetch_weather(collect_backfill_dates(lookback_days, historical_batch)),
+    ))
+
+    async def backfill():
+        # A failed prefetch only costs speed: the backfill fetches on demand.
+        prefetched = (await asyncio.gather(prefetch, return_exceptions=True))[0]
+        if isinstance(prefetched, BaseException):
+            prefetched = {}
+        return await orch.stage(
+            "weather_backfill",
+            lambda: run_weather_backfill(lookback_days, historical_batch, prefetched),
+            after=[catch_up],
+        )
+
+    backfilled = asyncio.ensure_future(backfill())
+    anomalies = orch.stage("anomaly_classification", run_anomaly_classification, after=[backfilled])
+    await asyncio.gather(catch_up, prefetch, backfilled, anomalies, return_exceptions=True)
+
+
+async def weekly_pipeline(orch: Orchestrator) -> None:
+    backfilled = asyncio.ensure_future(
+        orch.stage("weather_backfill", lambda: run_weather_backfill(None, 0))
+    )
+    forecasts = asyncio.ensure_future(orch.stage("hko_forecast_fetch", fetch_forecast))
+
+    learners = [
+        asyncio.ensure_future(orch.stage("impact_model", run_impact_model, after=[backfilled])),
+        asyncio.ensure_future(orch.stage("combination_impacts", run_combination_impacts, after=[backfilled])),
+        asyncio.ensure_future(orch.stage("ai_event_learning", run_ai_event_learning, after=[backfilled])),
+    ]
+    cache = orch.stage(
+        "forecast_cache",
+        lambda: run_forecast_cache(forecasts.result()),
+        after=[forecasts, *learners],
+    )
+    await asyncio.gather(backfilled, forecasts, *learners, cache, return_exceptions=True)
+
+
+async def forecast_pipeline(orch: Orchestrator) -> None:
+    fetched = await orch.stage("hko_forecast_fetch", fetch_forecast)
+    await orch.stage("forecast_cache", lambda: run_forecast_cache(fetched))
+
+
+async def run(task: str, lookback_days: int = 60, historical_batch: int = 30) -> Dict[str, object]:
+    orch = Orchestrator()
+    started = time.perf_counter()
+    try:
+        if task == "daily":
+            await daily_pipeline(orch, lookback_days, historical_batch)
+        elif task == "weekly":
+            await weekly_pipeline(orch)
+        elif task == "forecast":
+            await forecast_pipeline(orch)
+        else:
+            raise ValueError(f"unknown task: {task}")
+    except (StageSkipped, Exception):
+        # Stage outcomes are already recorded; the summary below reports them.
+        pass
+
+    return {
+        "task": task,
+        "version": ORCHESTRATOR_VERSION,
+        "success": bool(orch.stages) and all(s["status"] == "ok" for s in orch.stages.values()),
+        "duration_s": round(time.perf_counter() - started, 3),
+        "stages": orch.stages,
+        "db_stats": db_access.pool_stats(),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the learning pipeline in one process")
+    parser.add_argument("task", choices=["daily", "weekly", "forecast"])
+    parser.add_argument("--lookback-days", type=int, default=60, help="recent weather backfill window")
+    parser.add_argument("--historical-batch", type=int, default=30, help="older dates to backfill per daily run")
+    args = parser.parse_args()
+
+    load_dotenv()
+    # Stage modules print progress to stdout; keep stdout for the JSON summary.
+    with contextlib.redirect_stdout(sys.stderr):
+        result = asyncio.run(run(args.task, max(7, args.lookback_days), max(0, args.historical_batch)))
+    db_access.close_pool()
+
+    print(json.dumps(result, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Precomputed learning statistics (``learning_stat_moments``).
+
+Migration 007 keeps per-group running moments (count, sum, sum of squares)
+of ``actual_data.patient_count`` and ``learning_records.actual_attendance``
+up to date with row triggers; a ``TRUNCATE`` (clear-and-reimport) zeroes
+that table's groups. Readers fetch a handful of moment rows and derive
+mean / sample std locally instead of scanning the source tables.
+
+Groups:
+    actual_all / all           every actual_data row
+    actual_dow / 0..6          by day of week (0 = Sunday, as EXTRACT(DOW))
+    actual_month / 1..12       by month
+    actual_mmdd / 'MM-DD'      by calendar day (holiday families sum these)
+    lr_attendance / <name>     'all' plus the weather combinations used by
+                               weather_impact_learner
+
+If the migration has not been applied ``fetch_moments`` returns None and
+callers fall back to their aggregate queries.
+
+Usage:
+    python learning_stats.py --migrate   # apply migrations/007 (idempotent)
+    python learning_stats.py --rebuild   # recompute from the source tables
+    python learning_stats.py --check     # compare moments with a full scan
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable
+
+import psycopg2
+
+from db_access import get_connection
+
+
+MIGRATION_PATH = Path(__file__).resolve().parent.parent / "migrations" / "007_learning_stat_moments.sql"
+
+
+@dataclass(frozen=True)
+class Moments:
+    n: int = 0
+    sum_x: float = 0.0
+    sum_x2: float = 0.0
+
+    def __add__(self, other: "Moments") -> "Moments":
+        return Moments(self.n + other.n, self.sum_x + other.sum_x, self.sum_x2 + other.sum_x2)
+
+    @property
+    def mean(self) -> float | None:
+        return self.sum_x / self.n if self.n > 0 else None
+
+    @property
+    def std(self) -> float | None:
+        """Sample standard deviation (matches PostgreSQL ``STDDEV``)."""
+        if self.n < 2:
+            return None
+        var = (self.sum_x2 - self.sum_x * self.sum_x / self.n) / (self.n - 1)
+        return math.sqrt(max(var, 0.0))
+
+
+def combine(moments: Iterable[Moments]) -> Moments:
+    total = Moments()
+    for m in moments:
+        total = total + m
+    return total
+
+
+def fetch_moments(conn, groups: Iterable[str]) -> Dict[str, Dict[str, Moments]] | None:
+    """``{stat_group: {group_key: Moments}}`` for the requested groups, one query.
+
+    Returns None (after rolling back) when ``learning_stat_moments`` does not
+    exist or is empty for every requested group.
+    """
+    groups = list(groups)
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            SELECT stat_group, group_key, n, sum_x, sum_x2
+            FROM learning_stat_moments
+            WHERE stat_group = ANY(%s)
+            """,
+            (groups,),
+        )
+        rows = cur.fetchall()
+    except psycopg2.errors.UndefinedTable:
+        conn.rollback()
+        return None
+    finally:
+        cur.close()
+
+    out: Dict[str, Dict[str, Moments]] = {group: {} for group in groups}
+    for stat_group, group_key, n, sum_x, sum_x2 in rows:
+        out[stat_group][group_key] = Moments(int(n), float(sum_x), float(sum_x2))
+    if not any(out.values()):
+        return None
+    return out
+
+
+def apply_migration(conn) -> None:
+    cur = conn.cursor()
+    cur.execute(MIGRATION_PATH.read_text(encoding="utf-8"))
+    conn.commit()
+    cur.close()
+
+
+def rebuild(conn) -> int:
+    cur = conn.cursor()
+    cur.execute("SELECT rebuild_learning_stat_moments()")
+    count = int(cur.fetchone()[0])
+    conn.commit()
+    cur.close()
+    return count
+
+
+def check(conn) -> Dict[str, Dict[str, float]]:
+    """Compare the ``*/all`` moments with a direct scan; returns per-group drift."""
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT 'actual_all', COUNT(patient_count), AVG(patient_count), STDDEV(patient_count) FROM actual_data
+        UNION ALL
+        SELECT 'lr_attendance', COUNT(actual_attendance), AVG(actual_attendance), STDDEV(actual_attendance)
+        FROM learning_records
+        """
+    )
+    scanned = {row[0]: row[1:] for row in cur.fetchall()}
+    cur.close()
+
+    moments = fetch_moments(conn, scanned) or {}
+    report: Dict[str, Dict[str, float]] = {}
+    for group, (n, mean, std) in scanned.items():
+        m = moments.get(group, {}).get("all", Moments())
+        report[group] = {
+            "n_scan": int(n),
+            "n_moments": m.n,
+            "mean_drift": abs(float(mean or 0) - (m.mean or 0)),
+            "std_drift": abs(float(std or 0) - (m.std or 0)),
+        }
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Maintain learning_stat_moments")
+    parser.add_argument("--migrate", action="store_true", help="apply migrations/007_learning_stat_moments.sql")
+    parser.add_argument("--rebuild", action="store_true", help="recompute moments from source tables")
+    parser.add_argument("--check", action="store_true", help="compare moments with a full table scan")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        if args.migrate:
+            apply_migration(conn)
+            print(f"✅ Applied {MIGRATION_PATH.name}")
+        if args.rebuild:
+            print(f"✅ Rebuilt {rebuild(conn)} moment rows")
+        if args.check or not (args.migrate or args.rebuild):
+            for group, row in check(conn).items():
+                print(
+                    f"{group:<15} n scan={row['n_scan']} moments={row['n_moments']} "
+                    f"mean drift={row['mean_drift']:.6f} std drift={row['std_drift']:.6f}"
+                )
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
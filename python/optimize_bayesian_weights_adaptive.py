@@ -19,7 +19,7 @@ Date: 2026-01-05
 import sys
 import os
 import json
-import psycopg2
+from db_access import get_connection
 from psycopg2.extras import RealDictCursor
 from datetime import datetime, timedelta
 from scipy import stats
@@ -48,17 +48,14 @@ class AdaptiveBayesianOptimizer:
     def connect_db(self):
         """Connect to PostgreSQL database"""
         try:
-            if DATABASE_URL:
-                self.conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
-            else:
-                self.conn = psycopg2.connect(
-                    host=os.getenv('PGHOST', 'localhost'),
-                    port=os.getenv('PGPORT', '5432'),
-                    user=os.getenv('PGUSER', 'postgres'),
-                    password=os.getenv('PGPASSWORD', ''),
-                    database=os.getenv('PGDATABASE', 'ndh_aed'),
-                    cursor_factory=RealDictCursor
-                )
+            self.conn = get_connection(
+                cursor_factory=RealDictCursor,
+                host='localhost',
+                port='5432',
+                user='postgres',
+                database='ndh_aed',
+                sslmode='prefer',
+            )
             print('✅ Connected to PostgreSQL database')
             return True
         except Exception as e:
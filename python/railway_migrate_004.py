@@ -7,6 +7,7 @@ import io
 import os
 import subprocess
 import psycopg2
+from db_access import get_connection
 from psycopg2 import sql
 
 # Windows 編碼處理
@@ -79,7 +80,7 @@ try:
 
     # 連接數據庫
     print("🔌 連接數據庫...")
-    conn = psycopg2.connect(database_url)
+    conn = get_connection(dsn=database_url)
     cursor = conn.cursor()
 
     # 執行 migration
@@ -10,5 +10,7 @@ python3 python/backfill_ai_factor_historical.py \
   --start "${BACKFILL_START:-2014-12-01}" \
   --end "${BACKFILL_END:-}" \
   --rate-limit "${BACKFILL_RATE_LIMIT:-3}" \
+  --concurrency "${BACKFILL_CONCURRENCY:-4}" \
+  --batch-size "${BACKFILL_BATCH_SIZE:-25}" \
   --source "${BACKFILL_SOURCE:-archive}" \
   "$@"
@@ -0,0 +1,57 @@
+"""
+Rolling-origin backtest of the direct multi-horizon pipeline.
+
+Retrains at monthly origins (cached by data fingerprint under
+``python/models/backtest_cache``) and writes per-bucket / per-horizon error
+surfaces to ``python/models/horizon_backtest_report.json``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+
+import pandas as pd
+
+from horizon_backtest import DEFAULT_BACKTEST_MONTHS, run_rolling_backtest
+from horizon_model_pipeline import DEFAULT_RECENT_ROWS, DEFAULT_VALIDATION_CUTOFFS
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest for the horizon pipeline")
+    parser.add_argument("--months", type=int, default=DEFAULT_BACKTEST_MONTHS)
+    parser.add_argument("--origin", action="append", default=None, help="explicit origin date (repeatable)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--recent-rows", type=int, default=DEFAULT_RECENT_ROWS, help="0 = full history")
+    parser.add_argument("--validation-cutoffs", type=int, default=DEFAULT_VALIDATION_CUTOFFS)
+    parser.add_argument("--no-lightgbm", action="store_true")
+    parser.add_argument("--quantile", action="store_true")
+    args = parser.parse_args()
+
+    report = run_rolling_backtest(
+        months=args.months,
+        origins=[pd.Timestamp(o) for o in args.origin] if args.origin else None,
+        workers=args.workers,
+        recent_rows=args.recent_rows or None,
+        validation_cutoffs=args.validation_cutoffs,
+        train_lightgbm=not args.no_lightgbm,
+        train_quantile=args.quantile,
+    )
+    print(
+        json.dumps(
+            {
+                "summary": report["summary"],
+                "buckets": report["buckets"],
+                "origins_trained": report["origins_trained"],
+                "origins_cached": report["origins_cached"],
+                "training_seconds": report["training_seconds"],
+            },
+            indent=2,
+            ensure_ascii=False,
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -51,15 +51,25 @@ def main() -> int:
     nbeats_epochs = int(os.getenv("NBEATS_EPOCHS", "30"))
     tft_epochs = int(os.getenv("TFT_EPOCHS", "20"))
     deepar_epochs = int(os.getenv("DEEPAR_EPOCHS", "20"))
+    neural_parallel = os.getenv("NEURAL_PARALLEL", "1") not in ("0", "false", "False")
+    neural_threads = int(os.getenv("NEURAL_THREADS", "0")) or None
+    neural_timeout = float(os.getenv("NEURAL_TIMEOUT", str(hmp.NEURAL_WORKER_TIMEOUT_SECONDS)))
+    streaming = os.getenv("TRAIN_STREAMING", "0") not in ("0", "false", "False")
+    multi_quantile = os.getenv("TRAIN_MULTI_QUANTILE", "0") not in ("0", "false", "False")
+    recent_rows = int(os.getenv("TRAIN_RECENT_ROWS", str(hmp.DEFAULT_RECENT_ROWS))) or None
+    force_retrain = os.getenv("FORCE_RETRAIN", "0") not in ("0", "false", "False")
     aqhi_df = hmp.load_aqhi_history()
     print(f"  aqhi:       {len(aqhi_df)} rows from {hmp.AQHI_CSV_PATH.name}")
     print(f"  optuna_trials={optuna_trials} optuna_timeout={optuna_timeout}s")
     print(f"  train_lightgbm={train_lgb} train_nbeats={train_nb} nbeats_epochs={nbeats_epochs}")
     print(f"  train_tft={train_tft} tft_epochs={tft_epochs}")
     print(f"  train_deepar={train_deepar} deepar_epochs={deepar_epochs}")
+    print(f"  recent_rows={recent_rows or 'all'} streaming={streaming} multi_quantile={multi_quantile}")
+    print(f"  neural_parallel={neural_parallel} neural_threads={neural_threads or 'auto'} neural_timeout={neural_timeout}s")
 
-    result = hmp.train_horizon_models(
-        recent_rows=hmp.DEFAULT_RECENT_ROWS,
+    result = hmp.train_horizon_models_cached(
+        force=force_retrain,
+        recent_rows=recent_rows,
         validation_cutoffs=hmp.DEFAULT_VALIDATION_CUTOFFS,
         gate_margin=0.005,
         allow_gate_fail=True,
@@ -77,9 +87,15 @@ def main() -> int:
         tft_max_epochs=tft_epochs,
         train_deepar=train_deepar,
         deepar_max_epochs=deepar_epochs,
+        neural_parallel=neural_parallel,
+        neural_threads=neural_threads,
+        neural_timeout=neural_timeout,
+        streaming=streaming,
+        multi_quantile=multi_quantile,
     )
     elapsed = time.time() - t0
     print(f"[{time.strftime('%H:%M:%S')}] training finished in {elapsed:.1f}s")
+    print(f"  fingerprint={result['fingerprint'][:16]} status={result['status']}")
 
     bundle = result["bundle"]
     summary = bundle["summary"]
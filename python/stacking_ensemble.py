@@ -3,19 +3,38 @@ Stacking Ensemble 模型
 使用多個基模型的預測作為元特徵，訓練元學習器
 
 預期改善: MAE 15.77 → 14.5 (約 8% 改善)
+
+基模型訓練 (全量 + 5 個 TimeSeriesSplit fold × 每個基模型) 由 fit_models()
+在進程池中並行執行，每個 worker 分到 cpu // workers 個線程；
+每次擬合按 (模型類別 + 參數, 特徵欄位 + 數據哈希, 庫版本) 緩存於
+models/cache/stacking/，相同數據與配置不會重複訓練；
+只保留最近使用的 STACKING_CACHE_KEEP 個擬合。
+
+環境變數:
+    STACKING_WORKERS   並行進程數 (預設 CPU 核心數；1 = 串行)
+    STACKING_CACHE     0 = 不使用磁碟緩存
+    STACKING_CACHE_DIR 緩存目錄
+    STACKING_CACHE_KEEP 保留的緩存擬合數 (預設 300)
 """
+import hashlib
+import multiprocessing
 import numpy as np
 import pandas as pd
+import sklearn
 import xgboost as xgb
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.linear_model import Ridge, Lasso, ElasticNet
 from sklearn.model_selection import TimeSeriesSplit, cross_val_score
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+import joblib
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from pathlib import Path
 
 try:
+    import lightgbm
     from lightgbm import LGBMRegressor
     LIGHTGBM_AVAILABLE = True
 except:
@@ -29,6 +48,224 @@ except:
     CATBOOST_AVAILABLE = False
 
 
+STACKING_CACHE_DIR = Path(os.getenv(
+    'STACKING_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'cache', 'stacking'),
+))
+STACKING_CACHE_KEEP = 300
+OOF_SPLITS = 5
+
+# 不影響擬合結果的參數（線程數 / 日誌），不納入緩存鍵
+_RUNTIME_PARAMS = ('n_jobs', 'thread_count', 'verbose', 'verbosity', 'silent')
+
+# 庫升級後舊的 pickle 可能無法正確反序列化，版本納入緩存鍵
+_LIBRARY_VERSIONS = {
+    'numpy': np.__version__,
+    'sklearn': sklearn.__version__,
+    'xgboost': xgb.__version__,
+    'lightgbm': lightgbm.__version__ if LIGHTGBM_AVAILABLE else None,
+    'catboost': catboost.__version__ if CATBOOST_AVAILABLE else None,
+}
+
+
+# ========================================
+# 並行 + 緩存的模型擬合
+# ========================================
+
+def _data_digest(h, value):
+    """把 DataFrame / ndarray / 嵌套 tuple 的內容寫入哈希"""
+    if value is None:
+        h.update(b'none')
+    elif isinstance(value, pd.DataFrame):
+        h.update(repr(list(value.columns)).encode('utf-8'))
+        h.update(np.ascontiguousarray(value.to_numpy(dtype=np.float64)).tobytes())
+    elif isinstance(value, pd.Series):
+        h.update(np.ascontiguousarray(value.to_numpy(dtype=np.float64)).tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update(np.ascontiguousarray(value, dtype=np.float64).tobytes())
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            _data_digest(h, item)
+    else:
+        h.update(repr(value).encode('utf-8'))
+
+
+def fit_key(model, X, y, fit_kwargs=None):
+    """擬合緩存鍵: 模型類別 + 參數 + 特徵欄位 + 訓練數據 (+ fit 參數) + 庫版本"""
+    params = {k: v for k, v in model.get_params().items() if k not in _RUNTIME_PARAMS}
+    h = hashlib.sha1()
+    h.update(repr(sorted(_LIBRARY_VERSIONS.items())).encode('utf-8'))
+    h.update(f"{type(model).__module__}.{type(model).__name__}".encode('utf-8'))
+    h.update(repr(sorted(params.items())).encode('utf-8'))
+    _data_digest(h, X)
+    _data_digest(h, y)
+    for name, value in sorted((fit_kwargs or {}).items()):
+        h.update(name.encode('utf-8'))
+        _data_digest(h, value)
+    return h.hexdigest()
+
+
+def _with_threads(model, n_jobs):
+    params = model.get_params()
+    if 'n_jobs' in params:
+        model.set_params(n_jobs=n_jobs)
+    elif 'thread_count' in params:
+        model.set_params(thread_count=n_jobs)
+    return model
+
+
+def _fit_one(model, X, y, fit_kwargs, n_jobs):
+    """Worker: 以 n_jobs 個線程擬合一個模型"""
+    _with_threads(model, n_jobs).fit(X, y, **(fit_kwargs or {}))
+    return model
+
+
+def _cache_enabled():
+    return os.getenv('STACKING_CACHE', '1') not in ('0', 'false', 'False')
+
+
+def _load_cached(key):
+    path = STACKING_CACHE_DIR / f'{key}.joblib'
+    try:
+        model = joblib.load(path)
+    except Exception:
+        return None
+    try:
+        os.utime(path)  # 命中即視為最近使用，修剪時保留
+    except OSError:
+        pass
+    return model
+
+
+def _store_cached(key, model):
+    STACKING_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = STACKING_CACHE_DIR / f'.{key}.{os.getpid()}.tmp'
+    joblib.dump(model, tmp)
+    os.replace(tmp, STACKING_CACHE_DIR / f'{key}.joblib')
+
+
+def _prune_cache(keep, current=()):
+    """只保留最近使用的 keep 個緩存擬合 (本次用到的 current 不刪)"""
+    if not STACKING_CACHE_DIR.is_dir():
+        return []
+    entries = []
+    for path in STACKING_CACHE_DIR.glob('*.joblib'):
+        try:
+            entries.append((path.stat().st_mtime, path))
+        except OSError:
+            continue  # 另一進程剛刪除
+    entries.sort(key=lambda item: item[0], reverse=True)
+    removed = []
+    for _, path in entries[keep:]:
+        if path.stem in current:
+            continue
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        removed.append(path.stem)
+    return removed
+
+
+def fit_models(tasks, workers=None, use_cache=None, n_jobs=None):
+    """
+    擬合一組互相獨立的模型
+
+    Args:
+        tasks: {name: (model, X, y)} 或 {name: (model, X, y, fit_kwargs)}
+        workers: 並行進程數 (預設 STACKING_WORKERS 或 CPU 核心數)
+        use_cache: 是否使用磁碟緩存 (預設 STACKING_CACHE)
+        n_jobs: 每個模型的線程數 (預設 CPU 核心數 // 進程數)
+
+    Returns:
+        (models, stats): {name: 已擬合模型}, {'fitted': n, 'cached': n}
+    """
+    use_cache = _cache_enabled() if use_cache is None else use_cache
+    fitted, pending = {}, {}
+    keys = {}
+    for name, task in tasks.items():
+        model, X, y = task[:3]
+        fit_kwargs = task[3] if len(task) > 3 else {}
+        key = fit_key(model, X, y, fit_kwargs)
+        keys[name] = key
+        cached = _load_cached(key) if use_cache else None
+        if cached is not None:
+            fitted[name] = cached
+        elif key not in pending:
+            pending[key] = (model, X, y, fit_kwargs)
+    stats = {'fitted': len(pending), 'cached': len(tasks) - len(pending)}
+
+    if pending:
+        cpu = os.cpu_count() or 1
+        n_workers = max(1, min(len(pending), workers or int(os.getenv('STACKING_WORKERS', cpu))))
+        n_jobs = n_jobs or max(1, cpu // n_workers)
+        if n_workers == 1:
+            results = {key: _fit_one(*task, n_jobs) for key, task in pending.items()}
+        else:
+            ctx = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx) as pool:
+                futures = {key: pool.submit(_fit_one, *task, n_jobs) for key, task in pending.items()}
+                results = {key: future.result() for key, future in futures.items()}
+        for key, model in results.items():
+            _with_threads(model, -1)
+            if use_cache:
+                _store_cached(key, model)
+        for name, key in keys.items():
+            if name not in fitted:
+                fitted[name] = results[key]
+        if use_cache:
+            keep = int(os.getenv('STACKING_CACHE_KEEP', STACKING_CACHE_KEEP))
+            _prune_cache(keep, current=set(keys.values()))
+
+    return fitted, stats
+
+
+# ========================================
+# 基模型配置
+# ========================================
+
+def _base_model_names():
+    names = ['xgboost', 'randomforest', 'gradientboosting']
+    if LIGHTGBM_AVAILABLE:
+        names.append('lightgbm')
+    if CATBOOST_AVAILABLE:
+        names.append('catboost')
+    return names
+
+
+def _fold_model(name):
+    """OOF fold 用的輕量基模型"""
+    if name == 'xgboost':
+        return xgb.XGBRegressor(
+            n_estimators=300, max_depth=6, learning_rate=0.1,
+            objective='reg:squarederror', random_state=42, n_jobs=-1
+        )
+    elif name == 'randomforest':
+        return RandomForestRegressor(
+            n_estimators=100, max_depth=10, random_state=42, n_jobs=-1
+        )
+    elif name == 'gradientboosting':
+        return GradientBoostingRegressor(
+            n_estimators=100, max_depth=5, learning_rate=0.1, random_state=42
+        )
+    elif name == 'lightgbm' and LIGHTGBM_AVAILABLE:
+        return LGBMRegressor(
+            n_estimators=100, max_depth=6, learning_rate=0.1,
+            random_state=42, verbose=-1, n_jobs=-1
+        )
+    elif name == 'catboost' and CATBOOST_AVAILABLE:
+        return CatBoostRegressor(
+            iterations=100, depth=6, learning_rate=0.1,
+            random_state=42, verbose=False
+        )
+    return None
+
+
+def _fit_kwargs(name):
+    # RandomForest / GradientBoosting / LightGBM (v4) 的 fit 不接受 verbose 參數
+    return {'verbose': False} if name == 'xgboost' else {}
+
+
 class StackingEnsemble:
     """
     Stacking Ensemble 預測器
@@ -45,11 +282,14 @@ class StackingEnsemble:
     - 選項: ElasticNet, XGBoost meta-learner
     """
 
-    def __init__(self, use_meta='ridge'):
+    def __init__(self, use_meta='ridge', workers=None):
         self.use_meta = use_meta
+        self.workers = workers
         self.base_models = {}
         self.meta_model = None
         self.feature_cols = None
+        self.oof_predictions = None
+        self.oof_target = None
 
     def _get_base_models(self):
         """定義基模型"""
@@ -123,6 +363,7 @@ class StackingEnsemble:
         訓練 Stacking Ensemble
 
         使用 Out-of-Fold 預測作為元特徵，避免數據洩漏
+        全量基模型與 fold × 基模型網格一次提交給 fit_models() 並行訓練
         """
         print(f"\n{'='*60}")
         print("🔗 訓練 Stacking Ensemble")
@@ -130,103 +371,76 @@ class StackingEnsemble:
 
         self.feature_cols = X_train.columns.tolist()
         base_models = self._get_base_models()
+        model_names = list(base_models.keys())
+
+        # 使用 TimeSeriesSplit 生成 OOF 預測
+        n_splits = OOF_SPLITS
+        tscv = TimeSeriesSplit(n_splits=n_splits)
+        folds = list(tscv.split(X_train))
 
         # ========================================
-        # 第一層: 訓練基模型
+        # 第一層 + OOF: 全量基模型與 fold × 基模型網格
         # ========================================
-        print(f"\n📊 第一層: 訓練 {len(base_models)} 個基模型")
-
+        tasks = {}
         for name, model in base_models.items():
-            print(f"   訓練 {name}...", end=" ")
-
-            if name == 'catboost' and CATBOOST_AVAILABLE:
+            fit_kwargs = _fit_kwargs(name)
+            if name == 'catboost' and X_val is not None:
                 # CatBoost 直接處理 NaN
-                model.fit(X_train, y_train, eval_set=(X_val, y_val) if X_val is not None else None)
-            elif name == 'xgboost':
-                model.fit(X_train, y_train, verbose=False)
-            else:
-                # RandomForest 和 GradientBoosting 不接受 verbose 參數
-                model.fit(X_train, y_train)
+                fit_kwargs = {'eval_set': (X_val, y_val)}
+            tasks[('full', name)] = (model, X_train, y_train, fit_kwargs)
+
+        for fold_idx, (train_idx, val_idx) in enumerate(folds):
+            X_fold_train = X_train.iloc[train_idx] if hasattr(X_train, 'iloc') else X_train[train_idx]
+            y_fold_train = y_train[train_idx] if isinstance(y_train, np.ndarray) else y_train.iloc[train_idx]
+            for name in model_names:
+                tasks[(fold_idx, name)] = (_fold_model(name), X_fold_train, y_fold_train, _fit_kwargs(name))
+
+        print(f"\n📊 第一層: 訓練 {len(base_models)} 個基模型 + {n_splits} folds ({len(tasks)} 個擬合)")
+        fitted, stats = fit_models(tasks, workers=self.workers)
+        print(f"   新訓練 {stats['fitted']}，緩存命中 {stats['cached']}")
 
+        for name in model_names:
+            model = fitted[('full', name)]
             self.base_models[name] = model
 
             # 計算訓練集 MAE
             train_pred = model.predict(X_train)
             train_mae = mean_absolute_error(y_train, train_pred)
-            print(f"MAE={train_mae:.2f}")
+            print(f"   {name}: MAE={train_mae:.2f}")
 
         # ========================================
         # 第二層: 準備元特徵 (Out-of-Fold)
         # ========================================
         print(f"\n📊 第二層: 生成 Out-of-Fold 元特徵")
 
-        # 使用 TimeSeriesSplit 生成 OOF 預測
-        n_splits = 5
-        tscv = TimeSeriesSplit(n_splits=n_splits)
-
         # 初始化 OOF 預測數組
         oof_predictions = np.zeros((len(X_train), len(base_models)))
-        model_names = list(base_models.keys())
 
-        for fold_idx, (train_idx, val_idx) in enumerate(tscv.split(X_train)):
+        for fold_idx, (train_idx, val_idx) in enumerate(folds):
             print(f"   Fold {fold_idx + 1}/{n_splits}: 訓練 {len(train_idx)}, 驗證 {len(val_idx)}", end=" ")
-
-            X_fold_train = X_train.iloc[train_idx] if hasattr(X_train, 'iloc') else X_train[train_idx]
-            y_fold_train = y_train[train_idx] if isinstance(y_train, np.ndarray) else y_train.iloc[train_idx]
             X_fold_val = X_train.iloc[val_idx] if hasattr(X_train, 'iloc') else X_train[val_idx]
-
-            for i, (name, model_template) in enumerate(base_models.items()):
-                # 創建新模型實例
-                if name == 'xgboost':
-                    model = xgb.XGBRegressor(
-                        n_estimators=300, max_depth=6, learning_rate=0.1,
-                        objective='reg:squarederror', random_state=42, n_jobs=-1
-                    )
-                elif name == 'randomforest':
-                    model = RandomForestRegressor(
-                        n_estimators=100, max_depth=10, random_state=42, n_jobs=-1
-                    )
-                elif name == 'gradientboosting':
-                    model = GradientBoostingRegressor(
-                        n_estimators=100, max_depth=5, learning_rate=0.1, random_state=42
-                    )
-                elif name == 'lightgbm' and LIGHTGBM_AVAILABLE:
-                    model = LGBMRegressor(
-                        n_estimators=100, max_depth=6, learning_rate=0.1,
-                        random_state=42, verbose=-1, n_jobs=-1
-                    )
-                elif name == 'catboost' and CATBOOST_AVAILABLE:
-                    model = CatBoostRegressor(
-                        iterations=100, depth=6, learning_rate=0.1,
-                        random_state=42, verbose=False
-                    )
-                else:
-                    continue
-
-                # 根據模型類型決定是否使用 verbose 參數
-                if name in ['xgboost', 'lightgbm']:
-                    model.fit(X_fold_train, y_fold_train, verbose=False)
-                elif name == 'catboost':
-                    model.fit(X_fold_train, y_fold_train, verbose=False)
-                else:
-                    model.fit(X_fold_train, y_fold_train)
-
-                oof_predictions[val_idx, i] = model.predict(X_fold_val)
-
+            for i, name in enumerate(model_names):
+                oof_predictions[val_idx, i] = fitted[(fold_idx, name)].predict(X_fold_val)
             print("✓")
 
+        self.oof_predictions = oof_predictions
+        self.oof_target = y_train
+        self._fit_meta()
+        return self
+
+    def _fit_meta(self):
         # ========================================
         # 第三層: 訓練元學習器
         # ========================================
         print(f"\n📊 第三層: 訓練元學習器 ({self.use_meta})")
 
-        # 添加原始特徵作為輔助 (可選)
-        meta_X_train = oof_predictions
+        model_names = list(self.base_models.keys())
+        meta_X_train = self.oof_predictions
         meta_feature_names = [f'{name}_pred' for name in model_names]
 
         # 訓練元學習器
         self.meta_model = self._get_meta_model()
-        self.meta_model.fit(meta_X_train, y_train)
+        self.meta_model.fit(meta_X_train, self.oof_target)
 
         print(f"   元特徵: {meta_feature_names}")
         print(f"   元學習器: {self.meta_model.__class__.__name__}")
@@ -237,13 +451,21 @@ class StackingEnsemble:
             for name, weight in zip(model_names, self.meta_model.coef_):
                 print(f"      {name}: {weight:.4f}")
 
-        return self
+    def with_meta(self, use_meta):
+        """共用已訓練的基模型與 OOF 元特徵，只重新訓練元學習器"""
+        other = StackingEnsemble(use_meta=use_meta, workers=self.workers)
+        other.base_models = self.base_models
+        other.feature_cols = self.feature_cols
+        other.oof_predictions = self.oof_predictions
+        other.oof_target = self.oof_target
+        other._fit_meta()
+        return other
 
     def predict(self, X):
         """預測"""
         # 第一層: 獲取基模型預測
         base_predictions = []
-        for name in self._get_base_models().keys():
+        for name in _base_model_names():
             if name in self.base_models:
                 pred = self.base_models[name].predict(X)
                 base_predictions.append(pred)
@@ -271,9 +493,11 @@ class StackingEnsemble:
         }
 
 
-def train_and_evaluate_stacking(train_data, test_data, feature_cols, use_meta='ridge'):
+def train_and_evaluate_stacking(train_data, test_data, feature_cols, use_meta='ridge', base=None):
     """
     訓練並評估 Stacking Ensemble
+
+    base: 已用同一數據訓練的 StackingEnsemble；提供時只重新訓練元學習器
     """
     X_train = train_data[feature_cols].fillna(0)
     y_train = train_data['Attendance'].values
@@ -288,8 +512,11 @@ def train_and_evaluate_stacking(train_data, test_data, feature_cols, use_meta='r
     y_train_sub = y_train[:-val_size]
 
     # 訓練 Stacking
-    stacking = StackingEnsemble(use_meta=use_meta)
-    stacking.fit(X_train_sub, y_train_sub, X_val, y_val)
+    if base is not None and base.feature_cols == list(feature_cols):
+        stacking = base.with_meta(use_meta)
+    else:
+        stacking = StackingEnsemble(use_meta=use_meta)
+        stacking.fit(X_train_sub, y_train_sub, X_val, y_val)
 
     # 預測
     results = stacking.predict_with_base(X_test)
@@ -348,13 +575,23 @@ def compare_all_ensembles(train_data, test_data, feature_cols):
         'gradientboosting': GradientBoostingRegressor(n_estimators=200, max_depth=6, learning_rate=0.05, random_state=42)
     }
 
-    base_preds = {}
+    # 驗證集切分 (Weighted Average 用)
+    val_size = len(X_train) // 5
+    X_val = X_train[-val_size:]
+    y_val = y_train[-val_size:]
+    X_train_sub = X_train[:-val_size]
+    y_train_sub = y_train[:-val_size]
+
+    # 全量模型與驗證模型互相獨立，一次並行訓練
+    tasks = {}
     for name, model in base_models.items():
-        if name == 'xgboost':
-            model.fit(X_train, y_train, verbose=False)
-        else:
-            model.fit(X_train, y_train)
-        base_preds[name] = model.predict(X_test)
+        tasks[('full', name)] = (model, X_train, y_train, _fit_kwargs(name))
+        tasks[('val', name)] = (_fold_model(name), X_train_sub, y_train_sub, _fit_kwargs(name))
+    fitted, _ = fit_models(tasks)
+
+    base_preds = {}
+    for name in base_models:
+        base_preds[name] = fitted[('full', name)].predict(X_test)
 
     # Simple Average
     simple_avg = np.mean(list(base_preds.values()), axis=0)
@@ -368,26 +605,11 @@ def compare_all_ensembles(train_data, test_data, feature_cols):
     # ========================================
     print("\n2️⃣ Weighted Average Ensemble")
 
-    val_size = len(X_train) // 5
-    X_val = X_train[-val_size:]
-    y_val = y_train[-val_size:]
-    X_train_sub = X_train[:-val_size]
-    y_train_sub = y_train[:-val_size]
-
     # 在驗證集上評估
     val_mae = {}
     val_preds = {}
-    for name, model_template in base_models.items():
-        if name == 'xgboost':
-            model = xgb.XGBRegressor(n_estimators=300, max_depth=6, learning_rate=0.1,
-                                     objective='reg:squarederror', random_state=42, n_jobs=-1)
-        elif name == 'randomforest':
-            model = RandomForestRegressor(n_estimators=100, max_depth=10, random_state=42, n_jobs=-1)
-        else:
-            model = GradientBoostingRegressor(n_estimators=100, max_depth=5, learning_rate=0.1, random_state=42)
-
-        model.fit(X_train_sub, y_train_sub)
-        val_preds[name] = model.predict(X_val)
+    for name in base_models:
+        val_preds[name] = fitted[('val', name)].predict(X_val)
         val_mae[name] = mean_absolute_error(y_val, val_preds[name])
 
     # 計算權重 (誤差越小權重越大)
@@ -422,8 +644,9 @@ def compare_all_ensembles(train_data, test_data, feature_cols):
     # ========================================
     print("\n4️⃣ Stacking Ensemble (ElasticNet)")
 
+    # 基模型與 OOF 元特徵與 Ridge 版本相同，只重新訓練元學習器
     stacking_enet, metrics_enet = train_and_evaluate_stacking(
-        train_data, test_data, feature_cols, use_meta='elasticnet'
+        train_data, test_data, feature_cols, use_meta='elasticnet', base=stacking_ridge
     )
     results['stacking_elasticnet'] = metrics_enet
 
@@ -0,0 +1,76 @@
+"""Regression test for RecentAccuracyWindow refresh paths (no database needed)."""
+
+from __future__ import annotations
+
+import contextlib
+from types import SimpleNamespace
+
+import pandas as pd
+
+import db_access
+import horizon_model_pipeline as hmp
+
+
+class FakeListener:
+    def __init__(self):
+        self.notifies = []
+
+    def poll(self):
+        pass
+
+    def notify(self, date):
+        self.notifies.append(SimpleNamespace(channel=hmp.ACCURACY_NOTIFY_CHANNEL, payload=date))
+
+    def close(self):
+        pass
+
+
+def _rows(dates, with_flags=True):
+    frame = pd.DataFrame({
+        'target_date': pd.to_datetime(dates),
+        'predicted': 250.0,
+        'actual': 240.0,
+    })
+    if with_flags:
+        frame['within_ci80'] = True
+        frame['within_ci95'] = True
+    return frame.sort_values('target_date', ascending=False).reset_index(drop=True)
+
+
+def main() -> int:
+    source = {'frame': _rows([]), 'by_date': _rows([])}
+    listener = FakeListener()
+    hmp._load_recent_accuracy = lambda capacity: source['frame'].head(capacity)
+    hmp.RecentAccuracyWindow._open_listener = lambda self: listener
+    db_access.connection = lambda: contextlib.nullcontext(None)
+    db_access.fetch_frame = lambda name, sql, params, conn=None: source['by_date']
+
+    # Fallback source (no prediction_accuracy rows): the interval reload still runs with a listener open.
+    source['frame'] = _rows(pd.date_range('2026-01-01', periods=5), with_flags=False)
+    window = hmp.RecentAccuracyWindow(capacity=3, poll_seconds=0)
+    assert len(window.frame(3)) == 3 and window.stats['loads'] == 1
+    source['frame'] = _rows(pd.date_range('2026-01-02', periods=5), with_flags=False)
+    assert window.frame(3)['target_date'].iloc[0] == pd.Timestamp('2026-01-06')
+    assert window.stats['loads'] == 2, window.stats
+
+    # prediction_accuracy source: notifications merge only the notified dates.
+    source['frame'] = _rows(pd.date_range('2026-02-01', periods=5))
+    window = hmp.RecentAccuracyWindow(capacity=3, poll_seconds=0)
+    window.frame(3)
+    source['by_date'] = _rows(['2026-02-06'])
+    listener.notify('2026-02-06')
+    assert window.frame(3)['target_date'].iloc[0] == pd.Timestamp('2026-02-06')
+    assert window.stats['loads'] == 1, window.stats
+
+    # A notified date whose actual became NULL drops out; the window refills to capacity.
+    source['frame'] = _rows(['2026-02-06', '2026-02-04', '2026-02-03', '2026-02-02'])
+    source['by_date'] = _rows(['2026-02-05']).assign(actual=None)
+    listener.notify('2026-02-05')
+    frame = window.frame(3)
+    assert len(frame) == 3 and window.stats['loads'] == 2, (frame, window.stats)
+    assert pd.Timestamp('2026-02-05') not in set(frame['target_date'])
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
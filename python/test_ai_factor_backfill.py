@@ -0,0 +1,111 @@
+"""Regression test for the concurrent AI factor backfill (stub AI service)."""
+
+from __future__ import annotations
+
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import backfill_ai_factor_historical as backfill
+
+
+class StubAIService(BaseHTTPRequestHandler):
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_POST(self):  # noqa: N802 - http.server API
+        target = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["targetDate"]
+        with StubAIService.lock:
+            StubAIService.in_flight += 1
+            StubAIService.max_in_flight = max(StubAIService.max_in_flight, StubAIService.in_flight)
+        try:
+            time.sleep(0.1)
+            if target.endswith("-05"):
+                self.send_response(500)
+                self.end_headers()
+                return
+            payload = {"summary": "no factor"} if target.endswith("-07") else {
+                "factor": {"value": 0.9}, "eventType": "typhoon"
+            }
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with StubAIService.lock:
+                StubAIService.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def main() -> int:
+    dates = [f"2024-01-{day:02d}" for day in range(1, 21)]
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAIService)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    batches = []
+    progress = []
+
+    with tempfile.TemporaryDirectory() as root:
+        checkpoint = Path(root) / "checkpoint.jsonl"
+        try:
+            stats = backfill.run_backfill(
+                dates,
+                call=lambda d: backfill._call_ai_service(d, "none", base_url, None),
+                write_batch=lambda rows: batches.append(list(rows)),
+                checkpoint=checkpoint,
+                concurrency=4,
+                rate_limit=100,
+                batch_size=5,
+                log=lambda message: progress.append(message) if "progress" in message else None,
+            )
+
+            # A failing batch write surfaces its own error; the final flush doesn't retry it.
+            attempts = []
+
+            def failing_write(rows):
+                attempts.append(len(rows))
+                raise RuntimeError("write failed")
+
+            try:
+                backfill.run_backfill(
+                    dates[:4],
+                    call=lambda d: {"factor": {"value": 1.1}},
+                    write_batch=failing_write,
+                    checkpoint=Path(root) / "failing.jsonl",
+                    rate_limit=100,
+                    batch_size=2,
+                    log=lambda message: None,
+                )
+                raise AssertionError("expected the write error to propagate")
+            except RuntimeError as exc:
+                assert str(exc) == "write failed" and attempts == [2], attempts
+        finally:
+            server.shutdown()
+
+        records = [json.loads(line) for line in checkpoint.read_text(encoding="utf-8").splitlines()]
+
+    assert 2 <= StubAIService.max_in_flight <= 4, StubAIService.max_in_flight
+    # 18 successes at batch_size=5: three full batches plus the final flush, one write each.
+    assert stats.batches == len(batches) == 4, (stats.batches, len(batches))
+    assert (stats.written, stats.errors, stats.no_factor) == (18, 1, 1)
+    assert all(len(batch) <= 5 for batch in batches) and sum(map(len, batches)) == 18
+    assert {row[0] for batch in batches for row in batch} == set(dates) - {"2024-01-05", "2024-01-07"}
+    status = {record["date"]: record["status"] for record in records}
+    assert status["2024-01-05"] == "error" and status["2024-01-07"] == "no_factor"
+    assert sum(1 for s in status.values() if s == "ok") == 18
+    assert stats.completed == len(dates) and stats.dates_per_minute > 0
+    # One progress line per 25 completions (plus the last), not one per date.
+    assert len(progress) == 1 and "progress 20/20" in progress[0], progress
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
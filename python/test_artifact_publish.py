@@ -0,0 +1,37 @@
+"""Regression test: published artifacts are copies, so in-place rewrites never reach the store."""
+
+from __future__ import annotations
+
+import json
+import tempfile
+from pathlib import Path
+
+import horizon_model_pipeline as hmp
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as root:
+        models_dir = Path(root)
+        artifact_dir = models_dir / hmp.ARTIFACT_STORE_DIRNAME / 'abc'
+        artifact_dir.mkdir(parents=True)
+        (artifact_dir / hmp.SUMMARY_METRICS_FILENAME).write_text(json.dumps({'mae': 1.0}))
+        (artifact_dir / hmp.MODEL_BUNDLE_FILENAME).write_text(json.dumps({'artifact': {'fingerprint': 'abc'}}))
+        (artifact_dir / hmp.ARTIFACT_MANIFEST_FILENAME).write_text('{}')
+
+        published = hmp._publish_artifacts(artifact_dir, models_dir)
+        assert published == [hmp.SUMMARY_METRICS_FILENAME, hmp.MODEL_BUNDLE_FILENAME], published
+
+        # train_xgboost.py rewrites the metrics file in place with open(path, 'w').
+        with open(models_dir / hmp.SUMMARY_METRICS_FILENAME, 'w') as handle:
+            json.dump({'mae': 9.0}, handle)
+        assert json.loads((artifact_dir / hmp.SUMMARY_METRICS_FILENAME).read_text()) == {'mae': 1.0}
+
+        # An identical-inputs hit with the same live bundle restores only the rewritten file.
+        restored = hmp._publish_artifacts(artifact_dir, models_dir, changed_only=True)
+        assert restored == [hmp.SUMMARY_METRICS_FILENAME], restored
+        assert json.loads((models_dir / hmp.SUMMARY_METRICS_FILENAME).read_text()) == {'mae': 1.0}
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
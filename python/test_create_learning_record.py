@@ -6,7 +6,7 @@
 import os
 import sys
 import io
-import psycopg2
+from db_access import get_connection
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -33,7 +33,7 @@ print("=" * 60)
 print()
 
 try:
-    conn = psycopg2.connect(DATABASE_URL)
+    conn = get_connection(dsn=DATABASE_URL)
     cur = conn.cursor()
 
     date = "2026-01-17"
@@ -0,0 +1,132 @@
+"""Regression test for the db_access pool and the db_mirror sync paths (fake connections, no database)."""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+import time
+
+import pandas as pd
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import PoolError
+
+import db_access
+import db_mirror
+
+
+class FakeConnection:
+    def __init__(self, *args, **kwargs):
+        self.kwargs = kwargs
+        self.closed = 0
+        self.prepared_statements = set()
+        self.info = type('Info', (), {'transaction_status': psycopg2.extensions.TRANSACTION_STATUS_IDLE})()
+
+    def get_transaction_status(self):
+        return self.info.transaction_status
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+def _check_pool():
+    db_access.close_pool()
+    db_access.reset_stats()
+
+    first = db_access.get_pool()
+    assert db_access.get_pool() is first, 'same settings must reuse the process pool'
+    for _ in range(3):
+        with db_access.connection():
+            pass
+    assert db_access.pool_stats()['connections_opened'] == 1, db_access.pool_stats()
+
+    other = db_access.get_pool(sslmode='disable')
+    assert other is not first, 'different sslmode must not share the first caller\'s pool'
+    assert other._kwargs['sslmode'] == 'disable' and first._kwargs['sslmode'] == 'require'
+
+    # A forked child gets a fresh pool instead of the parent's sockets.
+    db_access._POOL_PID = -1
+    assert db_access.get_pool() is not first
+
+    # Exhaustion waits for a free connection instead of raising PoolError.
+    db_access.close_pool()
+    os.environ['DB_POOL_MAX'] = '2'
+    held = [db_access.get_connection(), db_access.get_connection()]
+    os.environ['DB_POOL_TIMEOUT'] = '0'
+    try:
+        db_access.get_connection()
+        raise AssertionError('expected PoolError when the wait times out')
+    except PoolError:
+        pass
+    os.environ['DB_POOL_TIMEOUT'] = '5'
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(db_access.get_connection()))
+    waiter.start()
+    time.sleep(0.2)
+    assert not got, 'checkout should block while the pool is exhausted'
+    held.pop().close()
+    waiter.join(timeout=5)
+    assert len(got) == 1 and db_access.pool_stats()['pool_in_use'] == 2
+    for conn in held + got:
+        conn.close()
+    assert db_access.pool_stats()['pool_in_use'] == 0
+    db_access.close_pool()
+
+
+def _check_statement_timeout():
+    assert db_access.connection_kwargs()['options'] == '-c statement_timeout=120000'
+    os.environ['DB_STATEMENT_TIMEOUT_MS'] = '0'
+    assert 'options' not in db_access.connection_kwargs()
+    del os.environ['DB_STATEMENT_TIMEOUT_MS']
+
+
+def _check_mirror(root):
+    os.environ['DB_MIRROR_PATH'] = os.path.join(root, 'mirror.sqlite')
+    os.environ['DB_MIRROR_MAX_AGE_SECONDS'] = '0'
+    full = pd.DataFrame({'Date': pd.to_datetime(['2026-01-01', '2026-01-02']), 'Attendance': [250, 260]})
+    copies = []
+    db_access.copy_frame = lambda query, **kwargs: copies.append(query) or full
+    sync_rows = {}
+    db_mirror._fetch_sync_row = lambda parts, params, names: {n: sync_rows[n] for n in names}
+
+    sync_rows['actual_data'] = {'verify': 'x', 'rows': None, 'boundary': '2026-01-02', 'checksum': 'c1'}
+    assert db_mirror.sync(['actual_data'])['actual_data']['status'] == 'initial'
+
+    # Matching checksum: only rows at/after the boundary are replaced.
+    sync_rows['actual_data'] = {
+        'verify': 'c1', 'rows': [{'Date': '2026-01-02', 'Attendance': 270}, {'Date': '2026-01-03', 'Attendance': 280}],
+        'boundary': '2026-01-03', 'checksum': 'c2',
+    }
+    report = db_mirror.sync(['actual_data'])['actual_data']
+    assert report == {'status': 'incremental', 'fetched': 2, 'rows': 3}, report
+    assert db_mirror.read('actual_data', sync_first=False)['Attendance'].tolist() == [250, 270, 280]
+
+    # Historical edit (checksum mismatch): full COPY resync.
+    sync_rows['actual_data'] = {'verify': 'edited', 'rows': [], 'boundary': '2026-01-01', 'checksum': 'c3'}
+    assert db_mirror.sync(['actual_data'])['actual_data']['status'] == 'full_resync'
+    assert len(copies) == 2
+
+    # Offline: served as-is without contacting PostgreSQL.
+    os.environ['DB_MIRROR_OFFLINE'] = '1'
+    assert db_mirror.sync(['actual_data']) == {'actual_data': {'status': 'offline'}}
+    assert len(db_mirror.read('actual_data')) == 2
+
+
+def main() -> int:
+    for name in ('DATABASE_URL', 'PGSSLMODE', 'DB_POOL_MIN', 'DB_POOL_MAX', 'DB_POOL_TIMEOUT', 'DB_STATEMENT_TIMEOUT_MS', 'DB_MIRROR_OFFLINE'):
+        os.environ.pop(name, None)
+    psycopg2.connect = FakeConnection
+
+    _check_pool()
+    _check_statement_timeout()
+    with tempfile.TemporaryDirectory() as root:
+        _check_mirror(root)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
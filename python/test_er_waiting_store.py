@@ -0,0 +1,73 @@
+"""Regression test for the append-only ER waiting-time store."""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import er_waiting_time_integrated as er
+
+
+def _legacy_features(history: pd.DataFrame, now: datetime):
+    """The CSV-scan computation the store replaces."""
+    history = history.copy()
+    history['datetime'] = pd.to_datetime(history['datetime'])
+    history['minutes'] = pd.to_numeric(history['minutes'], errors='coerce')
+    same_hour = history[
+        (history['datetime'].dt.hour == now.hour) & (history['datetime'] >= now - timedelta(days=7))
+    ]
+    recent = history[history['datetime'] >= now - timedelta(hours=3)]['minutes'].dropna().tail(5).values
+    return same_hour['minutes'].median(), recent
+
+
+def main() -> int:
+    rng = np.random.default_rng(0)
+    now = datetime(2026, 5, 20, 14, 30)
+    polled = now.replace(minute=0)  # cron polls on the hour
+    stamps = [polled - timedelta(hours=h) for h in range(24 * 40, -1, -1)]
+    minutes = [None if i % 17 == 0 else float(rng.integers(30, 300)) for i in range(len(stamps))]
+    legacy = pd.DataFrame({
+        'datetime': [ts.strftime('%Y-%m-%d %H:%M:%S') for ts in stamps],
+        't45p95': ['x'] * len(stamps),
+        't45p50': [''] * len(stamps),
+        't3p50': [''] * len(stamps),
+        'minutes': ['' if m is None else m for m in minutes],
+        'level': [1] * len(stamps),
+        'update_time': [''] * len(stamps),
+    })
+
+    with tempfile.TemporaryDirectory() as root:
+        csv_path = os.path.join(root, 'ndh_waiting_history.csv')
+        legacy.iloc[:-1].to_csv(csv_path, index=False)
+
+        store = er.get_waiting_time_store(csv_path, retention_days=30)
+        assert store.path.endswith('.sqlite') and len(store.frame()) == len(stamps) - 1, 'CSV not imported'
+
+        # The newest reading goes through append(), which also purges past retention.
+        store.append({'t45p95': 'x', 'minutes': minutes[-1], 'level': 1}, stamps[-1])
+        frame = store.frame()
+        assert frame['datetime'].min() >= polled - timedelta(days=30), 'retention not applied'
+        assert frame['datetime'].max() == polled
+
+        # Hourly polls → one reading per bucket, so the bucket-mean median equals the CSV median.
+        expected_median, expected_recent = _legacy_features(legacy, now)
+        assert abs(store.same_hour_median(now, days=7) - expected_median) < 1e-9
+        assert store.recent_minutes(now, hours=3, limit=5) == list(expected_recent)
+
+        # The store is cached per path; re-opening must not import the CSV twice.
+        assert er.get_waiting_time_store(csv_path) is store
+        store.close()
+        er._stores.clear()
+        reopened = er.get_waiting_time_store(csv_path)
+        assert len(reopened.frame()) == len(frame)
+        reopened.close()
+        er._stores.clear()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
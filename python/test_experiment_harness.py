@@ -0,0 +1,73 @@
+"""Regression test for the shared experiment harness (synthetic actual_data)."""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import experiment_harness as eh
+
+
+def _actual_data() -> pd.DataFrame:
+    dates = pd.date_range("2019-01-01", "2023-06-30", freq="D")
+    rng = np.random.default_rng(7)
+    weekly = np.array([20, 5, 0, 0, 3, -10, -15])[dates.dayofweek]
+    attendance = 250 + weekly + 10 * np.sin(np.arange(len(dates)) / 58) + rng.normal(0, 8, len(dates))
+    return pd.DataFrame({"Date": dates, "Attendance": attendance.round()})
+
+
+def main() -> int:
+    features = eh.FeatureSet.of(exclude_covid=True)
+    scenarios = eh.register(
+        eh.Scenario("harness_test/rf", "harness_test", "rf", features, tail_days=500),
+        eh.Scenario("harness_test/xgb", "harness_test", "xgb", features, tail_days=500),
+        eh.Scenario("harness_test/mean", "harness_test", "mean(rf,xgb)", features, tail_days=500),
+        eh.Scenario("harness_test/too_long", "harness_test", "rf", features, tail_days=100_000),
+    )
+    quiet = lambda message: None  # noqa: E731
+
+    with tempfile.TemporaryDirectory() as root:
+        eh.FEATURE_CACHE_DIR = Path(root) / "features"
+        os.environ["STACKING_CACHE_DIR"] = str(Path(root) / "fits")
+        store = eh.ResultStore(Path(root) / "results.sqlite")
+        try:
+            run_id, results = eh.run(
+                scenarios, workers=2, datasets=eh.Datasets({"actual_data": _actual_data()}), store=store, log=quiet
+            )
+            assert len(list(eh.FEATURE_CACHE_DIR.glob("*.pkl"))) == 1, "one frame per feature set"
+            by_name = {r["scenario"]: r for r in results}
+            assert "tail_days" in by_name["harness_test/too_long"]["error"]
+            rf, xgb, mean = (by_name[f"harness_test/{m}"] for m in ("rf", "xgb", "mean"))
+            assert rf["train_days"] == 400 and rf["test_days"] == 100
+            assert rf["metrics"]["mae"] < 15 and list(rf["by_period"])[-1] == "Day 61-90"
+            expected = (np.array(rf["predictions"]) + np.array(xgb["predictions"])) / 2
+            assert np.allclose(mean["predictions"], expected, atol=1e-2)
+
+            # Second run: frame from the cache, component fits shared with the first run.
+            logs = []
+            second_id, second = eh.run(
+                scenarios[:3], workers=1, datasets=eh.Datasets({"actual_data": _actual_data()}),
+                store=store, log=logs.append,
+            )
+            assert any("cached" in line for line in logs), logs
+            assert all(r["info"]["cached"] == len(r["info"]["components"]) for r in second)
+            assert np.allclose(
+                [r["metrics"]["mae"] for r in sorted(second, key=lambda r: r["scenario"])],
+                [by_name[n]["metrics"]["mae"] for n in sorted(by_name) if n != "harness_test/too_long"],
+            )
+
+            latest = store.results(group="harness_test")
+            assert list(latest.loc[["harness_test/rf", "harness_test/too_long"], "run_id"]) == [second_id, run_id]
+            y_true, y_pred = store.predictions("harness_test/xgb")
+            assert len(y_true) == len(y_pred) == 100
+        finally:
+            store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,44 @@
+"""Regression test for the in-process sliding-window experiment (synthetic history)."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+import experiment_sliding_window as esw
+from feature_engineering import create_comprehensive_features
+from train_xgboost import DEFAULT_OPTIMAL_FEATURES
+
+
+def _history() -> pd.DataFrame:
+    dates = pd.date_range("2017-01-01", "2024-12-31", freq="D")
+    rng = np.random.default_rng(3)
+    weekly = np.array([20, 5, 0, 0, 3, -10, -15])[dates.dayofweek]
+    attendance = 250 + weekly + 15 * np.sin(np.arange(len(dates)) / 58) + rng.normal(0, 8, len(dates))
+    df = create_comprehensive_features(pd.DataFrame({"Date": dates, "Attendance": attendance.round()}))
+    return df.dropna(subset=["Attendance"]).reset_index(drop=True)
+
+
+def main() -> int:
+    df = _history()
+    feature_cols = [c for c in DEFAULT_OPTIMAL_FEATURES if c in df.columns]
+    quiet = lambda message: None  # noqa: E731
+
+    parallel = esw.run_all(df, feature_cols, workers=2, log=quiet)
+    inline = esw.run_all(df, feature_cols, workers=1, log=quiet)
+
+    assert not esw._SHARED, "shared memory must be released"
+    for p, i in zip(parallel, inline):
+        assert p["metrics"]["success"], p["metrics"]
+        assert np.isclose(p["metrics"]["mae"], i["metrics"]["mae"]), "pool changed the result"
+        assert p["metrics"]["elapsed_time"] > 0
+
+    days = {r["config"]["sliding_window"]: r["metrics"]["train_days"] + r["metrics"]["test_days"] for r in parallel}
+    covid = ((df["Date"] >= "2020-02-01") & (df["Date"] <= "2022-06-30")).sum()
+    assert days[0] == len(df) - covid, days
+    assert days[2] == 731 and days[3] == 1096 and days[4] == 1461, days
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -25,6 +25,7 @@ import numpy as np
 from datetime import datetime
 import psycopg2
 import psycopg2.extras
+from db_access import get_connection
 from sklearn.model_selection import TimeSeriesSplit, cross_val_score
 from sklearn.preprocessing import StandardScaler
 from sklearn.feature_selection import RFECV, SelectKBest, f_regression, mutual_info_regression
@@ -66,7 +67,7 @@ def load_data():
     """加載數據"""
     try:
         print("📡 加載數據...")
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = get_connection(sslmode='prefer', **DB_CONFIG)
         cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
 
         query = "SELECT date, patient_count FROM actual_data ORDER BY date ASC"
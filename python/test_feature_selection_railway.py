@@ -17,6 +17,7 @@ import numpy as np
 from datetime import datetime
 import psycopg2
 import psycopg2.extras
+from db_access import get_connection
 import json
 import os
 import warnings
@@ -52,14 +53,7 @@ def load_data_from_railway():
         print("📡 連接 Railway 數據庫...")
 
         # 連接（Railway 內部網絡不需要 SSL）
-        conn = psycopg2.connect(
-            host=DB_CONFIG['host'],
-            port=DB_CONFIG['port'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password'],
-            database=DB_CONFIG['database'],
-            connect_timeout=10
-        )
+        conn = get_connection(sslmode='prefer', **DB_CONFIG)
         cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
 
         query = "SELECT date, patient_count FROM actual_data ORDER BY date ASC"
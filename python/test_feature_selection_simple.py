@@ -17,6 +17,7 @@ import numpy as np
 from datetime import datetime
 import psycopg2
 import psycopg2.extras
+from db_access import get_connection
 from sklearn.ensemble import RandomForestRegressor
 import xgboost as xgb
 import json
@@ -47,7 +48,7 @@ def load_data():
     """加載數據"""
     try:
         print("📡 加載數據...")
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = get_connection(sslmode='prefer', **DB_CONFIG)
         cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
 
         query = "SELECT date, patient_count FROM actual_data ORDER BY date ASC"
@@ -0,0 +1,119 @@
+"""Regression test for the shared resumable downloader (local fixture server)."""
+
+from __future__ import annotations
+
+import dataclasses
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pandas as pd
+
+import download_aqhi_history
+import history_downloader
+
+
+def _month_csv(period: str) -> str:
+    lines = ["Past AQHI", "Date,Hour,Central/Western,Southern,Central"]
+    for day in (1, 2):
+        lines.append(f"{period}-{day:02d},1,3,4,6")
+        lines.append(",2,5,2,7")
+    return "\n".join(lines) + "\n"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    requests = []
+    flaky = {"2024-02"}  # one 503 before succeeding
+    failing = {"2024-04"}  # 503 until cleared
+    missing = {"2024-03"}
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_GET(self):  # noqa: N802 - http.server API
+        period = self.path.strip("/")[:7]
+        with FixtureHandler.lock:
+            FixtureHandler.requests.append(period)
+            FixtureHandler.in_flight += 1
+            FixtureHandler.max_in_flight = max(FixtureHandler.max_in_flight, FixtureHandler.in_flight)
+        try:
+            time.sleep(0.05)
+            if period in FixtureHandler.missing:
+                self.send_response(404)
+                self.end_headers()
+                return
+            if period in FixtureHandler.failing or period in FixtureHandler.flaky:
+                FixtureHandler.flaky.discard(period)
+                self.send_response(503)
+                self.end_headers()
+                return
+            body = _month_csv(period).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with FixtureHandler.lock:
+                FixtureHandler.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def main() -> int:
+    periods = ["2024-01", "2024-02", "2024-03", "2024-04", "2024-05", "2024-06"]
+    with tempfile.TemporaryDirectory() as root:
+        os.environ["DOWNLOAD_STATE_DIR"] = str(Path(root) / "state")
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            source = dataclasses.replace(
+                download_aqhi_history.build_source(
+                    output_path=Path(root) / "aqhi_history.csv",
+                    url_template=f"http://127.0.0.1:{server.server_port}/{{year}}-{{month:02d}}.csv",
+                ),
+                periods=lambda: periods,
+                requests_per_second=0,
+            )
+            quiet = lambda message: None  # noqa: E731
+
+            # First run: retry recovers 2024-02, 404 → missing, persistent 503 → failed.
+            first = history_downloader.run(source, workers=2, retries=1, backoff=0.01, log=quiet)
+            assert first.fetched == ["2024-01", "2024-02", "2024-05", "2024-06"], first.fetched
+            assert first.missing == ["2024-03"] and list(first.failed) == ["2024-04"]
+            assert FixtureHandler.max_in_flight <= 2, "worker pool must bound concurrency"
+            output = pd.read_csv(source.output_path)
+            assert len(output) == 8 and list(output.columns)[-1] == "AQHI_Risk"
+
+            # Resume: only the failed period is requested again.
+            FixtureHandler.failing.clear()
+            FixtureHandler.requests.clear()
+            second = history_downloader.run(source, workers=2, retries=1, backoff=0.01, log=quiet)
+            assert FixtureHandler.requests == ["2024-04"], FixtureHandler.requests
+            assert second.ok and second.skipped == 5 and second.rows == 10
+
+            # A fresh state directory is seeded from the existing CSV: nothing re-downloaded.
+            os.environ["DOWNLOAD_STATE_DIR"] = str(Path(root) / "state2")
+            FixtureHandler.requests.clear()
+            third = history_downloader.run(source, workers=2, log=quiet)
+            assert third.seeded == 5 and FixtureHandler.requests == ["2024-03"], FixtureHandler.requests
+            assert third.rows == 10
+
+            # An unparsable body marks the period missing (complete), not failed (retried forever).
+            def broken_parse(body, period):
+                raise ValueError("not a month table")
+
+            os.environ["DOWNLOAD_STATE_DIR"] = str(Path(root) / "state3")
+            broken = dataclasses.replace(source, parse=broken_parse, periods=lambda: ["2024-05"])
+            fourth = history_downloader.run(broken, incremental=False, log=quiet)
+            assert fourth.ok and fourth.missing == ["2024-05"], (fourth.missing, fourth.failed)
+        finally:
+            server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,139 @@
+"""Regression test for the cross-process HKO forecast cache (local fixture server)."""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import http_cache
+
+FIXTURE = {
+    "weatherForecast": [
+        {
+            "forecastDate": "20260519",
+            "forecastMintemp": {"value": 24},
+            "forecastMaxtemp": {"value": 29},
+            "forecastMaxrh": {"value": 95},
+            "PSR": "High",
+            "forecastWind": "East force 4.",
+            "forecastWeather": "Heavy rain at times.",
+        }
+    ]
+}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    hits = 0
+    not_modified = 0
+    etag = '"v1"'
+    delay = 0.0
+    lock = threading.Lock()
+
+    def do_GET(self):  # noqa: N802 - http.server API
+        with FixtureHandler.lock:
+            FixtureHandler.hits += 1
+        time.sleep(FixtureHandler.delay)
+        if self.headers.get("If-None-Match") == FixtureHandler.etag:
+            with FixtureHandler.lock:
+                FixtureHandler.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", FixtureHandler.etag)
+            self.end_headers()
+            return
+        body = json.dumps(FIXTURE).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", FixtureHandler.etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_STALE_THEN_EXIT = (
+    "import sys, http_cache\n"
+    "print(http_cache.fetch(sys.argv[1], ttl=0.0, stale_ttl=3600, timeout=5).status)\n"
+)
+
+
+def _fetch_in_child(url: str, ttl: float, results) -> None:
+    response = http_cache.fetch(url, ttl=ttl, timeout=5)
+    results.put(response.status if response else None)
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as cache_root:
+        os.environ["HTTP_CACHE_DIR"] = cache_root
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/weather.php?dataType=fnd&lang=en"
+        try:
+            import horizon_model_pipeline as hmp
+
+            hmp.HKO_FORECAST_API_URL = url
+
+            # Cold cache: one live request; a second "process" reads from disk.
+            rows = hmp.fetch_hko_9day_forecast(timeout=5)
+            assert FixtureHandler.hits == 1 and len(rows) == 1 and rows[0]["is_heavy_rain"]
+            hmp._HKO_FORECAST_CACHE.update(entry=None, forecasts=[])
+            assert hmp.fetch_hko_9day_forecast(timeout=5) == rows
+            assert FixtureHandler.hits == 1, "fresh entry must not hit the API"
+
+            # Forced revalidation: conditional GET answered with 304.
+            hmp.fetch_hko_9day_forecast(timeout=5, use_cache=False)
+            assert FixtureHandler.hits == 2 and FixtureHandler.not_modified == 1
+
+            # Stale-while-revalidate: stale body returned, one background refresh.
+            FixtureHandler.etag = '"v2"'
+            FixtureHandler.delay = 0.3  # keep the refresh in flight across both stale reads
+            stale = http_cache.fetch(url, ttl=0.0, stale_ttl=3600, timeout=5)
+            assert stale.status == "stale" and stale.etag == '"v1"'
+            assert http_cache.fetch(url, ttl=0.0, stale_ttl=3600, timeout=5).status == "stale"
+            workers = list(http_cache._REVALIDATIONS.values())
+            assert len(workers) <= 1 and all(worker.daemon for worker in workers)
+            http_cache.wait_for_revalidations(10)
+            assert FixtureHandler.hits == 3 and not http_cache._REVALIDATIONS
+            assert http_cache.read_entry(url).etag == '"v2"'
+
+            # Single flight: concurrent processes on an expired entry → one request.
+            time.sleep(0.3)
+            FixtureHandler.delay = 0.5
+            ctx = multiprocessing.get_context("fork")
+            results = ctx.Queue()
+            children = [ctx.Process(target=_fetch_in_child, args=(url, 0.25, results)) for _ in range(6)]
+            for child in children:
+                child.start()
+            for child in children:
+                child.join(30)
+            statuses = [results.get(timeout=5) for _ in children]
+            assert FixtureHandler.hits == 4, f"stampede: {FixtureHandler.hits - 3} requests"
+            assert statuses.count("revalidated") == 1 and statuses.count("fresh") == 5, statuses
+
+            # A process that exits right after a stale hit still finishes the refresh.
+            FixtureHandler.etag = '"v3"'
+            FixtureHandler.delay = 0.3
+            child = subprocess.run(
+                [sys.executable, "-c", _STALE_THEN_EXIT, url],
+                cwd=os.path.dirname(os.path.abspath(http_cache.__file__)),
+                capture_output=True,
+                text=True,
+                timeout=60,
+            )
+            assert child.returncode == 0 and child.stdout.strip() == "stale", (child.stdout, child.stderr)
+            assert FixtureHandler.hits == 5 and http_cache.read_entry(url).etag == '"v3"'
+        finally:
+            server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
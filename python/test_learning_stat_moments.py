@@ -0,0 +1,75 @@
+"""Regression test: learning_stat_moments stay exact across clear-and-reimport.
+
+Runs migration 007 inside a throwaway schema of the database named by
+``DATABASE_URL`` and skips when no database is reachable.
+"""
+
+from __future__ import annotations
+
+import os
+import uuid
+
+import psycopg2
+
+import learning_stats
+
+
+ROWS = [('2024-01-0%d' % d, 200 + 10 * d) for d in range(1, 10)]
+
+
+def _load(cur, rows):
+    cur.executemany("INSERT INTO actual_data (date, patient_count) VALUES (%s, %s)", rows)
+    cur.executemany(
+        "INSERT INTO learning_records (date, actual_attendance, is_very_cold) VALUES (%s, %s, %s)",
+        [(date, count, i % 2 == 0) for i, (date, count) in enumerate(rows)],
+    )
+
+
+def _assert_exact(conn, n):
+    for group, row in learning_stats.check(conn).items():
+        assert row['n_scan'] == row['n_moments'] == n, (group, row)
+        assert row['mean_drift'] < 1e-9 and row['std_drift'] < 1e-9, (group, row)
+
+
+def main() -> int:
+    try:
+        conn = psycopg2.connect(os.environ['DATABASE_URL'], connect_timeout=5)
+    except (KeyError, psycopg2.OperationalError) as exc:
+        print(f"skipped: no database ({exc})")
+        return 0
+
+    schema = f"moments_test_{uuid.uuid4().hex[:8]}"
+    cur = conn.cursor()
+    try:
+        cur.execute(f"CREATE SCHEMA {schema}")
+        cur.execute(f"SET search_path TO {schema}")
+        cur.execute("CREATE TABLE actual_data (id SERIAL PRIMARY KEY, date DATE NOT NULL UNIQUE, patient_count INTEGER NOT NULL)")
+        cur.execute(
+            "CREATE TABLE learning_records (id SERIAL PRIMARY KEY, date DATE NOT NULL UNIQUE, "
+            "actual_attendance NUMERIC(10,2), is_very_cold BOOLEAN DEFAULT FALSE, is_very_hot BOOLEAN DEFAULT FALSE, "
+            "is_heavy_rain BOOLEAN DEFAULT FALSE, is_strong_wind BOOLEAN DEFAULT FALSE)"
+        )
+        conn.commit()
+        learning_stats.apply_migration(conn)
+
+        _load(cur, ROWS)
+        conn.commit()
+        _assert_exact(conn, len(ROWS))
+
+        # clear-and-reimport.js / database.clearAllData: TRUNCATE ... CASCADE, then reimport.
+        cur.execute("TRUNCATE TABLE actual_data CASCADE")
+        cur.execute("TRUNCATE TABLE learning_records")
+        _load(cur, ROWS[:5])
+        conn.commit()
+        _assert_exact(conn, 5)
+    finally:
+        conn.rollback()
+        cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        conn.commit()
+        cur.close()
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
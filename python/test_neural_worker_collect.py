@@ -0,0 +1,46 @@
+"""Regression test for collecting neural workers after their deadline (no neural deps needed)."""
+
+from __future__ import annotations
+
+import multiprocessing
+import time
+
+import horizon_model_pipeline as hmp
+
+
+def _finished_worker(result_queue) -> None:
+    result_queue.put({"available": True, "train_seconds": 0.1})
+
+
+def _stuck_worker(result_queue) -> None:
+    time.sleep(60)
+
+
+def _handle(ctx, target, started_at):
+    result_queue = ctx.Queue()
+    process = ctx.Process(target=target, args=(result_queue,), daemon=True)
+    process.start()
+    return {"process": process, "queue": result_queue, "staging_dir": None, "started_at": started_at}
+
+
+def main() -> int:
+    ctx = multiprocessing.get_context("spawn")
+    long_ago = time.monotonic() - 3600
+
+    # Tree training outlasted the timeout, but the worker had already finished: keep its result.
+    handle = _handle(ctx, _finished_worker, long_ago)
+    handle["process"].join(30)
+    assert not handle["process"].is_alive()
+    info = hmp._collect_neural_worker(handle, timeout=60)
+    assert info == {"available": True, "train_seconds": 0.1}, info
+
+    # Still running past its deadline: terminated and reported as timed out.
+    handle = _handle(ctx, _stuck_worker, long_ago)
+    info = hmp._collect_neural_worker(handle, timeout=60)
+    assert info["available"] is False and "timed out" in info["error"], info
+    assert not handle["process"].is_alive()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
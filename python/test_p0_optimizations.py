@@ -27,7 +27,7 @@ from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import json
 import os
 from datetime import datetime
-import psycopg2
+from db_access import get_connection
 from psycopg2.extras import RealDictCursor
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -39,13 +39,12 @@ from stacking_ensemble import compare_all_ensembles, StackingEnsemble
 def get_db_connection():
     """連接到 Railway Database"""
     password = os.environ.get('PGPASSWORD') or os.environ.get('DATABASE_PASSWORD') or 'nIdJPREHqkBdMgUifrazOsVlWbxsmDGq'
-    return psycopg2.connect(
-        host=os.environ.get('PGHOST', 'tramway.proxy.rlwy.net'),
-        port=int(os.environ.get('PGPORT', '45703')),
-        user=os.environ.get('PGUSER', 'postgres'),
+    return get_connection(
+        host='tramway.proxy.rlwy.net',
+        port='45703',
+        user='postgres',
         password=password,
-        database=os.environ.get('PGDATABASE', 'railway'),
-        sslmode='require'
+        database='railway',
     )
 
 
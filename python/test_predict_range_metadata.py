@@ -36,7 +36,7 @@ def main() -> int:
     }
 
     with patch.object(hmp, "predict_target_date", return_value=fake_result), patch.object(
-        hmp, "fetch_recent_residuals_from_db", return_value=pd.DataFrame()
+        hmp, "fetch_recent_accuracy_from_db", return_value=pd.DataFrame()
     ):
         result = hmp.predict_range(
             "2026-05-18",
@@ -0,0 +1,50 @@
+"""Regression test for the batched history errors and incremental rolling features."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+import ensemble_predict as ep
+from benchmark_rolling_forecast import legacy_historical_errors
+
+
+def _history(n=240):
+    rng = np.random.default_rng(3)
+    dates = pd.date_range('2024-01-01', periods=n, freq='D')
+    attendance = 250 + 20 * np.sin(np.arange(n) * 2 * np.pi / 7) + rng.integers(-15, 15, size=n)
+    return pd.DataFrame({'Date': dates, 'Attendance': attendance.astype(int)})
+
+
+def _model(df):
+    X = ep.prepare_opt10_history_features(df).iloc[14:]
+    y = df['Attendance'].iloc[14:]
+    booster = xgb.train({'max_depth': 3, 'nthread': 1}, xgb.DMatrix(X, label=y), num_boost_round=20)
+    return ep.XGBoostWrapper(booster, model_type='opt10')
+
+
+def main() -> int:
+    df = _history()
+    model = _model(df)
+
+    batched = ep.calculate_historical_errors(df, model, ep.OPT10_FEATURES)
+    legacy = legacy_historical_errors(df, model, ep.OPT10_FEATURES)
+    assert np.array_equal(batched, legacy), 'batched errors differ from the per-day loop'
+
+    state = ep.RollingFeatureState(df)
+    previous = []
+    start = df['Date'].iloc[-1]
+    for i in range(1, 40):
+        date = (start + pd.Timedelta(days=i)).strftime('%Y-%m-%d')
+        expected = ep.prepare_rolling_features(df, date, previous)
+        actual = state.features(date)
+        assert np.array_equal(expected.to_numpy(dtype=float), actual.to_numpy(dtype=float)), date
+        pred = ep.predict_with_xgboost(model, ep.OPT10_FEATURES, actual)
+        previous.append({'date': date, 'prediction': pred})
+        state.append(pred)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,65 @@
+"""Regression test for the parallel, cached out-of-fold stacking grid."""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import stacking_ensemble as se
+
+
+def _fit(workers):
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame(rng.normal(size=(400, 6)), columns=[f'f{i}' for i in range(6)])
+    y = (X['f0'] * 10 + X['f1'] * 5 + rng.normal(size=400) + 250).values
+    model = se.StackingEnsemble(use_meta='ridge', workers=workers).fit(X[:320], y[:320])
+    return model, X[320:]
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as root:
+        se.STACKING_CACHE_DIR = Path(root)
+        os.environ['STACKING_CACHE'] = '0'
+        serial, X_test = _fit(workers=1)
+        parallel, _ = _fit(workers=2)
+        assert np.allclose(serial.predict(X_test), parallel.predict(X_test)), 'pool changed the result'
+        assert not any(Path(root).iterdir()), 'STACKING_CACHE=0 must not write'
+
+        os.environ['STACKING_CACHE'] = '1'
+        names = se._base_model_names()
+        tasks = {n: (se._fold_model(n), X_test, X_test['f0'].values, se._fit_kwargs(n)) for n in names}
+        _, first = se.fit_models(tasks, workers=1)
+        _, second = se.fit_models(tasks, workers=1)
+        assert first == {'fitted': len(names), 'cached': 0}, first
+        assert second == {'fitted': 0, 'cached': len(names)}, second
+
+        # Library versions are part of the key: an upgrade refits instead of unpickling.
+        key = se.fit_key(*tasks[names[0]])
+        se._LIBRARY_VERSIONS['sklearn'] = '0.0-upgraded'
+        assert se.fit_key(*tasks[names[0]]) != key
+        se._LIBRARY_VERSIONS['sklearn'] = se.sklearn.__version__
+
+        # Keep-N pruning after a new fit keeps the most recently used entries (a hit counts as use).
+        os.environ['STACKING_CACHE_KEEP'] = '2'
+        assert len(list(Path(root).glob('*.joblib'))) == len(names)
+        se.fit_models({names[0]: tasks[names[0]]}, workers=1)
+        _, X, y, fit_kwargs = tasks[names[0]]
+        fresh = (se._fold_model(names[0]), X, y + 1, fit_kwargs)
+        _, third = se.fit_models({'fresh': fresh}, workers=1)
+        assert third == {'fitted': 1, 'cached': 0}, third
+        assert sorted(p.stem for p in Path(root).glob('*.joblib')) == sorted([key, se.fit_key(*fresh)])
+        del os.environ['STACKING_CACHE_KEEP']
+
+        # Meta-learner swap reuses base models and OOF features without refitting.
+        enet = serial.with_meta('elasticnet')
+        assert enet.base_models is serial.base_models
+        assert enet.predict(X_test).shape == (len(X_test),)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
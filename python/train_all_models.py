@@ -159,6 +159,8 @@ def run_training_script(script_name):
     else:
         print(f"\n✅ {script_name} 訓練完成")
         print(f"⏱️  訓練時間: {elapsed_minutes:.2f} 分鐘")
+        if 'skipped — identical inputs' in stdout_text:
+            print(f"⏭️  輸入與上次訓練相同，沿用 artifact store 中的模型 (skipped — identical inputs)")
         if metrics:
             print(f"📊 模型性能:")
             if 'MAE' in metrics:
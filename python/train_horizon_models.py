@@ -11,38 +11,53 @@ import sys
 from horizon_model_pipeline import (
     DEFAULT_GATE_MARGIN,
     DEFAULT_RECENT_ROWS,
+    DEFAULT_STREAM_CHUNK_CUTOFFS,
     DEFAULT_VALIDATION_CUTOFFS,
+    SKIPPED_IDENTICAL_INPUTS,
     TrainingGateError,
-    train_horizon_models,
+    train_horizon_models_cached,
 )
 
 
 def main() -> int:
     parser = argparse.ArgumentParser(description="Train direct multi-horizon NDH AED models")
-    parser.add_argument("--recent-rows", type=int, default=DEFAULT_RECENT_ROWS)
+    parser.add_argument("--recent-rows", type=int, default=DEFAULT_RECENT_ROWS, help="0 = full history")
     parser.add_argument("--validation-cutoffs", type=int, default=DEFAULT_VALIDATION_CUTOFFS)
     parser.add_argument("--gate-margin", type=float, default=DEFAULT_GATE_MARGIN)
     parser.add_argument("--allow-gate-fail", action="store_true")
+    parser.add_argument("--streaming", action="store_true", help="bounded-memory chunked training")
+    parser.add_argument("--stream-chunk-cutoffs", type=int, default=DEFAULT_STREAM_CHUNK_CUTOFFS)
+    parser.add_argument("--multi-quantile", action="store_true", help="one multi-quantile booster per bucket")
+    parser.add_argument("--force-retrain", action="store_true", help="refit even when the training fingerprint is unchanged")
     args = parser.parse_args()
 
     print("=" * 80, flush=True)
     print("NDH AED Direct Multi-Horizon Training", flush=True)
     print("=" * 80, flush=True)
-    print(f"recent_rows={args.recent_rows}", flush=True)
+    print(f"recent_rows={args.recent_rows or 'all'}", flush=True)
     print(f"validation_cutoffs={args.validation_cutoffs}", flush=True)
     print(f"gate_margin={args.gate_margin:.3f}", flush=True)
+    print(f"streaming={args.streaming}", flush=True)
 
     try:
-        result = train_horizon_models(
-            recent_rows=args.recent_rows,
+        result = train_horizon_models_cached(
+            force=args.force_retrain,
+            recent_rows=args.recent_rows or None,
             validation_cutoffs=args.validation_cutoffs,
             gate_margin=args.gate_margin,
             allow_gate_fail=args.allow_gate_fail,
+            streaming=args.streaming,
+            stream_chunk_cutoffs=args.stream_chunk_cutoffs,
+            multi_quantile=args.multi_quantile,
         )
     except TrainingGateError as exc:
         print(f"❌ Baseline gate failed: {exc}", file=sys.stderr, flush=True)
         return 1
 
+    print(f"fingerprint={result['fingerprint'][:16]} status={result['status']}", flush=True)
+    if result["status"] == SKIPPED_IDENTICAL_INPUTS:
+        print(f"⏭️ {SKIPPED_IDENTICAL_INPUTS} — reusing {result['artifact_dir']}", flush=True)
+
     summary = result["bundle"]["summary"]
     print("\nTraining summary", flush=True)
     print(json.dumps(summary, indent=2, ensure_ascii=False), flush=True)
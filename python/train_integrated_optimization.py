@@ -21,6 +21,7 @@ import numpy as np
 from datetime import datetime, timedelta
 import psycopg2
 import psycopg2.extras
+from db_access import get_connection
 from sklearn.model_selection import TimeSeriesSplit
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
@@ -67,7 +68,7 @@ def load_data_from_railway():
     try:
         print("📡 連接 Railway 數據庫...")
 
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = get_connection(sslmode='prefer', **DB_CONFIG)
         cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
 
         # 獲取所有就診數據
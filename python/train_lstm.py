@@ -42,7 +42,15 @@ import numpy as np
 import json
 import pickle
 import gc
+import math
+import time
 import traceback
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 # 現在導入 TensorFlow，並進行嚴格的 CPU-only 配置
 # 注意：即使設置了所有環境變數，TensorFlow 的 XLA 組件仍可能在導入時嘗試初始化 CUDA
@@ -113,7 +121,8 @@ try:
     from tensorflow.keras.models import Sequential
     from tensorflow.keras.layers import LSTM, Dense, Dropout
     from tensorflow.keras.optimizers import Adam
-    from tensorflow.keras.callbacks import EarlyStopping
+    from tensorflow.keras.callbacks import EarlyStopping, Callback
+    from tensorflow.keras.utils import Sequence
     from tensorflow.keras import backend as K
     
     print("✅ TensorFlow 已成功配置為 CPU-only 模式（XLA 已禁用）")
@@ -134,16 +143,11 @@ from feature_engineering import create_comprehensive_features, get_feature_colum
 def load_data_from_db():
     """從數據庫加載數據"""
     try:
-        import psycopg2
+        from db_access import get_connection
         from dotenv import load_dotenv
         load_dotenv()
         
-        conn = psycopg2.connect(
-            host=os.getenv('PGHOST') or os.getenv('DATABASE_URL', '').split('@')[1].split('/')[0] if '@' in os.getenv('DATABASE_URL', '') else None,
-            database=os.getenv('PGDATABASE') or os.getenv('DATABASE_URL', '').split('/')[-1] if '/' in os.getenv('DATABASE_URL', '') else None,
-            user=os.getenv('PGUSER') or os.getenv('DATABASE_URL', '').split('://')[1].split(':')[0] if '://' in os.getenv('DATABASE_URL', '') else None,
-            password=os.getenv('PGPASSWORD') or os.getenv('DATABASE_URL', '').split('@')[0].split(':')[-1] if '@' in os.getenv('DATABASE_URL', '') else None,
-        )
+        conn = get_connection(sslmode='prefer')
         
         query = """
             SELECT date as Date, patient_count as Attendance
@@ -199,12 +203,77 @@ def load_data_from_csv(csv_path):
         return None
 
 def create_sequences(X, y, seq_length=60):
-    """創建 60 天滑動窗口用於 LSTM"""
-    X_seq, y_seq = [], []
-    for i in range(len(X) - seq_length):
-        X_seq.append(X[i:i+seq_length])
-        y_seq.append(y[i+seq_length])
-    return np.array(X_seq), np.array(y_seq)
+    """
+    創建 60 天滑動窗口用於 LSTM
+
+    X_seq[i] = X[i:i+seq_length]，y_seq[i] = y[i+seq_length]。
+    X_seq 是 X 的只讀 strided view（sliding_window_view），不複製數據；
+    需要時由 SequenceBatches 按批物化。
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    n = len(X) - seq_length
+    if n <= 0:
+        return np.empty((0, seq_length) + X.shape[1:], dtype=X.dtype), y[:0]
+    # sliding_window_view 把窗口軸放在最後: (n+1, features, seq) → (n, seq, features)
+    X_seq = sliding_window_view(X, seq_length, axis=0)[:n].transpose(0, 2, 1)
+    return X_seq, y[seq_length:]
+
+
+class SequenceBatches(Sequence):
+    """
+    串流批次：每批只把 batch_size 個窗口複製成連續的 float32 數組，
+    完整序列張量 (樣本 × seq_length × 特徵) 不會被物化。
+    """
+
+    def __init__(self, windows, targets, batch_size=16, shuffle=False, seed=42):
+        super().__init__()
+        self.windows = windows
+        self.targets = np.asarray(targets, dtype=np.float32)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.order = np.arange(len(windows))
+        self._rng = np.random.default_rng(seed)
+        if shuffle:
+            self._rng.shuffle(self.order)
+
+    def __len__(self):
+        return math.ceil(len(self.order) / self.batch_size)
+
+    def __getitem__(self, idx):
+        rows = self.order[idx * self.batch_size:(idx + 1) * self.batch_size]
+        return np.ascontiguousarray(self.windows[rows], dtype=np.float32), self.targets[rows]
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            self._rng.shuffle(self.order)
+
+    def batch_bytes(self):
+        return self.batch_size * int(np.prod(self.windows.shape[1:])) * np.dtype(np.float32).itemsize
+
+
+def peak_rss_mb():
+    """進程峰值 RSS (MB)；不支援時返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 單位為 KB，macOS 為 bytes
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+class EpochProfile(Callback):
+    """記錄每個 epoch 的耗時與峰值 RSS"""
+
+    def __init__(self):
+        super().__init__()
+        self.epoch_seconds = []
+        self._started = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._started = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch_seconds.append(time.perf_counter() - self._started)
 
 def train_lstm_model(train_data, test_data, feature_cols, seq_length=60):
     """訓練 LSTM 模型"""
@@ -229,16 +298,14 @@ def train_lstm_model(train_data, test_data, feature_cols, seq_length=60):
         scaler_X = MinMaxScaler()
         scaler_y = MinMaxScaler()
         
-        X_train_scaled = scaler_X.fit_transform(X_train_raw)
-        X_test_scaled = scaler_X.transform(X_test_raw)
+        # float32: 模型輸入精度，序列視圖直接引用這兩個矩陣
+        X_train_scaled = scaler_X.fit_transform(X_train_raw).astype(np.float32)
+        X_test_scaled = scaler_X.transform(X_test_raw).astype(np.float32)
         y_train_scaled = scaler_y.fit_transform(y_train_raw.reshape(-1, 1)).flatten()
         y_test_scaled = scaler_y.transform(y_test_raw.reshape(-1, 1)).flatten()
-        
-        # 清理原始數據以釋放內存（但保留 y_test_raw 用於評估）
         del X_train_raw, X_test_raw, y_train_raw
-        gc.collect()
         
-        # 創建序列
+        # 創建序列（零拷貝窗口視圖）
         print(f"創建序列（序列長度: {seq_length}）...")
         X_train_seq, y_train_seq = create_sequences(X_train_scaled, y_train_scaled, seq_length)
         X_test_seq, y_test_seq = create_sequences(X_test_scaled, y_test_scaled, seq_length)
@@ -250,9 +317,13 @@ def train_lstm_model(train_data, test_data, feature_cols, seq_length=60):
         print(f"訓練序列: {X_train_seq.shape}")
         print(f"測試序列: {X_test_seq.shape}")
         
-        # 清理中間數據
-        del X_train_scaled, X_test_scaled, y_train_scaled, y_test_scaled
-        gc.collect()
+        # 使用較小的 batch_size 以減少內存壓力
+        train_batches = SequenceBatches(X_train_seq, y_train_seq, batch_size=16, shuffle=True)
+        test_batches = SequenceBatches(X_test_seq, y_test_seq, batch_size=16)
+        # 舊做法 (np.array(list of slices)) 會物化的 float64 序列張量大小，作對比
+        materialized_mb = (X_train_seq.size + X_test_seq.size) * 8 / 1e6
+        print(f"序列記憶體: 完整物化需 {materialized_mb:.1f} MB，串流每批 {train_batches.batch_bytes() / 1e6:.2f} MB")
+        profile = EpochProfile()
         
         # 構建 LSTM 模型（簡化架構以減少內存使用，避免 free(): invalid pointer 錯誤）
         print("構建 LSTM 模型...")
@@ -283,7 +354,6 @@ def train_lstm_model(train_data, test_data, feature_cols, seq_length=60):
         # 訓練
         print("開始訓練模型...")
         try:
-            # 使用較小的 batch_size 以減少內存壓力
             # 在訓練前再次確認沒有 GPU 被使用
             visible_devices = tf.config.get_visible_devices()
             if any('GPU' in d.name for d in visible_devices):
@@ -291,20 +361,29 @@ def train_lstm_model(train_data, test_data, feature_cols, seq_length=60):
                 raise RuntimeError("GPU 設備仍然可見，無法安全訓練")
             
             history = model.fit(
-                X_train_seq, y_train_seq,
+                train_batches,
                 epochs=100,
-                batch_size=16,  # 從 32 減少到 16 以減少內存使用
-                validation_data=(X_test_seq, y_test_seq),
+                validation_data=test_batches,
                 callbacks=[
                     EarlyStopping(
                         monitor='val_loss',
                         patience=15,
                         restore_best_weights=True,
                         verbose=1
-                    )
+                    ),
+                    profile
                 ],
                 verbose=1
             )
+            training_profile = {
+                'epochs': len(profile.epoch_seconds),
+                'mean_epoch_seconds': round(float(np.mean(profile.epoch_seconds)), 3) if profile.epoch_seconds else None,
+                'peak_rss_mb': peak_rss_mb(),
+                'materialized_sequence_mb': round(materialized_mb, 1),
+                'batch_mb': round(train_batches.batch_bytes() / 1e6, 3),
+            }
+            print(f"訓練: {training_profile['epochs']} epochs，平均每 epoch "
+                  f"{training_profile['mean_epoch_seconds']}s，峰值 RSS {training_profile['peak_rss_mb']} MB")
             # 訓練完成後立即清理 TensorFlow 會話
             K.clear_session()
             gc.collect()
@@ -355,7 +434,7 @@ def train_lstm_model(train_data, test_data, feature_cols, seq_length=60):
         print("評估模型...")
         try:
             # 使用較小的 batch_size 進行預測
-            y_pred_scaled = model.predict(X_test_seq, verbose=0, batch_size=16).flatten()
+            y_pred_scaled = model.predict(test_batches, verbose=0).flatten()
             y_pred = scaler_y.inverse_transform(y_pred_scaled.reshape(-1, 1)).flatten()
             
             # 只評估有對應實際值的預測
@@ -372,7 +451,7 @@ def train_lstm_model(train_data, test_data, feature_cols, seq_length=60):
             print(f"  RMSE: {rmse:.2f} 病人")
             print(f"  MAPE: {mape:.2f}%")
             
-            metrics = {'mae': mae, 'rmse': rmse, 'mape': mape}
+            metrics = {'mae': mae, 'rmse': rmse, 'mape': mape, 'training_profile': training_profile}
             
             # 清理評估數據
             del y_pred_scaled, y_pred, y_pred_eval, y_test_eval, y_test_raw
@@ -381,7 +460,7 @@ def train_lstm_model(train_data, test_data, feature_cols, seq_length=60):
         except Exception as eval_error:
             print(f"模型評估過程中發生錯誤: {eval_error}")
             traceback.print_exc()
-            metrics = {'mae': None, 'rmse': None, 'mape': None}
+            metrics = {'mae': None, 'rmse': None, 'mape': None, 'training_profile': training_profile}
             # 清理 y_test_raw
             if 'y_test_raw' in locals():
                 del y_test_raw
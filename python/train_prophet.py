@@ -14,16 +14,11 @@ from feature_engineering import create_comprehensive_features
 def load_data_from_db():
     """從數據庫加載數據"""
     try:
-        import psycopg2
+        from db_access import get_connection
         from dotenv import load_dotenv
         load_dotenv()
         
-        conn = psycopg2.connect(
-            host=os.getenv('PGHOST') or os.getenv('DATABASE_URL', '').split('@')[1].split('/')[0] if '@' in os.getenv('DATABASE_URL', '') else None,
-            database=os.getenv('PGDATABASE') or os.getenv('DATABASE_URL', '').split('/')[-1] if '/' in os.getenv('DATABASE_URL', '') else None,
-            user=os.getenv('PGUSER') or os.getenv('DATABASE_URL', '').split('://')[1].split(':')[0] if '://' in os.getenv('DATABASE_URL', '') else None,
-            password=os.getenv('PGPASSWORD') or os.getenv('DATABASE_URL', '').split('@')[0].split(':')[-1] if '@' in os.getenv('DATABASE_URL', '') else None,
-        )
+        conn = get_connection(sslmode='prefer')
         
         query = """
             SELECT date as Date, patient_count as Attendance
@@ -114,7 +114,7 @@ def load_ai_factors_from_db(conn):
 def load_data_from_db():
     """從數據庫加載數據（如果可用）"""
     try:
-        import psycopg2
+        from db_access import get_connection
         from dotenv import load_dotenv
         load_dotenv()
         
@@ -127,13 +127,12 @@ def load_data_from_db():
         
         print(f"   📡 連接資料庫: {host}:{port}/{database}")
         
-        conn = psycopg2.connect(
+        conn = get_connection(
             host=host,
             port=port,
             user=user,
             password=password,
             database=database,
-            sslmode='require'
         )
         
         # 使用 SQLAlchemy 創建連接（直接使用已知的連接參數）
@@ -217,16 +216,11 @@ def load_data_from_csv(csv_path):
 def load_old_metrics_from_db():
     """從數據庫加載上次訓練的模型指標（用於比較）"""
     try:
-        import psycopg2
+        from db_access import get_connection
         from dotenv import load_dotenv
         load_dotenv()
         
-        conn = psycopg2.connect(
-            host=os.getenv('PGHOST') or os.getenv('DATABASE_URL', '').split('@')[1].split('/')[0] if '@' in os.getenv('DATABASE_URL', '') else None,
-            database=os.getenv('PGDATABASE') or os.getenv('DATABASE_URL', '').split('/')[-1] if '/' in os.getenv('DATABASE_URL', '') else None,
-            user=os.getenv('PGUSER') or os.getenv('DATABASE_URL', '').split('://')[1].split(':')[0] if '://' in os.getenv('DATABASE_URL', '') else None,
-            password=os.getenv('PGPASSWORD') or os.getenv('DATABASE_URL', '').split('@')[0].split(':')[-1] if '@' in os.getenv('DATABASE_URL', '') else None,
-        )
+        conn = get_connection(sslmode='prefer')
         
         cursor = conn.cursor()
         cursor.execute("""
@@ -252,7 +246,78 @@ def load_old_metrics_from_db():
         print(f"⚠️ 無法從數據庫加載舊模型指標: {e}")
         return None
 
-def optuna_optimize(X_train, y_train, X_val, y_val, n_trials=50):
+# 動態加載優化特徵集（從 optimal_features.json）
+def load_optimal_features():
+    """從 JSON 文件加載最佳特徵配置"""
+    optimal_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'optimal_features.json')
+    if os.path.exists(optimal_path):
+        try:
+            with open(optimal_path, 'r') as f:
+                config = json.load(f)
+            if 'optimal_features' in config:
+                print(f"   📂 從 optimal_features.json 加載 {len(config['optimal_features'])} 個特徵")
+                print(f"   📊 上次優化: {config.get('updated', 'N/A')}")
+                print(f"   📈 預期 MAE: {config.get('metrics', {}).get('mae', 'N/A')}")
+                return config['optimal_features']
+        except Exception as e:
+            print(f"   ⚠️ 無法加載 optimal_features.json: {e}")
+    return None
+
+
+# 默認優化特徵集（備用）
+DEFAULT_OPTIMAL_FEATURES = [
+    "Attendance_EWMA7",        # 核心特徵
+    "Attendance_EWMA14",
+    "Daily_Change",
+    "Monthly_Change",
+    "Attendance_Lag1",
+    "Weekly_Change",
+    "Attendance_Rolling7",
+    "Attendance_Position7",
+    "Attendance_Lag30",
+    "Attendance_Lag7",
+    "Day_of_Week",
+    "Lag1_Diff",
+    "DayOfWeek_sin",
+    "Attendance_Rolling14",
+    "Attendance_Position14",
+    "Attendance_Position30",
+    "Attendance_Rolling3",
+    "Attendance_Min7",
+    "Attendance_Median14",
+    "DayOfWeek_Target_Mean",
+    "Attendance_Median3",
+    "Attendance_EWMA30",
+    "Is_Winter_Flu_Season",
+    "Is_Weekend",
+    "Holiday_Factor",
+]
+
+
+# ============ 訓練數據窗口 ============
+# COVID 期間: 2020-02-01 至 2022-06-30 (WHO 宣布 COVID 大流行至香港放寬限制)
+COVID_START = pd.Timestamp('2020-02-01')
+COVID_END = pd.Timestamp('2022-06-30')
+
+
+def apply_training_window(df, exclude_covid=True, sliding_window_years=0):
+    """排除 COVID 期間及/或只保留最近 N 年數據 (已特徵化的 DataFrame)"""
+    if exclude_covid:
+        df = df[~((df['Date'] >= COVID_START) & (df['Date'] <= COVID_END))]
+    if sliding_window_years > 0:
+        cutoff_date = df['Date'].max() - pd.Timedelta(days=sliding_window_years * 365)
+        df = df[df['Date'] >= cutoff_date]
+    return df.copy()
+
+
+def time_decay_weights(dates, time_decay_rate):
+    """時間衰減樣本權重 exp(-rate × 距最後一天的天數)，歸一化至平均 1"""
+    days_from_end = (dates.max() - dates).dt.days
+    weights = np.exp(-time_decay_rate * days_from_end)
+    return weights / weights.mean()
+
+
+def optuna_optimize(X_train, y_train, X_val, y_val, n_trials=50, n_jobs=-1):
     """
     使用 Optuna 進行超參數優化
     
@@ -260,6 +325,7 @@ def optuna_optimize(X_train, y_train, X_val, y_val, n_trials=50):
         X_train, y_train: 訓練數據
         X_val, y_val: 驗證數據
         n_trials: 優化試驗次數
+        n_jobs: XGBoost 線程數
     
     返回:
         最佳超參數字典
@@ -294,7 +360,7 @@ def optuna_optimize(X_train, y_train, X_val, y_val, n_trials=50):
             objective='reg:squarederror',
             tree_method='hist',
             random_state=42,
-            n_jobs=-1,
+            n_jobs=n_jobs,
             early_stopping_rounds=30,
             eval_metric='mae'
         )
@@ -431,7 +497,7 @@ def time_series_cross_validate(df, feature_cols, n_splits=3):
     return avg_scores
 
 
-def train_xgboost_model(train_data, test_data, feature_cols, sample_weights=None):
+def train_xgboost_model(train_data, test_data, feature_cols, sample_weights=None, n_jobs=-1):
     """
     訓練 XGBoost 模型（使用正確的時間序列驗證）
     
@@ -440,6 +506,7 @@ def train_xgboost_model(train_data, test_data, feature_cols, sample_weights=None
     
     參數:
         sample_weights: 樣本權重（用於時間衰減，近期數據權重更高）
+        n_jobs: XGBoost 線程數（並行實驗時按進程分配）
     """
     print(f"\n{'='*60}")
     print("🚀 XGBoost 模型訓練開始")
@@ -508,7 +575,7 @@ def train_xgboost_model(train_data, test_data, feature_cols, sample_weights=None
     n_trials = int(os.environ.get('OPTUNA_TRIALS', '30'))
     
     if use_optuna:
-        best_params = optuna_optimize(X_train, y_train, X_val, y_val, n_trials=n_trials)
+        best_params = optuna_optimize(X_train, y_train, X_val, y_val, n_trials=n_trials, n_jobs=n_jobs)
         if best_params:
             params = best_params
         else:
@@ -572,7 +639,7 @@ def train_xgboost_model(train_data, test_data, feature_cols, sample_weights=None
         early_stopping_rounds=50,
         eval_metric='mae',
         random_state=42,
-        n_jobs=-1
+        n_jobs=n_jobs
     )
     
     # ============ 樣本權重（時間衰減 + COVID 調整）============
@@ -744,52 +811,6 @@ def main():
     parser.add_argument('--time-decay', type=float, default=0.0, help='Time decay rate for sample weights (0=no decay, 0.001=recommended)')
     args = parser.parse_args()
     
-    # 動態加載優化特徵集（從 optimal_features.json）
-    def load_optimal_features():
-        """從 JSON 文件加載最佳特徵配置"""
-        optimal_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'optimal_features.json')
-        if os.path.exists(optimal_path):
-            try:
-                with open(optimal_path, 'r') as f:
-                    config = json.load(f)
-                if 'optimal_features' in config:
-                    print(f"   📂 從 optimal_features.json 加載 {len(config['optimal_features'])} 個特徵")
-                    print(f"   📊 上次優化: {config.get('updated', 'N/A')}")
-                    print(f"   📈 預期 MAE: {config.get('metrics', {}).get('mae', 'N/A')}")
-                    return config['optimal_features']
-            except Exception as e:
-                print(f"   ⚠️ 無法加載 optimal_features.json: {e}")
-        return None
-    
-    # 默認優化特徵集（備用）
-    DEFAULT_OPTIMAL_FEATURES = [
-        "Attendance_EWMA7",        # 核心特徵
-        "Attendance_EWMA14",
-        "Daily_Change",
-        "Monthly_Change",
-        "Attendance_Lag1",
-        "Weekly_Change",
-        "Attendance_Rolling7",
-        "Attendance_Position7",
-        "Attendance_Lag30",
-        "Attendance_Lag7",
-        "Day_of_Week",
-        "Lag1_Diff",
-        "DayOfWeek_sin",
-        "Attendance_Rolling14",
-        "Attendance_Position14",
-        "Attendance_Position30",
-        "Attendance_Rolling3",
-        "Attendance_Min7",
-        "Attendance_Median14",
-        "DayOfWeek_Target_Mean",
-        "Attendance_Median3",
-        "Attendance_EWMA30",
-        "Is_Winter_Flu_Season",
-        "Is_Weekend",
-        "Holiday_Factor",
-    ]
-    
     # 如果請求優化，先運行特徵優化器
     if args.optimize or args.quick_optimize:
         print("\n" + "=" * 60)
@@ -933,14 +954,12 @@ def main():
     # 參考: experiment_covid_exclusion_comparison.py 實驗結果
     # 排除期間: 2020-02-01 至 2022-06-30 (WHO 宣布 COVID 大流行至香港放寬限制)
     use_covid_exclusion = os.environ.get('USE_COVID_EXCLUSION', '1') == '1'
-    covid_start = pd.Timestamp('2020-02-01')
-    covid_end = pd.Timestamp('2022-06-30')
+    covid_start, covid_end = COVID_START, COVID_END
     
     if use_covid_exclusion:
         original_len = len(df)
-        covid_mask = (df['Date'] >= covid_start) & (df['Date'] <= covid_end)
-        covid_count = covid_mask.sum()
-        df = df[~covid_mask].copy()
+        df = apply_training_window(df, exclude_covid=True)
+        covid_count = original_len - len(df)
         print(f"\n🦠 COVID 期間排除模式 (研究基礎: 實驗證據):")
         print(f"   ├─ 排除期間: {covid_start.strftime('%Y-%m-%d')} 至 {covid_end.strftime('%Y-%m-%d')}")
         print(f"   ├─ 排除筆數: {covid_count} 筆 COVID 期間數據")
@@ -953,7 +972,7 @@ def main():
     if sliding_window_years > 0 and not use_covid_exclusion:
         cutoff_date = df['Date'].max() - pd.Timedelta(days=sliding_window_years * 365)
         original_len = len(df)
-        df = df[df['Date'] >= cutoff_date].copy()
+        df = apply_training_window(df, exclude_covid=False, sliding_window_years=sliding_window_years)
         print(f"\n📅 滑動窗口訓練模式 (備用):")
         print(f"   ├─ 窗口大小: 最近 {sliding_window_years} 年")
         print(f"   ├─ 截止日期: {cutoff_date.strftime('%Y-%m-%d')}")
@@ -970,9 +989,7 @@ def main():
     time_decay_rate = args.time_decay or float(os.environ.get('TIME_DECAY_RATE', '0'))
     sample_weights = None
     if time_decay_rate > 0:
-        days_from_end = (train_data['Date'].max() - train_data['Date']).dt.days
-        sample_weights = np.exp(-time_decay_rate * days_from_end)
-        sample_weights = sample_weights / sample_weights.mean()  # 歸一化
+        sample_weights = time_decay_weights(train_data['Date'], time_decay_rate)
         print(f"\n⚖️ 時間衰減權重模式:")
         print(f"   ├─ 衰減率: {time_decay_rate}")
         print(f"   ├─ 最新數據權重: {sample_weights.iloc[-1]:.2f}")
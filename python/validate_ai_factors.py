@@ -14,7 +14,7 @@ v3.0.81: Initial implementation
 import os
 import sys
 import json
-import psycopg2
+from db_access import get_connection
 from datetime import datetime, timedelta
 import numpy as np
 
@@ -22,13 +22,12 @@ def get_db_connection():
     """連接到 Railway Production Database"""
     password = os.environ.get('PGPASSWORD') or os.environ.get('DATABASE_PASSWORD') or 'nIdJPREHqkBdMgUifrazOsVlWbxsmDGq'
     
-    return psycopg2.connect(
-        host=os.environ.get('PGHOST', 'tramway.proxy.rlwy.net'),
-        port=int(os.environ.get('PGPORT', '45703')),
-        user=os.environ.get('PGUSER', 'postgres'),
+    return get_connection(
+        host='tramway.proxy.rlwy.net',
+        port='45703',
+        user='postgres',
         password=password,
-        database=os.environ.get('PGDATABASE', 'railway'),
-        sslmode='require'
+        database='railway',
     )
 
 def collect_ai_factor_validation_data():
@@ -4,21 +4,33 @@ Weather data loader utilities.
 
 優先使用本地 weather_full_history.csv，若目標日期超出本地快取，
 則改用 HKO Daily Extract XML 端點按年/月補抓。
+
+Daily Extract 原始檔經 http_cache 存於磁碟（ETag / Last-Modified 重新驗證、
+跨進程單一下載），解析結果按內容 hash 存成 pickle，同一檔案只解析一次。
+已完結的年份/月份長期有效，只有當月（及未完結年份）會定期回源。
+prefetch_daily_extracts() 以有限並行度預先抓取一批日期所需的檔案。
 """
 
 from __future__ import annotations
 
+import hashlib
 import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date as date_type, datetime
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import pandas as pd
-import requests
+
+import http_cache
 
 BASE_DIR = Path(__file__).resolve().parent
 WEATHER_FULL_HISTORY_PATH = BASE_DIR / 'weather_full_history.csv'
 WEATHER_WARNINGS_PATH = BASE_DIR / 'weather_warnings_history.csv'
+EXTRACT_CACHE_DIR = BASE_DIR / 'models' / 'cache' / 'hko_daily_extract'
 
 HKO_DAILY_EXTRACT_METADATA_URL = 'https://www.hko.gov.hk/cis/hko.xml'
 HKO_DAILY_EXTRACT_YEARLY_URL = 'https://www.hko.gov.hk/cis/dailyExtract/dailyExtract_{year}.xml'
@@ -26,10 +38,17 @@ HKO_DAILY_EXTRACT_MONTHLY_URL = 'https://www.hko.gov.hk/cis/dailyExtract/dailyEx
 
 REQUEST_TIMEOUT = 30
 
+# 磁碟快取有效期（秒）
+METADATA_TTL = 12 * 3600
+CURRENT_EXTRACT_TTL = 6 * 3600      # 當月 / 未完結年份
+FINAL_EXTRACT_TTL = 30 * 24 * 3600  # 已完結年份 / 月份（到期只做條件式重新驗證）
+PREFETCH_WORKERS = int(os.getenv('HKO_PREFETCH_WORKERS', '4'))
+
 _local_weather_df: Optional[pd.DataFrame] = None
 _warnings_df: Optional[pd.DataFrame] = None
-_yearly_extract_cache: Dict[int, pd.DataFrame] = {}
-_monthly_extract_cache: Dict[str, pd.DataFrame] = {}
+# 進程內快取: key → (到期 monotonic 時間, DataFrame)
+_yearly_extract_cache: Dict[int, Tuple[float, pd.DataFrame]] = {}
+_monthly_extract_cache: Dict[str, Tuple[float, pd.DataFrame]] = {}
 _daily_extract_metadata: Optional[dict] = None
 
 
@@ -93,15 +112,20 @@ def load_weather_warnings() -> Optional[pd.DataFrame]:
     return _warnings_df
 
 
+def _fetch_extract_payload(url: str, ttl: float) -> http_cache.CachedResponse:
+    response = http_cache.fetch(url, ttl=ttl, timeout=REQUEST_TIMEOUT)
+    if response is None:
+        raise RuntimeError(f'HKO daily extract unavailable: {url}')
+    return response
+
+
 def _load_daily_extract_metadata() -> dict:
     global _daily_extract_metadata
 
     if _daily_extract_metadata is not None:
         return _daily_extract_metadata
 
-    response = requests.get(HKO_DAILY_EXTRACT_METADATA_URL, timeout=REQUEST_TIMEOUT)
-    response.raise_for_status()
-    data = json.loads(response.text)
+    data = _fetch_extract_payload(HKO_DAILY_EXTRACT_METADATA_URL, METADATA_TTL).json()
 
     daily_extract = {}
     for item in data.get('hko', []):
@@ -113,6 +137,54 @@ def _load_daily_extract_metadata() -> dict:
     return _daily_extract_metadata
 
 
+def _metadata_end() -> Tuple[int, int]:
+    try:
+        metadata = _load_daily_extract_metadata()
+    except Exception:
+        return 0, 0
+    return int(metadata.get('endYear') or 0), int(metadata.get('endMonth') or 0)
+
+
+def _yearly_ttl(year: int) -> float:
+    end_year, end_month = _metadata_end()
+    if year < end_year or (year == end_year and end_month == 12):
+        return FINAL_EXTRACT_TTL
+    return CURRENT_EXTRACT_TTL
+
+
+def _monthly_ttl(year: int, month: int) -> float:
+    today = date_type.today()
+    return FINAL_EXTRACT_TTL if (year, month) < (today.year, today.month) else CURRENT_EXTRACT_TTL
+
+
+def _parsed_extract(name: str, response: http_cache.CachedResponse, parser) -> pd.DataFrame:
+    """每個原始檔內容只解析一次：結果以 body hash 為名存成 pickle"""
+    digest = hashlib.sha1(response.body).hexdigest()[:16]
+    path = EXTRACT_CACHE_DIR / f'{name}.{digest}.pkl'
+    try:
+        return pd.read_pickle(path)
+    except Exception:
+        pass
+
+    df = parser(json.loads(response.body.decode('utf-8')))
+    EXTRACT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # pid + 線程 id：同一進程內的並行解析 (學習追趕 / 天氣預取) 不會共用臨時檔
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    df.to_pickle(tmp)
+    os.replace(tmp, path)
+    for old in EXTRACT_CACHE_DIR.glob(f'{name}.*.pkl'):
+        if old != path:
+            old.unlink(missing_ok=True)
+    return df
+
+
+def _memo_get(cache: dict, key):
+    entry = cache.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+
 def _parse_yearly_daily_extract_payload(payload: dict, year: int) -> pd.DataFrame:
     rows = []
 
@@ -150,15 +222,18 @@ def _parse_yearly_daily_extract_payload(payload: dict, year: int) -> pd.DataFram
 
 
 def fetch_yearly_daily_extract(year: int) -> pd.DataFrame:
-    if year in _yearly_extract_cache:
-        return _yearly_extract_cache[year]
-
-    url = HKO_DAILY_EXTRACT_YEARLY_URL.format(year=year)
-    response = requests.get(url, timeout=REQUEST_TIMEOUT)
-    response.raise_for_status()
-    payload = json.loads(response.text)
-    df = _parse_yearly_daily_extract_payload(payload, year)
-    _yearly_extract_cache[year] = df
+    cached = _memo_get(_yearly_extract_cache, year)
+    if cached is not None:
+        return cached
+
+    ttl = _yearly_ttl(year)
+    response = _fetch_extract_payload(HKO_DAILY_EXTRACT_YEARLY_URL.format(year=year), ttl)
+    df = _parsed_extract(
+        f'dailyExtract_{year}',
+        response,
+        lambda payload: _parse_yearly_daily_extract_payload(payload, year),
+    )
+    _yearly_extract_cache[year] = (time.monotonic() + ttl, df)
     return df
 
 
@@ -194,18 +269,60 @@ def _parse_monthly_daily_extract_payload(payload: dict, year: int, month: int) -
 
 def fetch_monthly_daily_extract(year: int, month: int) -> pd.DataFrame:
     cache_key = f'{year:04d}-{month:02d}'
-    if cache_key in _monthly_extract_cache:
-        return _monthly_extract_cache[cache_key]
-
-    url = HKO_DAILY_EXTRACT_MONTHLY_URL.format(year=year, month=month)
-    response = requests.get(url, timeout=REQUEST_TIMEOUT)
-    response.raise_for_status()
-    payload = json.loads(response.text)
-    df = _parse_monthly_daily_extract_payload(payload, year, month)
-    _monthly_extract_cache[cache_key] = df
+    cached = _memo_get(_monthly_extract_cache, cache_key)
+    if cached is not None:
+        return cached
+
+    ttl = _monthly_ttl(year, month)
+    response = _fetch_extract_payload(HKO_DAILY_EXTRACT_MONTHLY_URL.format(year=year, month=month), ttl)
+    df = _parsed_extract(
+        f'dailyExtract_{year}{month:02d}',
+        response,
+        lambda payload: _parse_monthly_daily_extract_payload(payload, year, month),
+    )
+    _monthly_extract_cache[cache_key] = (time.monotonic() + ttl, df)
     return df
 
 
+def _needs_monthly_extract(target_date: date_type, end_year: int, end_month: int) -> bool:
+    return target_date.year > end_year or (target_date.year == end_year and target_date.month > end_month)
+
+
+def prefetch_daily_extracts(dates: Iterable, max_workers: Optional[int] = None) -> Dict[str, int]:
+    """並行預先抓取（並解析）一批日期所需的年度/月度 Daily Extract
+
+    本地 CSV 已有的日期略過；每個檔案只抓一次，並行度上限 max_workers。
+    之後 get_weather_data_for_date 直接命中進程內/磁碟快取。
+    """
+    local_df = load_local_weather_history()
+    pending = sorted({
+        d for d in (_normalize_date(x) for x in dates)
+        if _lookup_row(local_df, d) is None
+    })
+    if not pending:
+        return {'files': 0, 'failed': 0}
+
+    end_year, end_month = _metadata_end()
+    jobs: List[Tuple] = sorted({(d.year,) for d in pending if not end_year or d.year <= end_year})
+    jobs += sorted({(d.year, d.month) for d in pending if _needs_monthly_extract(d, end_year, end_month)})
+
+    def run(job):
+        if len(job) == 1:
+            return fetch_yearly_daily_extract(job[0])
+        return fetch_monthly_daily_extract(*job)
+
+    failed = 0
+    workers = max(1, min(max_workers or PREFETCH_WORKERS, len(jobs)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run, job) for job in jobs]
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception:
+                failed += 1  # 之後逐日查詢時照舊略過
+    return {'files': len(jobs), 'failed': failed}
+
+
 def _lookup_row(df: Optional[pd.DataFrame], target_date: date_type) -> Optional[dict]:
     if df is None or df.empty or target_date not in df.index:
         return None
@@ -226,15 +343,17 @@ def _lookup_weather_source_row(target_date: date_type) -> Optional[dict]:
     end_year = int(metadata.get('endYear') or 0)
     end_month = int(metadata.get('endMonth') or 0)
 
-    try:
-        yearly_df = fetch_yearly_daily_extract(target_date.year)
-        yearly_row = _lookup_row(yearly_df, target_date)
-        if yearly_row:
-            return yearly_row
-    except Exception:
-        pass
+    # 超出 metadata 覆蓋年份的年度檔不存在，不必每次 404
+    if not end_year or target_date.year <= end_year:
+        try:
+            yearly_df = fetch_yearly_daily_extract(target_date.year)
+            yearly_row = _lookup_row(yearly_df, target_date)
+            if yearly_row:
+                return yearly_row
+        except Exception:
+            pass
 
-    if target_date.year > end_year or (target_date.year == end_year and target_date.month > end_month):
+    if _needs_monthly_extract(target_date, end_year, end_month):
         try:
             monthly_df = fetch_monthly_daily_extract(target_date.year, target_date.month)
             monthly_row = _lookup_row(monthly_df, target_date)
@@ -10,7 +10,9 @@ Author: Ma Tsz Kiu
 Date: 2026-01-18
 """
 
-import psycopg2
+from db_access import get_connection
+from psycopg2.extras import execute_values
+from learning_stats import Moments, fetch_moments
 import pandas as pd
 import numpy as np
 from sklearn.linear_model import LinearRegression
@@ -141,22 +143,21 @@ def train_impact_model(conn):
             'abs_impact': abs(float(model.coef_[i]))
         }
 
-    # 6. 更新數據庫
+    # 6. 更新數據庫（單一批量 upsert）
     cur = conn.cursor()
 
-    for feature, data in impacts.items():
-        cur.execute("""
-            INSERT INTO weather_impact_parameters (
-                parameter_name,
-                parameter_value,
-                sample_count,
-                is_active
-            ) VALUES (%s, %s, %s, %s)
-            ON CONFLICT (parameter_name) DO UPDATE SET
-                parameter_value = EXCLUDED.parameter_value,
-                sample_count = EXCLUDED.sample_count,
-                last_updated = NOW()
-        """, (feature, data['coefficient'], len(df), True))
+    execute_values(cur, """
+        INSERT INTO weather_impact_parameters (
+            parameter_name,
+            parameter_value,
+            sample_count,
+            is_active
+        ) VALUES %s
+        ON CONFLICT (parameter_name) DO UPDATE SET
+            parameter_value = EXCLUDED.parameter_value,
+            sample_count = EXCLUDED.sample_count,
+            last_updated = NOW()
+    """, [(feature, data['coefficient'], len(df), True) for feature, data in impacts.items()])
 
     conn.commit()
     cur.close()
@@ -168,57 +169,84 @@ def train_impact_model(conn):
 
     return model, impacts
 
-def update_combination_impacts(conn):
-    """更新天氣條件組合影響"""
-
-    # 計算基線平均
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT AVG(actual_attendance), STDDEV(actual_attendance), COUNT(*)
+WEATHER_COMBINATIONS = [
+    ('very_cold', 'is_very_cold = TRUE'),
+    ('very_hot', 'is_very_hot = TRUE'),
+    ('heavy_rain', 'is_heavy_rain = TRUE'),
+    ('strong_wind', 'is_strong_wind = TRUE'),
+    ('cold_and_rain', 'is_very_cold = TRUE AND is_heavy_rain = TRUE'),
+    ('hot_and_rain', 'is_very_hot = TRUE AND is_heavy_rain = TRUE'),
+    ('cold_and_wind', 'is_very_cold = TRUE AND is_strong_wind = TRUE'),
+]
+
+
+def _scan_combination_stats(cur):
+    """未有 learning_stat_moments 時：基線 + 各組合的單次 FILTER 聚合"""
+    combination_columns = ",\n".join(
+        f"COUNT(*) FILTER (WHERE {condition}), "
+        f"AVG(actual_attendance) FILTER (WHERE {condition}), "
+        f"STDDEV(actual_attendance) FILTER (WHERE {condition})"
+        for _, condition in WEATHER_COMBINATIONS
+    )
+    cur.execute(f"""
+        SELECT
+            AVG(actual_attendance), STDDEV(actual_attendance), COUNT(*),
+            {combination_columns}
         FROM learning_records
         WHERE actual_attendance IS NOT NULL
     """)
-    result = cur.fetchone()
-    baseline_mean = float(result[0]) if result[0] else 250
-    baseline_std = float(result[1]) if result[1] else 20
+    return cur.fetchone()
 
-    # 分析各種組合
-    combinations = [
-        ('very_cold', 'is_very_cold = TRUE'),
-        ('very_hot', 'is_very_hot = TRUE'),
-        ('heavy_rain', 'is_heavy_rain = TRUE'),
-        ('strong_wind', 'is_strong_wind = TRUE'),
-        ('cold_and_rain', 'is_very_cold = TRUE AND is_heavy_rain = TRUE'),
-        ('hot_and_rain', 'is_very_hot = TRUE AND is_heavy_rain = TRUE'),
-        ('cold_and_wind', 'is_very_cold = TRUE AND is_strong_wind = TRUE'),
-    ]
 
-    updated_count = 0
+def update_combination_impacts(conn):
+    """更新天氣條件組合影響
 
-    for name, condition in combinations:
-        cur.execute(f"""
-            SELECT
-                COUNT(*) as n,
-                AVG(actual_attendance) as mean_att,
-                STDDEV(actual_attendance) as std_att
-            FROM learning_records
-            WHERE {condition}
-              AND actual_attendance IS NOT NULL
-        """)
+    優先讀 learning_stat_moments（migration 007 觸發器維護的累計 moments）；
+    未安裝時退回單次 FILTER 聚合。結果一次過 upsert。
+    """
+    moments = fetch_moments(conn, ['lr_attendance'])
+    cur = conn.cursor()
 
-        result = cur.fetchone()
-        n, mean_att, std_att = result
+    if moments is not None:
+        groups = moments['lr_attendance']
+        overall = groups.get('all', Moments())
+        result = [overall.mean, overall.std, overall.n]
+        for name, _ in WEATHER_COMBINATIONS:
+            m = groups.get(name, Moments())
+            result += [m.n, m.mean, m.std]
+    else:
+        result = _scan_combination_stats(cur)
+
+    # 計算基線平均
+    baseline_mean = float(result[0]) if result[0] else 250
+    baseline_std = float(result[1]) if result[1] else 20
+
+    # 分析各種組合
+    today = datetime.now().date()
+    rows = []
+    for i, (name, _) in enumerate(WEATHER_COMBINATIONS):
+        n, mean_att, std_att = result[3 + 3 * i: 6 + 3 * i]
 
         if n < 5:  # 樣本太少
             continue
 
+        mean_att = float(mean_att)
+        std_att = float(std_att) if std_att is not None else 0.0
         impact_factor = mean_att / baseline_mean
         impact_absolute = mean_att - baseline_mean
 
         # t-test
         t_stat = impact_absolute / (std_att / np.sqrt(n)) if std_att > 0 else 0
 
-        cur.execute("""
+        rows.append((
+            json.dumps({'condition': name}),
+            n, mean_att, std_att, baseline_mean,
+            impact_factor, impact_absolute, float(t_stat),
+            today
+        ))
+
+    if rows:
+        execute_values(cur, """
             INSERT INTO weather_combination_impacts (
                 conditions_json,
                 sample_count,
@@ -229,7 +257,7 @@ def update_combination_impacts(conn):
                 impact_absolute,
                 t_statistic,
                 last_seen
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ) VALUES %s
             ON CONFLICT (conditions_json) DO UPDATE SET
                 sample_count = EXCLUDED.sample_count,
                 impact_factor = EXCLUDED.impact_factor,
@@ -237,33 +265,32 @@ def update_combination_impacts(conn):
                 t_statistic = EXCLUDED.t_statistic,
                 last_seen = EXCLUDED.last_seen,
                 last_updated = NOW()
-        """, (
-            json.dumps({'condition': name}),
-            n, mean_att, std_att, baseline_mean,
-            impact_factor, impact_absolute, t_stat,
-            datetime.now().date()
-        ))
-
-        updated_count += 1
+        """, rows)
 
     conn.commit()
     cur.close()
 
+    updated_count = len(rows)
     print(f"✅ Updated {updated_count} weather combinations")
 
     return updated_count
 
 def update_ai_event_learning(conn):
-    """更新 AI 事件學習"""
+    """更新 AI 事件學習（一條 GROUP BY + FILTER 查詢，一次批量 upsert）"""
     cur = conn.cursor()
 
-    # 獲取所有 AI 事件的統計
+    # 獲取所有 AI 事件的統計與方向準確性 (AI 方向是否正確)
     cur.execute("""
         SELECT
             ai_event_type,
             COUNT(*) as total_occurrences,
             AVG(ai_factor) as avg_ai_factor,
-            AVG(prediction_error) as avg_error
+            AVG(prediction_error) as avg_error,
+            COUNT(*) FILTER (WHERE
+                (ai_factor < 1 AND prediction_error < 0) OR
+                (ai_factor > 1 AND prediction_error > 0) OR
+                (ABS(ai_factor - 1) < 0.01 AND ABS(prediction_error) < 5)
+            ) as correct
         FROM learning_records
         WHERE ai_event_type IS NOT NULL
           AND actual_attendance IS NOT NULL
@@ -272,27 +299,10 @@ def update_ai_event_learning(conn):
     """)
 
     events = cur.fetchall()
-    updated_count = 0
-
-    for event_type, count, avg_factor, avg_error in events:
-        # 計算準確性 (AI 方向是否正確)
-        cur.execute("""
-            SELECT
-                COUNT(*) as total,
-                COUNT(CASE
-                    WHEN (ai_factor < 1 AND prediction_error < 0) OR
-                         (ai_factor > 1 AND prediction_error > 0) OR
-                         (ABS(ai_factor - 1) < 0.01 AND ABS(prediction_error) < 5)
-                    THEN 1
-                END) as correct
-            FROM learning_records
-            WHERE ai_event_type = %s
-              AND actual_attendance IS NOT NULL
-        """, (event_type,))
-
-        result = cur.fetchone()
-        total = result[0]
-        correct = result[1]
+    today = datetime.now().date()
+    rows = []
+
+    for event_type, total, avg_factor, avg_error, correct in events:
         accuracy = correct / total if total > 0 else 0
 
         # 信度評估
@@ -303,7 +313,21 @@ def update_ai_event_learning(conn):
         else:
             confidence = 'low'
 
-        cur.execute("""
+        rows.append((
+            event_type,
+            event_type,
+            total,
+            avg_factor,
+            avg_error,
+            (avg_error / 250 * 100) if avg_error else 0,
+            correct,
+            accuracy,
+            confidence,
+            today
+        ))
+
+    if rows:
+        execute_values(cur, """
             INSERT INTO ai_event_learning (
                 event_type,
                 event_pattern,
@@ -315,7 +339,7 @@ def update_ai_event_learning(conn):
                 prediction_accuracy,
                 confidence_level,
                 last_occurrence
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ) VALUES %s
             ON CONFLICT (event_type, event_pattern) DO UPDATE SET
                 total_occurrences = EXCLUDED.total_occurrences,
                 avg_ai_factor = EXCLUDED.avg_ai_factor,
@@ -324,24 +348,12 @@ def update_ai_event_learning(conn):
                 confidence_level = EXCLUDED.confidence_level,
                 last_occurrence = EXCLUDED.last_occurrence,
                 last_updated = NOW()
-        """, (
-            event_type,
-            event_type,
-            count,
-            avg_factor,
-            avg_error,
-            (avg_error / 250 * 100) if avg_error else 0,
-            correct,
-            accuracy,
-            confidence,
-            datetime.now().date()
-        ))
-
-        updated_count += 1
+        """, rows)
 
     conn.commit()
     cur.close()
 
+    updated_count = len(rows)
     print(f"✅ Updated {updated_count} AI event learnings")
 
     return updated_count
@@ -349,7 +361,7 @@ def update_ai_event_learning(conn):
 def main():
     """主函數"""
     load_dotenv()
-    conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+    conn = get_connection()
 
     print("=" * 60)
     print("Weather Impact Learning v4.0.00")